@@ -0,0 +1,20 @@
+import io
+from abc import ABC, abstractmethod
+from typing import Iterable, List, Optional
+
+from .pipeline_filas import COLUMNAS_REPORTE_STATUS
+
+
+class ExportadorStatus(ABC):
+    extension: str = ""
+    media_type: str = ""
+
+    def __init__(self, columnas: list = None, titulo_hoja: str = "Reporte Status", titulo_resumen: str = "FILTROS APLICADOS"):
+        self.columnas = columnas or COLUMNAS_REPORTE_STATUS
+        self.titulo_hoja = titulo_hoja
+        self.titulo_resumen = titulo_resumen
+
+    @abstractmethod
+    def exportar(self, filas: Iterable[dict], resumen: Optional[List[list]] = None) -> io.BytesIO:
+        """Escribe las filas (ya transformadas por el pipeline) y devuelve el fichero en memoria."""
+        pass
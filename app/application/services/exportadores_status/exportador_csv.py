@@ -0,0 +1,24 @@
+import csv
+import io
+from typing import Iterable, List, Optional
+
+from .base_exportador import ExportadorStatus
+
+
+class ExportadorCsv(ExportadorStatus):
+    extension = "csv"
+    media_type = "text/csv; charset=utf-8"
+
+    def exportar(self, filas: Iterable[dict], resumen: Optional[List[list]] = None) -> io.BytesIO:
+        # El resumen de filtros no tiene cabida en un CSV tabular: solo cabecera y filas
+        texto = io.StringIO()
+        writer = csv.writer(texto)
+        writer.writerow([titulo for _, titulo, _ in self.columnas])
+        claves = [clave for clave, _, _ in self.columnas]
+        for fila in filas:
+            writer.writerow([fila.get(clave) for clave in claves])
+
+        # BOM para que Excel detecte UTF-8 al abrir el fichero
+        output = io.BytesIO(texto.getvalue().encode("utf-8-sig"))
+        output.seek(0)
+        return output
@@ -0,0 +1,24 @@
+import io
+import json
+from typing import Iterable, List, Optional
+
+from .base_exportador import ExportadorStatus
+
+
+class ExportadorJson(ExportadorStatus):
+    extension = "json"
+    media_type = "application/json"
+
+    def exportar(self, filas: Iterable[dict], resumen: Optional[List[list]] = None) -> io.BytesIO:
+        claves = [clave for clave, _, _ in self.columnas]
+        documento = {
+            # Solo las líneas "Etiqueta:", valor del resumen
+            "resumen": {
+                str(linea[0]).rstrip(":"): linea[1]
+                for linea in (resumen or []) if len(linea) == 2
+            },
+            "hitos": [{clave: fila.get(clave) for clave in claves} for fila in filas],
+        }
+        output = io.BytesIO(json.dumps(documento, ensure_ascii=False, default=str).encode("utf-8"))
+        output.seek(0)
+        return output
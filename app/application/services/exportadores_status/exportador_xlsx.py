@@ -0,0 +1,96 @@
+import io
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException
+
+from .base_exportador import ExportadorStatus
+
+try:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.utils import get_column_letter
+except ImportError:
+    Workbook = None
+
+# Colores por estado calculado (según los colores del frontend)
+COLORES_ESTADO = {
+    "Cumplido en plazo": "16a34a",  # Verde
+    "Cumplido fuera de plazo": "b45309",  # Naranja
+    "Vence hoy": "dc2626",  # Rojo
+    "Pendiente fuera de plazo": "ef4444",  # Rojo claro
+    "Pendiente en plazo": "00a1de",  # Azul Atisa
+}
+
+
+class ExportadorXlsx(ExportadorStatus):
+    """
+    Exportador Excel en modo write_only: las filas se escriben según llegan y no se
+    mantiene el libro completo en memoria. Los anchos de columna se fijan de antemano.
+    """
+    extension = "xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    def __init__(self, *args, **kwargs):
+        if Workbook is None:
+            raise HTTPException(status_code=500, detail="La librería 'openpyxl' no está instalada.")
+        super().__init__(*args, **kwargs)
+
+    def exportar(self, filas: Iterable[dict], resumen: Optional[List[list]] = None) -> io.BytesIO:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(self.titulo_hoja)
+
+        # En modo write_only los anchos deben definirse antes de la primera fila
+        for indice, (_, _, ancho) in enumerate(self.columnas, start=1):
+            ws.column_dimensions[get_column_letter(indice)].width = ancho
+
+        # --- SECCIÓN RESUMEN (filtros aplicados) ---
+        if resumen is not None:
+            titulo = WriteOnlyCell(ws, value=self.titulo_resumen)
+            titulo.font = Font(size=14, bold=True)
+            ws.append([titulo])
+            ws.append(["-" * 50])
+            ws.append([])
+            for fila_resumen in resumen:
+                ws.append(fila_resumen)
+            ws.append([])
+            ws.append([])
+
+        # --- SECCIÓN DATOS ---
+        font_cabecera = Font(bold=True, color="FFFFFF")
+        fill_cabecera = PatternFill(start_color="1f4788", end_color="1f4788", fill_type="solid")
+        alineacion_cabecera = Alignment(horizontal="center")
+        cabecera = []
+        for _, titulo_columna, _ in self.columnas:
+            celda = WriteOnlyCell(ws, value=titulo_columna)
+            celda.font = font_cabecera
+            celda.fill = fill_cabecera
+            celda.alignment = alineacion_cabecera
+            cabecera.append(celda)
+        ws.append(cabecera)
+
+        fills = {
+            estado: PatternFill(start_color=color, end_color=color, fill_type="solid")
+            for estado, color in COLORES_ESTADO.items()
+        }
+        font_blanco = Font(color="FFFFFF", bold=False)
+        claves = [clave for clave, _, _ in self.columnas]
+
+        for fila in filas:
+            fill_color = fills.get(fila.get("estado"))
+            if fill_color is None:
+                ws.append([fila.get(clave) for clave in claves])
+                continue
+
+            celdas = []
+            for clave in claves:
+                celda = WriteOnlyCell(ws, value=fila.get(clave))
+                celda.fill = fill_color
+                celda.font = font_blanco
+                celdas.append(celda)
+            ws.append(celdas)
+
+        output = io.BytesIO()
+        wb.save(output)
+        output.seek(0)
+        return output
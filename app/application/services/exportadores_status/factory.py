@@ -0,0 +1,18 @@
+from .base_exportador import ExportadorStatus
+from .exportador_csv import ExportadorCsv
+from .exportador_json import ExportadorJson
+from .exportador_xlsx import ExportadorXlsx
+
+FORMATOS_EXPORTACION = {
+    "xlsx": ExportadorXlsx,
+    "csv": ExportadorCsv,
+    "json": ExportadorJson,
+}
+
+
+def obtener_exportador(formato: str, **kwargs) -> ExportadorStatus:
+    formato = (formato or "xlsx").lower()
+    exportador = FORMATOS_EXPORTACION.get(formato)
+    if exportador is None:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    return exportador(**kwargs)
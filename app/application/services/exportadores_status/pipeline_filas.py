@@ -0,0 +1,176 @@
+from datetime import date, time, datetime
+from calendar import monthrange
+from typing import Callable, Iterable, Iterator, Optional
+
+# (clave, título de columna, ancho en Excel) en el orden del reporte
+COLUMNAS_REPORTE_STATUS = [
+    ("cliente", "Cliente", 40),
+    ("cubo", "Cubo", 30),
+    ("proceso", "Proceso", 35),
+    ("periodo", "Periodo", 25),
+    ("estado_proceso", "Estado Proceso", 16),
+    ("hito", "Hito", 40),
+    ("responsable", "Responsable", 14),
+    ("clave", "Clave", 10),
+    ("estado", "Estado", 26),
+    ("fecha_limite", "Fecha Límite", 14),
+    ("hora_limite", "Hora Límite", 12),
+    ("fecha_actualizacion", "Fecha y Hora Actualización", 26),
+    ("gestor", "Gestor", 30),
+    ("observaciones", "Observaciones", 50),
+    ("fecha_cumplimiento", "Fecha Cumplimiento", 20),
+    ("hora_cumplimiento", "Hora Cumplimiento", 19),
+    ("fecha_creacion_cumplimiento", "Fecha Creación Cumplimiento", 28),
+    ("cubo_cumplimiento", "Cubo Cumplimiento", 30),
+]
+
+# Columnas de la exportación de status de un único cliente
+COLUMNAS_STATUS_CLIENTE = [
+    ("proceso", "Proceso", 35),
+    ("hito", "Hito", 40),
+    ("estado", "Estado", 26),
+    ("fecha_limite", "Fecha Límite", 14),
+    ("hora_limite", "Hora Límite", 12),
+    ("fecha_actualizacion", "Fecha Estado", 14),
+    ("responsable", "Tipo", 12),
+    ("obligatorio", "Obligatorio", 12),
+    ("critico", "Crítico", 10),
+]
+
+
+class PipelineFilasStatus:
+    """
+    Transforma las filas del reporte de status en filas de exportación en una sola pasada.
+
+    Cada valor derivado se calcula una única vez: el estado calculado viene de la consulta
+    (o de calcular_estado si la fila no lo trae) y los textos que se repiten entre filas
+    (periodo por (mes, anio), estado por cliente_proceso_id, cubos y fechas formateadas)
+    se memorizan. El resultado alimenta cualquier exportador (xlsx, csv, json); las columnas
+    que la fila no trae (p.ej. en la exportación por cliente) quedan vacías.
+    """
+
+    def __init__(self, calcular_estado: Optional[Callable] = None):
+        self.calcular_estado = calcular_estado
+        self._periodos = {}
+        self._estados_proceso = {}
+        self._cubos = {}
+        self._fechas = {}
+        self._horas = {}
+
+    def transformar(self, filas: Iterable) -> Iterator[dict]:
+        for r in filas:
+            yield self.transformar_fila(r)
+
+    def transformar_fila(self, r) -> dict:
+        estado_calculado = getattr(r, 'estado_calculado', None)
+        if estado_calculado is None and self.calcular_estado:
+            estado_calculado = self.calcular_estado(r.estado, r.fecha_limite, r.hora_limite, r.cumplimiento_fecha)
+
+        gestor = ""
+        observaciones = ""
+        fecha_creacion = ""
+        fecha_cumplimiento = ""
+        hora_cumplimiento = ""
+        cubo_cumplimiento = ""
+        if getattr(r, 'cumplimiento_id', None):
+            gestor = str(r.cumplimiento_usuario or "").strip()
+            observaciones = str(r.cumplimiento_observacion or "").strip()
+            fecha_creacion = r.cumplimiento_fecha_creacion.strftime("%d/%m/%Y %H:%M") if r.cumplimiento_fecha_creacion else ""
+            fecha_cumplimiento = self._fecha(r.cumplimiento_fecha)
+            hora_cumplimiento = self._hora(r.cumplimiento_hora)
+            cubo_cumplimiento = self._cubo(r.cumplimiento_codSubDepar, r.cumplimiento_departamento)
+
+        return {
+            "cliente": str(getattr(r, 'cliente_nombre', None) or "").strip(),
+            "cubo": self._cubo(getattr(r, 'cliente_departamento_codigo', None), getattr(r, 'cliente_departamento_nombre', None)),
+            "proceso": str(r.proceso_nombre or "").strip(),
+            "periodo": self._periodo(r),
+            "estado_proceso": self._estado_proceso(r),
+            "hito": str(r.hito_nombre or "").strip(),
+            "responsable": str(r.tipo or ""),
+            "clave": "Clave" if getattr(r, 'hito_critico', False) else "No Clave",
+            "obligatorio": "Sí" if getattr(r, 'hito_obligatorio', 0) == 1 else "No",
+            "critico": "Sí" if getattr(r, 'hito_critico', False) else "No",
+            "estado": estado_calculado,
+            "fecha_limite": self._fecha(r.fecha_limite),
+            "hora_limite": self._hora(r.hora_limite),
+            "fecha_actualizacion": self._fecha(r.fecha_estado.date() if isinstance(r.fecha_estado, datetime) else r.fecha_estado),
+            "gestor": gestor,
+            "observaciones": observaciones,
+            "fecha_cumplimiento": fecha_cumplimiento,
+            "hora_cumplimiento": hora_cumplimiento,
+            "fecha_creacion_cumplimiento": fecha_creacion,
+            "cubo_cumplimiento": cubo_cumplimiento,
+        }
+
+    def _estado_proceso(self, r) -> str:
+        cp_id = getattr(r, 'cliente_proceso_id', None)
+        estado = self._estados_proceso.get(cp_id)
+        if estado is None:
+            # proceso_estado viene de la consulta (todos los hitos habilitados del proceso)
+            estado = getattr(r, 'proceso_estado', None) or 'En proceso'
+            self._estados_proceso[cp_id] = estado
+        return estado
+
+    def _periodo(self, r) -> str:
+        mes = getattr(r, 'proceso_mes', None)
+        anio = getattr(r, 'proceso_anio', None)
+
+        # Priorizar mes y año para calcular periodo exacto
+        if mes and anio:
+            periodo = self._periodos.get((mes, anio))
+            if periodo is None:
+                try:
+                    _, last_day = monthrange(anio, mes)
+                    periodo = f"{self._fecha(date(anio, mes, 1))} - {self._fecha(date(anio, mes, last_day))}"
+                except ValueError:
+                    periodo = ""
+                self._periodos[(mes, anio)] = periodo
+            if periodo:
+                return periodo
+
+        # Fallback a fecha_inicio y fecha_fin
+        fecha_inicio = getattr(r, 'proceso_fecha_inicio', None)
+        fecha_fin = getattr(r, 'proceso_fecha_fin', None)
+        clave = (fecha_inicio, fecha_fin)
+        periodo = self._periodos.get(clave)
+        if periodo is None:
+            periodo = ""
+            if fecha_inicio:
+                periodo = self._fecha(fecha_inicio)
+                if fecha_fin:
+                    periodo += f" - {self._fecha(fecha_fin)}"
+            self._periodos[clave] = periodo
+        return periodo
+
+    def _cubo(self, codigo, nombre) -> str:
+        clave = (codigo, nombre)
+        cubo = self._cubos.get(clave)
+        if cubo is None:
+            nombre_limpio = str(nombre or "").strip()
+            codigo_limpio = str(codigo or "").strip()
+            if codigo_limpio:
+                # Ultimos 2 digitos del codigo y nombre (Cubo - Linea)
+                cubo = f"{codigo_limpio[-2:]} - {nombre_limpio}"
+            else:
+                cubo = nombre_limpio
+            self._cubos[clave] = cubo
+        return cubo
+
+    def _fecha(self, valor: Optional[date]) -> str:
+        if not valor:
+            return ""
+        texto = self._fechas.get(valor)
+        if texto is None:
+            texto = valor.strftime("%d/%m/%Y")
+            self._fechas[valor] = texto
+        return texto
+
+    def _hora(self, valor: Optional[time]) -> str:
+        if not valor:
+            return ""
+        texto = self._horas.get(valor)
+        if texto is None:
+            texto = valor.strftime("%H:%M")
+            self._horas[valor] = texto
+        return texto
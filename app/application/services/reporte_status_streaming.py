@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+from app.infrastructure.db.database import SessionLocal
+from app.infrastructure.db.repositories.cliente_proceso_hito_repository_sql import ClienteProcesoHitoRepositorySQL
+from app.application.services.cliente_proceso_hito_status_service import ClienteProcesoHitoStatusService
+
+# formato -> (media_type, extensión) de las respuestas del reporte de status en streaming
+FORMATOS_STREAMING = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+@contextmanager
+def servicio_status() -> Iterator[ClienteProcesoHitoStatusService]:
+    """
+    Servicio del reporte con su propia sesión, para los endpoints que ofrecen la respuesta en
+    streaming: la rama que no hace streaming la abre aquí y la de streaming, dentro del generador.
+    """
+    db = SessionLocal()
+    try:
+        yield ClienteProcesoHitoStatusService(ClienteProcesoHitoRepositorySQL(db))
+    finally:
+        db.close()
+
+
+def generar_reporte_streaming(formato: str, filtros: dict, paginacion: dict,
+                              email: Optional[str] = None, campos: Optional[set] = None) -> Iterator[str]:
+    """
+    Bloques del reporte de status en NDJSON o CSV.
+    La sesión se abre dentro del generador para que el cursor viva mientras se envía la respuesta.
+    """
+    with servicio_status() as service:
+        if formato == "csv":
+            yield from service.stream_reporte_csv(filtros, paginacion, email, campos)
+        else:
+            yield from service.stream_reporte_ndjson(filtros, paginacion, email, campos)
+
+
+def nombre_fichero_streaming(nombre_base: str, formato: str) -> str:
+    return f"{nombre_base}_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{FORMATOS_STREAMING[formato][1]}"
@@ -1,9 +1,10 @@
-from typing import List
+from typing import List, Tuple
 from app.domain.entities.cliente import Cliente
 from app.domain.repositories.cliente_repository import ClienteRepository
 
-def listar_clientes_por_hito(repo: ClienteRepository, hito_id: int) -> List[Cliente]:
+def listar_clientes_por_hito(repo: ClienteRepository, hito_id: int, paginacion) -> Tuple[int, List[Cliente]]:
     """
-    Lista todos los clientes que tienen un hito específico asignado en su calendario.
+    Lista los clientes que tienen un hito específico asignado en su calendario.
+    Devuelve el total y la página solicitada, ordenada según la paginación indicada.
     """
-    return repo.listar_por_hito_id(hito_id)
+    return repo.listar_paginado(paginacion, hito_id=hito_id)
@@ -13,6 +13,49 @@ class Settings(BaseSettings):
     CLIENT_SECRET: Optional[str] = None
     TENANT_ID: Optional[str] = None
     REDIRECT_URI: Optional[str] = None
+    # Caché en proceso de asignaciones empleado -> clientes/subdepartamentos (0 la desactiva)
+    ASIGNACIONES_CACHE_TTL_SEGUNDOS: int = 300
+    ASIGNACIONES_CACHE_PRECARGAR: bool = False
+    # Índice en memoria cliente/CIF -> departamentos (recarga completa al caducar)
+    CLIENTE_DEPARTAMENTO_INDEX_TTL_SEGUNDOS: int = 900
+    # Directorio en memoria de personas (Numeross/email/NIF -> datos y nombre para mostrar)
+    DIRECTORIO_PERSONAS_TTL_SEGUNDOS: int = 3600
+    # Índice de trigramas en memoria para buscar/autocompletar clientes (razsoc, CIF, idcliente)
+    BUSCADOR_CLIENTES_TTL_SEGUNDOS: int = 900
+    # Índice en memoria para enrutar los eventos WebSocket (cliente_proceso/proceso/hito -> clientes);
+    # se reconcilia con una recarga completa al caducar
+    INDICE_RUTAS_EVENTOS_TTL_SEGUNDOS: int = 600
+    # Reparto de eventos WebSocket entre workers: memoria (un worker), local (sockets Unix en
+    # WEBSOCKET_BROKER_DIRECTORIO, una máquina) o redis (WEBSOCKET_BROKER_URL, varias máquinas)
+    WEBSOCKET_BROKER: str = "memoria"
+    WEBSOCKET_BROKER_DIRECTORIO: str = "/tmp/atisa-websocket"
+    WEBSOCKET_BROKER_URL: str = "redis://localhost:6379/0"
+    WEBSOCKET_BROKER_PREFIJO: str = "atisa:ws:"
+    # Espera máxima al conectar con Redis y a cada respuesta de un comando; sin ella un servidor
+    # inalcanzable bloquea a todos los que publican
+    WEBSOCKET_BROKER_TIMEOUT_SEGUNDOS: float = 5.0
+    # Cola de salida por socket: tamaño y política al llenarse (descartar_antiguo | coalescer | desconectar)
+    WEBSOCKET_COLA_MAXIMA: int = 256
+    WEBSOCKET_POLITICA_DESBORDE: str = "descartar_antiguo"
+    # Un envío que tarda más se da por socket muerto y se desconecta
+    WEBSOCKET_TIMEOUT_ENVIO_SEGUNDOS: float = 10.0
+    # Latido del servidor a cada socket; sin mensajes del cliente en WEBSOCKET_INACTIVIDAD_SEGUNDOS
+    # se desconecta (0 = no desconectar por inactividad)
+    WEBSOCKET_HEARTBEAT_SEGUNDOS: float = 30.0
+    WEBSOCKET_INACTIVIDAD_SEGUNDOS: float = 0
+    # Agrupación de eventos por canal: se envían tras WEBSOCKET_DEBOUNCE_MS sin eventos nuevos y,
+    # como mucho, WEBSOCKET_DEBOUNCE_MAXIMO_MS después del primero
+    WEBSOCKET_DEBOUNCE_MS: int = 200
+    WEBSOCKET_DEBOUNCE_MAXIMO_MS: int = 1000
+    # Historial por canal para reanudar tras una reconexión (last_seq) y tiempo que se conserva el
+    # canal (suscripción e historial) después de desconectarse su último socket
+    WEBSOCKET_HISTORIAL_EVENTOS: int = 500
+    WEBSOCKET_RETENCION_CANAL_SEGUNDOS: float = 300
+    # Máximo de departamentos a los que puede suscribirse un socket multiplexado
+    WEBSOCKET_CANALES_POR_SOCKET: int = 100
+    # Outbox de eventos de escritura: cambios resueltos por lote en segundo plano y máximo en cola
+    WEBSOCKET_OUTBOX_LOTE: int = 200
+    WEBSOCKET_OUTBOX_MAXIMO: int = 10000
 
     class Config:
         env_file = ".env"
@@ -13,6 +13,17 @@ class AdminHitosDepartamentoRepository(ABC):
         """Lista hitos agrupados por departamento y proceso con filtros opcionales."""
         pass
 
+    @abstractmethod
+    def listar_cambios(
+        self,
+        desde: int = 0,
+        cod_subdepar: Optional[str] = None,
+        limit: int = 5000,
+    ) -> Dict[str, Any]:
+        """Hitos y cumplimientos modificados después de la versión `desde`, con las lápidas de los
+        deshabilitados o eliminados, y la versión desde la que continuar."""
+        pass
+
     @abstractmethod
     def actualizar_hito_departamento(
         self,
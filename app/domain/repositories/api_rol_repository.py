@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import Iterable, Optional
 from app.domain.entities.api_rol import ApiRol
 
 class ApiRolRepository(ABC):
@@ -13,6 +13,11 @@ class ApiRolRepository(ABC):
         """Busca un rol de administrador por email."""
         pass
 
+    @abstractmethod
+    def buscar_por_emails(self, emails: Iterable[str]) -> dict[str, ApiRol]:
+        """Roles de varios emails en una sola consulta: {email en minúsculas: ApiRol}."""
+        pass
+
     @abstractmethod
     def listar(self) -> list[ApiRol]:
         """Devuelve la lista completa de roles de administrador."""
@@ -0,0 +1,10 @@
+from abc import ABC, abstractmethod
+
+class CecoSubdeparRepository(ABC):
+    @abstractmethod
+    def refrescar(self) -> dict:
+        """
+        Recalcula la correspondencia CODIDEPAR <-> subdepartamento a partir de HDW_Cecos y SubDepar
+        y aplica solo las diferencias con la tabla actual. Devuelve {'altas', 'bajas', 'total'}.
+        """
+        pass
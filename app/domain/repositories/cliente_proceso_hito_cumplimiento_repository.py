@@ -12,6 +12,10 @@ class ClienteProcesoHitoCumplimientoRepository(ABC):
     def listar(self):
         pass
 
+    @abstractmethod
+    def listar_paginado(self, paginacion, campos: set = None):
+        pass
+
     @abstractmethod
     def obtener_por_id(self, id: int):
         pass
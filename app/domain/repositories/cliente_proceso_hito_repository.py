@@ -66,9 +66,30 @@ class ClienteProcesoHitoRepository(ABC):
         pass
 
     @abstractmethod
-    def ejecutar_reporte_status_todos_clientes(self, filtros: dict, paginacion: dict):
+    def ejecutar_reporte_status_todos_clientes(self, filtros: dict, paginacion: dict, campos: set = None):
         """
         Ejecuta la consulta masiva para el reporte de Status Todos los Clientes.
-        Retorna (lista_resultados, total_registros).
+        Retorna (lista_resultados, total_registros); campos limita la proyección (None = todos).
+        """
+        pass
+
+    @abstractmethod
+    def contar_reporte_status_por_estado(self, filtros: dict, email: str = None) -> dict:
+        """Devuelve {estado_calculado: total} para los filtros del reporte de status."""
+        pass
+
+    @abstractmethod
+    def iterar_reporte_status_todos_clientes(self, filtros: dict, paginacion: dict = None, email: str = None, campos: set = None):
+        """
+        Igual que ejecutar_reporte_status_todos_clientes pero como generador en streaming
+        (sin total), opcionalmente restringido a los clientes del usuario (email).
+        """
+        pass
+
+    @abstractmethod
+    def listar_status_hitos_cliente(self, cliente_id: str, filtros: dict):
+        """
+        Hitos habilitados de un cliente con el estado calculado sobre su último cumplimiento,
+        como filas de columnas para la exportación de status por cliente.
         """
         pass
@@ -15,6 +15,10 @@ class ClienteProcesoRepository(ABC):
     def listar_por_cliente(self, cliente_id: str):
         pass
 
+    @abstractmethod
+    def listar_paginado(self, paginacion, cliente_id: str = None, solo_habilitados: bool = False):
+        pass
+
     @abstractmethod
     def listar_habilitados(self):
         pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Tuple
 from app.domain.entities.cliente import Cliente
 
 class ClienteRepository(ABC):
@@ -8,10 +8,20 @@ class ClienteRepository(ABC):
     def listar(self) -> List[Cliente]:
         pass
 
+    @abstractmethod
+    def listar_paginado(self, paginacion, hito_id: Optional[int] = None) -> Tuple[int, List[Cliente]]:
+        """(total, página de clientes) con el orden y la paginación resueltos en la consulta"""
+        pass
+
     @abstractmethod
     def buscar_por_nombre(self, nombre: str) -> List[Cliente]:
         pass
 
+    @abstractmethod
+    def autocompletar(self, texto: str, limite: int = 10) -> List[dict]:
+        """Mejores coincidencias (idcliente, cif, razsoc, puntuacion) para el texto tecleado"""
+        pass
+
     @abstractmethod
     def buscar_por_cif(self, cif: str) -> Optional[Cliente]:
         pass
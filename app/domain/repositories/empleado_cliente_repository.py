@@ -0,0 +1,20 @@
+from abc import ABC, abstractmethod
+
+class EmpleadoClienteRepository(ABC):
+    @abstractmethod
+    def listar_clientes(self, email: str) -> list[str]:
+        """IDs de los clientes asignados al empleado (email)."""
+        pass
+
+    @abstractmethod
+    def listar_todos(self) -> dict:
+        """Asignaciones de todos los empleados, {email: {id_cliente, ...}}."""
+        pass
+
+    @abstractmethod
+    def refrescar(self) -> dict:
+        """
+        Recalcula las asignaciones empleado-cliente y aplica solo las diferencias con la
+        tabla actual. Devuelve {'altas', 'bajas', 'total'}.
+        """
+        pass
@@ -12,6 +12,10 @@ class HitoRepository(ABC):
     def listar(self):
         pass
 
+    @abstractmethod
+    def listar_paginado(self, paginacion):
+        pass
+
     @abstractmethod
     def listar_habilitados(self):
         pass
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from app.domain.entities.persona import Persona
 
 class PersonaRepository(ABC):
@@ -7,6 +7,10 @@ class PersonaRepository(ABC):
     def listar(self) -> List[Persona]:
         pass
 
+    @abstractmethod
+    def listar_paginado(self, paginacion) -> Tuple[int, List[Persona]]:
+        pass
+
     @abstractmethod
     def buscar_por_email(self, email: str) -> Optional[Persona]:
         pass
@@ -8,6 +8,10 @@ class SubdeparRepository(ABC):
     def listar(self):
         pass
 
+    @abstractmethod
+    def listar_agrupado_paginado(self, paginacion):
+        pass
+
     @abstractmethod
     def obtener_por_id(self, id: int):
         pass
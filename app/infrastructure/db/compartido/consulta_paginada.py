@@ -0,0 +1,143 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import and_, func, or_
+
+# Ordenación y paginación de los listados resueltas en la base de datos (ORDER BY + OFFSET/FETCH
+# o keyset) en lugar de cargar la tabla entera y ordenar/trocear en Python. Cada repositorio declara
+# la lista blanca {sort_field: columna} que admite; cualquier otro campo se rechaza antes de llegar
+# a SQL. El orden siempre termina en una columna única (desempate) para que las páginas sean estables.
+
+
+class CampoOrdenNoPermitido(ValueError):
+    pass
+
+
+class CursorNoValido(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Paginacion:
+    page: Optional[int] = None
+    limit: Optional[int] = None
+    sort_field: Optional[str] = None
+    sort_direction: Optional[str] = "asc"
+
+    @property
+    def paginada(self) -> bool:
+        """Como hasta ahora, solo se pagina si llegan page y limit."""
+        return self.page is not None and self.limit is not None
+
+    @property
+    def offset(self) -> int:
+        return (self.page - 1) * self.limit if self.paginada else 0
+
+    @property
+    def descendente(self) -> bool:
+        return self.sort_direction == "desc"
+
+
+def validar_campo_orden(columnas: dict, sort_field: Optional[str]) -> Optional[str]:
+    if not sort_field:
+        return None
+    if sort_field not in columnas:
+        raise CampoOrdenNoPermitido(
+            f"No se puede ordenar por '{sort_field}'. Campos permitidos: {', '.join(sorted(columnas))}"
+        )
+    return sort_field
+
+
+def columnas_modelo(modelo) -> dict:
+    """Lista blanca con todas las columnas mapeadas de un modelo: {atributo: columna}."""
+    return {atributo.key: getattr(modelo, atributo.key) for atributo in modelo.__mapper__.column_attrs}
+
+
+def codificar_cursor(*valores) -> str:
+    """Cursor opaco con los valores de orden de la última fila devuelta (fechas en ISO 8601)."""
+    contenido = json.dumps(valores, default=lambda valor: valor.isoformat(), separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, num_valores: int) -> list:
+    try:
+        contenido = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        valores = json.loads(contenido)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise CursorNoValido("El cursor de paginación no es válido")
+    if not isinstance(valores, list) or len(valores) != num_valores:
+        raise CursorNoValido("El cursor de paginación no es válido")
+    return valores
+
+
+# — Consultas ORM —
+
+def contar(query) -> int:
+    """COUNT(*) sobre la consulta sin ORDER BY; respeta DISTINCT y GROUP BY de la original."""
+    return query.session.query(func.count()).select_from(query.order_by(None).subquery()).scalar() or 0
+
+
+def ordenar(query, columnas: dict, paginacion: Paginacion, desempate, campo_defecto: Optional[str] = None):
+    campo = validar_campo_orden(columnas, paginacion.sort_field) or campo_defecto
+    criterios = [columnas[campo]] if campo else []
+    criterios.append(desempate)
+    return query.order_by(*[c.desc() if paginacion.descendente else c.asc() for c in criterios])
+
+
+def filtro_keyset(columna, desempate, descendente: bool, valor, valor_desempate):
+    """
+    Condición "después de (valor, valor_desempate)" para paginar por keyset sobre un índice
+    (columna, desempate). La columna no debe admitir NULL.
+    """
+    if descendente:
+        return or_(columna < valor, and_(columna == valor, desempate < valor_desempate))
+    return or_(columna > valor, and_(columna == valor, desempate > valor_desempate))
+
+
+def paginar(query, columnas: dict, paginacion: Paginacion, desempate,
+            campo_defecto: Optional[str] = None) -> tuple[int, list]:
+    """(total, filas de la página) con el orden y la página aplicados en SQL."""
+    total = contar(query)
+    query = ordenar(query, columnas, paginacion, desempate, campo_defecto)
+    if paginacion.paginada:
+        query = query.offset(paginacion.offset).limit(paginacion.limit)
+    return total, query.all()
+
+
+# — SQL textual —
+
+def sql_orden(columnas: dict, paginacion: Paginacion, desempate: str, campo_defecto: Optional[str] = None) -> str:
+    """ORDER BY con la columna permitida (expresión SQL) y el desempate; nunca interpola la entrada."""
+    campo = validar_campo_orden(columnas, paginacion.sort_field) or campo_defecto
+    direccion = "DESC" if paginacion.descendente else "ASC"
+    criterios = [columnas[campo]] if campo else []
+    criterios.append(desempate)
+    return "ORDER BY " + ", ".join(f"{criterio} {direccion}" for criterio in criterios)
+
+
+def sql_paginacion(dialecto: str, paginacion: Paginacion, prefijo: str = "pagina") -> tuple[str, dict]:
+    """Cláusula OFFSET/FETCH (SQL Server) o LIMIT/OFFSET; va siempre detrás de un ORDER BY."""
+    if not paginacion.paginada:
+        return "", {}
+    params = {f"{prefijo}_offset": paginacion.offset, f"{prefijo}_limit": paginacion.limit}
+    if dialecto == "mssql":
+        return f"OFFSET :{prefijo}_offset ROWS FETCH NEXT :{prefijo}_limit ROWS ONLY", params
+    return f"LIMIT :{prefijo}_limit OFFSET :{prefijo}_offset", params
+
+
+def sql_keyset(columna: str, desempate: str, descendente: bool, valor, valor_desempate,
+               prefijo: str = "cursor", tipo_valor: Optional[str] = None) -> tuple[str, dict]:
+    """
+    Versión textual de filtro_keyset: (condición, parámetros) para añadir al WHERE. tipo_valor
+    fuerza el tipo del parámetro (p.ej. DATETIME, que SQL Server no compara bien con datetime2).
+    """
+    operador = "<" if descendente else ">"
+    marcador = f":{prefijo}_valor" if tipo_valor is None else f"CAST(:{prefijo}_valor AS {tipo_valor})"
+    condicion = (
+        f"({columna} {operador} {marcador}"
+        f" OR ({columna} = {marcador} AND {desempate} {operador} :{prefijo}_desempate))"
+    )
+    return condicion, {f"{prefijo}_valor": valor, f"{prefijo}_desempate": valor_desempate}
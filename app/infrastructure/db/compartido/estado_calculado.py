@@ -0,0 +1,60 @@
+from datetime import date, time
+
+from sqlalchemy import and_, case, func, or_
+
+# Claves aceptadas en el filtro "estados" (snake_case) y su etiqueta calculada
+ESTADOS_CALCULADOS = {
+    "cumplido_en_plazo": "Cumplido en plazo",
+    "cumplido_fuera_de_plazo": "Cumplido fuera de plazo",
+    "cumplido_fuera_plazo": "Cumplido fuera de plazo",
+    "vence_hoy": "Vence hoy",
+    "pendiente_fuera_de_plazo": "Pendiente fuera de plazo",
+    "pendiente_fuera_plazo": "Pendiente fuera de plazo",
+    "pendiente_en_plazo": "Pendiente en plazo",
+    "finalizado": "Finalizado",
+}
+
+
+def estado_calculado_expr(estado, fecha_limite, fecha_cumplimiento, hoy: date = None,
+                          hora_limite=None, hora_cumplimiento=None):
+    """
+    Expresión SQL (CASE) equivalente a ClienteProcesoHitoStatusService._calculate_excel_status.
+
+    La fecha de cumplimiento es DATE (medianoche) y el plazo vence el día fecha_limite a la
+    hora_limite (o 23:59:59), así que "fuera de plazo" equivale a fecha_cumplimiento > fecha_limite
+    sin depender de hora_limite. Con hora_cumplimiento (export por cliente) se compara también
+    la hora cuando el cumplimiento cae el mismo día del plazo.
+    Se puede usar en WHERE, ORDER BY y GROUP BY.
+    """
+    hoy = hoy or date.today()
+    finalizado = estado == 'Finalizado'
+
+    fuera_de_plazo = fecha_cumplimiento > fecha_limite
+    if hora_cumplimiento is not None:
+        fuera_de_plazo = or_(
+            fuera_de_plazo,
+            and_(
+                fecha_cumplimiento == fecha_limite,
+                hora_cumplimiento > func.coalesce(hora_limite, time(23, 59, 59))
+            )
+        )
+
+    return case(
+        (and_(finalizado, or_(fecha_cumplimiento.is_(None), fecha_limite.is_(None))), 'Finalizado'),
+        (and_(finalizado, fuera_de_plazo), 'Cumplido fuera de plazo'),
+        (finalizado, 'Cumplido en plazo'),
+        (fecha_limite.is_(None), estado),
+        (fecha_limite == hoy, 'Vence hoy'),
+        (fecha_limite < hoy, 'Pendiente fuera de plazo'),
+        else_='Pendiente en plazo'
+    )
+
+
+def filtro_estados_calculados(expr, estados: str):
+    """
+    Condición WHERE para una lista de estados separados por coma (cumplido_en_plazo, vence_hoy, ...).
+    Las claves desconocidas se comparan con el estado calculado normalizado (p.ej. "pendiente").
+    """
+    claves = [e.strip().lower() for e in estados.split(",") if e.strip()]
+    etiquetas = {ESTADOS_CALCULADOS.get(clave, clave.replace("_", " ")).lower() for clave in claves}
+    return func.lower(expr).in_(sorted(etiquetas))
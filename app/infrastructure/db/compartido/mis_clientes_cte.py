@@ -1,46 +1,58 @@
-MIS_CLIENTES_CTE = """
-WITH mis_clientes AS (
-  SELECT CS.id AS id_cliente
+from app.infrastructure.db.compartido.rango_fechas import sql_periodo
+from app.infrastructure.db.compartido.tabla_valores import sql_tabla_valores
+
+# Clientes de cada empleado (por contrato o por departamento). Es el recorrido entre bases de datos
+# que materializa el job de refresco en la tabla empleado_cliente; no se ejecuta por petición.
+# El subdepartamento de cada CODIDEPAR sale de ceco_subdepar (regla por_prefijo, antes LEFT(CODIDEPAR,29)).
+SNAPSHOT_EMPLEADO_CLIENTE_SQL = """
+  SELECT LOWER(P.email) AS email, CS.id AS id_cliente
     FROM [BI DW RRHH DEV].dbo.Persona P
     JOIN [BI DW RRHH DEV].dbo.HDW_Cecos C ON P.Numeross = C.Numeross
-    JOIN [ATISA_Input].dbo.SubDePar S ON LEFT(C.CODIDEPAR,29)=S.codidepar
-    JOIN [ATISA_Input].dbo.clienteSubdepar CS ON S.codSubDePar=CS.codSubDePar
-   WHERE P.email = :email AND C.FECHAFIN IS NULL
+    JOIN ceco_subdepar CSM ON CSM.codidepar = C.CODIDEPAR AND CSM.por_prefijo = 1
+    JOIN [ATISA_Input].dbo.clienteSubdepar CS ON CSM.codSubDepar=CS.codSubDePar
+   WHERE P.email IS NOT NULL AND C.FECHAFIN IS NULL
 
   UNION
 
-  SELECT DISTINCT CACO.IDCLIENTE AS id_cliente
+  SELECT LOWER(P.email) AS email, CACO.IDCLIENTE AS id_cliente
     FROM [BI DW RRHH DEV].dbo.Persona P
     JOIN [BI DW RRHH DEV].dbo.HDW_Cecos C ON P.Numeross=C.Numeross
-    JOIN [ATISA_Input].dbo.SubDePar S ON LEFT(C.CODIDEPAR,29)=S.codidepar
-    JOIN [ATISA_Input].dbo.ArtSubdepar ASU ON S.codSubDePar=ASU.codSubDePar
+    JOIN ceco_subdepar CSM ON CSM.codidepar = C.CODIDEPAR AND CSM.por_prefijo = 1
+    JOIN [ATISA_Input].dbo.ArtSubdepar ASU ON CSM.codSubDepar=ASU.codSubDePar
     JOIN [ATISA_Input].dbo.cuercontra CUCO ON ASU.codart=CUCO.idArticulo
     JOIN [ATISA_Input].dbo.cabecontra CACO ON CUCO.IDCONTRATO=CACO.IDCONTRATO
-   WHERE P.email = :email AND C.FECHAFIN IS NULL
+   WHERE P.email IS NOT NULL AND C.FECHAFIN IS NULL
 
   UNION
 
-  SELECT DISTINCT CACO.IDCLIENTE AS id_cliente
+  SELECT LOWER(P.email) AS email, CACO.IDCLIENTE AS id_cliente
     FROM [BI DW RRHH DEV].dbo.Persona P
     JOIN [BI DW RRHH DEV].dbo.HDW_Cecos C ON P.Numeross=C.Numeross
-    JOIN [ATISA_Input].dbo.SubDePar S ON LEFT(C.CODIDEPAR,29)=S.codidepar
-    JOIN [ATISA_Input].dbo.artCeco ARTC ON S.ceco=ARTC.codCeco
+    JOIN ceco_subdepar CSM ON CSM.codidepar = C.CODIDEPAR AND CSM.por_prefijo = 1
+    JOIN [ATISA_Input].dbo.artCeco ARTC ON CSM.ceco=ARTC.codCeco
     JOIN [ATISA_Input].dbo.cuercontra CUCO ON ARTC.codart=CUCO.idArticulo
     JOIN [ATISA_Input].dbo.cabecontra CACO ON CUCO.IDCONTRATO=CACO.IDCONTRATO
-   WHERE P.email = :email AND C.FECHAFIN IS NULL
+   WHERE P.email IS NOT NULL AND C.FECHAFIN IS NULL
+"""
+
+def mis_clientes_cte(dialecto: str = "mssql") -> str:
+    """
+    CTE mis_clientes con los clientes del empleado, recibidos ya resueltos (caché de asignaciones)
+    como lista JSON en :clientes en lugar de volver a leer empleado_cliente en cada petición.
+    """
+    return f"""
+WITH mis_clientes AS (
+  {sql_tabla_valores(dialecto, "clientes", "id_cliente", "VARCHAR(9)")}
 )
 """
 
-def construir_sql_procesos_cliente_por_empleado(filtrar_fecha=False, filtrar_mes=False, filtrar_anio=False):
-    filtros = []
-    if filtrar_mes:
-        filtros.append("MONTH(cp.fecha_inicio) = :mes")
-    if filtrar_anio:
-        filtros.append("YEAR(cp.fecha_inicio) = :anio")
+def construir_sql_procesos_cliente_por_empleado(filtrar_fecha=False, mes=None, anio=None, dialecto="mssql"):
+    """Devuelve (sql, parámetros del periodo); el año/mes se filtra como rango sobre cp.fecha_inicio."""
+    filtros, params = sql_periodo("cp.fecha_inicio", anio, mes)
 
     where_extra = " AND " + " AND ".join(filtros) if filtros else ""
 
-    sql = MIS_CLIENTES_CTE + f"""
+    sql = mis_clientes_cte(dialecto) + f"""
     SELECT
       mc.id_cliente AS cliente_id,
       c.razsoc AS cliente_nombre,
@@ -53,21 +65,18 @@ def construir_sql_procesos_cliente_por_empleado(filtrar_fecha=False, filtrar_mes
     WHERE 1=1 {where_extra}
     ORDER BY mc.id_cliente, p.id;
     """
-    return sql
+    return sql, params
 
-def construir_sql_hitos_cliente_por_empleado(filtrar_fecha=False, filtrar_mes=False, filtrar_anio=False):
-    filtros = []
+def construir_sql_hitos_cliente_por_empleado(filtrar_fecha=False, mes=None, anio=None, dialecto="mssql"):
+    """Devuelve (sql, parámetros del periodo); el año/mes se filtra como rango sobre cph.fecha_limite."""
+    filtros, params = sql_periodo("cph.fecha_limite", anio, mes)
     if filtrar_fecha:
         filtros.append("cph.fecha_limite >= :fecha_inicio")
         filtros.append("cph.fecha_limite <= :fecha_fin")
-    if filtrar_mes:
-        filtros.append("MONTH(cph.fecha_limite) = :mes")
-    if filtrar_anio:
-        filtros.append("YEAR(cph.fecha_limite) = :anio")
 
     where_extra = " AND " + " AND ".join(filtros) if filtros else ""
 
-    sql = MIS_CLIENTES_CTE + f"""
+    sql = mis_clientes_cte(dialecto) + f"""
     SELECT
       mc.id_cliente AS cliente_id,
       c.razsoc  AS cliente_nombre,
@@ -87,4 +96,4 @@ def construir_sql_hitos_cliente_por_empleado(filtrar_fecha=False, filtrar_mes=Fa
     WHERE 1=1 {where_extra}
     ORDER BY mc.id_cliente, p.id, h.id;
     """
-    return sql
+    return sql, params
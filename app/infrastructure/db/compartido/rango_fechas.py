@@ -0,0 +1,41 @@
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import extract
+
+# Filtros por año/mes escritos como rangos semiabiertos [inicio, fin) sobre la columna, en lugar de
+# MONTH()/YEAR()/extract(), para que SQL Server pueda usar los índices sobre la fecha (index seek).
+# Un mes sin año no es un rango contiguo: en ese caso se mantiene la comparación por MONTH().
+
+
+def rango_periodo(anio: int, mes: Optional[int] = None) -> tuple[date, date]:
+    """[inicio, fin) del mes indicado o, sin mes, del año completo."""
+    if mes is None:
+        return date(anio, 1, 1), date(anio + 1, 1, 1)
+    inicio = date(anio, mes, 1)
+    fin = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    return inicio, fin
+
+
+def condiciones_periodo(columna, anio: Optional[int] = None, mes: Optional[int] = None) -> list:
+    """Condiciones ORM equivalentes a extract('year') == anio AND extract('month') == mes."""
+    if anio is not None:
+        inicio, fin = rango_periodo(anio, mes)
+        return [columna >= inicio, columna < fin]
+    if mes is not None:
+        return [extract('month', columna) == mes]
+    return []
+
+
+def sql_periodo(columna: str, anio: Optional[int] = None, mes: Optional[int] = None,
+                prefijo: str = "periodo") -> tuple[list[str], dict]:
+    """Versión para SQL textual: devuelve (condiciones, parámetros) para añadir al WHERE."""
+    if anio is not None:
+        inicio, fin = rango_periodo(anio, mes)
+        return (
+            [f"{columna} >= :{prefijo}_desde", f"{columna} < :{prefijo}_hasta"],
+            {f"{prefijo}_desde": inicio, f"{prefijo}_hasta": fin},
+        )
+    if mes is not None:
+        return [f"MONTH({columna}) = :{prefijo}_mes"], {f"{prefijo}_mes": mes}
+    return [], {}
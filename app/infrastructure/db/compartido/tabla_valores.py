@@ -0,0 +1,32 @@
+import json
+
+from sqlalchemy import String, column, text
+
+# Conjuntos de valores (ids de cliente, codSubDepar, ...) pasados a SQL como una tabla.
+# Se envían como un único parámetro JSON que el motor expande en filas: OPENJSON en SQL Server
+# (equivalente a un TVP sin el límite de 2100 parámetros de un IN) y json_each en SQLite.
+# OPENJSON exige SQL Server 2016 o posterior con la base en nivel de compatibilidad 130 o superior.
+
+
+def valores_json(valores) -> str:
+    """Serializa el conjunto ordenado para que la misma consulta reutilice el plan en caché."""
+    return json.dumps(sorted(str(valor) for valor in valores))
+
+
+def sql_tabla_valores(dialecto: str, parametro: str, columna: str, tipo: str = "VARCHAR(255)") -> str:
+    """SELECT que devuelve una fila por cada valor de la lista JSON recibida en :parametro."""
+    if dialecto == "mssql":
+        return f"SELECT {columna} FROM OPENJSON(:{parametro}) WITH ({columna} {tipo} '$')"
+    return f"SELECT value AS {columna} FROM json_each(:{parametro})"
+
+
+def tabla_valores(session, nombre: str, columna: str, valores, tipo: str = "VARCHAR(255)"):
+    """Subconsulta ORM (alias nombre, columna única) con los valores indicados, lista para un JOIN."""
+    dialecto = session.get_bind().dialect.name
+    parametro = f"{nombre}_valores"
+    return (
+        text(sql_tabla_valores(dialecto, parametro, columna, tipo))
+        .bindparams(**{parametro: valores_json(valores)})
+        .columns(column(columna, String))
+        .subquery(nombre)
+    )
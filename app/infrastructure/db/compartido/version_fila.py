@@ -0,0 +1,77 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import BigInteger, Column, FetchedValue
+from sqlalchemy.dialects.mssql import ROWVERSION
+from sqlalchemy.orm import deferred
+
+from app.infrastructure.db.database import engine
+
+# Versión de fila (row_version) para la sincronización incremental (/admin-hitos/cambios).
+# En SQL Server es una columna rowversion: el motor la incrementa en cada INSERT/UPDATE, sea cual
+# sea el camino de escritura (ORM, UPDATE masivo o SQL textual), y es única en toda la base de
+# datos, así que las versiones de varias tablas se pueden comparar entre sí. Se lee como BIGINT.
+# En otros motores (desarrollo con SQLite) se emula con un contador en la aplicación: microsegundos
+# desde epoch, estrictamente creciente dentro del proceso, asignado por las sentencias de SQLAlchemy.
+
+ES_SQL_SERVER = engine.dialect.name == "mssql"
+
+_ultima_version = 0
+_lock = threading.Lock()
+
+
+def siguiente_version() -> int:
+    """Contador emulado (motores distintos de SQL Server)."""
+    global _ultima_version
+    with _lock:
+        _ultima_version = max(_ultima_version + 1, time.time_ns() // 1000)
+        return _ultima_version
+
+
+def columna_row_version():
+    """
+    Columna row_version del modelo: rowversion mantenida por SQL Server o contador emulado.
+    Se lee como entero (rowversion llega como 8 bytes, que jsonable_encoder no sabe serializar
+    en los endpoints que devuelven el modelo) y es diferida: solo /admin-hitos/cambios la usa
+    y lo hace con SQL propio, así que las consultas ORM no la cargan.
+    """
+    if ES_SQL_SERVER:
+        return deferred(Column(ROWVERSION(convert_int=True), nullable=False,
+                               server_default=FetchedValue(), server_onupdate=FetchedValue()))
+    return deferred(Column(BigInteger, nullable=True, index=True, default=siguiente_version, onupdate=siguiente_version))
+
+
+def sql_version(dialecto: str, columna: str) -> str:
+    """Expresión que lee la versión como entero."""
+    if dialecto == "mssql":
+        return f"CAST({columna} AS BIGINT)"
+    return columna
+
+
+def sql_version_mayor(dialecto: str, columna: str, otra: str) -> str:
+    """
+    La mayor de dos versiones: la de una fila que combina dos tablas cambia cuando cambia
+    cualquiera de ellas. Las filas anteriores al contador emulado tienen la versión a NULL.
+    """
+    if dialecto != "mssql":
+        columna, otra = f"COALESCE({columna}, 0)", f"COALESCE({otra}, 0)"
+    return f"CASE WHEN {columna} >= {otra} THEN {columna} ELSE {otra} END"
+
+
+def sql_parametro_version(dialecto: str, parametro: str) -> str:
+    """Parámetro entero comparable con la columna (rowversion se compara como BINARY(8))."""
+    if dialecto == "mssql":
+        return f"CAST(:{parametro} AS BINARY(8))"
+    return f":{parametro}"
+
+
+def sql_version_confirmada(dialecto: str) -> Optional[str]:
+    """
+    Última versión por debajo de la cual ya no puede confirmarse ninguna escritura en curso.
+    Sin esta cota, una transacción larga que confirme después con una versión menor que la ya
+    devuelta al cliente quedaría fuera de su siguiente petición. None si el motor no la ofrece.
+    """
+    if dialecto == "mssql":
+        return "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1"
+    return None
@@ -0,0 +1,24 @@
+-- V0001: índices compuestos para los filtros de calendario por rango de fechas
+-- (fecha_limite >= :desde AND fecha_limite < :hasta) en lugar de MONTH()/YEAR().
+-- Cada lote es idempotente: solo crea el índice si aún no existe.
+
+-- Reporte de status, calendario por mes y filtros (obtener_por_fecha, obtener_filtros, admin-hitos)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_cph_habilitado_fecha_limite' AND object_id = OBJECT_ID('dbo.cliente_proceso_hito'))
+    CREATE NONCLUSTERED INDEX ix_cph_habilitado_fecha_limite
+        ON dbo.cliente_proceso_hito (habilitado, fecha_limite)
+        INCLUDE (cliente_proceso_id, hito_id, estado, hora_limite, tipo);
+GO
+
+-- Hitos de un cliente_proceso (joins desde cliente_proceso y hitos por empleado)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_cph_cliente_proceso_habilitado' AND object_id = OBJECT_ID('dbo.cliente_proceso_hito'))
+    CREATE NONCLUSTERED INDEX ix_cph_cliente_proceso_habilitado
+        ON dbo.cliente_proceso_hito (cliente_proceso_id, habilitado)
+        INCLUDE (hito_id, fecha_limite, estado);
+GO
+
+-- Procesos de un cliente por periodo (procesos por empleado, calendario de cliente)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_cp_cliente_fecha_inicio' AND object_id = OBJECT_ID('dbo.cliente_proceso'))
+    CREATE NONCLUSTERED INDEX ix_cp_cliente_fecha_inicio
+        ON dbo.cliente_proceso (cliente_id, fecha_inicio)
+        INCLUDE (proceso_id, fecha_fin, habilitado);
+GO
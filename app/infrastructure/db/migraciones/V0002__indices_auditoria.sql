@@ -0,0 +1,15 @@
+-- V0002: índices del registro de auditoría para la paginación por keyset sobre
+-- (fecha_modificacion, id) y el filtro por cliente sin ordenar la tabla completa.
+-- Cada lote es idempotente: solo crea el índice si aún no existe.
+
+-- Listado general: ORDER BY fecha_modificacion, id con OFFSET/FETCH o cursor
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_auditoria_fecha_modificacion_id' AND object_id = OBJECT_ID('dbo.auditoria_calendarios'))
+    CREATE NONCLUSTERED INDEX ix_auditoria_fecha_modificacion_id
+        ON dbo.auditoria_calendarios (fecha_modificacion, id);
+GO
+
+-- Auditoría de un cliente (/auditoria-calendarios/cliente/{id} y filtro cliente_id)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_auditoria_cliente_fecha_modificacion' AND object_id = OBJECT_ID('dbo.auditoria_calendarios'))
+    CREATE NONCLUSTERED INDEX ix_auditoria_cliente_fecha_modificacion
+        ON dbo.auditoria_calendarios (cliente_id, fecha_modificacion, id);
+GO
@@ -0,0 +1,71 @@
+-- V0003: versión de fila (rowversion) en cliente_proceso_hito y cliente_proceso_hito_cumplimiento
+-- y lápidas de sus borrados, para la sincronización incremental de /admin-hitos/cambios
+-- (solo las filas con row_version mayor que la última versión que tiene el cliente).
+-- Los modelos mapean row_version, así que en SQL Server hay que aplicar esta migración antes de
+-- desplegar la aplicación: sin la columna fallan todas las consultas a estas tablas. Al arrancar,
+-- la API se niega a iniciar si quedan migraciones pendientes (app/main.py).
+-- Cada lote es idempotente: solo crea la columna, el índice, la tabla o el trigger si aún no existe.
+
+IF COL_LENGTH('dbo.cliente_proceso_hito', 'row_version') IS NULL
+    ALTER TABLE dbo.cliente_proceso_hito ADD row_version ROWVERSION NOT NULL;
+GO
+
+IF COL_LENGTH('dbo.cliente_proceso_hito_cumplimiento', 'row_version') IS NULL
+    ALTER TABLE dbo.cliente_proceso_hito_cumplimiento ADD row_version ROWVERSION NOT NULL;
+GO
+
+-- Cambios desde una versión: WHERE row_version > @desde ORDER BY row_version
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_cph_row_version' AND object_id = OBJECT_ID('dbo.cliente_proceso_hito'))
+    CREATE NONCLUSTERED INDEX ix_cph_row_version
+        ON dbo.cliente_proceso_hito (row_version)
+        INCLUDE (cliente_proceso_id, habilitado);
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_cphc_row_version' AND object_id = OBJECT_ID('dbo.cliente_proceso_hito_cumplimiento'))
+    CREATE NONCLUSTERED INDEX ix_cphc_row_version
+        ON dbo.cliente_proceso_hito_cumplimiento (row_version)
+        INCLUDE (cliente_proceso_hito_id);
+GO
+
+-- Lápidas: su propia rowversion es posterior a la de cualquier escritura anterior de la base
+IF OBJECT_ID('dbo.filas_eliminadas') IS NULL
+    CREATE TABLE dbo.filas_eliminadas (
+        id INT IDENTITY(1, 1) PRIMARY KEY,
+        tabla VARCHAR(64) NOT NULL,
+        fila_id INT NOT NULL,
+        cliente_id VARCHAR(9) NULL,
+        fecha_eliminacion DATETIME NULL,
+        row_version ROWVERSION NOT NULL
+    );
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_filas_eliminadas_row_version' AND object_id = OBJECT_ID('dbo.filas_eliminadas'))
+    CREATE NONCLUSTERED INDEX ix_filas_eliminadas_row_version
+        ON dbo.filas_eliminadas (row_version)
+        INCLUDE (tabla, fila_id, cliente_id);
+GO
+
+CREATE OR ALTER TRIGGER dbo.tr_cph_lapida ON dbo.cliente_proceso_hito
+AFTER DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO dbo.filas_eliminadas (tabla, fila_id, cliente_id, fecha_eliminacion)
+    SELECT 'cliente_proceso_hito', d.id, cp.cliente_id, GETDATE()
+    FROM deleted d
+    LEFT JOIN dbo.cliente_proceso cp ON cp.id = d.cliente_proceso_id;
+END
+GO
+
+CREATE OR ALTER TRIGGER dbo.tr_cphc_lapida ON dbo.cliente_proceso_hito_cumplimiento
+AFTER DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO dbo.filas_eliminadas (tabla, fila_id, cliente_id, fecha_eliminacion)
+    SELECT 'cliente_proceso_hito_cumplimiento', d.id, cp.cliente_id, GETDATE()
+    FROM deleted d
+    LEFT JOIN dbo.cliente_proceso_hito cph ON cph.id = d.cliente_proceso_hito_id
+    LEFT JOIN dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id;
+END
+GO
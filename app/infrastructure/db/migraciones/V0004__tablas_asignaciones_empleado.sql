@@ -0,0 +1,40 @@
+-- V0004: tablas locales materializadas por los jobs de refresco:
+--   ceco_subdepar     (python -m app.scripts.refrescar_ceco_subdepar)
+--   empleado_cliente  (python -m app.scripts.refrescar_empleado_cliente, que refresca antes ceco_subdepar)
+-- Los listados por empleado leen empleado_cliente, así que tras aplicar esta migración hay que
+-- lanzar una vez el refresco de empleado_cliente antes de desplegar la aplicación; hasta entonces
+-- las tablas existen pero están vacías y esos listados no devuelven clientes.
+-- Cada lote es idempotente: solo crea la tabla o el índice si aún no existe.
+
+IF OBJECT_ID('dbo.ceco_subdepar') IS NULL
+    CREATE TABLE dbo.ceco_subdepar (
+        codidepar VARCHAR(50) NOT NULL,
+        codSubDepar VARCHAR(6) NOT NULL,
+        ceco VARCHAR(4) NULL,
+        por_codigo BIT NOT NULL DEFAULT 0,
+        por_prefijo BIT NOT NULL DEFAULT 0,
+        fecha_alta DATETIME NOT NULL,
+        CONSTRAINT pk_ceco_subdepar PRIMARY KEY (codidepar, codSubDepar)
+    );
+GO
+
+-- Subdepartamentos de un empleado y empleados de un subdepartamento (regla por_codigo)
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_ceco_subdepar_subdepar' AND object_id = OBJECT_ID('dbo.ceco_subdepar'))
+    CREATE NONCLUSTERED INDEX ix_ceco_subdepar_subdepar
+        ON dbo.ceco_subdepar (codSubDepar, por_codigo, codidepar);
+GO
+
+IF OBJECT_ID('dbo.empleado_cliente') IS NULL
+    CREATE TABLE dbo.empleado_cliente (
+        email VARCHAR(255) NOT NULL,
+        id_cliente VARCHAR(9) NOT NULL,
+        fecha_alta DATETIME NOT NULL,
+        CONSTRAINT pk_empleado_cliente PRIMARY KEY (email, id_cliente)
+    );
+GO
+
+-- Empleados asignados a un cliente
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_empleado_cliente_id_cliente' AND object_id = OBJECT_ID('dbo.empleado_cliente'))
+    CREATE NONCLUSTERED INDEX ix_empleado_cliente_id_cliente
+        ON dbo.empleado_cliente (id_cliente);
+GO
@@ -0,0 +1,15 @@
+-- V0005: versión de fila (rowversion) en hito. /admin-hitos/cambios devuelve la fecha y hora límite
+-- del hito maestro cuando el cliente_proceso_hito no tiene las suyas, así que un cambio en el hito
+-- (PUT /hitos/{id}) también tiene que llegar a la sincronización incremental: la versión de cada
+-- fila es la mayor entre la del cliente_proceso_hito y la de su hito.
+-- HitoModel mapea row_version: hay que aplicar esta migración antes de desplegar la aplicación.
+-- Cada lote es idempotente: solo crea la columna o el índice si aún no existe.
+
+IF COL_LENGTH('dbo.hito', 'row_version') IS NULL
+    ALTER TABLE dbo.hito ADD row_version ROWVERSION NOT NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_hito_row_version' AND object_id = OBJECT_ID('dbo.hito'))
+    CREATE NONCLUSTERED INDEX ix_hito_row_version
+        ON dbo.hito (row_version);
+GO
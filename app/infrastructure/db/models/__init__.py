@@ -10,3 +10,7 @@ from .documental_carpeta_proceso_model import DocumentalCarpetaProcesoModel
 from .documental_carpeta_cliente_model import DocumentalCarpetaClienteModel
 from .documental_carpeta_documentos_model import DocumentalCarpetaDocumentosModel
 from .cliente_model import ClienteModel
+from .empleado_cliente_model import EmpleadoClienteModel
+from .ceco_subdepar_model import CecoSubdeparModel
+from .migracion_aplicada_model import MigracionAplicadaModel
+from .fila_eliminada_model import FilaEliminadaModel
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Index
 from app.infrastructure.db.database import Base
 
 class AuditoriaCalendariosModel(Base):
@@ -17,3 +17,9 @@ class AuditoriaCalendariosModel(Base):
     fecha_modificacion = Column(DateTime, nullable=False)
     created_at = Column(DateTime, nullable=False)
     updated_at = Column(DateTime, nullable=False)
+
+    # Paginación por keyset (fecha_modificacion, id) del listado y filtro por cliente
+    __table_args__ = (
+        Index('ix_auditoria_fecha_modificacion_id', 'fecha_modificacion', 'id'),
+        Index('ix_auditoria_cliente_fecha_modificacion', 'cliente_id', 'fecha_modificacion', 'id'),
+    )
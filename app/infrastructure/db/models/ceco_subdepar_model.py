@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Boolean, DateTime, Index
+from app.infrastructure.db.database import Base
+
+class CecoSubdeparModel(Base):
+    """
+    Correspondencia precalculada CODIDEPAR (HDW_Cecos) <-> subdepartamento, materializada por el
+    job de refresco para no trocear CODIDEPAR en cada consulta.
+    - por_codigo: SUBSTRING(CODIDEPAR, 24, 6) coincide con el codSubDepar (relleno a 6 dígitos).
+    - por_prefijo: LEFT(CODIDEPAR, 29) coincide con SubDepar.codidepar.
+    """
+    __tablename__ = "ceco_subdepar"
+
+    codidepar = Column(String(50), primary_key=True)
+    codSubDepar = Column(String(6), primary_key=True)
+    ceco = Column(String(4), nullable=True)
+    por_codigo = Column(Boolean, nullable=False, default=False)
+    por_prefijo = Column(Boolean, nullable=False, default=False)
+    fecha_alta = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_ceco_subdepar_subdepar', 'codSubDepar', 'por_codigo', 'codidepar'),
+    )
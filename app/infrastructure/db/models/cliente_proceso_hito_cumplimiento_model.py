@@ -3,6 +3,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Time
 from sqlalchemy.orm import relationship
 from app.infrastructure.db.database import Base
+from app.infrastructure.db.compartido.version_fila import columna_row_version
 
 class ClienteProcesoHitoCumplimientoModel(Base):
     __tablename__ = "cliente_proceso_hito_cumplimiento"
@@ -15,5 +16,7 @@ class ClienteProcesoHitoCumplimientoModel(Base):
     usuario = Column(String(255), nullable=False) # numeross del usuario
     fecha_creacion = Column(DateTime, nullable=True)
     codSubDepar = Column(String(6), nullable=True, default=None)
+    # Sincronización incremental (/admin-hitos/cambios); V0003__version_filas_hitos.sql
+    row_version = columna_row_version()
 
     cliente_proceso_hito = relationship("ClienteProcesoHitoModel", backref="cumplimientos")
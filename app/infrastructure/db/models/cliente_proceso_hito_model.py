@@ -1,8 +1,9 @@
 # app/infrastructure/db/models/cliente_proceso_hito_model.py
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Time, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Time, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.infrastructure.db.database import Base
+from app.infrastructure.db.compartido.version_fila import columna_row_version
 
 class ClienteProcesoHitoModel(Base):
     __tablename__ = "cliente_proceso_hito"
@@ -16,6 +17,16 @@ class ClienteProcesoHitoModel(Base):
     hora_limite = Column(Time, nullable=True)
     tipo = Column(String(255), nullable=False)
     habilitado = Column(Boolean, nullable=False, default=True)
+    # Sincronización incremental (/admin-hitos/cambios); V0003__version_filas_hitos.sql
+    row_version = columna_row_version()
+
+    # Creados en bases existentes por la migración V0001__indices_calendario.sql
+    __table_args__ = (
+        Index('ix_cph_habilitado_fecha_limite', 'habilitado', 'fecha_limite',
+              mssql_include=['cliente_proceso_id', 'hito_id', 'estado', 'hora_limite', 'tipo']),
+        Index('ix_cph_cliente_proceso_habilitado', 'cliente_proceso_id', 'habilitado',
+              mssql_include=['hito_id', 'fecha_limite', 'estado']),
+    )
 
     cliente_proceso = relationship("ClienteProcesoModel", backref="hitos_cliente")
     hito = relationship("ProcesoHitoMaestroModel",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Boolean, Index
 from sqlalchemy.orm import relationship
 from app.infrastructure.db.database import Base
 
@@ -15,6 +15,12 @@ class ClienteProcesoModel(Base):
     anterior_id = Column(Integer, ForeignKey("cliente_proceso.id"), nullable=True)
     habilitado = Column(Boolean, nullable=False, default=True)
 
+    # Creado en bases existentes por la migración V0001__indices_calendario.sql
+    __table_args__ = (
+        Index('ix_cp_cliente_fecha_inicio', 'cliente_id', 'fecha_inicio',
+              mssql_include=['proceso_id', 'fecha_fin', 'habilitado']),
+    )
+
     # Relaciones
     proceso = relationship("ProcesoModel", backref="cliente_procesos")
     anterior = relationship("ClienteProcesoModel", remote_side=[id])
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from app.infrastructure.db.database import Base
+
+class EmpleadoClienteModel(Base):
+    """Clientes asignados a cada empleado (email), materializados por el job de refresco."""
+    __tablename__ = "empleado_cliente"
+
+    email = Column(String(255), primary_key=True)
+    id_cliente = Column(String(9), primary_key=True, index=True)
+    fecha_alta = Column(DateTime, nullable=False)
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, event, select
+from app.infrastructure.db.database import Base
+from app.infrastructure.db.compartido.version_fila import ES_SQL_SERVER, columna_row_version
+from app.infrastructure.db.models.cliente_proceso_model import ClienteProcesoModel
+from app.infrastructure.db.models.cliente_proceso_hito_model import ClienteProcesoHitoModel
+from app.infrastructure.db.models.cliente_proceso_hito_cumplimiento_model import ClienteProcesoHitoCumplimientoModel
+
+class FilaEliminadaModel(Base):
+    """
+    Lápidas de las filas borradas de cliente_proceso_hito y cliente_proceso_hito_cumplimiento, para
+    que /admin-hitos/cambios también informe de los borrados. cliente_id se guarda al borrar para
+    poder filtrarlas por subdepartamento aunque el cliente_proceso ya no exista.
+    En SQL Server las escriben los triggers de V0003__version_filas_hitos.sql.
+    """
+    __tablename__ = "filas_eliminadas"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tabla = Column(String(64), nullable=False)
+    fila_id = Column(Integer, nullable=False)
+    cliente_id = Column(String(9), nullable=True)
+    fecha_eliminacion = Column(DateTime, nullable=True)
+    row_version = columna_row_version()
+
+
+def _registrar_lapida(connection, tabla: str, fila_id: int, cliente_id_sql) -> None:
+    connection.execute(FilaEliminadaModel.__table__.insert().values(
+        tabla=tabla,
+        fila_id=fila_id,
+        cliente_id=connection.execute(cliente_id_sql).scalar(),
+        fecha_eliminacion=datetime.now(),
+    ))
+
+
+# Fuera de SQL Server no hay triggers: se registran las lápidas de los borrados hechos con el ORM
+# (session.delete). Los borrados masivos (query.delete) no pasan por estos eventos.
+if not ES_SQL_SERVER:
+    @event.listens_for(ClienteProcesoHitoModel, "after_delete")
+    def _lapida_cliente_proceso_hito(mapper, connection, target):
+        _registrar_lapida(connection, "cliente_proceso_hito", target.id, select(ClienteProcesoModel.cliente_id).where(
+            ClienteProcesoModel.id == target.cliente_proceso_id
+        ))
+
+    @event.listens_for(ClienteProcesoHitoCumplimientoModel, "after_delete")
+    def _lapida_cumplimiento(mapper, connection, target):
+        _registrar_lapida(connection, "cliente_proceso_hito_cumplimiento", target.id, select(ClienteProcesoModel.cliente_id).join(
+            ClienteProcesoHitoModel, ClienteProcesoHitoModel.cliente_proceso_id == ClienteProcesoModel.id
+        ).where(ClienteProcesoHitoModel.id == target.cliente_proceso_hito_id))
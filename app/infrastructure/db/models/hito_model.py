@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Date, Time, Boolean
 from app.infrastructure.db.database import Base
+from app.infrastructure.db.compartido.version_fila import columna_row_version
 from sqlalchemy.orm import relationship
 
 class HitoModel(Base):
@@ -14,5 +15,7 @@ class HitoModel(Base):
     tipo = Column(String(255), nullable=False)
     habilitado = Column(Integer, nullable=False, default=1)  # 0 = No, 1 = Si
     critico = Column(Boolean, nullable=False, default=False)
+    # Sincronización incremental (/admin-hitos/cambios); V0005__version_fila_hito.sql
+    row_version = columna_row_version()
 
     procesos = relationship("ProcesoHitoMaestroModel", back_populates="hito", cascade="all, delete-orphan")
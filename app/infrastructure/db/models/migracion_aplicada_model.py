@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, DateTime
+from app.infrastructure.db.database import Base
+
+class MigracionAplicadaModel(Base):
+    """Migraciones SQL versionadas (app/infrastructure/db/migraciones) ya aplicadas en esta base."""
+    __tablename__ = "migraciones_aplicadas"
+
+    version = Column(String(10), primary_key=True)
+    descripcion = Column(String(255), nullable=False)
+    fecha_aplicacion = Column(DateTime, nullable=False)
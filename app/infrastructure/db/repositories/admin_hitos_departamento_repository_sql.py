@@ -2,15 +2,201 @@ from typing import List, Dict, Any, Optional
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.infrastructure.db.compartido.rango_fechas import sql_periodo
+from app.infrastructure.db.compartido.version_fila import (
+    sql_parametro_version,
+    sql_version,
+    sql_version_confirmada,
+    sql_version_mayor,
+)
 from app.domain.repositories.admin_hitos_departamento_repository import (
     AdminHitosDepartamentoRepository,
 )
 
 
+VERSION_MAXIMA = 2 ** 63 - 1
+
+# Clientes visibles para un subdepartamento (por su CIF, como en el listado de departamentos-hitos)
+FILTRO_CLIENTE_SUBDEPAR = """
+    AND EXISTS (
+        SELECT 1
+        FROM [ATISA_Input].dbo.clientes c_f
+        JOIN [ATISA_Input].dbo.clienteSubDepar csd_f ON csd_f.cif = c_f.cif
+        WHERE c_f.idcliente = {cliente} AND csd_f.codSubDePar = :cod_subdepar
+    )
+"""
+
+
 class AdminHitosDepartamentoRepositorySQL(AdminHitosDepartamentoRepository):
     def __init__(self, session: Session):
         self.session = session
 
+    def _sql_cambios(self, origen: str, dialecto: str, limite: Optional[int], filtro: str) -> str:
+        """
+        Filas de una de las tres fuentes de cambios con versión en (desde, hasta], por versión. La
+        de cada cliente_proceso_hito es la mayor entre la suya y la de su hito maestro, del que toma
+        la fecha y hora límite cuando no tiene las suyas.
+        """
+        columnas, tablas, versiones, cliente = {
+            "hitos": (
+                """
+                cph.id                  AS cliente_proceso_hito_id,
+                cph.cliente_proceso_id  AS cliente_proceso_id,
+                cph.estado              AS estado,
+                COALESCE(cph.fecha_limite, h.fecha_limite) AS fecha_limite,
+                COALESCE(cph.hora_limite, h.hora_limite)   AS hora_limite,
+                cph.habilitado          AS habilitado,
+                cph.tipo                AS tipo,
+                h.id                    AS hito_id,
+                h.nombre                AS hito_nombre,
+                p.id                    AS proceso_id,
+                p.nombre                AS proceso_nombre,
+                c.idcliente             AS cliente_id,
+                c.razsoc                AS cliente_nombre,
+                c.cif                   AS cliente_cif
+                """,
+                """
+                [ATISA_Input].dbo.cliente_proceso_hito cph
+                JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
+                JOIN [ATISA_Input].dbo.proceso p ON p.id = cp.proceso_id
+                JOIN [ATISA_Input].dbo.hito h ON h.id = cph.hito_id
+                JOIN [ATISA_Input].dbo.clientes c ON c.idcliente = cp.cliente_id
+                """,
+                ("cph.row_version", "h.row_version"),
+                "cp.cliente_id",
+            ),
+            "cumplimientos": (
+                """
+                cum.id                      AS id,
+                cum.cliente_proceso_hito_id AS cliente_proceso_hito_id,
+                cum.fecha                   AS fecha,
+                cum.hora                    AS hora,
+                cum.observacion             AS observacion,
+                cum.usuario                 AS usuario,
+                cum.fecha_creacion          AS fecha_creacion,
+                cum.codSubDepar             AS codSubDepar
+                """,
+                """
+                [ATISA_Input].dbo.cliente_proceso_hito_cumplimiento cum
+                JOIN [ATISA_Input].dbo.cliente_proceso_hito cph ON cph.id = cum.cliente_proceso_hito_id
+                JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
+                """,
+                ("cum.row_version",),
+                "cp.cliente_id",
+            ),
+            "eliminados": (
+                """
+                fe.tabla    AS tabla,
+                fe.fila_id  AS id
+                """,
+                "[ATISA_Input].dbo.filas_eliminadas fe",
+                ("fe.row_version",),
+                "fe.cliente_id",
+            ),
+        }[origen]
+
+        version = versiones[0] if len(versiones) == 1 else sql_version_mayor(dialecto, *versiones)
+        # Cada versión por separado para que use su índice; la mayor acota por arriba
+        desde = " OR ".join(f"{columna} > {sql_parametro_version(dialecto, 'desde')}" for columna in versiones)
+        condiciones = [f"({desde})", f"{version} <= {sql_parametro_version(dialecto, 'hasta')}"]
+        top = f"TOP ({limite})" if limite is not None and dialecto == "mssql" else ""
+        limit = f"LIMIT {limite}" if limite is not None and dialecto != "mssql" else ""
+        return f"""
+            SELECT {top} {sql_version(dialecto, version)} AS row_version, {columnas}
+            FROM {tablas}
+            WHERE {" AND ".join(condiciones)} {filtro.format(cliente=cliente)}
+            ORDER BY {version}
+            {limit}
+        """
+
+    def _consultar_cambios(self, params: Dict[str, Any], limite: Optional[int], filtro: str) -> List[tuple]:
+        """(row_version, origen, fila) de las tres fuentes, ordenadas por versión."""
+        dialecto = self.session.get_bind().dialect.name
+        cambios = []
+        for origen in ("hitos", "cumplimientos", "eliminados"):
+            sql = self._sql_cambios(origen, dialecto, limite, filtro)
+            for fila in self.session.execute(text(sql), params).mappings():
+                cambios.append((int(fila["row_version"]), origen, dict(fila)))
+        cambios.sort(key=lambda cambio: cambio[0])
+        return cambios
+
+    def listar_cambios(
+        self,
+        desde: int = 0,
+        cod_subdepar: Optional[str] = None,
+        limit: int = 5000,
+    ) -> Dict[str, Any]:
+        """
+        Sincronización incremental: filas de cliente_proceso_hito (o de su hito maestro) y de
+        cliente_proceso_hito_cumplimiento con row_version > desde y lápidas de los hitos
+        deshabilitados y de las filas eliminadas.
+
+        - version: versión que el cliente debe enviar como `desde` en la siguiente llamada.
+        - hay_mas: quedan cambios; se pide de nuevo con la versión devuelta.
+        - Una página nunca parte un grupo de filas con la misma versión (contador emulado).
+        """
+        dialecto = self.session.get_bind().dialect.name
+        lim = max(1, min(int(limit or 5000), 20000))
+
+        # Cota superior: lo que ya no puede cambiar por transacciones aún sin confirmar
+        sql_hasta = sql_version_confirmada(dialecto)
+        hasta = self.session.execute(text(sql_hasta)).scalar() if sql_hasta else VERSION_MAXIMA
+
+        params: Dict[str, Any] = {"desde": int(desde), "hasta": int(hasta)}
+        filtro = ""
+        if cod_subdepar:
+            filtro = FILTRO_CLIENTE_SUBDEPAR
+            params["cod_subdepar"] = cod_subdepar
+
+        cambios = self._consultar_cambios(params, lim + 1, filtro)
+        hay_mas = len(cambios) > lim
+        if hay_mas:
+            ultima = cambios[lim - 1][0]
+            if cambios[lim][0] == ultima:
+                # La página acabaría a mitad de una versión: se corta antes o, si la versión ocupa
+                # la página entera, se devuelve completa
+                anteriores = [cambio for cambio in cambios[:lim] if cambio[0] < ultima]
+                if anteriores:
+                    cambios = anteriores
+                else:
+                    cambios = self._consultar_cambios({**params, "hasta": ultima}, None, filtro)
+            else:
+                cambios = cambios[:lim]
+
+        hitos: List[Dict[str, Any]] = []
+        cumplimientos: List[Dict[str, Any]] = []
+        eliminados: List[Dict[str, Any]] = []
+        for row_version, origen, fila in cambios:
+            if origen == "hitos" and not fila["habilitado"]:
+                eliminados.append({
+                    "tabla": "cliente_proceso_hito",
+                    "id": fila["cliente_proceso_hito_id"],
+                    "motivo": "deshabilitado",
+                    "row_version": row_version,
+                })
+            elif origen == "hitos":
+                hitos.append(fila)
+            elif origen == "cumplimientos":
+                cumplimientos.append(fila)
+            else:
+                eliminados.append({**fila, "motivo": "eliminado"})
+
+        if hay_mas:
+            version = cambios[-1][0]
+        elif sql_hasta:
+            version = max(int(desde), hasta)
+        else:
+            version = cambios[-1][0] if cambios else int(desde)
+
+        return {
+            "desde": int(desde),
+            "version": version,
+            "hay_mas": hay_mas,
+            "hitos": hitos,
+            "cumplimientos": cumplimientos,
+            "eliminados": eliminados,
+        }
+
     def listar_hitos_departamentos(
         self,
         mes: Optional[int] = None,
@@ -20,12 +206,9 @@ class AdminHitosDepartamentoRepositorySQL(AdminHitosDepartamentoRepository):
         filtros = []
         params: Dict[str, Any] = {}
 
-        if mes is not None:
-            filtros.append("MONTH(cph.fecha_limite) = :mes")
-            params["mes"] = mes
-        if anio is not None:
-            filtros.append("YEAR(cph.fecha_limite) = :anio")
-            params["anio"] = anio
+        condiciones, params_periodo = sql_periodo("cph.fecha_limite", anio, mes)
+        filtros.extend(condiciones)
+        params.update(params_periodo)
         if cod_subdepar:
             filtros.append("sd.codSubDePar = :cod_subdepar")
             params["cod_subdepar"] = cod_subdepar
@@ -141,12 +324,9 @@ class AdminHitosDepartamentoRepositorySQL(AdminHitosDepartamentoRepository):
         filtros = ["cph.habilitado = 1"]
         params: Dict[str, Any] = {}
 
-        if mes is not None:
-            filtros.append("MONTH(cph.fecha_limite) = :mes")
-            params["mes"] = mes
-        if anio is not None:
-            filtros.append("YEAR(cph.fecha_limite) = :anio")
-            params["anio"] = anio
+        condiciones, params_periodo = sql_periodo("cph.fecha_limite", anio, mes)
+        filtros.extend(condiciones)
+        params.update(params_periodo)
         if cod_subdepar:
             filtros.append("sd.codSubDePar = :cod_subdepar")
             params["cod_subdepar"] = cod_subdepar
@@ -1,8 +1,10 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Iterable, Optional
 from app.domain.entities.api_rol import ApiRol
 from app.domain.repositories.api_rol_repository import ApiRolRepository
 from app.infrastructure.db.models.api_rol_model import ApiRolModel
+from app.infrastructure.db.compartido.tabla_valores import tabla_valores
 
 class SqlApiRolRepository(ApiRolRepository):
     def __init__(self, db: Session):
@@ -21,6 +23,16 @@ class SqlApiRolRepository(ApiRolRepository):
             return None
         return ApiRol(id=api_rol_model.id, email=api_rol_model.email, admin=api_rol_model.admin)
 
+    def buscar_por_emails(self, emails: Iterable[str]) -> dict[str, ApiRol]:
+        # Se envía cada email tal cual y en minúsculas en lugar de aplicar LOWER() a la columna,
+        # para que la búsqueda siga usando el índice único de email
+        claves = {valor for email in emails if email for valor in (email.strip(), email.strip().lower())}
+        if not claves:
+            return {}
+        emails_pagina = tabla_valores(self.db, "emails_pagina", "email", claves)
+        modelos = self.db.query(ApiRolModel).filter(ApiRolModel.email.in_(select(emails_pagina.c.email))).all()
+        return {m.email.strip().lower(): ApiRol(id=m.id, email=m.email, admin=m.admin) for m in modelos}
+
     def listar(self) -> list[ApiRol]:
         modelos = self.db.query(ApiRolModel).all()
         return [ApiRol(id=m.id, email=m.email, admin=m.admin) for m in modelos]
@@ -1,4 +1,6 @@
-from datetime import datetime
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import Optional
 from sqlalchemy import text
 from app.domain.entities.auditoria_calendarios import AuditoriaCalendarios
 from app.domain.repositories.auditoria_calendarios_repository import AuditoriaCalendariosRepository
@@ -6,6 +8,10 @@ from app.infrastructure.db.models.auditoria_calendarios_model import AuditoriaCa
 from app.infrastructure.db.models.hito_model import HitoModel
 from app.infrastructure.db.models.cliente_proceso_hito_model import ClienteProcesoHitoModel
 from app.infrastructure.db.models.proceso_hito_maestro_model import ProcesoHitoMaestroModel
+from app.infrastructure.services.directorio_personas import directorio_personas
+from app.infrastructure.db.compartido.consulta_paginada import (
+    CursorNoValido, Paginacion, codificar_cursor, decodificar_cursor, sql_keyset, sql_orden, sql_paginacion
+)
 
 # Catálogo de motivos de auditoría
 MOTIVOS_AUDITORIA = {
@@ -15,6 +21,84 @@ MOTIVOS_AUDITORIA = {
     4: "A petición de tercero",
 }
 
+# momento_cambio se calcula en SQL como código (ordenable) y se traduce al devolver la fila
+MOMENTOS_CAMBIO = {
+    1: "Antes de fecha límite",
+    2: "El mismo día de la fecha límite",
+    3: "Después de la fecha límite",
+}
+
+# Campos admitidos en sort_field -> expresión SQL del listado
+COLUMNAS_ORDEN_AUDITORIA = {
+    "id": "ac.id",
+    "cliente_id": "ac.cliente_id",
+    "hito_id": "ac.hito_id",
+    "campo_modificado": "ac.campo_modificado",
+    "motivo": "ac.motivo",
+    "usuario": "ac.usuario",
+    "codSubDepar": "ac.codSubDepar",
+    "fecha_modificacion": "ac.fecha_modificacion",
+    "created_at": "ac.created_at",
+    "updated_at": "ac.updated_at",
+    "nombre_subdepar": "sd.nombre",
+    "proceso_nombre": "p.nombre",
+    "hito_nombre": "h.nombre",
+    "tipo": "h.tipo",
+    "critico": "h.critico",
+    "obligatorio": "h.obligatorio",
+}
+
+# Orden de la paginación por keyset, respaldado por ix_auditoria_fecha_modificacion_id
+CAMPO_KEYSET_AUDITORIA = "fecha_modificacion"
+
+# Los INNER JOIN del listado también descartan filas: el recuento los mantiene
+CONTAR_AUDITORIA_SQL = """
+    SELECT COUNT(*)
+    FROM auditoria_calendarios ac
+    INNER JOIN [ATISA_Input].dbo.cliente_proceso_hito cph ON ac.hito_id = cph.id
+    INNER JOIN [ATISA_Input].dbo.hito h ON cph.hito_id = h.id
+    WHERE 1=1 {where_clause}
+"""
+
+
+@dataclass(frozen=True)
+class FiltrosAuditoria:
+    cliente_id: Optional[str] = None
+    hito_id: Optional[int] = None
+    usuario: Optional[str] = None
+    campo_modificado: Optional[str] = None
+    motivo: Optional[int] = None
+    fecha_desde: Optional[date] = None
+    fecha_hasta: Optional[date] = None  # inclusive
+
+    def sql(self) -> tuple[str, dict]:
+        """(condiciones AND ..., parámetros) sobre columnas de auditoria_calendarios."""
+        condiciones, params = [], {}
+        for campo in ("cliente_id", "hito_id", "usuario", "campo_modificado", "motivo"):
+            valor = getattr(self, campo)
+            if valor is not None:
+                condiciones.append(f"AND ac.{campo} = :{campo}")
+                params[campo] = valor
+        # Rango semiabierto sobre la columna para poder usar el índice por fecha
+        if self.fecha_desde is not None:
+            condiciones.append("AND ac.fecha_modificacion >= :fecha_desde")
+            params["fecha_desde"] = datetime.combine(self.fecha_desde, datetime.min.time())
+        if self.fecha_hasta is not None:
+            condiciones.append("AND ac.fecha_modificacion < :fecha_hasta")
+            params["fecha_hasta"] = datetime.combine(self.fecha_hasta + timedelta(days=1), datetime.min.time())
+        return " ".join(condiciones), params
+
+
+def sql_momento_cambio(dialecto: str) -> str:
+    """Código de MOMENTOS_CAMBIO comparando el día de la modificación con la fecha límite del hito."""
+    dia = "CAST(ac.fecha_modificacion AS DATE)" if dialecto == "mssql" else "DATE(ac.fecha_modificacion)"
+    return f"""CASE
+                    WHEN ac.fecha_modificacion IS NULL OR cph.fecha_limite IS NULL THEN NULL
+                    WHEN {dia} < cph.fecha_limite THEN 1
+                    WHEN {dia} = cph.fecha_limite THEN 2
+                    ELSE 3
+                END"""
+
 
 class AuditoriaCalendariosRepositorySQL(AuditoriaCalendariosRepository):
     def __init__(self, session):
@@ -39,7 +123,10 @@ class AuditoriaCalendariosRepositorySQL(AuditoriaCalendariosRepository):
         self.session.refresh(modelo)
         return modelo
 
-    def _execute_query(self, where_clause="", params={}):
+    def _dialecto(self) -> str:
+        return self.session.get_bind().dialect.name
+
+    def _execute_query(self, where_clause="", params={}, orden="ORDER BY ac.fecha_modificacion DESC", pagina=""):
         sql = f"""
             SELECT
                 ac.id,
@@ -51,10 +138,6 @@ class AuditoriaCalendariosRepositorySQL(AuditoriaCalendariosRepository):
                 ac.observaciones,
                 ac.motivo,
                 ac.usuario,
-                CASE
-                    WHEN per.Nombre IS NOT NULL THEN LTRIM(RTRIM(ISNULL(per.Nombre, ''))) + ' ' + LTRIM(RTRIM(ISNULL(per.Apellido1, ''))) + ' ' + LTRIM(RTRIM(ISNULL(per.Apellido2, '')))
-                    ELSE ac.usuario
-                END as nombre_usuario,
                 ac.codSubDepar,
                 ac.fecha_modificacion,
                 ac.created_at,
@@ -65,34 +148,24 @@ class AuditoriaCalendariosRepositorySQL(AuditoriaCalendariosRepository):
                 h.tipo AS tipo,
                 h.critico AS hito_critico,
                 h.obligatorio AS hito_obligatorio,
-                cph.fecha_limite AS cph_fecha_limite
+                cph.fecha_limite AS cph_fecha_limite,
+                {sql_momento_cambio(self._dialecto())} AS momento_cambio
             FROM auditoria_calendarios ac
             INNER JOIN [ATISA_Input].dbo.cliente_proceso_hito cph ON ac.hito_id = cph.id
             INNER JOIN [ATISA_Input].dbo.hito h ON cph.hito_id = h.id
             LEFT JOIN [ATISA_Input].dbo.cliente_proceso cp ON cph.cliente_proceso_id = cp.id
             LEFT JOIN [ATISA_Input].dbo.proceso p ON cp.proceso_id = p.id
             LEFT JOIN [ATISA_Input].dbo.SubDePar sd ON ac.codSubDepar = sd.codSubDePar
-            LEFT JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = ac.usuario
             WHERE 1=1 {where_clause}
-            ORDER BY ac.fecha_modificacion DESC
+            {orden} {pagina}
         """
         result = self.session.execute(text(sql), params)
         rows = result.mappings().all()
+        # Nombre del usuario desde el directorio de personas (sin JOIN a la base de datos de RRHH)
+        nombres = directorio_personas.nombres(self.session, (r['usuario'] for r in rows))
 
         output = []
         for r in rows:
-            # Calcular momento del cambio
-            momento_cambio = None
-            if r['fecha_modificacion'] and r['cph_fecha_limite']:
-                fm_date = r['fecha_modificacion'].date() if hasattr(r['fecha_modificacion'], 'date') else r['fecha_modificacion']
-                fl_date = r['cph_fecha_limite']
-                if fm_date < fl_date:
-                    momento_cambio = "Antes de fecha límite"
-                elif fm_date == fl_date:
-                    momento_cambio = "El mismo día de la fecha límite"
-                else:
-                    momento_cambio = "Después de la fecha límite"
-
             # Determinar fecha_limite_anterior y actual
             fecha_limite_anterior = None
             fecha_limite_actual = None
@@ -113,7 +186,7 @@ class AuditoriaCalendariosRepositorySQL(AuditoriaCalendariosRepository):
                 "motivo": r['motivo'],
                 "motivo_descripcion": MOTIVOS_AUDITORIA.get(r['motivo']) if r['motivo'] is not None else None,
                 "usuario": r['usuario'],
-                "nombre_usuario": r['nombre_usuario'],
+                "nombre_usuario": nombres.get(r['usuario'], r['usuario']),
                 "codSubDepar": r['codSubDepar'],
                 "fecha_modificacion": r['fecha_modificacion'],
                 "created_at": r['created_at'],
@@ -127,13 +200,59 @@ class AuditoriaCalendariosRepositorySQL(AuditoriaCalendariosRepository):
                 "obligatorio": bool(r['hito_obligatorio']) if r['hito_obligatorio'] is not None else False,
                 "fecha_limite_anterior": fecha_limite_anterior,
                 "fecha_limite_actual": fecha_limite_actual,
-                "momento_cambio": momento_cambio,
+                "momento_cambio": MOMENTOS_CAMBIO.get(r['momento_cambio']),
             })
         return output
 
     def listar(self):
         return self._execute_query()
 
+    def buscar(self, filtros: FiltrosAuditoria, paginacion: Paginacion,
+               cursor: Optional[str] = None, con_total: bool = True) -> dict:
+        """
+        Página del registro de auditoría con los filtros resueltos en SQL. Ordenado por
+        fecha_modificacion (el orden por defecto) admite paginación por keyset: el cursor
+        devuelto en siguiente_cursor continúa tras la última fila sin recorrer las anteriores.
+        Con con_total=False se omite el COUNT(*) sobre el conjunto filtrado.
+        """
+        where_clause, params = filtros.sql()
+        columnas = {**COLUMNAS_ORDEN_AUDITORIA, "momento_cambio": sql_momento_cambio(self._dialecto())}
+        keyset = paginacion.sort_field in (None, CAMPO_KEYSET_AUDITORIA)
+
+        total = None
+        if con_total:
+            total = self.session.execute(text(CONTAR_AUDITORIA_SQL.format(where_clause=where_clause)), params).scalar()
+
+        if cursor is not None:
+            if not keyset:
+                raise CursorNoValido(f"El cursor solo puede usarse ordenando por {CAMPO_KEYSET_AUDITORIA}")
+            fecha, id_ultimo = decodificar_cursor(cursor, 2)
+            try:
+                fecha = datetime.fromisoformat(fecha)
+            except (TypeError, ValueError):
+                raise CursorNoValido("El cursor de paginación no es válido")
+            # El id llega del cliente: un valor que no sea entero fallaría al convertirlo en la consulta
+            if not isinstance(id_ultimo, int) or isinstance(id_ultimo, bool):
+                raise CursorNoValido("El cursor de paginación no es válido")
+            condicion, params_cursor = sql_keyset(
+                "ac.fecha_modificacion", "ac.id", paginacion.descendente, fecha, id_ultimo,
+                tipo_valor="DATETIME" if self._dialecto() == "mssql" else None
+            )
+            where_clause = f"{where_clause} AND {condicion}"
+            params = {**params, **params_cursor}
+            # Con cursor la página siempre empieza tras la última fila vista
+            paginacion = replace(paginacion, page=1)
+
+        orden = sql_orden(columnas, paginacion, "ac.id", campo_defecto=CAMPO_KEYSET_AUDITORIA)
+        pagina, params_pagina = sql_paginacion(self._dialecto(), paginacion)
+        items = self._execute_query(where_clause, {**params, **params_pagina}, orden, pagina)
+
+        siguiente_cursor = None
+        if keyset and paginacion.limit is not None and len(items) == paginacion.limit:
+            siguiente_cursor = codificar_cursor(items[-1]["fecha_modificacion"], items[-1]["id"])
+
+        return {"total": total, "items": items, "siguiente_cursor": siguiente_cursor}
+
     def obtener_por_id(self, id: int):
         res = self._execute_query("AND ac.id = :id", {"id": id})
         return res[0] if res else None
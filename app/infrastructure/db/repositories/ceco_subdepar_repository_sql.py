@@ -0,0 +1,126 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.domain.repositories.ceco_subdepar_repository import CecoSubdeparRepository
+from app.infrastructure.db.models.ceco_subdepar_model import CecoSubdeparModel
+
+# Tamaño de los lotes de INSERT/DELETE al aplicar las diferencias
+TAMANO_LOTE_REFRESCO = 500
+
+# Las dos reglas con las que se cruzaban HDW_Cecos y SubDepar troceando CODIDEPAR. Solo se
+# evalúan aquí, en el job de refresco, sobre los CODIDEPAR distintos del almacén de RRHH.
+# CODIDEPAR se convierte siempre a VARCHAR(50), el tamaño de ceco_subdepar.codidepar; el trozo
+# 24..29 que compara por_codigo es el mismo que con el VARCHAR(30) implícito de antes.
+CECO_SUBDEPAR_POR_CODIGO_SQL = """
+  SELECT DISTINCT CAST(cc.CODIDEPAR AS VARCHAR(50)) AS codidepar, sd.codSubDepar, sd.ceco
+    FROM [BI DW RRHH DEV].dbo.HDW_Cecos cc
+    JOIN [ATISA_Input].dbo.SubDepar sd
+      ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR(50)), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6)
+"""
+
+CECO_SUBDEPAR_POR_PREFIJO_SQL = """
+  SELECT DISTINCT CAST(cc.CODIDEPAR AS VARCHAR(50)) AS codidepar, sd.codSubDepar, sd.ceco
+    FROM [BI DW RRHH DEV].dbo.HDW_Cecos cc
+    JOIN [ATISA_Input].dbo.SubDepar sd ON LEFT(CAST(cc.CODIDEPAR AS VARCHAR(50)), 29) = sd.codidepar
+"""
+
+# Clientes del departamento de cada empleado según la regla por_codigo (el CIF del cliente está
+# asignado a un subdepartamento de alguno de sus CODIDEPAR vigentes). Es el alcance del reporte
+# de status por usuario; empleado_cliente (MIS_CLIENTES) es más amplio.
+CLIENTES_DEPARTAMENTO_SQL = """
+  SELECT DISTINCT LOWER(per.email) AS email, c.idcliente
+    FROM [ATISA_Input].dbo.clientes c
+    JOIN [ATISA_Input].dbo.clienteSubDepar csd ON csd.cif = c.CIF
+    JOIN ceco_subdepar csm ON csm.codSubDepar = csd.codSubDepar AND csm.por_codigo = 1
+    JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc ON cc.CODIDEPAR = csm.codidepar AND cc.fechafin IS NULL
+    JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
+   WHERE {filtro}
+"""
+
+class CecoSubdeparRepositorySQL(CecoSubdeparRepository):
+    def __init__(self, session):
+        self.session = session
+
+    def listar_clientes_departamento(self, email: str) -> list[str]:
+        filas = self.session.execute(
+            text(CLIENTES_DEPARTAMENTO_SQL.format(filtro="per.email = :email")), {"email": email.strip()}
+        ).fetchall()
+        return [str(fila.idcliente).strip() for fila in filas]
+
+    def listar_clientes_departamento_todos(self) -> dict:
+        """{email en minúsculas: {idcliente}} de todos los empleados (precarga)."""
+        asignaciones = defaultdict(set)
+        for fila in self.session.execute(text(CLIENTES_DEPARTAMENTO_SQL.format(filtro="per.email IS NOT NULL"))):
+            asignaciones[fila.email.strip()].add(str(fila.idcliente).strip())
+        return dict(asignaciones)
+
+    def _snapshot_origen(self) -> dict:
+        """{(codidepar, codSubDepar): (ceco, por_codigo, por_prefijo)} según el origen."""
+        reglas = defaultdict(lambda: {"ceco": None, "por_codigo": False, "por_prefijo": False})
+        for sql, regla in ((CECO_SUBDEPAR_POR_CODIGO_SQL, "por_codigo"), (CECO_SUBDEPAR_POR_PREFIJO_SQL, "por_prefijo")):
+            for fila in self.session.execute(text(sql)).fetchall():
+                if fila.codidepar is None or fila.codSubDepar is None:
+                    continue
+                entrada = reglas[(str(fila.codidepar).strip(), str(fila.codSubDepar).strip())]
+                if fila.ceco is not None:
+                    entrada["ceco"] = str(fila.ceco).strip() or None
+                entrada[regla] = True
+
+        return {
+            (codidepar, cod_subdepar): (datos["ceco"], datos["por_codigo"], datos["por_prefijo"])
+            for (codidepar, cod_subdepar), datos in reglas.items()
+        }
+
+    def _snapshot_actual(self) -> dict:
+        filas = self.session.query(
+            CecoSubdeparModel.codidepar, CecoSubdeparModel.codSubDepar,
+            CecoSubdeparModel.ceco, CecoSubdeparModel.por_codigo, CecoSubdeparModel.por_prefijo
+        ).all()
+        return {
+            (fila.codidepar, fila.codSubDepar): (fila.ceco, bool(fila.por_codigo), bool(fila.por_prefijo))
+            for fila in filas
+        }
+
+    def refrescar(self) -> dict:
+        nuevo = self._snapshot_origen()
+        actual = self._snapshot_actual()
+
+        # Una fila que cambia (ceco o reglas) se da de baja y se vuelve a insertar
+        bajas = sorted(clave for clave, valor in actual.items() if nuevo.get(clave) != valor)
+        altas = sorted(clave for clave, valor in nuevo.items() if actual.get(clave) != valor)
+
+        try:
+            # SQL Server no admite IN sobre tuplas: las bajas se agrupan por codidepar
+            bajas_por_codidepar = defaultdict(list)
+            for codidepar, cod_subdepar in bajas:
+                bajas_por_codidepar[codidepar].append(cod_subdepar)
+            for codidepar, cods_subdepar in bajas_por_codidepar.items():
+                for inicio in range(0, len(cods_subdepar), TAMANO_LOTE_REFRESCO):
+                    self.session.query(CecoSubdeparModel).filter(
+                        CecoSubdeparModel.codidepar == codidepar,
+                        CecoSubdeparModel.codSubDepar.in_(cods_subdepar[inicio:inicio + TAMANO_LOTE_REFRESCO])
+                    ).delete(synchronize_session=False)
+
+            ahora = datetime.now()
+            for inicio in range(0, len(altas), TAMANO_LOTE_REFRESCO):
+                lote = altas[inicio:inicio + TAMANO_LOTE_REFRESCO]
+                self.session.bulk_insert_mappings(CecoSubdeparModel, [
+                    {
+                        "codidepar": codidepar,
+                        "codSubDepar": cod_subdepar,
+                        "ceco": nuevo[(codidepar, cod_subdepar)][0],
+                        "por_codigo": nuevo[(codidepar, cod_subdepar)][1],
+                        "por_prefijo": nuevo[(codidepar, cod_subdepar)][2],
+                        "fecha_alta": ahora,
+                    }
+                    for codidepar, cod_subdepar in lote
+                ])
+
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        return {"altas": len(altas), "bajas": len(bajas), "total": len(nuevo)}
@@ -7,6 +7,8 @@ from app.infrastructure.db.models.cliente_proceso_hito_cumplimiento_model import
 from app.infrastructure.db.models.documentos_cumplimiento_model import DocumentoCumplimientoModel
 
 from app.infrastructure.db.models.subdepar_model import SubdeparModel
+from app.infrastructure.db.compartido.consulta_paginada import paginar
+from app.infrastructure.services.directorio_personas import directorio_personas
 
 class ClienteProcesoHitoCumplimientoRepositorySQL(ClienteProcesoHitoCumplimientoRepository):
     def __init__(self, session):
@@ -32,38 +34,50 @@ class ClienteProcesoHitoCumplimientoRepositorySQL(ClienteProcesoHitoCumplimiento
         self.session.refresh(modelo)
         return modelo
 
-    def listar(self):
-        # Query con LEFT JOIN para contar documentos asociados a cada cumplimiento y obtener nombre departamento
-        # SQL Server requiere que todas las columnas estén en GROUP BY
-        resultados = (
-            self.session.query(
-                ClienteProcesoHitoCumplimientoModel.id,
-                ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id,
-                ClienteProcesoHitoCumplimientoModel.fecha,
-                ClienteProcesoHitoCumplimientoModel.hora,
-                ClienteProcesoHitoCumplimientoModel.observacion,
-                ClienteProcesoHitoCumplimientoModel.usuario,
-                ClienteProcesoHitoCumplimientoModel.fecha_creacion,
-                ClienteProcesoHitoCumplimientoModel.ceco,
-                SubdeparModel.nombre.label('departamento'),
-                func.count(DocumentoCumplimientoModel.id).label('num_documentos')
-            )
-            .outerjoin(DocumentoCumplimientoModel, ClienteProcesoHitoCumplimientoModel.id == DocumentoCumplimientoModel.cumplimiento_id)
-            .outerjoin(SubdeparModel, ClienteProcesoHitoCumplimientoModel.codSubDepar == SubdeparModel.codSubDepar)
-            .group_by(
-                ClienteProcesoHitoCumplimientoModel.id,
-                ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id,
-                ClienteProcesoHitoCumplimientoModel.fecha,
-                ClienteProcesoHitoCumplimientoModel.hora,
-                ClienteProcesoHitoCumplimientoModel.observacion,
-                ClienteProcesoHitoCumplimientoModel.usuario,
-                ClienteProcesoHitoCumplimientoModel.fecha_creacion,
-                ClienteProcesoHitoCumplimientoModel.codSubDepar,
-                SubdeparModel.nombre
-            )
-            .all()
-        )
+    def _query_listado(self, campos: set = None):
+        """
+        Consulta de cumplimientos con su departamento y número de documentos, junto con las
+        columnas por las que se puede ordenar. campos (None = todos) permite omitir el join de
+        documentos (num_documentos) y el de subdepar (departamento) cuando no se piden.
+        """
+        con_documentos = campos is None or 'num_documentos' in campos
+        con_departamento = campos is None or 'departamento' in campos
 
+        columnas = [
+            ClienteProcesoHitoCumplimientoModel.id,
+            ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id,
+            ClienteProcesoHitoCumplimientoModel.fecha,
+            ClienteProcesoHitoCumplimientoModel.hora,
+            ClienteProcesoHitoCumplimientoModel.observacion,
+            ClienteProcesoHitoCumplimientoModel.usuario,
+            ClienteProcesoHitoCumplimientoModel.fecha_creacion,
+            ClienteProcesoHitoCumplimientoModel.codSubDepar,
+        ]
+        columnas_orden = {columna.key: columna for columna in columnas}
+        agrupacion = list(columnas)
+        if con_departamento:
+            columnas.append(SubdeparModel.nombre.label('departamento'))
+            agrupacion.append(SubdeparModel.nombre)
+            columnas_orden['departamento'] = SubdeparModel.nombre
+
+        seleccion = list(columnas)
+        if con_documentos:
+            num_documentos = func.count(DocumentoCumplimientoModel.id)
+            seleccion.append(num_documentos.label('num_documentos'))
+            columnas_orden['num_documentos'] = num_documentos
+
+        query = self.session.query(*seleccion)
+        if con_documentos:
+            # Query con LEFT JOIN para contar documentos asociados a cada cumplimiento
+            query = query.outerjoin(DocumentoCumplimientoModel, ClienteProcesoHitoCumplimientoModel.id == DocumentoCumplimientoModel.cumplimiento_id)
+        if con_departamento:
+            query = query.outerjoin(SubdeparModel, ClienteProcesoHitoCumplimientoModel.codSubDepar == SubdeparModel.codSubDepar)
+        if con_documentos:
+            # SQL Server requiere que todas las columnas estén en GROUP BY
+            query = query.group_by(*agrupacion)
+        return query, columnas_orden
+
+    def _mapear_filas(self, resultados):
         # Reconstruir los modelos con el conteo de documentos y departamento
         modelos = []
         for row in resultados:
@@ -79,12 +93,23 @@ class ClienteProcesoHitoCumplimientoRepositorySQL(ClienteProcesoHitoCumplimiento
                 codSubDepar=row.codSubDepar
             )
             # Agregar atributos dinámicos
-            cumplimiento.num_documentos = row.num_documentos or 0
-            cumplimiento.departamento = row.departamento
+            cumplimiento.num_documentos = getattr(row, 'num_documentos', 0) or 0
+            cumplimiento.departamento = getattr(row, 'departamento', None)
             modelos.append(cumplimiento)
 
         return modelos
 
+    def listar(self, campos: set = None):
+        """Lista los cumplimientos con su departamento y número de documentos."""
+        query, _ = self._query_listado(campos)
+        return self._mapear_filas(query.all())
+
+    def listar_paginado(self, paginacion, campos: set = None):
+        """(total, página de cumplimientos) con el orden y la paginación resueltos en SQL."""
+        query, columnas_orden = self._query_listado(campos)
+        total, resultados = paginar(query, columnas_orden, paginacion, ClienteProcesoHitoCumplimientoModel.id)
+        return total, self._mapear_filas(resultados)
+
     def obtener_por_id(self, id: int):
         # Query con LEFT JOIN para contar documentos asociados y obtener departamento
         resultado = (
@@ -216,37 +241,60 @@ class ClienteProcesoHitoCumplimientoRepositorySQL(ClienteProcesoHitoCumplimiento
 
         return modelos
 
-    def obtener_historial_por_cliente_id(self, cliente_id: str, skip: int = 0, limit: int = 100):
-        """Obtiene el historial de cumplimientos de un cliente con información completa de proceso e hito"""
+    def obtener_historial_por_cliente_id(self, cliente_id: str, skip: int = 0, limit: int = 100, campos: set = None):
+        """
+        Obtiene el historial de cumplimientos de un cliente con información completa de proceso e hito.
+        Con campos solo se unen subdepar (departamento), documentos (num_documentos) y el estado
+        del proceso (proceso_estado) si se piden; el nombre del usuario (usuario) se resuelve
+        con el directorio de personas.
+        """
+        con_persona = campos is None or 'usuario' in campos
+        con_departamento = campos is None or 'departamento' in campos
+        con_documentos = campos is None or 'num_documentos' in campos
+        con_estado_proceso = campos is None or 'proceso_estado' in campos
+
+        columnas_extra = []
+        joins_extra = []
+        agrupacion_extra = []
+        if con_departamento:
+            columnas_extra.append("sd.nombre as departamento")
+            joins_extra.append("LEFT JOIN subdepar sd ON sd.codSubDePar = cpc.codSubDepar")
+            agrupacion_extra.append("sd.nombre")
+        if con_estado_proceso:
+            columnas_extra.append("""(SELECT CASE WHEN COUNT(*) = SUM(CASE WHEN estado = 'Finalizado' THEN 1 ELSE 0 END) THEN 'Finalizado' ELSE 'En proceso' END
+                    FROM cliente_proceso_hito WHERE cliente_proceso_id = cp.id) as proceso_estado""")
+        if con_documentos:
+            columnas_extra.append("COUNT(dc.id) as num_documentos")
+            joins_extra.append("LEFT JOIN documentos_cumplimiento dc ON dc.cumplimiento_id = cpc.id")
+
+        group_by_sql = ""
+        if con_documentos:
+            group_by_sql = "GROUP BY " + ", ".join([
+                "cpc.id, cpc.fecha, cpc.hora, cpc.usuario, cpc.observacion, cpc.fecha_creacion, cpc.codSubDepar",
+                "p.id, p.nombre, h.id, h.nombre, cph.fecha_limite, cph.hora_limite",
+                "cp.id, cp.fecha_inicio, cp.fecha_fin",
+            ] + agrupacion_extra)
 
-        query = text("""
+        query = text(f"""
             SELECT cpc.id, cpc.fecha, cpc.hora,
-                   CASE
-                       WHEN per.Nombre IS NOT NULL THEN ISNULL(per.Nombre, '') + ' ' + ISNULL(per.Apellido1, '') + ' ' + ISNULL(per.Apellido2, '')
-                       ELSE cpc.usuario
-                   END as usuario,
-                   cpc.observacion, cpc.fecha_creacion, cpc.codSubDepar, sd.nombre as departamento,
+                   cpc.usuario,
+                   cpc.observacion, cpc.fecha_creacion, cpc.codSubDepar,
                    p.id as proceso_id, p.nombre AS proceso, h.id as hito_id, h.nombre AS hito,
                    cp.id as cliente_proceso_id, cp.fecha_inicio as proceso_fecha_inicio, cp.fecha_fin as proceso_fecha_fin,
-                   (SELECT CASE WHEN COUNT(*) = SUM(CASE WHEN estado = 'Finalizado' THEN 1 ELSE 0 END) THEN 'Finalizado' ELSE 'En proceso' END
-                    FROM cliente_proceso_hito WHERE cliente_proceso_id = cp.id) as proceso_estado,
-                   cph.fecha_limite, cph.hora_limite,
-                   COUNT(dc.id) as num_documentos
+                   cph.fecha_limite, cph.hora_limite{"".join(", " + columna for columna in columnas_extra)}
             FROM cliente_proceso_hito_cumplimiento cpc
             JOIN cliente_proceso_hito cph ON cph.id = cpc.cliente_proceso_hito_id
             JOIN cliente_proceso cp ON cp.id = cph.cliente_proceso_id
             JOIN proceso p ON p.id = cp.proceso_id
             JOIN hito h ON h.id = cph.hito_id
-            LEFT JOIN documentos_cumplimiento dc ON dc.cumplimiento_id = cpc.id
-            LEFT JOIN subdepar sd ON sd.codSubDePar = cpc.codSubDepar
-            LEFT JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cpc.usuario
+            {" ".join(joins_extra)}
             WHERE cp.cliente_id = :cliente_id
-            GROUP BY cpc.id, cpc.fecha, cpc.hora, cpc.usuario, cpc.observacion, cpc.fecha_creacion, cpc.codSubDepar, sd.nombre,
-                     p.id, p.nombre, h.id, h.nombre, cph.fecha_limite, cph.hora_limite,
-                     cp.id, cp.fecha_inicio, cp.fecha_fin,
-                     per.Nombre, per.Apellido1, per.Apellido2
+            {group_by_sql}
             ORDER BY cpc.id DESC
         """)
 
-        result = self.session.execute(query, {"cliente_id": cliente_id})
-        return result.fetchall()
+        filas = self.session.execute(query, {"cliente_id": cliente_id}).fetchall()
+        if not con_persona:
+            return filas
+        # Nombre del usuario desde el directorio de personas (sin JOIN a la base de datos de RRHH)
+        return directorio_personas.resolver_en_filas(self.session, filas, 'usuario')
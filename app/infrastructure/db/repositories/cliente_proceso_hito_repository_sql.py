@@ -2,8 +2,10 @@
 
 from datetime import date, datetime, time, timedelta
 import calendar
+from collections import namedtuple
+from itertools import islice
 
-from sqlalchemy import extract, text, func, case, or_, Table, Column, String, MetaData, Integer, Date, select, literal_column
+from sqlalchemy import text, func, case, or_, Integer, Date, select, literal_column
 from sqlalchemy.orm import aliased
 
 from app.domain.entities.cliente_proceso_hito import ClienteProcesoHito
@@ -18,6 +20,12 @@ from app.infrastructure.db.models.cliente_proceso_hito_cumplimiento_model import
 from app.infrastructure.db.models.documentos_cumplimiento_model import DocumentoCumplimientoModel
 from app.infrastructure.db.models.subdepar_model import SubdeparModel
 from app.infrastructure.db.models import ProcesoHitoMaestroModel
+from app.infrastructure.db.compartido.estado_calculado import estado_calculado_expr, filtro_estados_calculados
+from app.infrastructure.db.compartido.rango_fechas import condiciones_periodo
+from app.infrastructure.db.compartido.tabla_valores import tabla_valores
+from app.infrastructure.services.asignaciones_empleado_cache import cache_asignaciones
+from app.infrastructure.services.cliente_departamento_index import indice_cliente_departamento
+from app.infrastructure.services.directorio_personas import directorio_personas
 
 class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
     def __init__(self, session):
@@ -53,8 +61,7 @@ class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
         ).join(
             ProcesoModel, ClienteProcesoModel.proceso_id == ProcesoModel.id
         ).filter(
-            extract('year', ClienteProcesoHitoModel.fecha_limite) == anio,
-            extract('month', ClienteProcesoHitoModel.fecha_limite) == mes,
+            *condiciones_periodo(ClienteProcesoHitoModel.fecha_limite, anio, mes),
             ClienteProcesoHitoModel.habilitado == True
         )
 
@@ -86,8 +93,7 @@ class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
     def obtener_filtros(self, anio: int, mes: int, cliente_id: str = None):
         # Base filters
         filters = [
-            extract('year', ClienteProcesoHitoModel.fecha_limite) == anio,
-            extract('month', ClienteProcesoHitoModel.fecha_limite) == mes,
+            *condiciones_periodo(ClienteProcesoHitoModel.fecha_limite, anio, mes),
             ClienteProcesoHitoModel.habilitado == True,
             ClienteProcesoModel.habilitado == True
         ]
@@ -471,159 +477,192 @@ class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
         return 0
 
 
-    def ejecutar_reporte_status_todos_clientes(self, filtros: dict, paginacion: dict):
-        # Definir tabla externa Persona
-        metadata = MetaData()
-        # Se asume que el driver manejara los espacios en el nombre de la BD si se pasa como schema
-        persona_table = Table(
-            'Persona',
-            metadata,
-            Column('Numeross', String, primary_key=True),
-            Column('Nombre', String),
-            Column('Apellido1', String),
-            Column('Apellido2', String),
-            schema='BI DW RRHH DEV.dbo'
-        )
-        per = persona_table.alias('per')
+    def _construir_query_reporte_status(self, filtros: dict, campos: set = None):
+        """
+        Construye la consulta base (filtrada y ordenada) del reporte de status.
 
-        # Subconsulta para obtener el ID del último cumplimiento por hito
-        subquery_ultimo_cumplimiento = (
-            self.session.query(
-                ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id,
-                func.max(ClienteProcesoHitoCumplimientoModel.id).label('ultimo_cumplimiento_id')
-            )
-            .group_by(ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id)
-            .subquery()
-        )
+        campos limita la proyección a los campos pedidos del reporte (None = todos); los del
+        último cumplimiento van como 'ultimo_cumplimiento.<campo>'. Solo se añaden los joins y
+        subconsultas que alimentan esos campos o los filtros/orden solicitados.
+        """
+        def pide(*nombres):
+            return campos is None or any(nombre in campos for nombre in nombres)
 
-        # Subquery para estado del proceso
-        cph_sub = aliased(ClienteProcesoHitoModel)
-        proceso_estado_column = (
-            self.session.query(
-                case(
-                    (func.count(cph_sub.id) == func.sum(case((cph_sub.estado == 'Finalizado', 1), else_=0)), 'Finalizado'),
-                    else_='En proceso'
+        def pide_cumplimiento(nombre):
+            return pide(f'ultimo_cumplimiento.{nombre}')
+
+        ordenar_por = filtros.get('ordenar_por', 'fecha_limite')
+        con_cumplimiento = (
+            campos is None
+            or any(campo.startswith('ultimo_cumplimiento.') for campo in campos)
+            or 'estado_calculado' in campos
+            or bool(filtros.get('estados'))
+            or ordenar_por == 'estado_calculado'
+        )
+        con_persona = pide_cumplimiento('usuario')
+        con_subdepar = pide_cumplimiento('departamento')
+        # El conteo de documentos es el único agregado: sin él no hace falta GROUP BY
+        con_documentos = pide_cumplimiento('num_documentos')
+
+        # (columna seleccionada, columnas que la respaldan en el GROUP BY)
+        columnas = []
+
+        def agregar(columna, *agrupar):
+            columnas.append((columna, list(agrupar) or [columna]))
+
+        # Identificación del hito y del cliente (necesarios para enriquecer y filtrar por usuario)
+        agregar(ClienteProcesoHitoModel.id)
+        agregar(ClienteModel.idcliente.label('cliente_id'), ClienteModel.idcliente)
+
+        # Campos de ClienteProcesoHito
+        if pide('cliente_proceso_id'):
+            agregar(ClienteProcesoHitoModel.cliente_proceso_id)
+        if pide('hito_id'):
+            agregar(ClienteProcesoHitoModel.hito_id)
+        if pide('estado'):
+            agregar(ClienteProcesoHitoModel.estado)
+        if pide('fecha_estado'):
+            agregar(ClienteProcesoHitoModel.fecha_estado)
+        if pide('fecha_limite'):
+            agregar(ClienteProcesoHitoModel.fecha_limite)
+        if pide('hora_limite'):
+            agregar(ClienteProcesoHitoModel.hora_limite)
+        if pide('tipo'):
+            agregar(ClienteProcesoHitoModel.tipo)
+        if pide('habilitado'):
+            agregar(ClienteProcesoHitoModel.habilitado)
+
+        # Información del cliente
+        if pide('cliente_nombre'):
+            agregar(ClienteModel.razsoc.label('cliente_nombre'), ClienteModel.razsoc)
+
+        # Información del proceso
+        if pide('proceso_id'):
+            agregar(ClienteProcesoModel.proceso_id)
+        if campos is None:
+            # Periodo del proceso (solo lo usan las exportaciones, que piden todos los campos)
+            agregar(ClienteProcesoModel.fecha_inicio.label('proceso_fecha_inicio'), ClienteProcesoModel.fecha_inicio)
+            agregar(ClienteProcesoModel.fecha_fin.label('proceso_fecha_fin'), ClienteProcesoModel.fecha_fin)
+            agregar(ClienteProcesoModel.mes.label('proceso_mes'), ClienteProcesoModel.mes)
+            agregar(ClienteProcesoModel.anio.label('proceso_anio'), ClienteProcesoModel.anio)
+        if pide('proceso_nombre'):
+            agregar(ProcesoModel.nombre.label('proceso_nombre'), ProcesoModel.nombre)
+
+        if pide('estado_proceso'):
+            # Subquery para estado del proceso
+            cph_sub = aliased(ClienteProcesoHitoModel)
+            proceso_estado_column = (
+                self.session.query(
+                    case(
+                        (func.count(cph_sub.id) == func.sum(case((cph_sub.estado == 'Finalizado', 1), else_=0)), 'Finalizado'),
+                        else_='En proceso'
+                    )
                 )
+                .filter(cph_sub.cliente_proceso_id == ClienteProcesoModel.id)
+                .filter(cph_sub.habilitado == True)
+                .correlate(ClienteProcesoModel)
+                .as_scalar()
+                .label('proceso_estado')
             )
-            .filter(cph_sub.cliente_proceso_id == ClienteProcesoModel.id)
-            .filter(cph_sub.habilitado == True)
-            .correlate(ClienteProcesoModel)
-            .as_scalar()
-            .label('proceso_estado')
-        )
+            agregar(proceso_estado_column, ClienteProcesoModel.id)
 
-        query = (
-            self.session.query(
-                # Campos de ClienteProcesoHito
-                ClienteProcesoHitoModel.id,
-                ClienteProcesoHitoModel.cliente_proceso_id,
-                ClienteProcesoHitoModel.hito_id,
+        estado_calculado = None
+        if con_cumplimiento:
+            # Estado calculado (cumplido en plazo, vence hoy, ...) evaluado en SQL sobre el último cumplimiento
+            estado_calculado = estado_calculado_expr(
                 ClienteProcesoHitoModel.estado,
-                ClienteProcesoHitoModel.fecha_estado,
                 ClienteProcesoHitoModel.fecha_limite,
-                ClienteProcesoHitoModel.hora_limite,
-                ClienteProcesoHitoModel.tipo,
-                ClienteProcesoHitoModel.habilitado,
-                # Información del cliente
-                ClienteModel.idcliente.label('cliente_id'),
-                ClienteModel.razsoc.label('cliente_nombre'),
-                # Información del proceso
-                ClienteProcesoModel.proceso_id,
-                ClienteProcesoModel.fecha_inicio.label('proceso_fecha_inicio'),
-                ClienteProcesoModel.fecha_fin.label('proceso_fecha_fin'),
-                ClienteProcesoModel.mes.label('proceso_mes'),
-                ClienteProcesoModel.anio.label('proceso_anio'),
-                ProcesoModel.nombre.label('proceso_nombre'),
-                proceso_estado_column,
-                literal_column("NULL").label('cliente_departamento_codigo'),
-                literal_column("NULL").label('cliente_departamento_nombre'),
-                # Información del hito maestro
-                HitoModel.nombre.label('hito_nombre'),
-                HitoModel.obligatorio.label('hito_obligatorio'),
-                HitoModel.critico.label('hito_critico'),
-                # Último cumplimiento (si existe)
-                ClienteProcesoHitoCumplimientoModel.id.label('cumplimiento_id'),
-                ClienteProcesoHitoCumplimientoModel.fecha.label('cumplimiento_fecha'),
-                ClienteProcesoHitoCumplimientoModel.hora.label('cumplimiento_hora'),
-                ClienteProcesoHitoCumplimientoModel.observacion.label('cumplimiento_observacion'),
-                 # Usuario: si existe en Persona, concatenar nombre completo, sino usar campo usuario
-                case(
-                    (per.c.Nombre != None,
-                     func.concat(
-                         func.isnull(per.c.Nombre, ''), ' ',
-                         func.isnull(per.c.Apellido1, ''), ' ',
-                         func.isnull(per.c.Apellido2, '')
-                     )),
-                    else_=ClienteProcesoHitoCumplimientoModel.usuario
-                ).label('cumplimiento_usuario'),
-                ClienteProcesoHitoCumplimientoModel.codSubDepar.label('cumplimiento_codSubDepar'),
-                SubdeparModel.nombre.label('cumplimiento_departamento'),
-                ClienteProcesoHitoCumplimientoModel.fecha_creacion.label('cumplimiento_fecha_creacion'),
-                # Número de documentos del último cumplimiento
-                func.count(DocumentoCumplimientoModel.id).label('num_documentos')
+                ClienteProcesoHitoCumplimientoModel.fecha
+            )
+            if pide('estado_calculado'):
+                agregar(
+                    estado_calculado.label('estado_calculado'),
+                    ClienteProcesoHitoModel.estado,
+                    ClienteProcesoHitoModel.fecha_limite,
+                    ClienteProcesoHitoCumplimientoModel.fecha
+                )
+
+        # Información del hito maestro
+        if pide('hito_nombre'):
+            agregar(HitoModel.nombre.label('hito_nombre'), HitoModel.nombre)
+        if pide('obligatorio'):
+            agregar(HitoModel.obligatorio.label('hito_obligatorio'), HitoModel.obligatorio)
+        if pide('critico'):
+            agregar(HitoModel.critico.label('hito_critico'), HitoModel.critico)
+
+        # Último cumplimiento (si existe)
+        if con_cumplimiento and (campos is None or any(campo.startswith('ultimo_cumplimiento.') for campo in campos)):
+            agregar(ClienteProcesoHitoCumplimientoModel.id.label('cumplimiento_id'), ClienteProcesoHitoCumplimientoModel.id)
+            if pide_cumplimiento('fecha'):
+                agregar(ClienteProcesoHitoCumplimientoModel.fecha.label('cumplimiento_fecha'), ClienteProcesoHitoCumplimientoModel.fecha)
+            if pide_cumplimiento('hora'):
+                agregar(ClienteProcesoHitoCumplimientoModel.hora.label('cumplimiento_hora'), ClienteProcesoHitoCumplimientoModel.hora)
+            if pide_cumplimiento('observacion'):
+                agregar(ClienteProcesoHitoCumplimientoModel.observacion.label('cumplimiento_observacion'), ClienteProcesoHitoCumplimientoModel.observacion)
+            if pide_cumplimiento('codSubDepar'):
+                agregar(ClienteProcesoHitoCumplimientoModel.codSubDepar.label('cumplimiento_codSubDepar'), ClienteProcesoHitoCumplimientoModel.codSubDepar)
+            if pide_cumplimiento('fecha_creacion'):
+                agregar(ClienteProcesoHitoCumplimientoModel.fecha_creacion.label('cumplimiento_fecha_creacion'), ClienteProcesoHitoCumplimientoModel.fecha_creacion)
+
+        if con_persona:
+            # Numeross del usuario: el nombre se resuelve tras la consulta con el directorio de personas
+            agregar(
+                ClienteProcesoHitoCumplimientoModel.usuario.label('cumplimiento_usuario'),
+                ClienteProcesoHitoCumplimientoModel.usuario
             )
+
+        if con_subdepar:
+            agregar(SubdeparModel.nombre.label('cumplimiento_departamento'), SubdeparModel.nombre)
+
+        seleccion = [columna for columna, _ in columnas]
+        if con_documentos:
+            # Número de documentos del último cumplimiento
+            seleccion.append(func.count(DocumentoCumplimientoModel.id).label('num_documentos'))
+
+        query = (
+            self.session.query(*seleccion)
             .join(ClienteProcesoModel, ClienteProcesoHitoModel.cliente_proceso_id == ClienteProcesoModel.id)
             .join(ClienteModel, ClienteProcesoModel.cliente_id == ClienteModel.idcliente)
             .join(ProcesoModel, ClienteProcesoModel.proceso_id == ProcesoModel.id)
             .join(HitoModel, ClienteProcesoHitoModel.hito_id == HitoModel.id)
-            .outerjoin(
+        )
+
+        if con_cumplimiento:
+            # Subconsulta para obtener el ID del último cumplimiento por hito
+            subquery_ultimo_cumplimiento = (
+                self.session.query(
+                    ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id,
+                    func.max(ClienteProcesoHitoCumplimientoModel.id).label('ultimo_cumplimiento_id')
+                )
+                .group_by(ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id)
+                .subquery()
+            )
+            query = query.outerjoin(
                 subquery_ultimo_cumplimiento,
                 ClienteProcesoHitoModel.id == subquery_ultimo_cumplimiento.c.cliente_proceso_hito_id
-            )
-            .outerjoin(
+            ).outerjoin(
                 ClienteProcesoHitoCumplimientoModel,
                 ClienteProcesoHitoCumplimientoModel.id == subquery_ultimo_cumplimiento.c.ultimo_cumplimiento_id
             )
-            .outerjoin(
+
+        if con_documentos:
+            query = query.outerjoin(
                 DocumentoCumplimientoModel,
                 ClienteProcesoHitoCumplimientoModel.id == DocumentoCumplimientoModel.cumplimiento_id
             )
-            .outerjoin(
+
+        if con_subdepar:
+            query = query.outerjoin(
                 SubdeparModel,
                 ClienteProcesoHitoCumplimientoModel.codSubDepar == SubdeparModel.codSubDepar
             )
-            .outerjoin(
-                per,
-                per.c.Numeross == ClienteProcesoHitoCumplimientoModel.usuario
-            )
+
+        query = (
+            query
             .filter(ClienteProcesoHitoModel.habilitado == True)
             .filter(ClienteProcesoModel.habilitado == True)
             .filter(ProcesoModel.habilitado == True)
             .filter(HitoModel.habilitado == True)
-            .group_by(
-                ClienteProcesoHitoModel.id,
-                ClienteProcesoHitoModel.cliente_proceso_id,
-                ClienteProcesoHitoModel.hito_id,
-                ClienteProcesoHitoModel.estado,
-                ClienteProcesoHitoModel.fecha_estado,
-                ClienteProcesoHitoModel.fecha_limite,
-                ClienteProcesoHitoModel.hora_limite,
-                ClienteProcesoHitoModel.tipo,
-                ClienteProcesoHitoModel.habilitado,
-                ClienteModel.idcliente,
-                ClienteModel.razsoc,
-                ClienteProcesoModel.id,
-                ClienteProcesoModel.proceso_id,
-                ClienteProcesoModel.fecha_inicio,
-                ClienteProcesoModel.fecha_fin,
-                ClienteProcesoModel.mes,
-                ClienteProcesoModel.anio,
-                ProcesoModel.nombre,
-                HitoModel.nombre,
-                HitoModel.obligatorio,
-                HitoModel.critico,
-                ClienteProcesoHitoCumplimientoModel.id,
-                ClienteProcesoHitoCumplimientoModel.fecha,
-                ClienteProcesoHitoCumplimientoModel.hora,
-                ClienteProcesoHitoCumplimientoModel.observacion,
-                ClienteProcesoHitoCumplimientoModel.usuario,
-                ClienteProcesoHitoCumplimientoModel.codSubDepar,
-                SubdeparModel.nombre,
-                per.c.Nombre,
-                per.c.Apellido1,
-                per.c.Apellido2,
-                ClienteProcesoHitoCumplimientoModel.fecha_creacion
-            )
         )
 
         # Aplicar filtros
@@ -656,8 +695,10 @@ class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
                 (HitoModel.nombre.ilike(search_pattern))
             )
 
+        if filtros.get('estados'):
+            query = query.filter(filtro_estados_calculados(estado_calculado, filtros['estados']))
+
         # Ordenar
-        ordenar_por = filtros.get('ordenar_por', 'fecha_limite')
         orden = filtros.get('orden', 'asc')
 
         if ordenar_por == "fecha_limite":
@@ -666,14 +707,103 @@ class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
             order_field = ClienteModel.razsoc
         elif ordenar_por == "proceso_nombre":
             order_field = ProcesoModel.nombre
+        elif ordenar_por == "estado_calculado":
+            order_field = estado_calculado
         else:
             order_field = ClienteProcesoHitoModel.fecha_limite
 
+        if con_documentos:
+            # SQL Server exige en el GROUP BY todas las columnas no agregadas (y la de orden)
+            respaldos = [columna for _, respaldo in columnas for columna in respaldo]
+            if order_field is estado_calculado:
+                respaldos += [ClienteProcesoHitoModel.estado, ClienteProcesoHitoModel.fecha_limite, ClienteProcesoHitoCumplimientoModel.fecha]
+            else:
+                respaldos.append(order_field)
+            agrupacion = list({id(columna): columna for columna in respaldos}.values())
+            query = query.group_by(*agrupacion)
+
         if orden and orden.lower() == "desc":
             query = query.order_by(order_field.desc())
         else:
             query = query.order_by(order_field.asc())
 
+        return query
+
+    def _filtrar_clientes_usuario(self, query, email: str):
+        """
+        Restringe la consulta a los clientes del departamento del usuario: el CIF del cliente está
+        asignado a uno de sus subdepartamentos por SUBSTRING(CODIDEPAR, 24, 6) (regla por_codigo
+        de ceco_subdepar, la misma que _subdepar_usuario). El conjunto sale de la caché de
+        asignaciones y se pasa a SQL como tabla de valores (un único parámetro).
+        """
+        clientes_usuario = tabla_valores(
+            self.session, "clientes_usuario", "id_cliente",
+            cache_asignaciones.clientes_departamento(email, self.session), "VARCHAR(9)"
+        )
+        return query.join(clientes_usuario, clientes_usuario.c.id_cliente == ClienteModel.idcliente)
+
+    def _subdepar_usuario(self, email: str) -> set:
+        """codSubDepar del usuario según HDW_Cecos (misma regla que listar_con_departamentos)."""
+        persona = directorio_personas.por_email(self.session, email)
+        if persona is None or persona.numeross is None:
+            return set()
+        filas = self.session.execute(text("""
+            SELECT DISTINCT csm.codSubDepar
+            FROM ceco_subdepar csm
+            JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc ON cc.CODIDEPAR = csm.codidepar AND cc.fechafin IS NULL
+            WHERE csm.por_codigo = 1 AND cc.Numeross = :numeross
+        """), {"numeross": persona.numeross}).fetchall()
+        return {str(fila.codSubDepar).strip() for fila in filas}
+
+    def _obtener_departamentos_clientes(self, ids_clientes: list, email: str = None) -> dict:
+        """
+        Devuelve {idcliente: {'codSubDepar', 'nombre'}} para los clientes indicados, a partir del
+        índice en memoria cliente -> departamentos. Sin email se toma el primer departamento del
+        cliente; con email, el último que pertenezca también al usuario (como la consulta original,
+        que sobrescribía el departamento con cada fila).
+        """
+        dept_map = {}
+        if not ids_clientes:
+            return dept_map
+
+        subdepar_usuario = self._subdepar_usuario(email) if email else None
+        for id_cliente, departamentos in indice_cliente_departamento.mapa_departamentos(self.session, ids_clientes).items():
+            if subdepar_usuario is not None:
+                departamentos = [
+                    departamento for departamento in departamentos
+                    if str(departamento.codSubDepar).strip() in subdepar_usuario
+                ][-1:]
+            if departamentos:
+                dept_map[id_cliente] = {
+                    'codSubDepar': departamentos[0].codSubDepar,
+                    'nombre': departamentos[0].nombre
+                }
+        return dept_map
+
+    @staticmethod
+    def _pide_departamento(campos: set = None) -> bool:
+        """Indica si los campos pedidos del reporte incluyen el departamento del cliente."""
+        return campos is None or 'codSubDepar' in campos or 'departamento_cliente' in campos
+
+    def _enriquecer_con_departamentos(self, registros, dept_map: dict):
+        """Añade cliente_departamento_codigo/nombre a cada fila (namedtuple con atributos accesibles)."""
+        if not registros:
+            return []
+        campos = list(registros[0]._fields) + ['cliente_departamento_codigo', 'cliente_departamento_nombre']
+        RowType = namedtuple('Row', campos)
+        enriched = []
+        for row in registros:
+            dept_info = dept_map.get(str(row.cliente_id), {})
+            enriched.append(RowType(*row, dept_info.get('codSubDepar'), dept_info.get('nombre', '')))
+        return enriched
+
+    def _resolver_usuarios(self, registros):
+        """Sustituye el Numeross de cumplimiento_usuario por el nombre del directorio de personas."""
+        return directorio_personas.resolver_en_filas(self.session, registros, 'cumplimiento_usuario')
+
+    def ejecutar_reporte_status_todos_clientes(self, filtros: dict, paginacion: dict, campos: set = None):
+        query = self._construir_query_reporte_status(filtros, campos)
+
         # Obtener Total
         total_registros = query.count()
 
@@ -684,319 +814,200 @@ class ClienteProcesoHitoRepositorySQL(ClienteProcesoHitoRepository):
             if paginacion.get('limit') is not None:
                 query = query.limit(paginacion['limit'])
 
-        registros = query.all()
+        registros = self._resolver_usuarios(query.all())
+        if not self._pide_departamento(campos):
+            return registros, total_registros
 
         # Obtener departamentos de los clientes (sin filtro de usuario)
-        dept_map = {}
-        if registros:
-            ids_clientes = list({str(row.cliente_id) for row in registros})
-            placeholders = ', '.join([f':id{i}' for i in range(len(ids_clientes))])
-            dept_query_str = f"""
-                SELECT c.idcliente, sd.codSubDepar, sd.nombre
-                FROM [ATISA_Input].dbo.clientes c
-                JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
-                JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
-                WHERE c.idcliente IN ({placeholders})
-            """
-            dept_params = {f'id{i}': id_cliente for i, id_cliente in enumerate(ids_clientes)}
-            dept_results = self.session.execute(text(dept_query_str), dept_params).fetchall()
-            for dr in dept_results:
-                # Si un cliente tiene varios departamentos, tomamos el primero
-                if str(dr.idcliente) not in dept_map:
-                    dept_map[str(dr.idcliente)] = {
-                        'codSubDepar': dr.codSubDepar,
-                        'nombre': dr.nombre
-                    }
-
-        # Enriquecer registros con datos de departamento
-        from collections import namedtuple
-        enriched = []
-        for row in registros:
-            dept_info = dept_map.get(str(row.cliente_id), {})
-            row_dict = row._asdict()
-            row_dict['cliente_departamento_codigo'] = dept_info.get('codSubDepar')
-            row_dict['cliente_departamento_nombre'] = dept_info.get('nombre', '')
-            RowType = namedtuple('Row', row_dict.keys())
-            enriched.append(RowType(**row_dict))
-
-        return enriched, total_registros
-
-    def ejecutar_reporte_status_todos_clientes_por_usuario(self, filtros: dict, paginacion: dict, email: str):
-        # Definir tabla externa Persona
-        metadata = MetaData()
-        # Se asume que el driver manejara los espacios en el nombre de la BD si se pasa como schema
-        persona_table = Table(
-            'Persona',
-            metadata,
-            Column('Numeross', String, primary_key=True),
-            Column('Nombre', String),
-            Column('Apellido1', String),
-            Column('Apellido2', String),
-            schema='BI DW RRHH DEV.dbo'
+        ids_clientes = list({str(row.cliente_id) for row in registros})
+        dept_map = self._obtener_departamentos_clientes(ids_clientes)
+
+        return self._enriquecer_con_departamentos(registros, dept_map), total_registros
+
+    def ejecutar_reporte_status_todos_clientes_por_usuario(self, filtros: dict, paginacion: dict, email: str, campos: set = None):
+        query = self._construir_query_reporte_status(filtros, campos)
+        # Filtro de clientes por usuario (email)
+        query = self._filtrar_clientes_usuario(query, email)
+
+        # Obtener Total
+        # Usamos subquery para contar correctamente con GROUP BY
+        total_registros = self.session.query(query.subquery()).count()
+
+        # Paginación
+        if paginacion:
+            if paginacion.get('offset') is not None:
+                query = query.offset(paginacion['offset'])
+            if paginacion.get('limit') is not None:
+                query = query.limit(paginacion['limit'])
+
+        registros = self._resolver_usuarios(query.all())
+        if not self._pide_departamento(campos):
+            return registros, total_registros
+
+        # Obtener departamentos del cliente para este usuario usando la misma lógica que listar_con_departamentos
+        ids_clientes = list({str(row.cliente_id) for row in registros})
+        dept_map = self._obtener_departamentos_clientes(ids_clientes, email)
+
+        return self._enriquecer_con_departamentos(registros, dept_map), total_registros
+
+    def contar_reporte_status_por_estado(self, filtros: dict, email: str = None) -> dict:
+        """Número de hitos del reporte por estado calculado (con los mismos filtros), agrupado en SQL."""
+        # Solo se proyecta el estado calculado: sin Persona, departamentos ni documentos
+        query = self._construir_query_reporte_status(filtros, {'estado_calculado'})
+
+        if email:
+            query = self._filtrar_clientes_usuario(query, email)
+
+        sub = query.order_by(None).subquery()
+        conteos = (
+            self.session.query(sub.c.estado_calculado, func.count())
+            .group_by(sub.c.estado_calculado)
+            .all()
         )
-        per = persona_table.alias('per')
+        return {estado: total for estado, total in conteos}
+
+    def iterar_reporte_status_todos_clientes(self, filtros: dict, paginacion: dict = None, email: str = None,
+                                             lote: int = 500, campos: set = None):
+        """
+        Versión en streaming del reporte de status: recorre el resultado con un cursor
+        de servidor (stream_results + yield_per) y produce las filas enriquecidas lote a lote,
+        sin materializar el resultado completo en memoria.
+        """
+        query = self._construir_query_reporte_status(filtros, campos)
+
+        if email:
+            query = self._filtrar_clientes_usuario(query, email)
+
+        if paginacion:
+            if paginacion.get('offset') is not None:
+                query = query.offset(paginacion['offset'])
+            if paginacion.get('limit') is not None:
+                query = query.limit(paginacion['limit'])
 
-        # Subconsulta para obtener el ID del último cumplimiento por hito
-        subquery_ultimo_cumplimiento = (
+        # yield_per activa stream_results: el driver entrega las filas bajo demanda
+        filas = iter(query.yield_per(lote))
+        pide_departamento = self._pide_departamento(campos)
+
+        # Nombres y departamentos se resuelven por lote; los departamentos se reutilizan
+        # para clientes ya vistos
+        dept_cache = {}
+        while True:
+            particion = self._resolver_usuarios(list(islice(filas, lote)))
+            if not particion:
+                break
+            if not pide_departamento:
+                yield from particion
+                continue
+            nuevos = list({str(row.cliente_id) for row in particion} - dept_cache.keys())
+            if nuevos:
+                encontrados = self._obtener_departamentos_clientes(nuevos, email)
+                for id_cliente in nuevos:
+                    dept_cache[id_cliente] = encontrados.get(id_cliente, {})
+            yield from self._enriquecer_con_departamentos(particion, dept_cache)
+
+    def listar_status_hitos_cliente(self, cliente_id: str, filtros: dict, lote: int = 500):
+        """
+        Hitos habilitados de un cliente para la exportación de status por cliente.
+
+        Devuelve tuplas ligeras de columnas (sin entidades ORM) con solo el último cumplimiento
+        de cada hito, elegido en SQL con ROW_NUMBER() por (fecha, hora) descendente. El ranking
+        se limita a los cumplimientos de los hitos del cliente, para que el coste no crezca con
+        el histórico de todos los clientes.
+        El estado calculado, el filtro por estados y la búsqueda se resuelven en la consulta.
+        """
+        cumplimiento = ClienteProcesoHitoCumplimientoModel
+        cph_cliente = aliased(ClienteProcesoHitoModel)
+        cp_cliente = aliased(ClienteProcesoModel)
+        ultimo_cumplimiento = (
             self.session.query(
-                ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id,
-                func.max(ClienteProcesoHitoCumplimientoModel.id).label('ultimo_cumplimiento_id')
+                cumplimiento.cliente_proceso_hito_id.label('cliente_proceso_hito_id'),
+                cumplimiento.fecha.label('fecha'),
+                cumplimiento.hora.label('hora'),
+                func.row_number().over(
+                    partition_by=cumplimiento.cliente_proceso_hito_id,
+                    order_by=(cumplimiento.fecha.desc(), cumplimiento.hora.desc(), cumplimiento.id.desc())
+                ).label('rn')
             )
-            .group_by(ClienteProcesoHitoCumplimientoModel.cliente_proceso_hito_id)
+            .join(cph_cliente, cph_cliente.id == cumplimiento.cliente_proceso_hito_id)
+            .join(cp_cliente, cp_cliente.id == cph_cliente.cliente_proceso_id)
+            .filter(cp_cliente.cliente_id == cliente_id)
             .subquery()
         )
 
-        # Subquery para estado del proceso
-        cph_sub = aliased(ClienteProcesoHitoModel)
-        proceso_estado_column = (
-            self.session.query(
-                case(
-                    (func.count(cph_sub.id) == func.sum(case((cph_sub.estado == 'Finalizado', 1), else_=0)), 'Finalizado'),
-                    else_='En proceso'
-                )
-            )
-            .filter(cph_sub.cliente_proceso_id == ClienteProcesoModel.id)
-            .filter(cph_sub.habilitado == True)
-            .correlate(ClienteProcesoModel)
-            .as_scalar()
-            .label('proceso_estado')
+        estado_calculado = estado_calculado_expr(
+            ClienteProcesoHitoModel.estado,
+            ClienteProcesoHitoModel.fecha_limite,
+            ultimo_cumplimiento.c.fecha,
+            hora_limite=ClienteProcesoHitoModel.hora_limite,
+            hora_cumplimiento=ultimo_cumplimiento.c.hora
         )
 
         query = (
             self.session.query(
-                # Campos de ClienteProcesoHito
                 ClienteProcesoHitoModel.id,
                 ClienteProcesoHitoModel.cliente_proceso_id,
-                ClienteProcesoHitoModel.hito_id,
                 ClienteProcesoHitoModel.estado,
                 ClienteProcesoHitoModel.fecha_estado,
                 ClienteProcesoHitoModel.fecha_limite,
                 ClienteProcesoHitoModel.hora_limite,
                 ClienteProcesoHitoModel.tipo,
-                ClienteProcesoHitoModel.habilitado,
-                # Información del cliente
-                ClienteModel.idcliente.label('cliente_id'),
-                ClienteModel.razsoc.label('cliente_nombre'),
-                # Información del proceso
-                ClienteProcesoModel.proceso_id,
-                ClienteProcesoModel.fecha_inicio.label('proceso_fecha_inicio'),
-                ClienteProcesoModel.fecha_fin.label('proceso_fecha_fin'),
-                ClienteProcesoModel.mes.label('proceso_mes'),
-                ClienteProcesoModel.anio.label('proceso_anio'),
                 ProcesoModel.nombre.label('proceso_nombre'),
-                proceso_estado_column,
-                # Información del hito maestro
                 HitoModel.nombre.label('hito_nombre'),
                 HitoModel.obligatorio.label('hito_obligatorio'),
                 HitoModel.critico.label('hito_critico'),
-                # Último cumplimiento (si existe)
-                ClienteProcesoHitoCumplimientoModel.id.label('cumplimiento_id'),
-                ClienteProcesoHitoCumplimientoModel.fecha.label('cumplimiento_fecha'),
-                ClienteProcesoHitoCumplimientoModel.hora.label('cumplimiento_hora'),
-                ClienteProcesoHitoCumplimientoModel.observacion.label('cumplimiento_observacion'),
-                 # Usuario: si existe en Persona, concatenar nombre completo, sino usar campo usuario
-                case(
-                    (per.c.Nombre != None,
-                     func.concat(
-                         func.isnull(per.c.Nombre, ''), ' ',
-                         func.isnull(per.c.Apellido1, ''), ' ',
-                         func.isnull(per.c.Apellido2, '')
-                     )),
-                    else_=ClienteProcesoHitoCumplimientoModel.usuario
-                ).label('cumplimiento_usuario'),
-                ClienteProcesoHitoCumplimientoModel.codSubDepar.label('cumplimiento_codSubDepar'),
-                SubdeparModel.nombre.label('cumplimiento_departamento'),
-                ClienteProcesoHitoCumplimientoModel.fecha_creacion.label('cumplimiento_fecha_creacion'),
-                # Número de documentos del último cumplimiento
-                func.count(DocumentoCumplimientoModel.id).label('num_documentos')
+                ultimo_cumplimiento.c.fecha.label('cumplimiento_fecha'),
+                ultimo_cumplimiento.c.hora.label('cumplimiento_hora'),
+                estado_calculado.label('estado_calculado')
             )
             .join(ClienteProcesoModel, ClienteProcesoHitoModel.cliente_proceso_id == ClienteProcesoModel.id)
-            .join(ClienteModel, ClienteProcesoModel.cliente_id == ClienteModel.idcliente)
             .join(ProcesoModel, ClienteProcesoModel.proceso_id == ProcesoModel.id)
             .join(HitoModel, ClienteProcesoHitoModel.hito_id == HitoModel.id)
             .outerjoin(
-                subquery_ultimo_cumplimiento,
-                ClienteProcesoHitoModel.id == subquery_ultimo_cumplimiento.c.cliente_proceso_hito_id
-            )
-            .outerjoin(
-                ClienteProcesoHitoCumplimientoModel,
-                ClienteProcesoHitoCumplimientoModel.id == subquery_ultimo_cumplimiento.c.ultimo_cumplimiento_id
-            )
-            .outerjoin(
-                DocumentoCumplimientoModel,
-                ClienteProcesoHitoCumplimientoModel.id == DocumentoCumplimientoModel.cumplimiento_id
-            )
-            .outerjoin(
-                SubdeparModel,
-                ClienteProcesoHitoCumplimientoModel.codSubDepar == SubdeparModel.codSubDepar
+                ultimo_cumplimiento,
+                (ultimo_cumplimiento.c.cliente_proceso_hito_id == ClienteProcesoHitoModel.id) &
+                (ultimo_cumplimiento.c.rn == 1)
             )
-            .outerjoin(
-                per,
-                per.c.Numeross == ClienteProcesoHitoCumplimientoModel.usuario
+            .filter(
+                ClienteProcesoModel.cliente_id == cliente_id,
+                ClienteProcesoModel.habilitado == True,
+                ClienteProcesoHitoModel.habilitado == True
             )
-            .filter(ClienteProcesoHitoModel.habilitado == True)
-            .filter(ClienteProcesoModel.habilitado == True)
-            .filter(ProcesoModel.habilitado == True)
-            .filter(HitoModel.habilitado == True)
         )
 
-        # Filtro de clientes por usuario (email)
-        # Se replica la logica usada en cliente_repository_sql.py: listar_empresas_usuario
-        # Ajustamos para usarlo como filtro EXISTS o IN
-        subquery_clientes_usuario = text("""
-            SELECT c.idcliente FROM [ATISA_Input].dbo.clientes c
-            JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
-            JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
-            JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6) AND cc.fechafin IS NULL
-            JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
-            WHERE per.email = :email
-        """)
-
-        # Filtramos los clientes que esten en la subconsulta
-        # Ejecutamos la subconsulta primero para obtener los IDs
-        result_clientes = self.session.execute(subquery_clientes_usuario, {"email": email}).fetchall()
-        cliente_ids = [row[0] for row in result_clientes]
-
-        if not cliente_ids:
-            return [], 0
-
-        # Filtramos por la lista de IDs obtenidos
-        query = query.filter(ClienteModel.idcliente.in_(cliente_ids))
-
-        # Resto de agrupacion
-        query = query.group_by(
-                ClienteProcesoHitoModel.id,
-                ClienteProcesoHitoModel.cliente_proceso_id,
-                ClienteProcesoHitoModel.hito_id,
-                ClienteProcesoHitoModel.estado,
-                ClienteProcesoHitoModel.fecha_estado,
-                ClienteProcesoHitoModel.fecha_limite,
-                ClienteProcesoHitoModel.hora_limite,
-                ClienteProcesoHitoModel.tipo,
-                ClienteProcesoHitoModel.habilitado,
-                ClienteModel.idcliente,
-                ClienteModel.razsoc,
-                ClienteProcesoModel.id,
-                ClienteProcesoModel.proceso_id,
-                ClienteProcesoModel.fecha_inicio,
-                ClienteProcesoModel.fecha_fin,
-                ClienteProcesoModel.mes,
-                ClienteProcesoModel.anio,
-                ProcesoModel.nombre,
-                HitoModel.nombre,
-                HitoModel.obligatorio,
-                HitoModel.critico,
-                ClienteProcesoHitoCumplimientoModel.id,
-                ClienteProcesoHitoCumplimientoModel.fecha,
-                ClienteProcesoHitoCumplimientoModel.hora,
-                ClienteProcesoHitoCumplimientoModel.observacion,
-                ClienteProcesoHitoCumplimientoModel.usuario,
-                ClienteProcesoHitoCumplimientoModel.codSubDepar,
-                SubdeparModel.nombre,
-                per.c.Nombre,
-                per.c.Apellido1,
-                per.c.Apellido2,
-                ClienteProcesoHitoCumplimientoModel.fecha_creacion
-            )
+        if filtros.get('hito_id'):
+            query = query.filter(ClienteProcesoHitoModel.hito_id == filtros['hito_id'])
 
+        if filtros.get('proceso_nombre'):
+            query = query.filter(ProcesoModel.nombre.ilike(f"%{filtros['proceso_nombre']}%"))
 
-        # Aplicar filtros adicionales
         if filtros.get('fecha_limite_desde'):
             query = query.filter(ClienteProcesoHitoModel.fecha_limite >= filtros['fecha_limite_desde'])
 
         if filtros.get('fecha_limite_hasta'):
             query = query.filter(ClienteProcesoHitoModel.fecha_limite <= filtros['fecha_limite_hasta'])
 
-        if filtros.get('cliente_id'):
-            query = query.filter(ClienteModel.idcliente == filtros['cliente_id'])
-
-        if filtros.get('proceso_id'):
-            query = query.filter(ClienteProcesoModel.proceso_id == filtros['proceso_id'])
-
-        if filtros.get('hito_id'):
-            query = query.filter(ClienteProcesoHitoModel.hito_id == filtros['hito_id'])
-
-        if filtros.get('proceso_nombre'):
-             query = query.filter(ProcesoModel.nombre.ilike(f"%{filtros['proceso_nombre']}%"))
-
         if filtros.get('tipos'):
             tipos_list = [t.strip() for t in filtros['tipos'].split(",")]
             query = query.filter(ClienteProcesoHitoModel.tipo.in_(tipos_list))
 
+        if filtros.get('estados'):
+            query = query.filter(filtro_estados_calculados(estado_calculado, filtros['estados']))
+
         if filtros.get('search_term'):
             search_pattern = f"%{filtros['search_term']}%"
             query = query.filter(
-                (ProcesoModel.nombre.ilike(search_pattern)) |
-                (HitoModel.nombre.ilike(search_pattern))
+                ProcesoModel.nombre.ilike(search_pattern) |
+                HitoModel.nombre.ilike(search_pattern) |
+                estado_calculado.ilike(search_pattern) |
+                ClienteProcesoHitoModel.tipo.ilike(search_pattern)
             )
 
-        # Ordenar
-        ordenar_por = filtros.get('ordenar_por', 'fecha_limite')
-        orden = filtros.get('orden', 'asc')
-
-        if ordenar_por == "fecha_limite":
-            order_field = ClienteProcesoHitoModel.fecha_limite
-        elif ordenar_por == "cliente_nombre":
-            order_field = ClienteModel.razsoc
-        elif ordenar_por == "proceso_nombre":
-            order_field = ProcesoModel.nombre
-        else:
-            order_field = ClienteProcesoHitoModel.fecha_limite
-
-        if orden and orden.lower() == "desc":
-            query = query.order_by(order_field.desc())
-        else:
-            query = query.order_by(order_field.asc())
-
-        # Obtener Total
-        # Usamos subquery para contar correctamente con GROUP BY
-        total_registros = self.session.query(query.subquery()).count()
-
-        # Paginación
-        if paginacion:
-            if paginacion.get('offset') is not None:
-                query = query.offset(paginacion['offset'])
-            if paginacion.get('limit') is not None:
-                query = query.limit(paginacion['limit'])
-
-        registros = query.all()
-
-        # Obtener departamentos del cliente para este usuario usando la misma lógica que listar_con_departamentos
-        dept_map = {}
-        if registros:
-            ids_clientes = list({str(row.cliente_id) for row in registros})
-            placeholders = ', '.join([f':id{i}' for i in range(len(ids_clientes))])
-            dept_query_str = f"""
-                SELECT c.idcliente, sd.codSubDepar, sd.nombre
-                FROM [ATISA_Input].dbo.clientes c
-                JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
-                JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
-                JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc
-                    ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6)
-                    AND cc.fechafin IS NULL
-                JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
-                WHERE c.idcliente IN ({placeholders})
-                AND per.email = :email
-            """
-            dept_params = {f'id{i}': id_cliente for i, id_cliente in enumerate(ids_clientes)}
-            dept_params['email'] = email
-            dept_results = self.session.execute(text(dept_query_str), dept_params).fetchall()
-            for dr in dept_results:
-                dept_map[str(dr.idcliente)] = {
-                    'codSubDepar': dr.codSubDepar,
-                    'nombre': dr.nombre
-                }
+        # SQL Server no soporta NULLS LAST, usamos CASE para poner NULLs al final
+        query = query.order_by(
+            case((ClienteProcesoHitoModel.fecha_limite.is_(None), 1), else_=0),
+            ClienteProcesoHitoModel.fecha_limite.asc(),
+            case((ClienteProcesoHitoModel.hora_limite.is_(None), 1), else_=0),
+            ClienteProcesoHitoModel.hora_limite.asc()
+        )
 
-        # Enriquecer registros con datos de departamento
-        from collections import namedtuple
-        enriched = []
-        for row in registros:
-            dept_info = dept_map.get(str(row.cliente_id), {})
-            row_dict = row._asdict()
-            row_dict['cliente_departamento_codigo'] = dept_info.get('codSubDepar')
-            row_dict['cliente_departamento_nombre'] = dept_info.get('nombre', '')
-            # Reconstruir como objeto con atributos accesibles
-            RowType = namedtuple('Row', row_dict.keys())
-            enriched.append(RowType(**row_dict))
-
-        return enriched, total_registros
+        return query.yield_per(lote)
@@ -2,6 +2,10 @@ from app.domain.entities.cliente_proceso import ClienteProceso
 from app.domain.repositories.cliente_proceso_repository import ClienteProcesoRepository
 from app.infrastructure.db.models.cliente_proceso_model import ClienteProcesoModel
 from app.infrastructure.mappers.cliente_proceso_mapper import mapear_modelo_a_entidad
+from app.infrastructure.db.compartido.consulta_paginada import columnas_modelo, paginar
+
+# Campos admitidos en sort_field para los listados de procesos de cliente
+COLUMNAS_ORDEN_CLIENTE_PROCESO = columnas_modelo(ClienteProcesoModel)
 
 class ClienteProcesoRepositorySQL(ClienteProcesoRepository):
     def __init__(self, session):
@@ -31,6 +35,15 @@ class ClienteProcesoRepositorySQL(ClienteProcesoRepository):
     def listar_por_cliente(self, cliente_id: str):
         return self.session.query(ClienteProcesoModel).filter_by(cliente_id=cliente_id).all()
 
+    def listar_paginado(self, paginacion, cliente_id: str = None, solo_habilitados: bool = False):
+        """(total, página) de procesos de cliente, opcionalmente de un cliente y/o solo habilitados"""
+        query = self.session.query(ClienteProcesoModel)
+        if cliente_id is not None:
+            query = query.filter(ClienteProcesoModel.cliente_id == cliente_id)
+        if solo_habilitados:
+            query = query.filter(ClienteProcesoModel.habilitado == True)
+        return paginar(query, COLUMNAS_ORDEN_CLIENTE_PROCESO, paginacion, ClienteProcesoModel.id)
+
     def listar_habilitados(self):
         """Lista solo los procesos de cliente habilitados (habilitado=True)"""
         return self.session.query(ClienteProcesoModel).filter_by(habilitado=True).all()
@@ -1,11 +1,30 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import Integer, cast, exists, func, text, try_cast
 from app.domain.repositories.cliente_repository import ClienteRepository
 from app.domain.entities.cliente import Cliente
 from app.infrastructure.db.models.cliente_model import ClienteModel
 from app.infrastructure.db.models.cliente_proceso_model import ClienteProcesoModel
 from app.infrastructure.db.models.cliente_proceso_hito_model import ClienteProcesoHitoModel
+from app.infrastructure.db.models.config_avisos_calendarios_model import ConfigAvisoCalendarioModel
+from app.infrastructure.db.compartido.tabla_valores import tabla_valores
+from app.infrastructure.db.compartido.consulta_paginada import Paginacion, columnas_modelo, paginar
+from app.infrastructure.services.buscador_clientes import buscador_clientes
+from app.infrastructure.services.cliente_departamento_index import indice_cliente_departamento
+
+# Campos admitidos en sort_field para los listados de clientes
+COLUMNAS_ORDEN_CLIENTE = columnas_modelo(ClienteModel)
+
+
+def columnas_orden_cliente(dialecto: str) -> dict:
+    """
+    COLUMNAS_ORDEN_CLIENTE con idcliente ordenado como número (los que no lo son, como 0), igual
+    que la ordenación en Python que sustituye: "9" va antes que "10". En SQL Server TRY_CAST
+    devuelve NULL para los no numéricos; en SQLite CAST ya devuelve 0.
+    """
+    conversion = try_cast if dialecto == "mssql" else cast
+    return {**COLUMNAS_ORDEN_CLIENTE, "idcliente": func.coalesce(conversion(ClienteModel.idcliente, Integer), 0)}
+
 
 class ClienteRepositorySQL(ClienteRepository):
     def __init__(self, session: Session):
@@ -15,12 +34,38 @@ class ClienteRepositorySQL(ClienteRepository):
         registros = self.session.query(ClienteModel).all()
         return [self._mapear_modelo_a_entidad(r) for r in registros]
 
+    def listar_paginado(self, paginacion: Paginacion, hito_id: Optional[int] = None) -> Tuple[int, List[Cliente]]:
+        """
+        Página de clientes ordenada en SQL. Con hito_id solo se incluyen los clientes que tienen
+        ese hito en su calendario (EXISTS en lugar de JOIN + DISTINCT).
+        """
+        query = self.session.query(ClienteModel)
+        if hito_id is not None:
+            query = query.filter(
+                exists().where(
+                    ClienteProcesoModel.cliente_id == ClienteModel.idcliente,
+                    ClienteProcesoHitoModel.cliente_proceso_id == ClienteProcesoModel.id,
+                    ClienteProcesoHitoModel.hito_id == hito_id
+                )
+            )
+        columnas = columnas_orden_cliente(self.session.get_bind().dialect.name)
+        total, registros = paginar(query, columnas, paginacion, ClienteModel.idcliente)
+        return total, [self._mapear_modelo_a_entidad(r) for r in registros]
+
     def buscar_por_nombre(self, nombre: str) -> List[Cliente]:
         registros = self.session.query(ClienteModel).filter(
             ClienteModel.razsoc.ilike(f"%{nombre}%")
         ).all()
         return [self._mapear_modelo_a_entidad(r) for r in registros]
 
+    def autocompletar(self, texto: str, limite: int = 10) -> List[dict]:
+        """
+        Se resuelve entero sobre el índice en memoria, sin consultar la base de datos. Solo lo usa
+        el autocompletado: el índice se recarga cada BUSCADOR_CLIENTES_TTL_SEGUNDOS y puede no
+        tener aún las altas recientes, así que las búsquedas de los listados siguen en SQL.
+        """
+        return buscador_clientes.buscar(self.session, texto, limite)
+
     def buscar_por_cif(self, cif: str) -> Optional[Cliente]:
         registro = self.session.query(ClienteModel).filter_by(cif=cif).first()
         return self._mapear_modelo_a_entidad(registro) if registro else None
@@ -85,7 +130,8 @@ class ClienteRepositorySQL(ClienteRepository):
             SELECT c.* FROM [ATISA_Input].dbo.clientes c
             JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
             JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
-            JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6) AND cc.fechafin IS NULL
+            JOIN ceco_subdepar csm ON csm.codSubDepar = sd.codSubDepar AND csm.por_codigo = 1
+            JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc ON cc.CODIDEPAR = csm.codidepar AND cc.fechafin IS NULL
             JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
             WHERE per.email = :email
         """)
@@ -103,8 +149,9 @@ class ClienteRepositorySQL(ClienteRepository):
                 SELECT 1
                 FROM [ATISA_Input].dbo.clienteSubDepar csd
                 JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
+                JOIN ceco_subdepar csm ON csm.codSubDepar = sd.codSubDepar AND csm.por_codigo = 1
                 JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc
-                    ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6)
+                    ON cc.CODIDEPAR = csm.codidepar
                     AND cc.fechafin IS NULL
                 JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
                 WHERE csd.cif = c.CIF
@@ -142,93 +189,60 @@ class ClienteRepositorySQL(ClienteRepository):
         registros = self.session.query(ClienteModel).from_statement(data_query).params(**params).all()
         clientes = [self._mapear_modelo_a_entidad(r) for r in registros]
 
-        # Si hay clientes, obtenemos sus departamentos
+        # Si hay clientes, obtenemos sus departamentos del índice en memoria cliente -> departamentos
         if clientes:
             ids_clientes = [c.idcliente for c in clientes]
+            departamentos_por_cliente = indice_cliente_departamento.mapa_departamentos(self.session, ids_clientes)
+            # Mismo criterio que el EXISTS del listado: solo subdepartamentos con empleados en activo
+            con_empleados = indice_cliente_departamento.subdepar_con_empleados(self.session)
 
-            # Construir query para departamentos con placeholders dinámicos para IN clause
-            # SQL Server con pyodbc no soporta binding de tuplas directamente
-            placeholders = ', '.join([f':id{i}' for i in range(len(ids_clientes))])
-            dept_query_str = f"""
-                SELECT c.idcliente, sd.codSubDepar, sd.nombre,
-                       cac.id as config_id,
-                       CAST(cac.aviso_vence_hoy AS INT) as aviso_vence_hoy,
-                       cac.temporicidad_vence_hoy,
-                       cac.tiempo_vence_hoy,
-                       cac.hora_vence_hoy,
-                       CAST(cac.aviso_proximo_vencimiento AS INT) as aviso_proximo_vencimiento,
-                       cac.temporicidad_proximo_vencimiento,
-                       cac.tiempo_proximo_vencimiento,
-                       cac.hora_proximo_vencimiento,
-                       cac.dias_proximo_vencimiento,
-                       CAST(cac.aviso_vencido AS INT) as aviso_vencido,
-                       cac.temporicidad_vencido,
-                       cac.tiempo_vencido,
-                       cac.hora_vencido,
-                       CAST(cac.config_global AS INT) as config_global,
-                       cac.temporicidad_global,
-                       cac.tiempo_global,
-                       cac.hora_global
-                FROM [ATISA_Input].dbo.clientes c
-                JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
-                JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
-                JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc
-                    ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6)
-                    AND cc.fechafin IS NULL
-                JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
-                LEFT JOIN config_avisos_calendarios cac
-                    ON cac.cliente_id COLLATE DATABASE_DEFAULT = c.idcliente COLLATE DATABASE_DEFAULT
-                    AND cac.codSubDepar COLLATE DATABASE_DEFAULT = sd.codSubDepar COLLATE DATABASE_DEFAULT
-                WHERE c.idcliente IN ({placeholders})
-                GROUP BY c.idcliente, sd.codSubDepar, sd.nombre,
-                         cac.id, cac.aviso_vence_hoy, cac.temporicidad_vence_hoy, cac.tiempo_vence_hoy, cac.hora_vence_hoy,
-                         cac.aviso_proximo_vencimiento, cac.temporicidad_proximo_vencimiento, cac.tiempo_proximo_vencimiento, cac.hora_proximo_vencimiento, cac.dias_proximo_vencimiento,
-                         cac.aviso_vencido, cac.temporicidad_vencido, cac.tiempo_vencido, cac.hora_vencido,
-                         cac.config_global, cac.temporicidad_global, cac.tiempo_global, cac.hora_global
-            """
-
-            dept_query = text(dept_query_str)
-
-            # Crear diccionario de parámetros con id0, id1, id2, etc.
-            dept_params = {f'id{i}': id_cliente for i, id_cliente in enumerate(ids_clientes)}
-
-            dept_results = self.session.execute(dept_query, dept_params).fetchall()
+            # Configuración de avisos de los clientes de la página (lista pasada como tabla de valores)
+            ids_pagina = tabla_valores(self.session, "clientes_pagina", "id_cliente", ids_clientes, "VARCHAR(9)")
+            configuraciones = {
+                (str(cfg.cliente_id).strip(), str(cfg.codSubDepar).strip()): cfg
+                for cfg in self.session.query(ConfigAvisoCalendarioModel)
+                .join(ids_pagina, ids_pagina.c.id_cliente == ConfigAvisoCalendarioModel.cliente_id)
+            }
 
             # Map departments to clients
             dept_map = {}
-            for row in dept_results:
-                if row.idcliente not in dept_map:
-                    dept_map[row.idcliente] = []
-
-                dept_data = {
-                    "codSubDepar": row.codSubDepar,
-                    "nombre": row.nombre,
-                    "configuracion": None
-                }
-
-                if row.config_id is not None:
-                    dept_data["configuracion"] = {
-                        "id": row.config_id,
-                        "aviso_vence_hoy": bool(row.aviso_vence_hoy),
-                        "temporicidad_vence_hoy": row.temporicidad_vence_hoy,
-                        "tiempo_vence_hoy": row.tiempo_vence_hoy,
-                        "hora_vence_hoy": str(row.hora_vence_hoy) if row.hora_vence_hoy else None,
-                        "aviso_proximo_vencimiento": bool(row.aviso_proximo_vencimiento),
-                        "temporicidad_proximo_vencimiento": row.temporicidad_proximo_vencimiento,
-                        "tiempo_proximo_vencimiento": row.tiempo_proximo_vencimiento,
-                        "hora_proximo_vencimiento": str(row.hora_proximo_vencimiento) if row.hora_proximo_vencimiento else None,
-                        "dias_proximo_vencimiento": row.dias_proximo_vencimiento,
-                        "aviso_vencido": bool(row.aviso_vencido),
-                        "temporicidad_vencido": row.temporicidad_vencido,
-                        "tiempo_vencido": row.tiempo_vencido,
-                        "hora_vencido": str(row.hora_vencido) if row.hora_vencido else None,
-                        "config_global": bool(row.config_global) if row.config_global is not None else None,
-                        "temporicidad_global": row.temporicidad_global,
-                        "tiempo_global": row.tiempo_global,
-                        "hora_global": str(row.hora_global) if row.hora_global else None
+            for id_cliente, departamentos in departamentos_por_cliente.items():
+                dept_map[id_cliente] = []
+                for departamento in departamentos:
+                    cod = str(departamento.codSubDepar).strip()
+                    if cod not in con_empleados:
+                        continue
+
+                    dept_data = {
+                        "codSubDepar": departamento.codSubDepar,
+                        "nombre": departamento.nombre,
+                        "configuracion": None
                     }
 
-                dept_map[row.idcliente].append(dept_data)
+                    cfg = configuraciones.get((str(id_cliente).strip(), cod))
+                    if cfg is not None:
+                        dept_data["configuracion"] = {
+                            "id": cfg.id,
+                            "aviso_vence_hoy": bool(cfg.aviso_vence_hoy),
+                            "temporicidad_vence_hoy": cfg.temporicidad_vence_hoy,
+                            "tiempo_vence_hoy": cfg.tiempo_vence_hoy,
+                            "hora_vence_hoy": str(cfg.hora_vence_hoy) if cfg.hora_vence_hoy else None,
+                            "aviso_proximo_vencimiento": bool(cfg.aviso_proximo_vencimiento),
+                            "temporicidad_proximo_vencimiento": cfg.temporicidad_proximo_vencimiento,
+                            "tiempo_proximo_vencimiento": cfg.tiempo_proximo_vencimiento,
+                            "hora_proximo_vencimiento": str(cfg.hora_proximo_vencimiento) if cfg.hora_proximo_vencimiento else None,
+                            "dias_proximo_vencimiento": cfg.dias_proximo_vencimiento,
+                            "aviso_vencido": bool(cfg.aviso_vencido),
+                            "temporicidad_vencido": cfg.temporicidad_vencido,
+                            "tiempo_vencido": cfg.tiempo_vencido,
+                            "hora_vencido": str(cfg.hora_vencido) if cfg.hora_vencido else None,
+                            "config_global": bool(cfg.config_global) if cfg.config_global is not None else None,
+                            "temporicidad_global": cfg.temporicidad_global,
+                            "tiempo_global": cfg.tiempo_global,
+                            "hora_global": str(cfg.hora_global) if cfg.hora_global else None
+                        }
+
+                    dept_map[id_cliente].append(dept_data)
 
             # Attach to client dicts
             results = []
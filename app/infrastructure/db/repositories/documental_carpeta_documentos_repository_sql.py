@@ -7,6 +7,7 @@ from app.infrastructure.db.models.documental_carpeta_documentos_model import Doc
 from app.infrastructure.db.models.documental_carpeta_cliente_model import DocumentalCarpetaClienteModel
 from app.infrastructure.db.models.cliente_model import ClienteModel
 from sqlalchemy import text
+from app.infrastructure.services.directorio_personas import directorio_personas
 
 class DocumentalCarpetaDocumentosRepositorySQL(DocumentalCarpetaDocumentosRepository):
     def __init__(self, db: Session):
@@ -33,16 +34,25 @@ class DocumentalCarpetaDocumentosRepositorySQL(DocumentalCarpetaDocumentosReposi
         order_col = sort_mapping.get(sort_field, "d.fecha_creacion")
         direction = "DESC" if sort_direction and sort_direction.lower() == "desc" else "ASC"
 
-        query_str = f"""
-            SELECT d.id, d.carpeta_id, d.nombre_documento, d.original_file_name, d.stored_file_name,
-                   CASE
+        # El nombre del autor se resuelve con el directorio de personas tras la consulta. Solo
+        # ordenar por autor necesita el nombre en SQL, y solo entonces se une Persona.
+        ordenar_por_autor = order_col == "autor"
+        autor_sql = "d.autor"
+        join_persona = ""
+        if ordenar_por_autor:
+            autor_sql = """CASE
                        WHEN p.Nombre IS NOT NULL THEN ISNULL(p.Nombre, '') + ' ' + ISNULL(p.Apellido1, '') + ' ' + ISNULL(p.Apellido2, '')
                        ELSE d.autor
-                   END as autor,
+                   END"""
+            join_persona = "LEFT JOIN [BI DW RRHH DEV].dbo.Persona p ON p.Numeross = d.autor"
+
+        query_str = f"""
+            SELECT d.id, d.carpeta_id, d.nombre_documento, d.original_file_name, d.stored_file_name,
+                   d.autor AS autor_numeross, {autor_sql} as autor,
                    d.codSubDepar, sd.nombre as departamento,
                    d.eliminado, d.fecha_creacion, d.fecha_actualizacion
             FROM documental_carpeta_documentos d
-            LEFT JOIN [BI DW RRHH DEV].dbo.Persona p ON p.Numeross = d.autor
+            {join_persona}
             LEFT JOIN subdepar sd ON sd.codSubDePar = d.codSubDepar
             WHERE d.carpeta_id = :carpeta_id AND d.eliminado = 0
             ORDER BY {order_col} {direction}
@@ -51,6 +61,7 @@ class DocumentalCarpetaDocumentosRepositorySQL(DocumentalCarpetaDocumentosReposi
 
         query = text(query_str)
         results = self.db.execute(query, {"carpeta_id": carpeta_id, "skip": skip, "limit": limit}).fetchall()
+        nombres = {} if ordenar_por_autor else directorio_personas.nombres(self.db, (row.autor_numeross for row in results))
 
         documents = []
         for row in results:
@@ -60,7 +71,7 @@ class DocumentalCarpetaDocumentosRepositorySQL(DocumentalCarpetaDocumentosReposi
                 nombre_documento=row.nombre_documento,
                 original_file_name=row.original_file_name,
                 stored_file_name=row.stored_file_name,
-                autor=row.autor,
+                autor=nombres.get(row.autor_numeross, row.autor),
                 codSubDepar=row.codSubDepar,
                 departamento=row.departamento,
                 eliminado=row.eliminado,
@@ -0,0 +1,76 @@
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.domain.repositories.empleado_cliente_repository import EmpleadoClienteRepository
+from app.infrastructure.db.models.empleado_cliente_model import EmpleadoClienteModel
+from app.infrastructure.db.compartido.mis_clientes_cte import SNAPSHOT_EMPLEADO_CLIENTE_SQL
+
+# Tamaño de los lotes de INSERT/DELETE al aplicar las diferencias
+TAMANO_LOTE_REFRESCO = 500
+
+class EmpleadoClienteRepositorySQL(EmpleadoClienteRepository):
+    def __init__(self, session):
+        self.session = session
+
+    def listar_clientes(self, email: str) -> list[str]:
+        filas = (
+            self.session.query(EmpleadoClienteModel.id_cliente)
+            .filter(EmpleadoClienteModel.email == email.strip().lower())
+            .all()
+        )
+        return [fila.id_cliente for fila in filas]
+
+    def listar_todos(self) -> dict:
+        asignaciones = defaultdict(set)
+        for fila in self.session.query(EmpleadoClienteModel.email, EmpleadoClienteModel.id_cliente).yield_per(5000):
+            asignaciones[fila.email].add(fila.id_cliente)
+        return dict(asignaciones)
+
+    def _snapshot_origen(self) -> set:
+        """Asignaciones (email, id_cliente) calculadas sobre las tablas de origen."""
+        filas = self.session.execute(text(SNAPSHOT_EMPLEADO_CLIENTE_SQL)).fetchall()
+        return {
+            (fila.email.strip(), str(fila.id_cliente).strip())
+            for fila in filas
+            if fila.email and fila.id_cliente is not None
+        }
+
+    def _snapshot_actual(self) -> set:
+        filas = self.session.query(EmpleadoClienteModel.email, EmpleadoClienteModel.id_cliente).all()
+        return {(fila.email, fila.id_cliente) for fila in filas}
+
+    def refrescar(self) -> dict:
+        nuevo = self._snapshot_origen()
+        actual = self._snapshot_actual()
+
+        altas = sorted(nuevo - actual)
+        bajas = sorted(actual - nuevo)
+
+        try:
+            # SQL Server no admite IN sobre tuplas: las bajas se agrupan por email
+            bajas_por_email = defaultdict(list)
+            for email, id_cliente in bajas:
+                bajas_por_email[email].append(id_cliente)
+            for email, ids_cliente in bajas_por_email.items():
+                for inicio in range(0, len(ids_cliente), TAMANO_LOTE_REFRESCO):
+                    self.session.query(EmpleadoClienteModel).filter(
+                        EmpleadoClienteModel.email == email,
+                        EmpleadoClienteModel.id_cliente.in_(ids_cliente[inicio:inicio + TAMANO_LOTE_REFRESCO])
+                    ).delete(synchronize_session=False)
+
+            ahora = datetime.now()
+            for inicio in range(0, len(altas), TAMANO_LOTE_REFRESCO):
+                lote = altas[inicio:inicio + TAMANO_LOTE_REFRESCO]
+                self.session.bulk_insert_mappings(EmpleadoClienteModel, [
+                    {"email": email, "id_cliente": id_cliente, "fecha_alta": ahora}
+                    for email, id_cliente in lote
+                ])
+
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        return {"altas": len(altas), "bajas": len(bajas), "total": len(nuevo)}
@@ -3,8 +3,13 @@ from app.domain.entities.hito import Hito
 from app.infrastructure.db.models import HitoModel
 from sqlalchemy import text
 from collections import OrderedDict
-from app.infrastructure.db.compartido.mis_clientes_cte import MIS_CLIENTES_CTE
 from app.infrastructure.db.compartido.mis_clientes_cte import construir_sql_hitos_cliente_por_empleado
+from app.infrastructure.db.compartido.tabla_valores import valores_json
+from app.infrastructure.db.compartido.consulta_paginada import columnas_modelo, paginar
+from app.infrastructure.services.asignaciones_empleado_cache import cache_asignaciones
+
+# Campos admitidos en sort_field para el listado de hitos
+COLUMNAS_ORDEN_HITO = columnas_modelo(HitoModel)
 
 class HitoRepositorySQL(HitoRepository):
     def __init__(self, session):
@@ -20,6 +25,10 @@ class HitoRepositorySQL(HitoRepository):
     def listar(self):
         return self.session.query(HitoModel).all()
 
+    def listar_paginado(self, paginacion):
+        """(total, página de hitos) ordenada y paginada en SQL"""
+        return paginar(self.session.query(HitoModel), COLUMNAS_ORDEN_HITO, paginacion, HitoModel.id)
+
     def listar_habilitados(self):
         """Lista solo los hitos habilitados (habilitado=True)"""
         return self.session.query(HitoModel).filter_by(habilitado=True).all()
@@ -46,19 +55,22 @@ class HitoRepositorySQL(HitoRepository):
         return True
 
     def listar_hitos_cliente_por_empleado(self, email, fecha_inicio=None, fecha_fin=None, mes=None, anio=None):
-        sql = construir_sql_hitos_cliente_por_empleado(
+        clientes_empleado = cache_asignaciones.clientes(email, self.session)
+        if not clientes_empleado:
+            return []
+
+        sql, params = construir_sql_hitos_cliente_por_empleado(
             filtrar_fecha=bool(fecha_inicio and fecha_fin),
-            filtrar_mes=bool(mes),
-            filtrar_anio=bool(anio)
+            mes=mes or None,
+            anio=anio or None,
+            dialecto=self.session.get_bind().dialect.name
         )
 
-        params = {
-            "email": email,
+        params.update({
+            "clientes": valores_json(clientes_empleado),
             "fecha_inicio": fecha_inicio,
-            "fecha_fin": fecha_fin,
-            "mes": mes,
-            "anio": anio
-        }
+            "fecha_fin": fecha_fin
+        })
 
         result = self.session.execute(text(sql), params)
         rows = result.mappings().all()
@@ -1,10 +1,25 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.domain.repositories.persona_repository import PersonaRepository
 from app.domain.entities.persona import Persona
+from app.infrastructure.db.compartido.consulta_paginada import Paginacion, validar_campo_orden
+from app.infrastructure.services.directorio_personas import PersonaDirectorio, directorio_personas
+
+# Campos admitidos en sort_field -> atributo del directorio de personas
+COLUMNAS_ORDEN_PERSONA = {
+    "NIF": "nif",
+    "Nombre": "nombre",
+    "Apellido1": "apellido1",
+    "Apellido2": "apellido2",
+    "email": "email",
+}
 
 class PersonaRepositorySQL(PersonaRepository):
+    """
+    Personas en activo servidas desde el directorio en memoria. Las búsquedas por email/NIF
+    consultan la tabla solo si la persona no está en el directorio (altas posteriores a la carga).
+    """
     def __init__(self, session: Session):
         self.session = session
 
@@ -17,17 +32,42 @@ class PersonaRepositorySQL(PersonaRepository):
             email=row.email
         )
 
+    def _desde_directorio(self, persona: PersonaDirectorio) -> Persona:
+        return Persona(
+            NIF=persona.nif,
+            Nombre=persona.nombre,
+            Apellido1=persona.apellido1,
+            Apellido2=persona.apellido2,
+            email=persona.email
+        )
+
     def listar(self) -> List[Persona]:
-        query = text("SELECT NIF, Nombre, Apellido1, Apellido2, email FROM [BI DW RRHH DEV].dbo.Persona WHERE fechabaja IS NULL")
-        result = self.session.execute(query).fetchall()
-        return [self._mapear_a_entidad(row) for row in result]
+        return [self._desde_directorio(p) for p in directorio_personas.activas(self.session)]
+
+    def listar_paginado(self, paginacion: Paginacion) -> Tuple[int, List[Persona]]:
+        """(total, página de personas activas) ordenada sobre el directorio en memoria."""
+        campo = COLUMNAS_ORDEN_PERSONA.get(validar_campo_orden(COLUMNAS_ORDEN_PERSONA, paginacion.sort_field), "nif")
+        personas = sorted(
+            directorio_personas.activas(self.session),
+            key=lambda p: ((getattr(p, campo) or "").lower(), p.nif or ""),
+            reverse=paginacion.descendente
+        )
+        if paginacion.paginada:
+            personas = personas[paginacion.offset:paginacion.offset + paginacion.limit]
+        return len(directorio_personas.activas(self.session)), [self._desde_directorio(p) for p in personas]
 
     def buscar_por_email(self, email: str) -> Optional[Persona]:
+        persona = directorio_personas.por_email(self.session, email)
+        if persona:
+            return self._desde_directorio(persona)
         query = text("SELECT NIF, Nombre, Apellido1, Apellido2, email FROM [BI DW RRHH DEV].dbo.Persona WHERE email = :email AND fechabaja IS NULL")
         result = self.session.execute(query, {"email": email}).fetchone()
         return self._mapear_a_entidad(result) if result else None
 
     def buscar_por_nif(self, nif: str) -> Optional[Persona]:
+        persona = directorio_personas.por_nif(self.session, nif)
+        if persona:
+            return self._desde_directorio(persona)
         query = text("SELECT NIF, Nombre, Apellido1, Apellido2, email FROM [BI DW RRHH DEV].dbo.Persona WHERE NIF = :nif AND fechabaja IS NULL")
         result = self.session.execute(query, {"nif": nif}).fetchone()
         return self._mapear_a_entidad(result) if result else None
@@ -3,8 +3,9 @@ from app.domain.entities.proceso import Proceso
 from sqlalchemy import text
 from collections import OrderedDict
 from app.infrastructure.db.models import ProcesoModel
-from app.infrastructure.db.compartido.mis_clientes_cte import MIS_CLIENTES_CTE
 from app.infrastructure.db.compartido.mis_clientes_cte import construir_sql_procesos_cliente_por_empleado
+from app.infrastructure.db.compartido.tabla_valores import valores_json
+from app.infrastructure.services.asignaciones_empleado_cache import cache_asignaciones
 
 
 class ProcesoRepositorySQL(ProcesoRepository):
@@ -49,17 +50,18 @@ class ProcesoRepositorySQL(ProcesoRepository):
         return True
 
     def listar_procesos_cliente_por_empleado(self, email: str, mes=None, anio=None):
-        sql = construir_sql_procesos_cliente_por_empleado(
+        clientes_empleado = cache_asignaciones.clientes(email, self.session)
+        if not clientes_empleado:
+            return []
+
+        sql, params = construir_sql_procesos_cliente_por_empleado(
             filtrar_fecha=False,
-            filtrar_mes=bool(mes),
-            filtrar_anio=bool(anio)
+            mes=mes or None,
+            anio=anio or None,
+            dialecto=self.session.get_bind().dialect.name
         )
 
-        params = {
-            "email": email,
-            "mes": mes,
-            "anio": anio
-        }
+        params["clientes"] = valores_json(clientes_empleado)
 
         result = self.session.execute(text(sql), params)
         rows = result.mappings().all()
@@ -1,9 +1,24 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, or_, select, text
 from app.domain.repositories.subdepar_repository import SubdeparRepository
 from app.domain.entities.subdepar import Subdepar
 from app.infrastructure.db.models.subdepar_model import SubdeparModel
+from app.infrastructure.db.compartido.consulta_paginada import Paginacion, paginar
+from app.infrastructure.db.compartido.tabla_valores import tabla_valores
+
+# Campos admitidos en sort_field para el listado agrupado por codSubDepar. Los campos de detalle
+# se ordenan por su valor mínimo dentro del grupo.
+COLUMNAS_ORDEN_GRUPO_SUBDEPAR = {
+    "codSubDepar": SubdeparModel.codSubDepar,
+    "nombre": func.min(SubdeparModel.nombre),
+    "cantidad": func.count(SubdeparModel.id),
+    "id": func.min(SubdeparModel.id),
+    "codidepar": func.min(SubdeparModel.codidepar),
+    "ceco": func.min(SubdeparModel.ceco),
+    "fechaini": func.min(SubdeparModel.fechaini),
+    "fechafin": func.min(SubdeparModel.fechafin),
+}
 
 class SubdeparRepositorySQL(SubdeparRepository):
     def __init__(self, session: Session):
@@ -13,6 +28,44 @@ class SubdeparRepositorySQL(SubdeparRepository):
         registros = self.session.query(SubdeparModel).all()
         return [self._mapear_modelo_a_entidad(r) for r in registros]
 
+    def listar_agrupado_paginado(self, paginacion: Paginacion) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        (total de grupos, página de grupos) agrupando por codSubDepar en SQL. Solo se cargan los
+        subdepartamentos de los grupos de la página.
+        """
+        grupos_query = self.session.query(
+            SubdeparModel.codSubDepar,
+            COLUMNAS_ORDEN_GRUPO_SUBDEPAR["nombre"].label("nombre"),
+            COLUMNAS_ORDEN_GRUPO_SUBDEPAR["cantidad"].label("cantidad"),
+        ).group_by(SubdeparModel.codSubDepar)
+        total, grupos = paginar(grupos_query, COLUMNAS_ORDEN_GRUPO_SUBDEPAR, paginacion, SubdeparModel.codSubDepar)
+        if not grupos:
+            return total, []
+
+        items_query = self.session.query(SubdeparModel)
+        if paginacion.paginada:
+            codigos = [grupo.codSubDepar for grupo in grupos if grupo.codSubDepar is not None]
+            pagina = tabla_valores(self.session, "subdepar_pagina", "codSubDepar", codigos, "VARCHAR(6)")
+            filtro = SubdeparModel.codSubDepar.in_(select(pagina.c.codSubDepar))
+            if len(codigos) < len(grupos):
+                # El grupo de los registros sin codSubDepar no puede viajar en la tabla de valores
+                filtro = or_(filtro, SubdeparModel.codSubDepar.is_(None))
+            items_query = items_query.filter(filtro)
+
+        items = {}
+        for registro in items_query.order_by(SubdeparModel.id).all():
+            items.setdefault(registro.codSubDepar, []).append(self._mapear_modelo_a_entidad(registro))
+
+        return total, [
+            {
+                "codSubDepar": grupo.codSubDepar,
+                "nombre": grupo.nombre,
+                "cantidad": grupo.cantidad,
+                "items": items.get(grupo.codSubDepar, []),
+            }
+            for grupo in grupos
+        ]
+
     def obtener_por_id(self, id: int) -> Optional[Subdepar]:
         registro = self.session.query(SubdeparModel).filter_by(id=id).first()
         return self._mapear_modelo_a_entidad(registro) if registro else None
@@ -23,8 +76,9 @@ class SubdeparRepositorySQL(SubdeparRepository):
             FROM [ATISA_Input].dbo.clientes c
             JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
             JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
+            JOIN ceco_subdepar csm ON csm.codSubDepar = sd.codSubDepar AND csm.por_codigo = 1
             JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc
-                ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6)
+                ON cc.CODIDEPAR = csm.codidepar
                 AND cc.fechafin IS NULL
             JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
             WHERE c.idcliente = :id_cliente
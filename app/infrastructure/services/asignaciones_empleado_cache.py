@@ -0,0 +1,168 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.infrastructure.db.database import SessionLocal
+from app.infrastructure.db.repositories.ceco_subdepar_repository_sql import CecoSubdeparRepositorySQL
+from app.infrastructure.db.repositories.empleado_cliente_repository_sql import EmpleadoClienteRepositorySQL
+from app.infrastructure.services.empleado_subdepar_provider import EmpleadoSubDeparProvider
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AsignacionesEmpleado:
+    clientes: frozenset
+    subdepartamentos: tuple
+    clientes_departamento: frozenset
+    cargado_en: float
+
+
+class CacheAsignacionesEmpleado:
+    """
+    Caché en proceso email -> (clientes, codSubDepar, clientes del departamento) para las
+    peticiones por usuario. clientes son los de empleado_cliente (MIS_CLIENTES); clientes del
+    departamento, los de la regla por_codigo de ceco_subdepar que usa el reporte de status.
+
+    - Las entradas caducan a los ttl_segundos (0 desactiva la caché).
+    - Carga single-flight: si varias peticiones del mismo email llegan con la entrada vacía,
+      solo una consulta la base de datos y el resto espera su resultado.
+    - invalidar() descarta una entrada o todas; una carga en curso iniciada antes de la
+      invalidación no llega a guardarse.
+    El job de refresco de empleado_cliente corre en otro proceso, así que sus cambios se ven
+    al caducar el TTL o tras invalidar desde el endpoint de administración, que propaga la
+    invalidación a los demás workers por el broker de eventos (invalidacion_caches).
+    """
+
+    def __init__(self, ttl_segundos: int):
+        self.ttl_segundos = ttl_segundos
+        self._entradas: dict[str, AsignacionesEmpleado] = {}
+        self._cargas: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def _clave(email: str) -> str:
+        return email.strip().lower()
+
+    def _vigente(self, entrada: Optional[AsignacionesEmpleado]) -> bool:
+        return entrada is not None and time.monotonic() - entrada.cargado_en < self.ttl_segundos
+
+    def _cargar(self, email: str, session: Session) -> AsignacionesEmpleado:
+        clientes = EmpleadoClienteRepositorySQL(session).listar_clientes(email)
+        subdepars = EmpleadoSubDeparProvider(session).obtener_subdepar_por_email(email)
+        clientes_departamento = CecoSubdeparRepositorySQL(session).listar_clientes_departamento(email)
+        return AsignacionesEmpleado(
+            frozenset(clientes), tuple(subdepars), frozenset(clientes_departamento), time.monotonic()
+        )
+
+    def obtener(self, email: str, session: Session) -> AsignacionesEmpleado:
+        clave = self._clave(email)
+        if self.ttl_segundos <= 0:
+            return self._cargar(clave, session)
+
+        entrada = self._entradas.get(clave)
+        if self._vigente(entrada):
+            self.aciertos += 1
+            return entrada
+
+        with self._lock:
+            carga = self._cargas.setdefault(clave, threading.Lock())
+            generacion = self._generacion
+
+        with carga:
+            # Otra petición pudo completar la carga mientras esperábamos
+            entrada = self._entradas.get(clave)
+            if self._vigente(entrada):
+                self.aciertos += 1
+                return entrada
+
+            self.fallos += 1
+            entrada = self._cargar(clave, session)
+            with self._lock:
+                if generacion == self._generacion:
+                    self._entradas[clave] = entrada
+                self._cargas.pop(clave, None)
+        return entrada
+
+    def clientes(self, email: str, session: Session) -> frozenset:
+        return self.obtener(email, session).clientes
+
+    def subdepartamentos(self, email: str, session: Session) -> list[str]:
+        return list(self.obtener(email, session).subdepartamentos)
+
+    def clientes_departamento(self, email: str, session: Session) -> frozenset:
+        return self.obtener(email, session).clientes_departamento
+
+    def invalidar(self, email: Optional[str] = None) -> int:
+        """Descarta la entrada del email (o todas sin email). Devuelve cuántas se eliminaron."""
+        with self._lock:
+            self._generacion += 1
+            if email is None:
+                eliminadas = len(self._entradas)
+                self._entradas.clear()
+                return eliminadas
+            return 1 if self._entradas.pop(self._clave(email), None) else 0
+
+    def precargar(self, session: Session) -> int:
+        """Carga todas las asignaciones con tres consultas masivas (arranque o tras un refresco)."""
+        if self.ttl_segundos <= 0:
+            return 0
+
+        with self._lock:
+            generacion = self._generacion
+
+        clientes = EmpleadoClienteRepositorySQL(session).listar_todos()
+        subdepars = EmpleadoSubDeparProvider(session).obtener_subdepar_todos()
+        departamento = CecoSubdeparRepositorySQL(session).listar_clientes_departamento_todos()
+        ahora = time.monotonic()
+        entradas = {
+            email: AsignacionesEmpleado(
+                frozenset(clientes.get(email, ())), tuple(subdepars.get(email, ())),
+                frozenset(departamento.get(email, ())), ahora
+            )
+            for email in set(clientes) | set(subdepars) | set(departamento)
+        }
+
+        with self._lock:
+            if generacion != self._generacion:
+                return 0
+            self._entradas.update(entradas)
+        return len(entradas)
+
+    def estadisticas(self) -> dict:
+        return {
+            "entradas": len(self._entradas),
+            "ttl_segundos": self.ttl_segundos,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+        }
+
+
+cache_asignaciones = CacheAsignacionesEmpleado(settings.ASIGNACIONES_CACHE_TTL_SEGUNDOS)
+
+
+def precargar_asignaciones():
+    """Precarga la caché con su propia sesión (se lanza en segundo plano al arrancar)."""
+    db = SessionLocal()
+    try:
+        total = cache_asignaciones.precargar(db)
+        logger.info("Caché de asignaciones precargada: %s empleados", total)
+    except Exception:
+        logger.exception("No se pudo precargar la caché de asignaciones")
+    finally:
+        db.close()
+
+
+class EmpleadoSubDeparProviderCacheado(EmpleadoSubDeparProvider):
+    """EmpleadoSubDeparProvider que resuelve los codSubDepar a través de la caché de asignaciones."""
+
+    def obtener_subdepar_por_email(self, email: str) -> list[str]:
+        return cache_asignaciones.subdepartamentos(email, self.db)
@@ -0,0 +1,463 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+from abc import ABC, abstractmethod
+from contextlib import suppress
+from typing import Awaitable, Callable, Optional
+from urllib.parse import unquote, urlparse
+
+from app.config import settings
+from app.infrastructure.services.tramas_websocket import Trama
+
+logger = logging.getLogger(__name__)
+
+# Callback que recibe en cada worker los eventos de los canales a los que está suscrito
+Entregar = Callable[[str, Trama], Awaitable[None]]
+# Callback que recibe los mensajes de control de los demás workers (invalidaciones de cachés)
+Controlar = Callable[[dict], Awaitable[None]]
+
+# Longitud de cada mensaje del broker local y bytes pendientes de envío admitidos por conexión
+_CABECERA_LOCAL = struct.Struct("!I")
+LIMITE_COLA_LOCAL = 16 * 1024 * 1024
+
+
+def _serializar(mensaje: dict) -> bytes:
+    return json.dumps(mensaje, default=str, separators=(",", ":")).encode()
+
+
+class BrokerEventos(ABC):
+    """
+    Transporte de los eventos en tiempo real (por canal = codSubDepar) entre los workers de uvicorn.
+
+    - publicar(): hace llegar el evento a todos los workers que tienen algún socket en el canal,
+      incluido el propio; cada uno lo recibe en `entregar` (el debouncer de websocket_hitos).
+      El evento viaja como Trama: entre workers se envía su JSON ya codificado, sin reserializarlo.
+    - suscribir()/desuscribir(): el worker se apunta a un canal al conectarse su primer socket y
+      se borra al irse el último, de modo que solo recibe el tráfico de sus canales. Son síncronos
+      para poder llamarlos desde ConnectionManager.disconnect.
+    - iniciar()/cerrar(): arranque y parada del transporte (eventos startup/shutdown de la app).
+    - publicar_control(): mensaje fuera de los canales para todos los demás workers (no para el
+      propio), que lo reciben en `controlar`; lo usan las invalidaciones de cachés en proceso.
+    """
+
+    tipo = ""
+
+    def __init__(self, entregar: Entregar):
+        self._entregar = entregar
+        self.canales: set[str] = set()
+        self.controlar: Optional[Controlar] = None
+
+    async def iniciar(self):
+        pass
+
+    async def cerrar(self):
+        pass
+
+    @abstractmethod
+    async def publicar(self, canal: str, trama: Trama):
+        pass
+
+    async def publicar_control(self, mensaje: dict):
+        pass
+
+    def suscribir(self, canal: str):
+        self.canales.add(canal)
+
+    def desuscribir(self, canal: str):
+        self.canales.discard(canal)
+
+    async def _recibir(self, canal: str, trama: Trama):
+        if canal not in self.canales:
+            return
+        try:
+            await self._entregar(canal, trama)
+        except Exception as e:
+            logger.error(f"Error entregando evento del canal {canal}: {e}")
+
+    async def _recibir_control(self, mensaje: dict):
+        if self.controlar is None:
+            return
+        try:
+            await self.controlar(mensaje)
+        except Exception as e:
+            logger.error(f"Error procesando mensaje de control {mensaje}: {e}")
+
+    def estadisticas(self) -> dict:
+        return {"tipo": self.tipo, "canales": len(self.canales)}
+
+
+class BrokerMemoria(BrokerEventos):
+    """
+    Un solo worker: el evento se entrega directamente en el proceso (comportamiento original).
+    No hay otros workers a los que enviar los mensajes de control.
+    """
+
+    tipo = "memoria"
+
+    async def publicar(self, canal: str, trama: Trama):
+        await self._recibir(canal, trama)
+
+
+class BrokerLocal(BrokerEventos):
+    """
+    Varios workers en la misma máquina sin servicios externos: cada worker escucha en un socket
+    Unix de flujo (<directorio>/<pid>.sock), abre una conexión a cada uno de los demás y conoce
+    sus canales.
+
+    - Al arrancar saluda a los sockets del directorio y cada uno le responde con sus canales;
+      las altas y bajas de canal se anuncian a todos los workers.
+    - Cada mensaje va precedido de su longitud (4 bytes), así que no hay tamaño máximo como con
+      los datagramas. Dentro, una línea JSON de control; los eventos llevan detrás, tras un salto
+      de línea, el JSON de la trama tal cual, que el receptor no necesita volver a codificar.
+    - publicar() envía el evento solo a los workers suscritos al canal.
+    - Un socket sin nadie escuchando (worker caído) se elimina al fallar la conexión.
+    - Si un worker no lee y su conexión acumula más de LIMITE_COLA_LOCAL bytes pendientes, los
+      mensajes que no caben se descartan con un aviso en el log.
+    """
+
+    tipo = "local"
+
+    def __init__(self, entregar: Entregar, directorio: str):
+        super().__init__(entregar)
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, f"{os.getpid()}.sock")
+        self._pares: dict[str, set[str]] = {}
+        # Conexiones salientes a cada worker y mensajes a la espera de que se abra la suya
+        self._conexiones: dict[str, asyncio.StreamWriter] = {}
+        self._pendientes: dict[str, list[bytes]] = {}
+        # Conexiones entrantes y la tarea que las lee, para cerrarlas al parar
+        self._entrantes: dict[asyncio.StreamWriter, asyncio.Task] = {}
+        self._servidor: Optional[asyncio.AbstractServer] = None
+        self.descartados = 0
+
+    async def iniciar(self):
+        os.makedirs(self.directorio, exist_ok=True)
+        if os.path.exists(self.ruta):
+            os.unlink(self.ruta)
+        self._servidor = await asyncio.start_unix_server(self._atender, path=self.ruta)
+
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            if nombre.endswith(".sock") and ruta != self.ruta:
+                self._pares[ruta] = set()
+                self._enviar(ruta, self._control("hola"))
+        logger.info(f"Broker local escuchando en {self.ruta} ({len(self._pares)} workers vecinos)")
+
+    async def cerrar(self):
+        if self._servidor is None:
+            return
+        self._anunciar(self._control("adios"))
+        self._servidor.close()
+        self._servidor = None
+        for writer in [*self._conexiones.values(), *self._entrantes]:
+            writer.close()
+        # Al cerrarse su conexión cada tarea lectora termina sola
+        await asyncio.gather(*self._entrantes.values(), return_exceptions=True)
+        self._conexiones.clear()
+        self._entrantes.clear()
+        if os.path.exists(self.ruta):
+            os.unlink(self.ruta)
+
+    def _control(self, operacion: str, **datos) -> bytes:
+        return _serializar({"op": operacion, "origen": self.ruta, **datos})
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._entrantes[writer] = asyncio.current_task()
+        try:
+            while True:
+                longitud = _CABECERA_LOCAL.unpack(await reader.readexactly(_CABECERA_LOCAL.size))[0]
+                datos = await reader.readexactly(longitud)
+                try:
+                    control, _, evento = datos.partition(b"\n")
+                    await self._procesar(json.loads(control), evento)
+                except Exception as e:
+                    logger.error(f"Mensaje de broker local no válido: {e}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            # El otro worker cerró la conexión
+            pass
+        finally:
+            self._entrantes.pop(writer, None)
+            writer.close()
+
+    def _enviar(self, ruta: str, datos: bytes):
+        if self._servidor is None:
+            return
+        mensaje = _CABECERA_LOCAL.pack(len(datos)) + datos
+        writer = self._conexiones.get(ruta)
+        if writer is not None and writer.is_closing():
+            # El otro worker cerró su extremo: se reconecta (y se descubre si ha caído)
+            del self._conexiones[ruta]
+            writer = None
+        if writer is not None:
+            if writer.transport.get_write_buffer_size() > LIMITE_COLA_LOCAL:
+                self.descartados += 1
+                logger.warning(f"Cola del worker {ruta} llena, se descarta el mensaje")
+                return
+            writer.write(mensaje)
+            return
+        if ruta in self._pendientes:
+            self._pendientes[ruta].append(mensaje)
+            return
+        self._pendientes[ruta] = [mensaje]
+        asyncio.get_running_loop().create_task(self._conectar(ruta))
+
+    async def _conectar(self, ruta: str):
+        try:
+            _, writer = await asyncio.open_unix_connection(ruta)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # Worker caído: su socket ya no tiene a nadie escuchando
+            self._pendientes.pop(ruta, None)
+            self._pares.pop(ruta, None)
+            try:
+                os.unlink(ruta)
+            except OSError:
+                pass
+            return
+        except OSError as e:
+            descartados = self._pendientes.pop(ruta, [])
+            self.descartados += len(descartados)
+            logger.error(f"No se pudo conectar con el worker {ruta}; se descartan {len(descartados)} mensajes: {e}")
+            return
+        if self._servidor is None:
+            writer.close()
+            return
+        # Sin esperas entre vaciar los pendientes y registrar la conexión: se mantiene el orden
+        for mensaje in self._pendientes.pop(ruta, []):
+            writer.write(mensaje)
+        self._conexiones[ruta] = writer
+
+    def _anunciar(self, datos: bytes):
+        for ruta in list(self._pares):
+            self._enviar(ruta, datos)
+
+    async def _procesar(self, datos: dict, evento: bytes = b""):
+        operacion, origen = datos.get("op"), datos.get("origen")
+        if operacion == "evento":
+            await self._recibir(datos["canal"], Trama(texto=evento.decode()))
+        elif operacion == "hola":
+            self._pares[origen] = set()
+            self._enviar(origen, self._control("canales", canales=sorted(self.canales)))
+        elif operacion == "canales":
+            self._pares[origen] = set(datos.get("canales") or ())
+        elif operacion == "suscribir":
+            self._pares.setdefault(origen, set()).add(datos["canal"])
+        elif operacion == "desuscribir":
+            self._pares.get(origen, set()).discard(datos["canal"])
+        elif operacion == "adios":
+            self._pares.pop(origen, None)
+            writer = self._conexiones.pop(origen, None)
+            if writer is not None:
+                writer.close()
+        elif operacion == "control":
+            await self._recibir_control(datos["mensaje"])
+
+    async def publicar(self, canal: str, trama: Trama):
+        destinos = [ruta for ruta, canales in self._pares.items() if canal in canales]
+        if destinos:
+            datos = self._control("evento", canal=canal) + b"\n" + trama.texto.encode()
+            for ruta in destinos:
+                self._enviar(ruta, datos)
+        await self._recibir(canal, trama)
+
+    async def publicar_control(self, mensaje: dict):
+        self._anunciar(self._control("control", mensaje=mensaje))
+
+    def suscribir(self, canal: str):
+        if canal not in self.canales:
+            super().suscribir(canal)
+            self._anunciar(self._control("suscribir", canal=canal))
+
+    def desuscribir(self, canal: str):
+        if canal in self.canales:
+            super().desuscribir(canal)
+            self._anunciar(self._control("desuscribir", canal=canal))
+
+    def estadisticas(self) -> dict:
+        return {
+            **super().estadisticas(),
+            "workers_vecinos": len(self._pares),
+            "conexiones": len(self._conexiones),
+            "descartados": self.descartados,
+        }
+
+
+class ErrorRedis(ConnectionError):
+    pass
+
+
+def _comando_resp(*partes) -> bytes:
+    salida = [f"*{len(partes)}\r\n".encode()]
+    for parte in partes:
+        datos = parte if isinstance(parte, bytes) else str(parte).encode()
+        salida.append(b"$%d\r\n%s\r\n" % (len(datos), datos))
+    return b"".join(salida)
+
+
+async def _leer_resp(reader: asyncio.StreamReader):
+    linea = await reader.readline()
+    if not linea:
+        raise ErrorRedis("Conexión cerrada por el servidor")
+    tipo, contenido = linea[:1], linea[1:-2]
+    if tipo == b"+":
+        return contenido
+    if tipo == b"-":
+        raise ErrorRedis(contenido.decode(errors="replace"))
+    if tipo == b":":
+        return int(contenido)
+    if tipo == b"$":
+        longitud = int(contenido)
+        return None if longitud < 0 else (await reader.readexactly(longitud + 2))[:-2]
+    if tipo == b"*":
+        longitud = int(contenido)
+        return None if longitud < 0 else [await _leer_resp(reader) for _ in range(longitud)]
+    raise ErrorRedis(f"Respuesta RESP no reconocida: {linea!r}")
+
+
+async def _cerrar_conexion(writer: asyncio.StreamWriter):
+    """Cierra una conexión que se va a descartar; los errores al cerrarla ya no importan."""
+    writer.close()
+    with suppress(Exception):
+        await writer.wait_closed()
+
+
+class BrokerRedis(BrokerEventos):
+    """
+    Workers en varias máquinas: PUBLISH/SUBSCRIBE de Redis (o cualquier servidor compatible con
+    el protocolo RESP) con un cliente mínimo sobre asyncio, sin dependencias adicionales.
+
+    - Una conexión para publicar y otra dedicada a la suscripción, que se reabre con espera
+      exponencial y vuelve a suscribir todos los canales del worker si se cae.
+    - Los canales se prefijan (WEBSOCKET_BROKER_PREFIJO) para compartir el servidor.
+    - El propio worker recibe sus publicaciones a través de Redis, como los demás.
+    - Los mensajes de control van por el canal <prefijo>_control, al que todos los workers están
+      suscritos; cada uno ignora los que llevan su propio origen.
+    - La conexión y cada respuesta esperan como mucho `timeout` segundos: la publicación tiene el
+      lock tomado y un servidor inalcanzable bloquearía a todos los que publican.
+    """
+
+    tipo = "redis"
+
+    def __init__(self, entregar: Entregar, url: str, prefijo: str, timeout: float = 5.0):
+        super().__init__(entregar)
+        self.url = urlparse(url)
+        self.prefijo = prefijo
+        self.timeout = timeout
+        self.origen = f"{socket.gethostname()}:{os.getpid()}"
+        self._canal_control = f"{prefijo}_control".encode()
+        self._publicador: Optional[tuple] = None
+        self._lock_publicador = asyncio.Lock()
+        self._suscriptor: Optional[asyncio.StreamWriter] = None
+        self._tarea: Optional[asyncio.Task] = None
+
+    def _clave(self, canal: str) -> bytes:
+        return f"{self.prefijo}{canal}".encode()
+
+    async def _conectar(self) -> tuple:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.url.hostname or "localhost", self.url.port or 6379), self.timeout
+        )
+        if self.url.password:
+            credenciales = [unquote(self.url.username)] if self.url.username else []
+            writer.write(_comando_resp("AUTH", *credenciales, unquote(self.url.password)))
+            try:
+                await asyncio.wait_for(_leer_resp(reader), self.timeout)
+            except BaseException:
+                await _cerrar_conexion(writer)
+                raise
+        return reader, writer
+
+    async def iniciar(self):
+        self._tarea = asyncio.create_task(self._escuchar())
+
+    async def cerrar(self):
+        if self._tarea:
+            self._tarea.cancel()
+            self._tarea = None
+        for writer in (self._suscriptor, self._publicador[1] if self._publicador else None):
+            if writer is not None:
+                writer.close()
+        self._suscriptor = self._publicador = None
+
+    async def _escuchar(self):
+        espera = 0.5
+        while True:
+            try:
+                reader, writer = await self._conectar()
+                writer.write(_comando_resp(
+                    "SUBSCRIBE", self._canal_control, *[self._clave(canal) for canal in self.canales]
+                ))
+                self._suscriptor = writer
+                espera = 0.5
+                while True:
+                    respuesta = await _leer_resp(reader)
+                    if isinstance(respuesta, list) and len(respuesta) == 3 and respuesta[0] == b"message":
+                        if respuesta[1] == self._canal_control:
+                            control = json.loads(respuesta[2])
+                            if control.get("origen") != self.origen:
+                                await self._recibir_control(control["mensaje"])
+                            continue
+                        canal = respuesta[1].decode()[len(self.prefijo):]
+                        await self._recibir(canal, Trama(texto=respuesta[2].decode()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._suscriptor = None
+                logger.warning(f"Suscripción a Redis perdida ({e}); reintento en {espera}s")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30)
+
+    async def publicar(self, canal: str, trama: Trama):
+        await self._publicar(_comando_resp("PUBLISH", self._clave(canal), trama.texto.encode()), f"el evento del canal {canal}")
+
+    async def publicar_control(self, mensaje: dict):
+        datos = _serializar({"origen": self.origen, "mensaje": mensaje})
+        await self._publicar(_comando_resp("PUBLISH", self._canal_control, datos), "un mensaje de control")
+
+    async def _publicar(self, datos: bytes, descripcion: str):
+        async with self._lock_publicador:
+            for intento in range(2):
+                try:
+                    if self._publicador is None:
+                        self._publicador = await self._conectar()
+                    reader, writer = self._publicador
+                    writer.write(datos)
+                    await asyncio.wait_for(_leer_resp(reader), self.timeout)
+                    return
+                except Exception as e:
+                    # Una respuesta a medio leer dejaría la conexión desalineada: se descarta
+                    if self._publicador is not None:
+                        await _cerrar_conexion(self._publicador[1])
+                    self._publicador = None
+                    if intento:
+                        logger.error(f"No se pudo publicar en Redis {descripcion}: {e}")
+
+    def suscribir(self, canal: str):
+        if canal not in self.canales:
+            super().suscribir(canal)
+            if self._suscriptor is not None:
+                self._suscriptor.write(_comando_resp("SUBSCRIBE", self._clave(canal)))
+
+    def desuscribir(self, canal: str):
+        if canal in self.canales:
+            super().desuscribir(canal)
+            if self._suscriptor is not None:
+                self._suscriptor.write(_comando_resp("UNSUBSCRIBE", self._clave(canal)))
+
+    def estadisticas(self) -> dict:
+        return {**super().estadisticas(), "conectado": self._suscriptor is not None}
+
+
+def crear_broker(entregar: Entregar) -> BrokerEventos:
+    """Broker configurado en WEBSOCKET_BROKER: memoria (un worker), local (una máquina) o redis."""
+    tipo = settings.WEBSOCKET_BROKER
+    if tipo == "redis":
+        return BrokerRedis(entregar, settings.WEBSOCKET_BROKER_URL, settings.WEBSOCKET_BROKER_PREFIJO,
+                           settings.WEBSOCKET_BROKER_TIMEOUT_SEGUNDOS)
+    if tipo == "local":
+        return BrokerLocal(entregar, settings.WEBSOCKET_BROKER_DIRECTORIO)
+    if tipo != "memoria":
+        logger.warning(f"WEBSOCKET_BROKER '{tipo}' no reconocido; se usa el broker en memoria")
+    return BrokerMemoria(entregar)
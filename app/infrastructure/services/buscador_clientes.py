@@ -0,0 +1,272 @@
+import heapq
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter, namedtuple
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.infrastructure.db.compartido.tabla_valores import tabla_valores
+from app.infrastructure.db.models.cliente_model import ClienteModel
+from app.infrastructure.services.indice_en_memoria_ttl import IndiceEnMemoriaTTL
+
+logger = logging.getLogger(__name__)
+
+ClienteIndexado = namedtuple(
+    "ClienteIndexado", ["idcliente", "cif", "razsoc", "razsoc_normalizada", "cif_normalizado", "relleno", "num_trigramas"]
+)
+
+# Fracción mínima de los trigramas de la consulta que debe contener un cliente para ser candidato
+COBERTURA_MINIMA = 0.5
+# Coincidencias completas que se reúnen por resultado pedido antes de ordenar y cortar
+CANDIDATOS_POR_RESULTADO = 5
+# Clientes de la lista más rara que se recorren antes de intersectar el resto con la segunda
+LISTA_LARGA = 500
+# Clientes que se cuentan de cada lista de trigramas al buscar coincidencias parciales
+MAXIMO_PARCIALES_POR_TRIGRAMA = 500
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+
+def normalizar_texto(texto) -> str:
+    """Minúsculas, sin acentos (ñ -> n) y con cualquier signo de puntuación reducido a un espacio."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", str(texto).lower())
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(_NO_ALFANUMERICO.sub(" ", sin_acentos).split())
+
+
+def _sin_espacios(valor) -> Optional[str]:
+    return valor.strip() if isinstance(valor, str) else valor
+
+
+def _relleno(palabras: Iterable[str], abierta: bool = False) -> list:
+    """
+    Palabras rellenadas como en pg_trgm ("  palabra "): los trigramas del inicio y del final
+    marcan los bordes de la palabra. Con abierta, la última palabra no se cierra porque el
+    usuario aún la está escribiendo.
+    """
+    palabras = list(palabras)
+    rellenas = [f"  {palabra} " for palabra in palabras]
+    if abierta and rellenas:
+        rellenas[-1] = rellenas[-1][:-1]
+    return rellenas
+
+
+def _trigramas(rellenas: Iterable[str]) -> set:
+    return {palabra[i:i + 3] for palabra in rellenas for i in range(len(palabra) - 2)}
+
+
+class BuscadorClientes(IndiceEnMemoriaTTL):
+    """
+    Índice de trigramas en memoria sobre razsoc, CIF e idcliente de los clientes para el
+    autocompletado (/clientes/buscar). Los listados filtran en SQL: entre recargas el índice
+    no tiene las altas recientes.
+
+    - Insensible a mayúsculas y acentos (normalizar_texto).
+    - cargar(): una consulta y sustitución atómica del índice; se recarga entero al caducar el TTL.
+    - refrescar_clientes(): reindexa solo los clientes indicados. La versión anterior de cada
+      cliente queda anulada en las listas de trigramas hasta la siguiente carga completa.
+    - buscar(): parte de la lista del trigrama más raro y comprueba el resto sobre esos candidatos,
+      de modo que los trigramas frecuentes ("sl ", "  s") nunca se recorren enteros; solo si no
+      hay ninguna coincidencia completa cuenta coincidencias parciales (erratas).
+    - Los clientes reindexados se añaden al final y pierden el orden por longitud hasta la
+      siguiente carga completa.
+    """
+
+    def __init__(self, ttl_segundos: int):
+        super().__init__(ttl_segundos)
+        self._clientes: list[Optional[ClienteIndexado]] = []
+        self._posicion: dict[str, int] = {}
+        self._claves: dict[str, int] = {}
+        self._trigramas: dict[str, list] = {}
+        self._anulados = 0
+
+    # — Carga —
+
+    @staticmethod
+    def _consulta(session: Session):
+        return session.query(ClienteModel.idcliente, ClienteModel.cif, ClienteModel.razsoc)
+
+    @staticmethod
+    def _indexado(fila) -> tuple[ClienteIndexado, set]:
+        idcliente = str(fila.idcliente).strip()
+        razsoc = normalizar_texto(fila.razsoc)
+        cif = normalizar_texto(fila.cif)
+        rellenas = _relleno(" ".join(parte for parte in (razsoc, cif, normalizar_texto(idcliente)) if parte).split())
+        trigramas = _trigramas(rellenas)
+        cliente = ClienteIndexado(
+            idcliente, _sin_espacios(fila.cif), _sin_espacios(fila.razsoc),
+            razsoc, cif, "".join(rellenas), len(trigramas)
+        )
+        return cliente, trigramas
+
+    @staticmethod
+    def _agregar(cliente: ClienteIndexado, trigramas: set, clientes: list, posicion: dict, claves: dict,
+                 por_trigrama: dict):
+        indice = len(clientes)
+        clientes.append(cliente)
+        posicion[cliente.idcliente] = indice
+        claves[normalizar_texto(cliente.idcliente)] = indice
+        if cliente.cif_normalizado:
+            claves.setdefault(cliente.cif_normalizado, indice)
+        for trigrama in trigramas:
+            por_trigrama.setdefault(trigrama, []).append(indice)
+
+    def _cargar(self, session: Session):
+        # Se indexan de la razón social más corta a la más larga: las listas de trigramas quedan
+        # en el orden de preferencia del autocompletado y buscar() puede parar en cuanto tiene bastantes
+        indexados = sorted((self._indexado(fila) for fila in self._consulta(session)),
+                           key=lambda indexado: indexado[0].num_trigramas)
+        clientes, posicion, claves, por_trigrama = [], {}, {}, {}
+        for cliente, trigramas in indexados:
+            self._agregar(cliente, trigramas, clientes, posicion, claves, por_trigrama)
+
+        self._clientes = clientes
+        self._posicion = posicion
+        self._claves = claves
+        self._trigramas = por_trigrama
+        self._anulados = 0
+        logger.info("Buscador de clientes cargado: %s clientes, %s trigramas", len(clientes), len(por_trigrama))
+
+    def _anular(self, indice: int):
+        cliente = self._clientes[indice]
+        self._clientes[indice] = None
+        self._anulados += 1
+        for clave in (normalizar_texto(cliente.idcliente), cliente.cif_normalizado):
+            if self._claves.get(clave) == indice:
+                del self._claves[clave]
+
+    def refrescar_clientes(self, session: Session, ids_clientes: Iterable[str]):
+        """Reindexa los clientes indicados; los que ya no existen desaparecen del índice."""
+        ids = {str(id_cliente).strip() for id_cliente in ids_clientes if id_cliente is not None}
+        if not ids:
+            return
+        self._asegurar_cargado(session)
+
+        ids_refresco = tabla_valores(session, "clientes_refresco", "id_cliente", ids, "VARCHAR(9)")
+        filas = self._consulta(session).filter(ClienteModel.idcliente.in_(select(ids_refresco.c.id_cliente))).all()
+
+        with self._lock:
+            for id_cliente in ids:
+                indice = self._posicion.pop(id_cliente, None)
+                if indice is not None and self._clientes[indice] is not None:
+                    self._anular(indice)
+            for fila in filas:
+                self._agregar(*self._indexado(fila), self._clientes, self._posicion, self._claves, self._trigramas)
+
+    # — Consultas —
+
+    def buscar(self, session: Session, texto: str, limite: int = 10) -> list[dict]:
+        """
+        Los `limite` clientes que mejor encajan con el texto tecleado, ordenados por: idcliente o
+        CIF exactos, razón social o CIF que empiezan por el texto, que lo contienen y, por último,
+        por la fracción de trigramas de la consulta presentes en el cliente.
+        """
+        self._asegurar_cargado(session)
+        consulta = normalizar_texto(texto)
+        if not consulta:
+            return []
+        clientes, por_trigrama = self._clientes, self._trigramas
+
+        trigramas = _trigramas(_relleno(consulta.split(), abierta=not texto[-1:].isspace()))
+        listas = sorted(((por_trigrama.get(trigrama, ()), trigrama) for trigrama in trigramas),
+                        key=lambda lista: len(lista[0]))
+
+        # Coincidencias completas: basta recorrer la lista más corta y comprobar el resto de
+        # trigramas en el texto del cliente. Las listas están en orden de razón social más corta,
+        # así que al reunir suficientes candidatos ya se tienen los mejores y se deja de recorrer.
+        puntuaciones = {}
+        objetivo = limite * CANDIDATOS_POR_RESULTADO
+        lista, resto = listas[0][0], [trigrama for _, trigrama in listas[1:]]
+        self._coincidencias_completas(lista[:LISTA_LARGA], resto, clientes, puntuaciones, objetivo)
+        if len(puntuaciones) < objetivo and len(lista) > LISTA_LARGA and len(listas) > 1:
+            # Coincidencias escasas en una lista larga: el resto de la lista se intersecta antes
+            # con la segunda más rara (en C) y se recupera el orden
+            pendientes = sorted(set(lista[LISTA_LARGA:]).intersection(listas[1][0]))
+            self._coincidencias_completas(pendientes, resto[1:], clientes, puntuaciones, objetivo)
+
+        # Sin ninguna coincidencia completa (errata) se recurre a las parciales
+        exacto = self._claves.get(consulta)
+        if not puntuaciones and exacto is None:
+            self._coincidencias_parciales(listas, clientes, puntuaciones)
+
+        def orden(indice: int):
+            cliente = clientes[indice]
+            if indice == exacto:
+                nivel = 3
+            elif cliente.razsoc_normalizada.startswith(consulta) or cliente.cif_normalizado.startswith(consulta):
+                nivel = 2
+            elif consulta in cliente.razsoc_normalizada or consulta in cliente.cif_normalizado:
+                nivel = 1
+            else:
+                nivel = 0
+            return nivel, puntuaciones.get(indice, 1.0), -cliente.num_trigramas
+
+        candidatos = list(puntuaciones)
+        if exacto is not None and exacto not in puntuaciones and clientes[exacto] is not None:
+            candidatos.append(exacto)
+
+        resultado = []
+        for indice in heapq.nlargest(limite, candidatos, key=orden):
+            cliente = clientes[indice]
+            resultado.append({
+                "idcliente": cliente.idcliente,
+                "cif": cliente.cif,
+                "razsoc": cliente.razsoc,
+                "puntuacion": round(puntuaciones.get(indice, 1.0), 3),
+            })
+        return resultado
+
+    @staticmethod
+    def _coincidencias_completas(candidatos, trigramas: list, clientes: list, puntuaciones: dict, objetivo: int):
+        for indice in candidatos:
+            cliente = clientes[indice]
+            if cliente is not None and all(trigrama in cliente.relleno for trigrama in trigramas):
+                puntuaciones[indice] = 1.0
+                if len(puntuaciones) >= objetivo:
+                    return
+
+    @staticmethod
+    def _coincidencias_parciales(listas: list, clientes: list, puntuaciones: dict):
+        """
+        Añade a puntuaciones los clientes con al menos COBERTURA_MINIMA de los trigramas (erratas,
+        palabras incompletas). Un cliente con `minimo` coincidencias está por fuerza en alguna de
+        las len - minimo + 1 listas más cortas; las demás solo suman a esos candidatos. De cada
+        lista se toman solo los primeros clientes (los de razón social más corta).
+        """
+        total_trigramas = len(listas)
+        minimo = max(1, math.ceil(total_trigramas * COBERTURA_MINIMA))
+        corte = total_trigramas - minimo + 1
+        coincidencias = Counter()
+        for lista, _ in listas[:corte]:
+            coincidencias.update(lista[:MAXIMO_PARCIALES_POR_TRIGRAMA])
+        for lista, trigrama in listas[corte:]:
+            if len(lista) <= len(coincidencias):
+                for indice in lista:
+                    if indice in coincidencias:
+                        coincidencias[indice] += 1
+            else:
+                for indice in coincidencias:
+                    cliente = clientes[indice]
+                    if cliente is not None and trigrama in cliente.relleno:
+                        coincidencias[indice] += 1
+
+        for indice, total in coincidencias.items():
+            if total >= minimo and clientes[indice] is not None and indice not in puntuaciones:
+                puntuaciones[indice] = total / total_trigramas
+
+    def _contadores(self) -> dict:
+        return {
+            "clientes": len(self._posicion),
+            "trigramas": len(self._trigramas),
+            "anulados": self._anulados,
+        }
+
+
+buscador_clientes = BuscadorClientes(settings.BUSCADOR_CLIENTES_TTL_SEGUNDOS)
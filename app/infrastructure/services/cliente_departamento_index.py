@@ -0,0 +1,167 @@
+import logging
+from collections import namedtuple
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.infrastructure.db.compartido.tabla_valores import sql_tabla_valores, valores_json
+from app.infrastructure.services.indice_en_memoria_ttl import IndiceEnMemoriaTTL
+
+logger = logging.getLogger(__name__)
+
+DepartamentoCliente = namedtuple("DepartamentoCliente", ["codSubDepar", "nombre"])
+
+CLIENTES_CIF_SQL = """
+    SELECT c.idcliente, c.cif
+    FROM [ATISA_Input].dbo.clientes c
+"""
+
+DEPARTAMENTOS_CIF_SQL = """
+    SELECT csd.cif, sd.codSubDepar, sd.nombre
+    FROM [ATISA_Input].dbo.clienteSubDepar csd
+    JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
+"""
+
+# Subdepartamentos con algún empleado en activo (mismo criterio que listar_con_departamentos)
+SUBDEPAR_CON_EMPLEADOS_SQL = """
+    SELECT DISTINCT csm.codSubDepar
+    FROM ceco_subdepar csm
+    JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc ON cc.CODIDEPAR = csm.codidepar AND cc.fechafin IS NULL
+    JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
+    WHERE csm.por_codigo = 1
+"""
+
+
+def _normalizar(valor) -> Optional[str]:
+    return str(valor).strip() if valor is not None else None
+
+
+class ClienteDepartamentoIndex(IndiceEnMemoriaTTL):
+    """
+    Índice en memoria idcliente/CIF -> [(codSubDepar, nombre)] compartido por el reporte de status,
+    el listado de clientes con departamentos y la difusión por WebSocket.
+
+    - cargar(): carga masiva (tres consultas sin parámetros) y sustitución atómica de los mapas.
+    - refrescar_clientes(): recarga solo los clientes indicados en una consulta con plan fijo
+      (la lista viaja como tabla de valores). Se usa también para los clientes que aún no están
+      en el índice.
+    - Las consultas son O(1) sobre diccionarios.
+    """
+
+    def __init__(self, ttl_segundos: int):
+        super().__init__(ttl_segundos)
+        self._cif_por_cliente: dict[str, Optional[str]] = {}
+        self._por_cif: dict[str, tuple] = {}
+        self._subdepar_con_empleados: frozenset = frozenset()
+
+    # — Carga —
+
+    def _cargar(self, session: Session):
+        cif_por_cliente = {
+            _normalizar(fila.idcliente): _normalizar(fila.cif)
+            for fila in session.execute(text(CLIENTES_CIF_SQL))
+        }
+
+        por_cif: dict[str, list] = {}
+        for fila in session.execute(text(DEPARTAMENTOS_CIF_SQL)):
+            departamentos = por_cif.setdefault(_normalizar(fila.cif), [])
+            departamento = DepartamentoCliente(fila.codSubDepar, fila.nombre)
+            if departamento not in departamentos:
+                departamentos.append(departamento)
+
+        con_empleados = frozenset(
+            _normalizar(fila.codSubDepar) for fila in session.execute(text(SUBDEPAR_CON_EMPLEADOS_SQL))
+        )
+
+        self._cif_por_cliente = cif_por_cliente
+        self._por_cif = {cif: tuple(departamentos) for cif, departamentos in por_cif.items()}
+        self._subdepar_con_empleados = con_empleados
+        logger.info("Índice cliente-departamento cargado: %s clientes, %s CIF", len(cif_por_cliente), len(por_cif))
+
+    def refrescar_clientes(self, session: Session, ids_clientes: Iterable[str]):
+        """Recarga el CIF y los departamentos de los clientes indicados sin tocar el resto del índice."""
+        ids = {_normalizar(id_cliente) for id_cliente in ids_clientes if id_cliente is not None}
+        if not ids:
+            return
+
+        dialecto = session.get_bind().dialect.name
+        sql = text(f"""
+            SELECT c.idcliente, c.cif, sd.codSubDepar, sd.nombre
+            FROM [ATISA_Input].dbo.clientes c
+            LEFT JOIN [ATISA_Input].dbo.clienteSubDepar csd ON csd.cif = c.CIF
+            LEFT JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
+            WHERE c.idcliente IN ({sql_tabla_valores(dialecto, "clientes", "id_cliente", "VARCHAR(9)")})
+        """)
+
+        cifs = {id_cliente: None for id_cliente in ids}
+        por_cif: dict[str, list] = {}
+        for fila in session.execute(sql, {"clientes": valores_json(ids)}):
+            cif = _normalizar(fila.cif)
+            cifs[_normalizar(fila.idcliente)] = cif
+            if cif is None:
+                continue
+            departamentos = por_cif.setdefault(cif, [])
+            if fila.codSubDepar is not None:
+                departamento = DepartamentoCliente(fila.codSubDepar, fila.nombre)
+                if departamento not in departamentos:
+                    departamentos.append(departamento)
+
+        with self._lock:
+            self._cif_por_cliente.update(cifs)
+            self._por_cif.update({cif: tuple(departamentos) for cif, departamentos in por_cif.items()})
+
+    # — Consultas —
+
+    def cif(self, session: Session, id_cliente: str) -> Optional[str]:
+        self._asegurar_cargado(session)
+        clave = _normalizar(id_cliente)
+        if clave not in self._cif_por_cliente:
+            self.refrescar_clientes(session, [clave])
+        return self._cif_por_cliente.get(clave)
+
+    def departamentos_por_cif(self, session: Session, cif: str) -> list:
+        self._asegurar_cargado(session)
+        return list(self._por_cif.get(_normalizar(cif), ()))
+
+    def departamentos(self, session: Session, id_cliente: str) -> list:
+        cif = self.cif(session, id_cliente)
+        return list(self._por_cif.get(cif, ())) if cif else []
+
+    def mapa_departamentos(self, session: Session, ids_clientes: Iterable[str]) -> dict:
+        """{idcliente: [DepartamentoCliente]} con una sola consulta para los clientes no indexados."""
+        self._asegurar_cargado(session)
+        ids = list(ids_clientes)
+        faltan = [id_cliente for id_cliente in ids if _normalizar(id_cliente) not in self._cif_por_cliente]
+        if faltan:
+            self.refrescar_clientes(session, faltan)
+
+        mapa = {}
+        for id_cliente in ids:
+            cif = self._cif_por_cliente.get(_normalizar(id_cliente))
+            mapa[id_cliente] = list(self._por_cif.get(cif, ())) if cif else []
+        return mapa
+
+    def subdepar_por_cifs(self, session: Session, cifs: Iterable[str]) -> set:
+        """codSubDepar asignados a cualquiera de los CIF indicados."""
+        self._asegurar_cargado(session)
+        return {
+            departamento.codSubDepar
+            for cif in cifs
+            for departamento in self._por_cif.get(_normalizar(cif), ())
+        }
+
+    def subdepar_con_empleados(self, session: Session) -> frozenset:
+        self._asegurar_cargado(session)
+        return self._subdepar_con_empleados
+
+    def _contadores(self) -> dict:
+        return {
+            "clientes": len(self._cif_por_cliente),
+            "cifs": len(self._por_cif),
+            "subdepar_con_empleados": len(self._subdepar_con_empleados),
+        }
+
+
+indice_cliente_departamento = ClienteDepartamentoIndex(settings.CLIENTE_DEPARTAMENTO_INDEX_TTL_SEGUNDOS)
@@ -0,0 +1,177 @@
+import logging
+from collections import namedtuple
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.infrastructure.db.compartido.tabla_valores import sql_tabla_valores, valores_json
+from app.infrastructure.services.indice_en_memoria_ttl import IndiceEnMemoriaTTL
+
+logger = logging.getLogger(__name__)
+
+PersonaDirectorio = namedtuple(
+    "PersonaDirectorio", ["numeross", "nif", "nombre", "apellido1", "apellido2", "email", "activa"]
+)
+
+# Se cargan también las bajas: el histórico (auditoría, cumplimientos, documentos) sigue
+# mostrando el nombre de quien hizo el cambio aunque ya no esté en activo.
+PERSONAS_SQL = """
+    SELECT Numeross, NIF, Nombre, Apellido1, Apellido2, email,
+           CASE WHEN fechabaja IS NULL THEN 1 ELSE 0 END AS activa
+    FROM [BI DW RRHH DEV].dbo.Persona
+"""
+
+
+def _normalizar(valor) -> Optional[str]:
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+
+def _clave_email(email) -> Optional[str]:
+    email = _normalizar(email)
+    return email.lower() if email else None
+
+
+def nombre_completo(persona: PersonaDirectorio) -> Optional[str]:
+    """Nombre y apellidos como los concatenaban las consultas (None si la persona no tiene nombre)."""
+    if persona is None or persona.nombre is None:
+        return None
+    return " ".join(parte for parte in (persona.nombre, persona.apellido1, persona.apellido2) if parte)
+
+
+class DirectorioPersonas(IndiceEnMemoriaTTL):
+    """
+    Directorio en memoria de [BI DW RRHH DEV].dbo.Persona indexado por Numeross, email y NIF.
+
+    Sustituye los JOIN entre bases de datos que solo servían para mostrar el nombre de un usuario:
+    las consultas devuelven el Numeross y el nombre se resuelve aquí después de leer las filas.
+
+    - cargar(): una consulta sin parámetros y sustitución atómica de los índices.
+    - Los Numeross desconocidos se cargan con refrescar_numeross() (ver IndiceEnMemoriaTTL).
+    """
+
+    def __init__(self, ttl_segundos: int):
+        super().__init__(ttl_segundos)
+        self._por_numeross: dict[str, Optional[PersonaDirectorio]] = {}
+        self._por_email: dict[str, PersonaDirectorio] = {}
+        self._por_nif: dict[str, PersonaDirectorio] = {}
+        self._activas: tuple = ()
+
+    # — Carga —
+
+    @staticmethod
+    def _persona(fila) -> PersonaDirectorio:
+        return PersonaDirectorio(
+            _normalizar(fila.Numeross), _normalizar(fila.NIF), _normalizar(fila.Nombre),
+            _normalizar(fila.Apellido1), _normalizar(fila.Apellido2), _normalizar(fila.email),
+            bool(fila.activa)
+        )
+
+    def _indexar(self, personas: Iterable[PersonaDirectorio], por_numeross: dict, por_email: dict, por_nif: dict):
+        for persona in personas:
+            if persona.numeross:
+                por_numeross[persona.numeross] = persona
+            # Email y NIF solo resuelven personas en activo (como las búsquedas de /personas)
+            if not persona.activa:
+                continue
+            if persona.email:
+                por_email[_clave_email(persona.email)] = persona
+            if persona.nif:
+                por_nif[persona.nif] = persona
+
+    def _cargar(self, session: Session):
+        personas = [self._persona(fila) for fila in session.execute(text(PERSONAS_SQL))]
+        por_numeross, por_email, por_nif = {}, {}, {}
+        self._indexar(personas, por_numeross, por_email, por_nif)
+
+        self._por_numeross = por_numeross
+        self._por_email = por_email
+        self._por_nif = por_nif
+        self._activas = tuple(persona for persona in personas if persona.activa)
+        logger.info("Directorio de personas cargado: %s personas, %s activas", len(personas), len(self._activas))
+
+    def refrescar_numeross(self, session: Session, numeross: Iterable[str]):
+        """Carga solo las personas indicadas sin tocar el resto del directorio."""
+        claves = {clave for clave in (_normalizar(valor) for valor in numeross) if clave}
+        if not claves:
+            return
+
+        dialecto = session.get_bind().dialect.name
+        sql = text(f"""
+            {PERSONAS_SQL}
+            WHERE Numeross IN ({sql_tabla_valores(dialecto, "numeross", "numeross", "VARCHAR(50)")})
+        """)
+        personas = [self._persona(fila) for fila in session.execute(sql, {"numeross": valores_json(claves)})]
+
+        with self._lock:
+            por_numeross = {clave: None for clave in claves}
+            self._indexar(personas, por_numeross, self._por_email, self._por_nif)
+            self._por_numeross.update(por_numeross)
+
+    # — Consultas —
+
+    def por_numeross(self, session: Session, numeross) -> Optional[PersonaDirectorio]:
+        self._asegurar_cargado(session)
+        clave = _normalizar(numeross)
+        if clave is None:
+            return None
+        if clave not in self._por_numeross:
+            self.refrescar_numeross(session, [clave])
+        return self._por_numeross.get(clave)
+
+    def por_email(self, session: Session, email) -> Optional[PersonaDirectorio]:
+        self._asegurar_cargado(session)
+        return self._por_email.get(_clave_email(email))
+
+    def por_nif(self, session: Session, nif) -> Optional[PersonaDirectorio]:
+        self._asegurar_cargado(session)
+        return self._por_nif.get(_normalizar(nif))
+
+    def activas(self, session: Session) -> tuple:
+        self._asegurar_cargado(session)
+        return self._activas
+
+    def nombres(self, session: Session, numeross: Iterable) -> dict:
+        """
+        {numeross: nombre para mostrar} con una sola consulta para los no indexados. Sin persona
+        (o sin nombre) se devuelve el propio valor, como hacía el CASE ... ELSE usuario de SQL.
+        """
+        self._asegurar_cargado(session)
+        valores = {valor for valor in numeross if valor is not None}
+        faltan = [valor for valor in valores if _normalizar(valor) and _normalizar(valor) not in self._por_numeross]
+        if faltan:
+            self.refrescar_numeross(session, faltan)
+        return {
+            valor: nombre_completo(self._por_numeross.get(_normalizar(valor))) or valor
+            for valor in valores
+        }
+
+    def resolver_en_filas(self, session: Session, filas: list, campo: str) -> list:
+        """
+        Copia las filas (Row o namedtuple) sustituyendo el Numeross de `campo` por el nombre
+        para mostrar. Las filas sin ese campo se devuelven tal cual.
+        """
+        if not filas or campo not in filas[0]._fields:
+            return filas
+        nombres = self.nombres(session, (getattr(fila, campo) for fila in filas))
+        Fila = namedtuple("Fila", filas[0]._fields)
+        posicion = filas[0]._fields.index(campo)
+        resueltas = []
+        for fila in filas:
+            valores = list(fila)
+            valores[posicion] = nombres.get(valores[posicion], valores[posicion])
+            resueltas.append(Fila(*valores))
+        return resueltas
+
+    def _contadores(self) -> dict:
+        return {
+            "personas": len(self._por_numeross),
+            "activas": len(self._activas),
+        }
+
+
+directorio_personas = DirectorioPersonas(settings.DIRECTORIO_PERSONAS_TTL_SEGUNDOS)
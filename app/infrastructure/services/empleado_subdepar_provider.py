@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
@@ -21,3 +23,22 @@ class EmpleadoSubDeparProvider:
 
         result = self.db.execute(sql, {"email": email})
         return [row.codSubDepar for row in result.fetchall()]
+
+    def obtener_subdepar_todos(self) -> dict[str, list[str]]:
+        """codSubDepar vigentes de todos los empleados, {email en minúsculas: [codSubDepar]} (precarga)."""
+        sql = text("""
+        SELECT LOWER(p.email) AS email, s.codSubDepar
+        FROM [ATISA_Input].[dbo].[subDepar] s
+        JOIN [BI DW RRHH DEV].[dbo].[HDW_Cecos] c
+            ON s.codidepar = c.CODIDEPAR
+        JOIN [BI DW RRHH DEV].[dbo].[Persona] p
+            ON p.Numeross = c.NUMEROSS
+        WHERE p.email IS NOT NULL
+          AND c.FECHAINI <= CAST(GETDATE() AS DATE)
+          AND (c.FECHAFIN IS NULL OR c.FECHAFIN >= CAST(GETDATE() AS DATE))
+        """)
+
+        subdepars = defaultdict(list)
+        for row in self.db.execute(sql).fetchall():
+            subdepars[row.email].append(row.codSubDepar)
+        return dict(subdepars)
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+
+class IndiceEnMemoriaTTL:
+    """
+    Base de los índices en memoria que se cargan enteros desde la base de datos y se recargan al
+    caducar el TTL (directorio de personas, buscador de clientes, índice cliente-departamento y
+    rutas de eventos).
+
+    - Cada índice implementa _cargar(): lee las filas y sustituye sus mapas de una vez; el lock ya
+      está tomado. La base marca el momento de la carga.
+    - Las consultas llaman a _asegurar_cargado() antes de leer los mapas.
+    - Las claves que no están en el índice (altas posteriores a la carga) se buscan en una sola
+      consulta por lote y quedan registradas aunque no existan, para no volver a consultarlas.
+    - _contadores() aporta los tamaños propios de cada índice a estadisticas().
+    """
+
+    def __init__(self, ttl_segundos: int):
+        self.ttl_segundos = ttl_segundos
+        self._cargado_en: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _cargar(self, session: Session):
+        raise NotImplementedError
+
+    def _contadores(self) -> dict:
+        return {}
+
+    def _recargar(self, session: Session):
+        self._cargar(session)
+        self._cargado_en = time.monotonic()
+
+    def _caducado(self) -> bool:
+        return self._cargado_en is None or time.monotonic() - self._cargado_en >= self.ttl_segundos
+
+    def _asegurar_cargado(self, session: Session):
+        if not self._caducado():
+            return
+        with self._lock:
+            # Otra petición pudo recargar mientras esperábamos el lock
+            if self._caducado():
+                self._recargar(session)
+
+    def cargar(self, session: Session) -> dict:
+        with self._lock:
+            self._recargar(session)
+        return self.estadisticas()
+
+    def invalidar(self):
+        """Fuerza la recarga completa en la próxima consulta."""
+        with self._lock:
+            self._cargado_en = None
+
+    def estadisticas(self) -> dict:
+        return {
+            **self._contadores(),
+            "ttl_segundos": self.ttl_segundos,
+            "antiguedad_segundos": None if self._cargado_en is None else round(time.monotonic() - self._cargado_en, 1),
+        }
@@ -0,0 +1,210 @@
+import logging
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.infrastructure.db.compartido.tabla_valores import sql_tabla_valores, valores_json
+from app.infrastructure.services.cliente_departamento_index import indice_cliente_departamento
+from app.infrastructure.services.indice_en_memoria_ttl import IndiceEnMemoriaTTL
+
+logger = logging.getLogger(__name__)
+
+CLIENTE_PROCESO_SQL = """
+    SELECT cp.id, cp.cliente_id, cp.proceso_id
+    FROM [ATISA_Input].dbo.cliente_proceso cp
+"""
+
+# Clientes con alguna instancia de cada hito: enrutan los eventos del hito maestro (incluye los
+# cliente_proceso_hito creados fuera de la plantilla y los que sobreviven a una baja en ella)
+HITOS_CLIENTE_SQL = """
+    SELECT DISTINCT cp.cliente_id, cph.hito_id
+    FROM [ATISA_Input].dbo.cliente_proceso_hito cph
+    JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
+"""
+
+# Plantilla de hitos de cada proceso: al dar de alta un proceso para un cliente se generan sus
+# instancias, que se registran sin esperar a la recarga
+HITOS_PROCESO_SQL = """
+    SELECT phm.proceso_id, phm.hito_id
+    FROM [ATISA_Input].dbo.proceso_hito_maestro phm
+"""
+
+# Subdepartamentos asignados directamente al cliente (clienteSubDePar.id = idcliente)
+SUBDEPAR_DIRECTO_SQL = """
+    SELECT csd.id, sd.codSubDePar AS cod
+    FROM [ATISA_Input].dbo.clienteSubDePar csd
+    JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
+"""
+
+
+def _normalizar(valor) -> Optional[str]:
+    return str(valor).strip() if valor is not None else None
+
+
+class IndiceRutasEventos(IndiceEnMemoriaTTL):
+    """
+    Índice en memoria para enrutar los eventos en tiempo real a sus subdepartamentos sin consultar
+    la base de datos: cliente_proceso -> cliente, proceso -> {clientes}, hito -> {clientes con
+    instancias del hito}, proceso -> {hitos de su plantilla} y cliente -> {codSubDePar}
+    (asignación directa). El paso cliente -> CIF -> {codSubDePar} lo resuelve
+    indice_cliente_departamento.
+
+    - cargar(): cuatro consultas sin parámetros al arrancar y sustitución atómica de los mapas; el
+      índice se reconcilia con una recarga completa al caducar el TTL.
+    - registrar_cliente_proceso()/registrar_hito_cliente()/registrar_hito_proceso(): las escrituras
+      que llegan como eventos mantienen el índice al día entre recargas. Las bajas de instancias
+      solo se reflejan en la recarga (hasta entonces el hito se sigue enviando a ese cliente).
+    - Los cliente_proceso desconocidos se cargan con refrescar_cliente_procesos() (ver IndiceEnMemoriaTTL).
+    """
+
+    def __init__(self, ttl_segundos: int):
+        super().__init__(ttl_segundos)
+        self._cliente_por_cp: dict[int, Optional[str]] = {}
+        self._clientes_por_proceso: dict[int, set] = {}
+        self._clientes_por_hito: dict[int, set] = {}
+        self._hitos_por_proceso: dict[int, set] = {}
+        self._subdepar_por_cliente: dict[str, set] = {}
+
+    # — Carga —
+
+    def _cargar(self, session: Session):
+        cliente_por_cp: dict[int, Optional[str]] = {}
+        clientes_por_proceso: dict[int, set] = {}
+        for fila in session.execute(text(CLIENTE_PROCESO_SQL)):
+            cliente = _normalizar(fila.cliente_id)
+            cliente_por_cp[fila.id] = cliente
+            clientes_por_proceso.setdefault(fila.proceso_id, set()).add(cliente)
+
+        clientes_por_hito: dict[int, set] = {}
+        for fila in session.execute(text(HITOS_CLIENTE_SQL)):
+            clientes_por_hito.setdefault(fila.hito_id, set()).add(_normalizar(fila.cliente_id))
+
+        hitos_por_proceso: dict[int, set] = {}
+        for fila in session.execute(text(HITOS_PROCESO_SQL)):
+            hitos_por_proceso.setdefault(fila.proceso_id, set()).add(fila.hito_id)
+
+        subdepar_por_cliente: dict[str, set] = {}
+        for fila in session.execute(text(SUBDEPAR_DIRECTO_SQL)):
+            subdepar_por_cliente.setdefault(_normalizar(fila.id), set()).add(fila.cod)
+
+        self._cliente_por_cp = cliente_por_cp
+        self._clientes_por_proceso = clientes_por_proceso
+        self._clientes_por_hito = clientes_por_hito
+        self._hitos_por_proceso = hitos_por_proceso
+        self._subdepar_por_cliente = subdepar_por_cliente
+        logger.info(
+            "Índice de rutas de eventos cargado: %s cliente_proceso, %s procesos, %s hitos",
+            len(cliente_por_cp), len(clientes_por_proceso), len(clientes_por_hito)
+        )
+
+    def refrescar_cliente_procesos(self, session: Session, ids: Iterable[int]):
+        """Carga los cliente_proceso indicados sin tocar el resto del índice."""
+        ids = {int(id_cp) for id_cp in ids}
+        if not ids:
+            return
+        dialecto = session.get_bind().dialect.name
+        sql = text(f"""
+            SELECT cp.id, cp.cliente_id, cp.proceso_id
+            FROM [ATISA_Input].dbo.cliente_proceso cp
+            WHERE cp.id IN ({sql_tabla_valores(dialecto, "cliente_procesos", "id", "INT")})
+        """)
+        filas = session.execute(sql, {"cliente_procesos": valores_json(ids)}).all()
+        with self._lock:
+            for id_cp in ids:
+                self._cliente_por_cp.setdefault(id_cp, None)
+            for fila in filas:
+                self._registrar(fila.id, _normalizar(fila.cliente_id), fila.proceso_id)
+
+    def _registrar(self, id_cp: Optional[int], cliente: Optional[str], proceso_id: Optional[int]):
+        if id_cp is not None:
+            self._cliente_por_cp[id_cp] = cliente
+        if cliente is not None and proceso_id is not None:
+            self._clientes_por_proceso.setdefault(proceso_id, set()).add(cliente)
+
+    def registrar_cliente_proceso(self, cliente_id, proceso_id, id_cp: Optional[int] = None):
+        """Alta de un proceso para un cliente (evento de escritura): genera los hitos de su plantilla."""
+        cliente = _normalizar(cliente_id)
+        proceso_id = int(proceso_id) if proceso_id is not None else None
+        with self._lock:
+            self._registrar(id_cp, cliente, proceso_id)
+            if cliente is not None and proceso_id is not None:
+                for hito_id in self._hitos_por_proceso.get(proceso_id, ()):
+                    self._clientes_por_hito.setdefault(hito_id, set()).add(cliente)
+
+    def registrar_hito_cliente(self, hito_id, cliente_id):
+        """Alta de una instancia de un hito para un cliente (evento de escritura)."""
+        cliente = _normalizar(cliente_id)
+        if hito_id is None or cliente is None:
+            return
+        with self._lock:
+            self._clientes_por_hito.setdefault(int(hito_id), set()).add(cliente)
+
+    def registrar_hito_proceso(self, hito_id, proceso_id):
+        """Alta de un hito en la plantilla de un proceso (evento de escritura)."""
+        if hito_id is None or proceso_id is None:
+            return
+        with self._lock:
+            self._hitos_por_proceso.setdefault(int(proceso_id), set()).add(int(hito_id))
+
+    # — Consultas —
+
+    def cliente_de_cliente_proceso(self, session: Session, id_cp: int) -> Optional[str]:
+        self._asegurar_cargado(session)
+        if id_cp not in self._cliente_por_cp:
+            self.refrescar_cliente_procesos(session, [id_cp])
+        return self._cliente_por_cp.get(id_cp)
+
+    def precargar_cliente_procesos(self, session: Session, ids: Iterable[int]):
+        """Carga en una sola consulta los cliente_proceso de un lote que aún no están en el índice."""
+        self._asegurar_cargado(session)
+        self.refrescar_cliente_procesos(session, [id_cp for id_cp in ids if id_cp not in self._cliente_por_cp])
+
+    def clientes_de_proceso(self, session: Session, proceso_id: int) -> set:
+        self._asegurar_cargado(session)
+        return set(self._clientes_por_proceso.get(proceso_id, ()))
+
+    def clientes_de_hito(self, session: Session, hito_id: int) -> set:
+        """Clientes con alguna instancia (cliente_proceso_hito) del hito."""
+        self._asegurar_cargado(session)
+        return set(self._clientes_por_hito.get(hito_id, ()))
+
+    def subdepar_por_cif(self, session: Session, clientes: Iterable[str]) -> set:
+        """codSubDepar asignados al CIF de los clientes indicados (cliente -> CIF -> subdepartamentos)."""
+        clientes = list(clientes)
+        if not clientes:
+            return set()
+        return {
+            departamento.codSubDepar
+            for departamentos in indice_cliente_departamento.mapa_departamentos(session, clientes).values()
+            for departamento in departamentos
+        }
+
+    def subdepar_de_clientes(self, session: Session, clientes: Iterable[str]) -> set:
+        """Asignación directa de cada cliente más la de su CIF."""
+        self._asegurar_cargado(session)
+        clientes = list(clientes)
+        directos = {
+            cod
+            for cliente in clientes
+            for cod in self._subdepar_por_cliente.get(cliente, ())
+        }
+        return directos | self.subdepar_por_cif(session, clientes)
+
+    def subdepar_de_proceso(self, session: Session, proceso_id: int) -> set:
+        return self.subdepar_de_clientes(session, self.clientes_de_proceso(session, proceso_id))
+
+    def subdepar_de_hito(self, session: Session, hito_id: int) -> set:
+        return self.subdepar_de_clientes(session, self.clientes_de_hito(session, hito_id))
+
+    def _contadores(self) -> dict:
+        return {
+            "cliente_procesos": len(self._cliente_por_cp),
+            "procesos": len(self._clientes_por_proceso),
+            "hitos": len(self._clientes_por_hito),
+            "clientes_con_subdepar": len(self._subdepar_por_cliente),
+        }
+
+
+indice_rutas_eventos = IndiceRutasEventos(settings.INDICE_RUTAS_EVENTOS_TTL_SEGUNDOS)
@@ -0,0 +1,65 @@
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+Publicar = Callable[[dict], Awaitable[None]]
+
+
+class InvalidacionCaches:
+    """
+    Propaga a los demás workers las invalidaciones y recargas de las cachés en proceso
+    (endpoints /admin/cache/*), que de otro modo solo afectarían al worker que atiende la petición.
+
+    - registrar(): asocia un nombre de operación a la acción que la aplica en un worker.
+    - propagar(): publica la operación a los demás workers a través del broker de eventos
+      (conectar() lo fija al arrancar la app); el worker que la publica ya la aplicó al atender
+      la petición. Se llama desde los endpoints síncronos (hilo del threadpool).
+    - recibir(): operación llegada de otro worker; la acción corre en un hilo porque puede
+      consultar la base de datos.
+    Sin broker conectado (rutas WebSocket no cargadas) o con el broker en memoria (un solo
+    worker) las operaciones solo afectan al propio proceso.
+    """
+
+    def __init__(self):
+        self._acciones: dict[str, Callable[..., Any]] = {}
+        self._publicar: Optional[Publicar] = None
+        self.enviadas = 0
+        self.recibidas = 0
+
+    def registrar(self, operacion: str, accion: Callable[..., Any]):
+        self._acciones[operacion] = accion
+
+    def conectar(self, publicar: Optional[Publicar]):
+        self._publicar = publicar
+
+    def propagar(self, operacion: str, **datos) -> bool:
+        """Envía la operación a los demás workers. Devuelve si se pudo publicar."""
+        if self._publicar is None:
+            return False
+        try:
+            anyio.from_thread.run(self._publicar, {"operacion": operacion, "datos": datos})
+        except Exception as e:
+            logger.error(f"No se pudo propagar la operación de caché '{operacion}': {e}")
+            return False
+        self.enviadas += 1
+        return True
+
+    async def recibir(self, mensaje: dict):
+        accion = self._acciones.get(mensaje.get("operacion"))
+        if accion is None:
+            logger.warning(f"Operación de caché desconocida recibida de otro worker: {mensaje}")
+            return
+        self.recibidas += 1
+        try:
+            await anyio.to_thread.run_sync(lambda: accion(**(mensaje.get("datos") or {})))
+        except Exception as e:
+            logger.error(f"Error aplicando la operación de caché '{mensaje.get('operacion')}': {e}")
+
+    def estadisticas(self) -> dict:
+        return {"conectada": self._publicar is not None, "enviadas": self.enviadas, "recibidas": self.recibidas}
+
+
+invalidacion_caches = InvalidacionCaches()
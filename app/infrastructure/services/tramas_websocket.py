@@ -0,0 +1,170 @@
+import json
+from datetime import date, datetime, time
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+FORMATO_JSON = "json"
+FORMATO_MSGPACK = "msgpack"
+
+
+def formato_disponible(formato: Optional[str]) -> str:
+    """Formato negociado por el cliente; MessagePack solo si la librería está instalada."""
+    if formato == FORMATO_MSGPACK and msgpack is not None:
+        return FORMATO_MSGPACK
+    return FORMATO_JSON
+
+
+def _por_defecto(valor: Any) -> str:
+    """
+    Valores que el codificador no conoce. Fechas y horas en ISO 8601 como las escribe orjson
+    ("2024-05-01T10:30:00"), para que el mensaje sea el mismo con o sin orjson y en MessagePack.
+    """
+    if isinstance(valor, (date, datetime, time)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def dumps_json(mensaje: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(mensaje, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(mensaje, default=_por_defecto, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads_json(texto):
+    return orjson.loads(texto) if orjson is not None else json.loads(texto)
+
+
+def _packb(valor: Any) -> bytes:
+    return msgpack.packb(valor, default=_por_defecto, use_bin_type=True)
+
+
+class Trama:
+    """
+    Mensaje de WebSocket codificado como mucho una vez por formato (JSON de texto o MessagePack)
+    y compartido por todos los destinatarios y canales que lo reciben.
+
+    Se puede crear a partir del mensaje o del JSON ya recibido de otro worker; la otra
+    representación se obtiene solo si algún destinatario la necesita.
+    """
+
+    __slots__ = ("_mensaje", "_texto", "_binario")
+
+    def __init__(self, mensaje: Any = None, texto: Optional[str] = None):
+        self._mensaje = mensaje
+        self._texto = texto
+        self._binario: Optional[bytes] = None
+
+    @classmethod
+    def de(cls, mensaje: Any) -> "Trama":
+        return mensaje if isinstance(mensaje, Trama) else cls(mensaje)
+
+    @property
+    def mensaje(self) -> Any:
+        if self._mensaje is None and self._texto is not None:
+            self._mensaje = loads_json(self._texto)
+        return self._mensaje
+
+    @property
+    def texto(self) -> str:
+        if self._texto is None:
+            self._texto = dumps_json(self._mensaje)
+        return self._texto
+
+    @property
+    def binario(self) -> bytes:
+        if self._binario is None:
+            self._binario = _packb(self.mensaje)
+        return self._binario
+
+
+class TramaLote(Trama):
+    """
+    Trama {**cabecera, "events": [...]} que se monta concatenando los eventos ya codificados,
+    sin volver a serializarlos (cada evento puede ir además en los lotes de otros canales).
+    """
+
+    __slots__ = ("_cabecera", "_eventos")
+
+    def __init__(self, eventos: list, **cabecera):
+        super().__init__()
+        self._cabecera = cabecera
+        self._eventos = eventos
+
+    @property
+    def mensaje(self) -> dict:
+        if self._mensaje is None:
+            self._mensaje = {**self._cabecera, "events": [evento.mensaje for evento in self._eventos]}
+        return self._mensaje
+
+    @property
+    def texto(self) -> str:
+        if self._texto is None:
+            eventos = ",".join(evento.texto for evento in self._eventos)
+            self._texto = f'{dumps_json(self._cabecera)[:-1]},"events":[{eventos}]}}'
+        return self._texto
+
+    @property
+    def binario(self) -> bytes:
+        if self._binario is None:
+            packer = msgpack.Packer(default=_por_defecto, use_bin_type=True)
+            partes = [packer.pack_map_header(len(self._cabecera) + 1)]
+            for clave, valor in self._cabecera.items():
+                partes += [packer.pack(clave), packer.pack(valor)]
+            partes += [packer.pack("events"), packer.pack_array_header(len(self._eventos))]
+            partes += [evento.binario for evento in self._eventos]
+            self._binario = b"".join(partes)
+        return self._binario
+
+
+class TramaAmpliada(Trama):
+    """
+    Trama de un objeto con campos añadidos (p. ej. el número de secuencia del canal) que reutiliza
+    la codificación de la original: solo se codifican los campos nuevos, que prevalecen.
+    """
+
+    __slots__ = ("_base", "_campos")
+
+    def __init__(self, base: Trama, **campos):
+        super().__init__()
+        self._base = base
+        self._campos = campos
+
+    @property
+    def mensaje(self) -> dict:
+        if self._mensaje is None:
+            self._mensaje = {**self._base.mensaje, **self._campos}
+        return self._mensaje
+
+    @property
+    def texto(self) -> str:
+        if self._texto is None:
+            base, campos = self._base.texto, dumps_json(self._campos)
+            self._texto = campos if base == "{}" else f"{base[:-1]},{campos[1:]}"
+        return self._texto
+
+    @property
+    def binario(self) -> bytes:
+        if self._binario is None:
+            base = self._base.binario
+            # Cabecera de mapa de MessagePack: fixmap (1 byte), map16 (3) o map32 (5)
+            if base[0] == 0xDE:
+                elementos, inicio = int.from_bytes(base[1:3], "big"), 3
+            elif base[0] == 0xDF:
+                elementos, inicio = int.from_bytes(base[1:5], "big"), 5
+            else:
+                elementos, inicio = base[0] & 0x0F, 1
+            packer = msgpack.Packer(default=_por_defecto, use_bin_type=True)
+            partes = [packer.pack_map_header(elementos + len(self._campos)), base[inicio:]]
+            for clave, valor in self._campos.items():
+                partes += [packer.pack(clave), packer.pack(valor)]
+            self._binario = b"".join(partes)
+        return self._binario
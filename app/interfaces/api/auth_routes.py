@@ -262,8 +262,9 @@ def sso_callback(
             FROM [ATISA_Input].dbo.clientes c
             JOIN [ATISA_Input].dbo.clienteSubDepar csd ON c.CIF = csd.cif
             JOIN [ATISA_Input].dbo.SubDepar sd ON sd.codSubDepar = csd.codSubDepar
+            JOIN ceco_subdepar csm ON csm.codSubDepar = sd.codSubDepar AND csm.por_codigo = 1
             JOIN [BI DW RRHH DEV].dbo.HDW_Cecos cc
-                ON SUBSTRING(CAST(cc.CODIDEPAR AS VARCHAR), 24, 6) = RIGHT('000000' + CAST(sd.codSubDepar AS VARCHAR), 6)
+                ON cc.CODIDEPAR = csm.codidepar
                 AND cc.fechafin IS NULL
             JOIN [BI DW RRHH DEV].dbo.Persona per ON per.Numeross = cc.Numeross
             WHERE per.email = :email
@@ -0,0 +1,152 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.database import SessionLocal
+from app.infrastructure.services.asignaciones_empleado_cache import cache_asignaciones
+from app.infrastructure.services.buscador_clientes import buscador_clientes
+from app.infrastructure.services.cliente_departamento_index import indice_cliente_departamento
+from app.infrastructure.services.directorio_personas import directorio_personas
+from app.infrastructure.services.indice_rutas_eventos import indice_rutas_eventos
+from app.infrastructure.services.invalidacion_caches import invalidacion_caches
+from app.interfaces.api.api_key_guard import verificar_admin_key
+
+# Las invalidaciones y recargas se aplican en el worker que atiende la petición y se propagan a
+# los demás por el broker de eventos (invalidacion_caches); la respuesta indica si se propagaron.
+router = APIRouter(prefix="/admin/cache", tags=["Admin API"], dependencies=[Depends(verificar_admin_key)])
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _con_sesion(accion):
+    db = SessionLocal()
+    try:
+        return accion(db)
+    finally:
+        db.close()
+
+# — Operaciones recibidas de otros workers —
+# Una recarga completa solo invalida el índice en los demás workers (se recarga en su próxima
+# consulta) para no lanzar la misma carga masiva en todos a la vez.
+
+def _refrescar_indice_clientes(idcliente=None):
+    if idcliente:
+        _con_sesion(lambda db: indice_cliente_departamento.refrescar_clientes(db, idcliente))
+    else:
+        indice_cliente_departamento.invalidar()
+
+def _refrescar_directorio(numeross=None):
+    if numeross:
+        _con_sesion(lambda db: directorio_personas.refrescar_numeross(db, numeross))
+    else:
+        directorio_personas.invalidar()
+
+def _refrescar_buscador(idcliente=None):
+    if idcliente:
+        _con_sesion(lambda db: buscador_clientes.refrescar_clientes(db, idcliente))
+    else:
+        buscador_clientes.invalidar()
+
+invalidacion_caches.registrar("asignaciones.invalidar", lambda email=None: cache_asignaciones.invalidar(email))
+invalidacion_caches.registrar("clientes_departamentos.refrescar", _refrescar_indice_clientes)
+invalidacion_caches.registrar("personas.refrescar", _refrescar_directorio)
+invalidacion_caches.registrar("clientes_buscador.refrescar", _refrescar_buscador)
+invalidacion_caches.registrar("rutas_eventos.refrescar", lambda: indice_rutas_eventos.invalidar())
+
+@router.get("/asignaciones",
+    summary="Estado de la caché de asignaciones",
+    description="Devuelve el número de empleados en caché, el TTL configurado y los aciertos/fallos acumulados.")
+def estado_cache_asignaciones():
+    return cache_asignaciones.estadisticas()
+
+@router.delete("/asignaciones",
+    summary="Invalidar la caché de asignaciones",
+    description="Descarta las asignaciones (clientes y subdepartamentos) en caché de un empleado o, sin email, de todos.")
+def invalidar_cache_asignaciones(
+    email: Optional[str] = Query(None, description="Email del empleado. Sin email se invalida toda la caché")
+):
+    eliminadas = cache_asignaciones.invalidar(email)
+    propagada = invalidacion_caches.propagar("asignaciones.invalidar", email=email)
+    return {"invalidadas": eliminadas, "email": email, "propagada": propagada}
+
+@router.post("/asignaciones/precargar",
+    summary="Precargar la caché de asignaciones",
+    description="Carga las asignaciones de todos los empleados con consultas masivas (útil tras refrescar empleado_cliente). "
+                "Los demás workers solo invalidan su caché y la cargan bajo demanda.")
+def precargar_cache_asignaciones(db: Session = Depends(get_db)):
+    precargadas = cache_asignaciones.precargar(db)
+    return {"precargadas": precargadas, "propagada": invalidacion_caches.propagar("asignaciones.invalidar", email=None)}
+
+@router.get("/clientes-departamentos",
+    summary="Estado del índice cliente-departamentos",
+    description="Devuelve el número de clientes y CIF indexados, el TTL y la antigüedad de la última carga completa.")
+def estado_indice_clientes_departamentos():
+    return indice_cliente_departamento.estadisticas()
+
+@router.post("/clientes-departamentos/refrescar",
+    summary="Refrescar el índice cliente-departamentos",
+    description="Sin clientes recarga el índice completo; con idcliente (repetible) recarga solo esos clientes.")
+def refrescar_indice_clientes_departamentos(
+    idcliente: Optional[List[str]] = Query(None, description="Clientes a recargar. Sin valor se recarga todo el índice"),
+    db: Session = Depends(get_db)
+):
+    propagada = invalidacion_caches.propagar("clientes_departamentos.refrescar", idcliente=idcliente)
+    if idcliente:
+        indice_cliente_departamento.refrescar_clientes(db, idcliente)
+        return {"refrescados": len(set(idcliente)), "propagada": propagada}
+    return {**indice_cliente_departamento.cargar(db), "propagada": propagada}
+
+@router.get("/personas",
+    summary="Estado del directorio de personas",
+    description="Devuelve el número de personas (y en activo) del directorio, el TTL y la antigüedad de la última carga completa.")
+def estado_directorio_personas():
+    return directorio_personas.estadisticas()
+
+@router.post("/personas/refrescar",
+    summary="Refrescar el directorio de personas",
+    description="Sin numeross recarga el directorio completo; con numeross (repetible) recarga solo esas personas.")
+def refrescar_directorio_personas(
+    numeross: Optional[List[str]] = Query(None, description="Personas a recargar. Sin valor se recarga todo el directorio"),
+    db: Session = Depends(get_db)
+):
+    propagada = invalidacion_caches.propagar("personas.refrescar", numeross=numeross)
+    if numeross:
+        directorio_personas.refrescar_numeross(db, numeross)
+        return {"refrescadas": len(set(numeross)), "propagada": propagada}
+    return {**directorio_personas.cargar(db), "propagada": propagada}
+
+@router.get("/clientes-buscador",
+    summary="Estado del buscador de clientes",
+    description="Devuelve el número de clientes y trigramas indexados, las entradas anuladas pendientes de compactar, el TTL y la antigüedad de la carga.")
+def estado_buscador_clientes():
+    return buscador_clientes.estadisticas()
+
+@router.post("/clientes-buscador/refrescar",
+    summary="Refrescar el buscador de clientes",
+    description="Sin clientes reconstruye el índice completo; con idcliente (repetible) reindexa solo esos clientes.")
+def refrescar_buscador_clientes(
+    idcliente: Optional[List[str]] = Query(None, description="Clientes a reindexar. Sin valor se reconstruye todo el índice"),
+    db: Session = Depends(get_db)
+):
+    propagada = invalidacion_caches.propagar("clientes_buscador.refrescar", idcliente=idcliente)
+    if idcliente:
+        buscador_clientes.refrescar_clientes(db, idcliente)
+        return {"refrescados": len(set(idcliente)), "propagada": propagada}
+    return {**buscador_clientes.cargar(db), "propagada": propagada}
+
+@router.get("/rutas-eventos",
+    summary="Estado del índice de rutas de eventos",
+    description="Devuelve el número de cliente_proceso, procesos e hitos indexados para enrutar los eventos WebSocket, el TTL y la antigüedad de la carga.")
+def estado_indice_rutas_eventos():
+    return indice_rutas_eventos.estadisticas()
+
+@router.post("/rutas-eventos/refrescar",
+    summary="Refrescar el índice de rutas de eventos",
+    description="Recarga el índice completo (cliente_proceso -> cliente, proceso -> clientes, hito -> procesos y asignaciones directas).")
+def refrescar_indice_rutas_eventos(db: Session = Depends(get_db)):
+    propagada = invalidacion_caches.propagar("rutas_eventos.refrescar")
+    return {**indice_rutas_eventos.cargar(db), "propagada": propagada}
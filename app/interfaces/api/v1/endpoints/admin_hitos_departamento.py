@@ -54,6 +54,26 @@ def listar_hitos_departamentos(
     return repo.listar_hitos_departamentos(mes=mes, anio=anio, cod_subdepar=cod_subdepar)
 
 
+@router.get(
+    "/cambios",
+    summary="Cambios de hitos y cumplimientos desde una versión",
+    description=(
+        "Sincronización incremental de la copia local del frontend: devuelve solo los hitos "
+        "(cliente_proceso_hito) y cumplimientos modificados después de la versión `desde`, y en "
+        "`eliminados` las lápidas de los hitos deshabilitados y de las filas borradas. La primera "
+        "llamada usa desde=0 (o la carga completa habitual); las siguientes, la `version` devuelta. "
+        "Si hay_mas es true, quedan cambios y se vuelve a pedir con esa versión."
+    ),
+)
+def listar_cambios(
+    desde: int = Query(0, ge=0, description="Última versión recibida (0 = desde el principio)"),
+    cod_subdepar: Optional[str] = Query(None, alias="codSubDepar", description="Solo clientes del subdepartamento"),
+    limit: int = Query(5000, ge=1, le=20000, description="Máximo de cambios por llamada"),
+    repo = Depends(get_repo),
+):
+    return repo.listar_cambios(desde=desde, cod_subdepar=cod_subdepar, limit=limit)
+
+
 @router.post(
     "/departamento-hito/{cliente_proceso_hito_id}",
     summary="Actualizar campos de hito por ID de cliente_proceso_hito",
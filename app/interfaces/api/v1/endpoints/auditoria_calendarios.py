@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from sqlalchemy.orm import Session
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from app.infrastructure.db.database import SessionLocal
-from app.infrastructure.db.repositories.auditoria_calendarios_repository_sql import AuditoriaCalendariosRepositorySQL
+from app.infrastructure.db.repositories.auditoria_calendarios_repository_sql import AuditoriaCalendariosRepositorySQL, FiltrosAuditoria
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, CursorNoValido, Paginacion
 from app.interfaces.schemas.auditoria_calendarios import (
     AuditoriaCalendariosCreate,
     AuditoriaCalendariosUpdate,
@@ -26,33 +27,18 @@ def get_repo(db: Session = Depends(get_db)):
     return AuditoriaCalendariosRepositorySQL(db)
 
 
-def _sort_and_paginate(items: list, sort_field, sort_direction, page, limit):
-    """Ordena y pagina una lista de dicts."""
-    total = len(items)
-    if sort_field and items and sort_field in items[0]:
-        reverse = sort_direction == "desc"
-
-        def sort_key(a):
-            value = a.get(sort_field)
-            if sort_field in ["id", "hito_id"]:
-                try:
-                    return int(value) if value is not None else (-1 if not reverse else float('inf'))
-                except (ValueError, TypeError):
-                    return -1 if not reverse else float('inf')
-            elif sort_field in ["fecha_modificacion", "created_at", "updated_at"]:
-                if value is None:
-                    return -1 if not reverse else float('inf')
-                return value.timestamp() if hasattr(value, 'timestamp') else (-1 if not reverse else float('inf'))
-            else:
-                return str(value).lower() if value is not None else ""
-
-        items.sort(key=sort_key, reverse=reverse)
-
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        items = items[start:start + limit]
-
-    return total, items
+def _buscar(repo, filtros: FiltrosAuditoria, paginacion: Paginacion, cursor, con_total: bool, mensaje_error: str):
+    try:
+        resultado = repo.buscar(filtros, paginacion, cursor, con_total)
+    except (CampoOrdenNoPermitido, CursorNoValido) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"{mensaje_error}: {str(e)}")
+    return {
+        "total": resultado["total"],
+        "auditoria_calendarios": resultado["items"],
+        "siguiente_cursor": resultado["siguiente_cursor"],
+    }
 
 
 @router.post("",
@@ -80,39 +66,45 @@ def crear(data: AuditoriaCalendariosCreate, repo=Depends(get_repo)):
 
 @router.get("",
             summary="Listar registros de auditoría",
-            description="Devuelve todos los registros de auditoría enriquecidos con hito, proceso, departamento, tipo y momento del cambio.")
+            description="Devuelve los registros de auditoría enriquecidos con hito, proceso, departamento, tipo y momento del cambio. "
+                        "Los filtros se aplican en la consulta. Ordenando por fecha_modificacion (por defecto) se puede paginar "
+                        "con el cursor devuelto en siguiente_cursor en lugar de page.")
 def listar(
     page: Optional[int] = Query(None, ge=1, description="Página actual"),
     limit: Optional[int] = Query(None, ge=1, le=10000, description="Resultados por página"),
     sort_field: Optional[str] = Query(None, description="Campo por el cual ordenar"),
     sort_direction: Optional[str] = Query("desc", regex="^(asc|desc)$", description="asc o desc"),
+    cliente_id: Optional[str] = Query(None, description="Filtrar por cliente"),
+    hito_id: Optional[int] = Query(None, description="Filtrar por hito del calendario (cliente_proceso_hito)"),
+    usuario: Optional[str] = Query(None, description="Filtrar por usuario (numeross) que hizo el cambio"),
+    campo_modificado: Optional[str] = Query(None, description="Filtrar por campo modificado"),
+    motivo: Optional[int] = Query(None, description="Filtrar por motivo (1-4)"),
+    fecha_desde: Optional[date] = Query(None, description="Modificaciones desde esta fecha (incluida)"),
+    fecha_hasta: Optional[date] = Query(None, description="Modificaciones hasta esta fecha (incluida)"),
+    cursor: Optional[str] = Query(None, description="Cursor de siguiente_cursor para continuar tras la última fila"),
+    con_total: bool = Query(True, description="Calcular el total de registros que cumplen los filtros"),
     repo=Depends(get_repo)
 ):
-    try:
-        auditorias = repo.listar()
-        total, auditorias = _sort_and_paginate(auditorias, sort_field, sort_direction, page, limit)
-        return {"total": total, "auditoria_calendarios": auditorias}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al listar auditorias: {str(e)}")
+    filtros = FiltrosAuditoria(cliente_id, hito_id, usuario, campo_modificado, motivo, fecha_desde, fecha_hasta)
+    return _buscar(repo, filtros, Paginacion(page, limit, sort_field, sort_direction), cursor, con_total,
+                   "Error al listar auditorias")
 
 
 @router.get("/cliente/{cliente_id}",
             summary="Obtener auditoría de un cliente",
-            description="Devuelve todos los registros de auditoría de un cliente con información completa.")
+            description="Devuelve los registros de auditoría de un cliente con información completa.")
 def obtener_por_cliente(
     cliente_id: str = Path(..., description="ID del cliente"),
     page: Optional[int] = Query(None, ge=1),
     limit: Optional[int] = Query(None, ge=1, le=10000),
     sort_field: Optional[str] = Query(None),
     sort_direction: Optional[str] = Query("desc", regex="^(asc|desc)$"),
+    cursor: Optional[str] = Query(None),
+    con_total: bool = Query(True),
     repo=Depends(get_repo)
 ):
-    try:
-        auditorias = repo.obtener_por_cliente(cliente_id)
-        total, auditorias = _sort_and_paginate(auditorias, sort_field, sort_direction, page, limit)
-        return {"total": total, "auditoria_calendarios": auditorias}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al obtener auditorías del cliente: {str(e)}")
+    return _buscar(repo, FiltrosAuditoria(cliente_id=cliente_id), Paginacion(page, limit, sort_field, sort_direction),
+                   cursor, con_total, "Error al obtener auditorías del cliente")
 
 
 @router.get("/hito/{id_hito}",
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.cliente_repository_sql import ClienteRepositorySQL
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, Paginacion
 from app.application.use_cases.clientes.listar_clientes_por_hito import listar_clientes_por_hito
 
 router = APIRouter(prefix="/clientes", tags=["Cliente"])
@@ -28,34 +29,10 @@ def get_clientes_por_hito(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    clientes = listar_clientes_por_hito(repo, hito_id)
-    total = len(clientes)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(clientes[0] if clientes else None, sort_field):
-        reverse = sort_direction == "desc"
-
-        # Función de ordenación que maneja valores None
-        def sort_key(cliente):
-            value = getattr(cliente, sort_field, None)
-            if value is None:
-                return ""  # Los valores None van al final
-            # Si es numérico (como idcliente), convertir a número para ordenación correcta
-            if sort_field == "idcliente":
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return 0
-            # Para campos de texto, convertir a minúsculas para ordenación insensible a mayúsculas
-            return str(value).lower()
-
-        clientes.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        clientes = clientes[start:end]
+    try:
+        total, clientes = listar_clientes_por_hito(repo, hito_id, Paginacion(page, limit, sort_field, sort_direction))
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not clientes:
         raise HTTPException(status_code=404, detail=f"No se encontraron clientes con el hito {hito_id}")
@@ -74,34 +51,10 @@ def obtener_todos(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    clientes = repo.listar()
-    total = len(clientes)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(clientes[0] if clientes else None, sort_field):
-        reverse = sort_direction == "desc"
-
-        # Función de ordenación que maneja valores None
-        def sort_key(cliente):
-            value = getattr(cliente, sort_field, None)
-            if value is None:
-                return ""  # Los valores None van al final
-            # Si es numérico (como idcliente), convertir a número para ordenación correcta
-            if sort_field == "idcliente":
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return 0
-            # Para campos de texto, convertir a minúsculas para ordenación insensible a mayúsculas
-            return str(value).lower()
-
-        clientes.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación después de ordenar
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        clientes = clientes[start:end]
+    try:
+        total, clientes = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction))
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not clientes:
         raise HTTPException(status_code=404, detail="No se encontraron clientes")
@@ -135,6 +88,20 @@ def buscar_nombre(
         raise HTTPException(status_code=404, detail="No se encontraron clientes con ese nombre")
     return clientes
 
+@router.get("/buscar", summary="Autocompletar clientes",
+    description="Devuelve los clientes que mejor encajan con el texto (razón social, CIF o ID), sin distinguir mayúsculas ni acentos. "
+                "Pensado para el selector de clientes: se resuelve sobre un índice en memoria.")
+def autocompletar_clientes(
+    q: str = Query(..., min_length=1, description="Texto tecleado"),
+    limite: int = Query(10, ge=1, le=50, description="Número máximo de clientes devueltos"),
+    repo = Depends(get_repo)
+):
+    clientes = repo.autocompletar(q, limite)
+    return {
+        "total": len(clientes),
+        "clientes": clientes
+    }
+
 @router.get("/cif/{cif}", summary="Buscar cliente por CIF",
     description="Busca un cliente específico por su CIF.")
 def buscar_cif(
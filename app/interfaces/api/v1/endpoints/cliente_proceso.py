@@ -7,6 +7,7 @@ from app.infrastructure.db.repositories.cliente_proceso_repository_sql import Cl
 from app.infrastructure.db.repositories.proceso_repository_sql import ProcesoRepositorySQL
 from app.infrastructure.db.repositories.proceso_hito_maestro_repository_sql import ProcesoHitoMaestroRepositorySQL
 from app.infrastructure.db.repositories.cliente_proceso_hito_repository_sql import ClienteProcesoHitoRepositorySQL
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, Paginacion
 
 from app.application.use_cases.cliente_proceso.crear_cliente_proceso import crear_cliente_proceso
 from app.application.use_cases.cliente_proceso.generar_calendario_cliente_proceso import generar_calendario_cliente_proceso
@@ -45,30 +46,10 @@ def listar(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    items = repo.listar()
-    total = len(items)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(items[0] if items else None, sort_field):
-        reverse = sort_direction == "desc"
-        def sort_key(item):
-            val = getattr(item, sort_field, None)
-            if val is None:
-                return ""
-            if sort_field == "id":
-                try:
-                    return int(val)
-                except (ValueError, TypeError):
-                    return 0
-            return str(val).lower() if isinstance(val, str) else val
-
-        items.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        items = items[start:end]
+    try:
+        total, items = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction))
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "total": total,
@@ -90,29 +71,10 @@ def get_por_cliente(cliente_id: str,
                     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
                     repo = Depends(get_repo)):
 
-    cliente_procesos = repo.listar_por_cliente(cliente_id)
-    total = len(cliente_procesos)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(cliente_procesos[0] if cliente_procesos else None, sort_field):
-        reverse = sort_direction == "desc"
-        def sort_key(item):
-            val = getattr(item, sort_field, None)
-            if val is None:
-                return ""
-            if sort_field == "id":
-                try:
-                    return int(val)
-                except (ValueError, TypeError):
-                    return 0
-            return str(val).lower() if isinstance(val, str) else val
-
-        cliente_procesos.sort(key=sort_key, reverse=reverse)
-
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        cliente_procesos = cliente_procesos[start:end]
+    try:
+        total, cliente_procesos = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction), cliente_id)
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "clienteProcesos" : cliente_procesos,
@@ -128,29 +90,10 @@ def listar_habilitados(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    items = repo.listar_habilitados()
-    total = len(items)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(items[0] if items else None, sort_field):
-        reverse = sort_direction == "desc"
-        def sort_key(item):
-            val = getattr(item, sort_field, None)
-            if val is None:
-                return ""
-            if sort_field == "id":
-                try:
-                    return int(val)
-                except (ValueError, TypeError):
-                    return 0
-            return str(val).lower() if isinstance(val, str) else val
-
-        items.sort(key=sort_key, reverse=reverse)
-
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        items = items[start:end]
+    try:
+        total, items = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction), solo_habilitados=True)
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "total": total,
@@ -167,29 +110,10 @@ def get_habilitados_por_cliente(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    cliente_procesos = repo.listar_habilitados_por_cliente(cliente_id)
-    total = len(cliente_procesos)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(cliente_procesos[0] if cliente_procesos else None, sort_field):
-        reverse = sort_direction == "desc"
-        def sort_key(item):
-            val = getattr(item, sort_field, None)
-            if val is None:
-                return ""
-            if sort_field == "id":
-                try:
-                    return int(val)
-                except (ValueError, TypeError):
-                    return 0
-            return str(val).lower() if isinstance(val, str) else val
-
-        cliente_procesos.sort(key=sort_key, reverse=reverse)
-
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        cliente_procesos = cliente_procesos[start:end]
+    try:
+        total, cliente_procesos = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction), cliente_id, solo_habilitados=True)
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "clienteProcesos": cliente_procesos,
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Path, Query
 from fastapi.responses import StreamingResponse
-from app.application.services.cliente_proceso_hito_status_service import ClienteProcesoHitoStatusService
+from app.application.services.cliente_proceso_hito_status_service import (
+    ClienteProcesoHitoStatusService, parsear_campos_reporte, CAMPOS_REPORTE_STATUS_USUARIO
+)
+from app.application.services.exportadores_status.factory import FORMATOS_EXPORTACION
 from typing import Optional, List
 from datetime import date
 from sqlalchemy.orm import Session
@@ -8,6 +11,12 @@ from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.cliente_proceso_hito_repository_sql import ClienteProcesoHitoRepositorySQL
 from app.application.use_cases.cliente_proceso_hito.actualizar_fecha_masivo import actualizar_fecha_masivo
 from app.interfaces.schemas.cliente_proceso_hito_api import UpdateFechaMasivoRequest, UpdateDeshabilitarHitoRequest
+from app.application.services.reporte_status_streaming import (
+    FORMATOS_STREAMING,
+    generar_reporte_streaming,
+    nombre_fichero_streaming,
+    servicio_status,
+)
 
 from app.domain.entities.cliente_proceso_hito import ClienteProcesoHito
 
@@ -54,8 +63,8 @@ def crear(
 @router.get("/filtros", summary="Obtener filtros disponibles",
     description="Devuelve la lista de procesos e hitos disponibles para el mes, año y cliente seleccionados.")
 def obtener_filtros(
-    anio: int = Query(..., description="Año a filtrar"),
-    mes: int = Query(..., description="Mes a filtrar"),
+    anio: int = Query(..., ge=2000, le=2100, description="Año a filtrar"),
+    mes: int = Query(..., ge=1, le=12, description="Mes a filtrar (1-12)"),
     cliente_id: Optional[str] = Query(None, description="Cliente a filtrar"),
     repo = Depends(get_repo)
 ):
@@ -65,8 +74,8 @@ def obtener_filtros(
 
     description="Devuelve una lista de IDs de cliente_proceso_hito filtrada por mes y año.")
 def obtener_por_fecha(
-    anio: int = Query(..., description="Año a filtrar (YYYY)"),
-    mes: int = Query(..., description="Mes a filtrar (1-12)"),
+    anio: int = Query(..., ge=2000, le=2100, description="Año a filtrar (YYYY)"),
+    mes: int = Query(..., ge=1, le=12, description="Mes a filtrar (1-12)"),
     cliente_id: Optional[str] = Query(None, description="Filtrar por ID de cliente"),
     proceso_ids: Optional[List[int]] = Query(None, description="Filtrar por lista de IDs de procesos"),
     hito_ids: Optional[List[int]] = Query(None, description="Filtrar por lista de IDs de hitos"),
@@ -123,12 +132,20 @@ def status_todos_clientes_hitos(
     proceso_nombre: Optional[str] = Query(None),
     tipos: Optional[str] = Query(None),
     search_term: Optional[str] = Query(None),
+    estados: Optional[str] = Query(None, description="Filtrar por estados calculados (separados por coma)"),
     sort_by: Optional[str] = Query(None),
     order: Optional[str] = Query("asc"),
     page: int = Query(1, ge=1),
     limit: Optional[int] = Query(100, ge=0),
-    repo: ClienteProcesoHitoRepositorySQL = Depends(get_repo)
+    formato: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$", description="Formato de salida: json, ndjson o csv (estos dos en streaming)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p.ej. id,fecha_limite,estado_calculado o ultimo_cumplimiento.fecha)"),
 ):
+    # Sin Depends(get_service): la rama en streaming abre su propia sesión dentro del generador
+    try:
+        campos = parsear_campos_reporte(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     filtros = {
         "fecha_limite_desde": fecha_limite_desde,
         "fecha_limite_hasta": fecha_limite_hasta,
@@ -138,6 +155,7 @@ def status_todos_clientes_hitos(
         "proceso_nombre": proceso_nombre,
         "tipos": tipos,
         "search_term": search_term,
+        "estados": estados,
         "ordenar_por": sort_by,
         "orden": order
     }
@@ -149,48 +167,20 @@ def status_todos_clientes_hitos(
             "limit": limit
         }
 
-    try:
-        registros, total = repo.ejecutar_reporte_status_todos_clientes_por_usuario(filtros, paginacion, email)
-
-        data = []
-        for r in registros:
-            ultimo_cumplimiento = None
-            if r.cumplimiento_id:
-                ultimo_cumplimiento = {
-                    "id": r.cumplimiento_id,
-                    "fecha": r.cumplimiento_fecha.isoformat() if r.cumplimiento_fecha else None,
-                    "hora": str(r.cumplimiento_hora) if r.cumplimiento_hora else None,
-                    "observacion": r.cumplimiento_observacion,
-                    "usuario": r.cumplimiento_usuario,
-                    "fecha_creacion": r.cumplimiento_fecha_creacion.isoformat() if r.cumplimiento_fecha_creacion else None,
-                    "num_documentos": int(r.num_documentos or 0)
-                }
-
-            item = {
-                "id": r.id,
-                "cliente_proceso_id": r.cliente_proceso_id,
-                "hito_id": r.hito_id,
-                "estado": r.estado,
-                "fecha_estado": r.fecha_estado.isoformat() if r.fecha_estado else None,
-                "fecha_limite": r.fecha_limite.isoformat() if r.fecha_limite else None,
-                "hora_limite": str(r.hora_limite) if r.hora_limite else None,
-                "tipo": r.tipo,
-                "habilitado": bool(r.habilitado),
-                "cliente_id": str(r.cliente_id or ""),
-                "cliente_nombre": str(r.cliente_nombre or "").strip(),
-                "proceso_id": r.proceso_id,
-                "proceso_nombre": str(r.proceso_nombre or "").strip(),
-                "hito_nombre": str(r.hito_nombre or "").strip(),
-                "obligatorio": bool(getattr(r, 'hito_obligatorio', 0) == 1),
-                "critico": bool(getattr(r, 'hito_critico', False)),
-                "ultimo_cumplimiento": ultimo_cumplimiento
+    if formato in FORMATOS_STREAMING:
+        return StreamingResponse(
+            generar_reporte_streaming(formato, filtros, paginacion, email, campos),
+            media_type=FORMATOS_STREAMING[formato][0],
+            headers={
+                "Content-Disposition": f'attachment; filename={nombre_fichero_streaming("status_mis_clientes", formato)}',
+                "Access-Control-Expose-Headers": "Content-Disposition"
             }
-            data.append(item)
+        )
 
-        return {
-            "hitos": data,
-            "total": total
-        }
+    try:
+        # Sin fields se devuelven los campos habituales de este listado (sin departamentos)
+        with servicio_status() as service:
+            return service.obtener_reporte_status_por_usuario(filtros, paginacion, email, campos or CAMPOS_REPORTE_STATUS_USUARIO)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener reporte: {str(e)}")
 
@@ -208,6 +198,7 @@ def exportar_status_todos_excel_por_usuario(
     tipos: Optional[str] = Query(None),
     search_term: Optional[str] = Query(None),
     estados: Optional[str] = Query(None, description="Filtrar por estados (separados por coma)"),
+    formato: str = Query("xlsx", alias="format", pattern="^(xlsx|csv|json)$", description="Formato del fichero: xlsx, csv o json"),
     service: ClienteProcesoHitoStatusService = Depends(get_service)
 ):
     try:
@@ -223,13 +214,14 @@ def exportar_status_todos_excel_por_usuario(
             "estados": estados
         }
 
-        output = service.exportar_reporte_excel_por_usuario(filtros, email)
+        output = service.exportar_reporte_excel_por_usuario(filtros, email, formato)
 
         from datetime import datetime
-        filename = f"status_mis_clientes_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+        exportador = FORMATOS_EXPORTACION[formato]
+        filename = f"status_mis_clientes_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{exportador.extension}"
         return StreamingResponse(
             output,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            media_type=exportador.media_type,
             headers={
                 "Content-Disposition": f'attachment; filename={filename}',
                 "Access-Control-Expose-Headers": "Content-Disposition"
@@ -6,6 +6,7 @@ from datetime import datetime, date
 from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.cliente_proceso_hito_cumplimiento_repository_sql import ClienteProcesoHitoCumplimientoRepositorySQL
 from app.infrastructure.db.repositories.cliente_proceso_hito_repository_sql import ClienteProcesoHitoRepositorySQL
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, Paginacion
 
 from app.domain.entities.cliente_proceso_hito_cumplimiento import ClienteProcesoHitoCumplimiento
 
@@ -24,6 +25,27 @@ def get_repo(db: Session = Depends(get_db)):
 def get_repo_cliente_proceso_hito(db: Session = Depends(get_db)):
     return ClienteProcesoHitoRepositorySQL(db)
 
+CAMPOS_CUMPLIMIENTO = [
+    "id", "cliente_proceso_hito_id", "fecha", "hora", "observacion", "usuario",
+    "fecha_creacion", "codSubDepar", "departamento", "num_documentos",
+]
+
+CAMPOS_HISTORIAL = [
+    "id", "fecha", "hora", "usuario", "observacion", "fecha_creacion", "codSubDepar", "departamento",
+    "proceso_id", "proceso", "proceso_fecha_inicio", "proceso_fecha_fin", "proceso_periodo",
+    "proceso_estado", "cliente_proceso_id", "hito_id", "hito", "fecha_limite", "hora_limite", "num_documentos",
+]
+
+def parsear_fields(fields: Optional[str], permitidos: list) -> Optional[set]:
+    """Campos pedidos en el parámetro fields (None = todos); 400 si alguno no existe."""
+    if not fields or not fields.strip():
+        return None
+    campos = {campo.strip() for campo in fields.split(",") if campo.strip()}
+    desconocidos = campos - set(permitidos)
+    if desconocidos:
+        raise HTTPException(status_code=400, detail=f"Campos no válidos: {', '.join(sorted(desconocidos))}")
+    return campos
+
 @router.post("", summary="Crear cumplimiento de hito",
     description="Registra el cumplimiento de un hito específico de un proceso de cliente.")
 def crear(
@@ -72,36 +94,14 @@ def listar(
     limit: Optional[int] = Query(None, ge=1, le=10000, description="Cantidad de resultados por página (máximo 10000)"),
     sort_field: Optional[str] = Query(None, description="Campo por el cual ordenar (id, cliente_proceso_hito_id, fecha, hora, observacion, usuario)"),
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p.ej. id,fecha,usuario). Por defecto, todos"),
     repo = Depends(get_repo)
 ):
-    cumplimientos = repo.listar()
-    total = len(cumplimientos)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(cumplimientos[0] if cumplimientos else None, sort_field):
-        reverse = sort_direction == "desc"
-
-        # Función de ordenación que maneja valores None
-        def sort_key(cumplimiento):
-            value = getattr(cumplimiento, sort_field, None)
-            if value is None:
-                return ""  # Los valores None van al final
-            # Si es numérico (como id, cliente_proceso_hito_id), convertir a número para ordenación correcta
-            if sort_field in ["id", "cliente_proceso_hito_id"]:
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return 0
-            # Para campos de texto/fecha/hora, convertir a string para ordenación
-            return str(value).lower() if isinstance(value, str) else str(value)
-
-        cumplimientos.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación después de ordenar
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        cumplimientos = cumplimientos[start:end]
+    campos = parsear_fields(fields, CAMPOS_CUMPLIMIENTO)
+    try:
+        total, cumplimientos = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction), campos)
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not cumplimientos:
         raise HTTPException(status_code=404, detail="No se encontraron cumplimientos")
@@ -121,6 +121,8 @@ def listar(
             "departamento": getattr(cumplimiento, 'departamento', None),
             "num_documentos": getattr(cumplimiento, 'num_documentos', 0)
         }
+        if campos is not None:
+            cumplimiento_dict = {clave: valor for clave, valor in cumplimiento_dict.items() if clave in campos}
         cumplimientos_dict.append(cumplimiento_dict)
 
     return {
@@ -297,11 +299,14 @@ def obtener_historial_por_cliente(
     limit: Optional[int] = Query(None, ge=1, le=10000, description="Cantidad de resultados por página (máximo 10000)"),
     sort_field: Optional[str] = Query(None, description="Campo por el cual ordenar"),
     sort_direction: Optional[str] = Query("desc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p.ej. id,fecha,proceso,hito). Por defecto, todos"),
     repo = Depends(get_repo)
 ):
     try:
+        campos = parsear_fields(fields, CAMPOS_HISTORIAL)
+
         # Obtener el historial completo del cliente
-        historial_raw = repo.obtener_historial_por_cliente_id(cliente_id)
+        historial_raw = repo.obtener_historial_por_cliente_id(cliente_id, campos=campos)
 
         # Convertir los resultados a diccionarios para facilitar el manejo
         historial = []
@@ -316,7 +321,7 @@ def obtener_historial_por_cliente(
                 if p_fin:
                     periodo += f" - {p_fin.strftime('%d/%m/%Y')}"
 
-            historial.append({
+            item = {
                 "id": row.id,
                 "fecha": row.fecha.isoformat() if row.fecha else None,
                 "hora": str(row.hora) if row.hora else None,
@@ -324,7 +329,7 @@ def obtener_historial_por_cliente(
                 "observacion": row.observacion,
                 "fecha_creacion": row.fecha_creacion.isoformat() if row.fecha_creacion else None,
                 "codSubDepar": row.codSubDepar,
-                "departamento": row.departamento,
+                "departamento": getattr(row, 'departamento', None),
                 "proceso_id": row.proceso_id,
                 "proceso": row.proceso,
                 "proceso_fecha_inicio": p_inicio.isoformat() if p_inicio else None,
@@ -337,7 +342,10 @@ def obtener_historial_por_cliente(
                 "fecha_limite": row.fecha_limite.isoformat() if row.fecha_limite else None,
                 "hora_limite": str(row.hora_limite) if row.hora_limite else None,
                 "num_documentos": getattr(row, 'num_documentos', 0) or 0
-            })
+            }
+            if campos is not None:
+                item = {clave: valor for clave, valor in item.items() if clave in campos}
+            historial.append(item)
 
         total = len(historial)
 
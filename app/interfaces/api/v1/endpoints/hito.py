@@ -1,11 +1,11 @@
 from typing import Optional
-from datetime import datetime, date
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body
 from sqlalchemy.orm import Session
 from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.hito_repository_sql import HitoRepositorySQL
 from app.infrastructure.db.repositories.cliente_proceso_hito_repository_sql import ClienteProcesoHitoRepositorySQL
 from app.infrastructure.db.repositories.proceso_hito_maestro_repository_sql import ProcesoHitoMaestroRepositorySQL
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, Paginacion
 
 from app.domain.entities.hito import Hito
 from app.application.use_cases.hitos.update_hito import actualizar_hito
@@ -91,54 +91,10 @@ def listar(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    hitos = repo.listar()
-    total = len(hitos)
-
-    # Aplicar ordenación si se especifica y hay datos para ordenar
-    if sort_field and hitos and hasattr(hitos[0], sort_field):
-        reverse = sort_direction == "desc"
-
-        # Función de ordenación que maneja valores None
-        def sort_key(hito):
-            value = getattr(hito, sort_field, None)
-
-            # Manejo especial para diferentes tipos de campos
-            if sort_field in ["id", "frecuencia", "obligatorio"]:
-                if value is None:
-                    return -1 if not reverse else float('inf')  # None al inicio en asc, al final en desc
-                try:
-                    return int(value)
-                except (ValueError, TypeError):
-                    return -1 if not reverse else float('inf')
-
-            elif sort_field in ["fecha_inicio", "fecha_fin"]:
-                if value is None:
-                    return -1 if not reverse else float('inf')  # None al inicio en asc, al final en desc
-                try:
-                    # Convertir fecha a timestamp para ordenación
-                    if isinstance(value, str):
-                        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
-                    elif isinstance(value, date):
-                        return datetime.combine(value, datetime.min.time()).timestamp()
-                    elif hasattr(value, 'timestamp'):
-                        return value.timestamp()
-                    else:
-                        return -1 if not reverse else float('inf')
-                except (ValueError, TypeError):
-                    return -1 if not reverse else float('inf')
-            else:
-                # Para campos de texto
-                if value is None:
-                    return ""  # Strings vacíos van al principio alfabéticamente
-                return str(value).lower()
-
-        hitos.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación después de ordenar
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        hitos = hitos[start:end]
+    try:
+        total, hitos = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction))
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Devolver respuesta exitosa incluso si no hay hitos después de la paginación
     return {
@@ -7,7 +7,7 @@ from app.domain.entities.metadato import Metadato
 from app.infrastructure.db.repositories.metadato_repositoy_sql import SQLMetadatoRepository
 from app.infrastructure.db.repositories.metadatos_area_repository_sql import SQLMetadatosAreaRepository
 from app.application.use_cases.metadato.obtener_metadatos_visibles import ObtenerMetadatosVisibles
-from app.infrastructure.services.empleado_subdepar_provider import EmpleadoSubDeparProvider
+from app.infrastructure.services.asignaciones_empleado_cache import EmpleadoSubDeparProviderCacheado
 
 router = APIRouter(prefix="/metadatos", tags=["Metadatos"])
 
@@ -73,7 +73,7 @@ def obtener_metadatos_visibles(
 ):
     metadato_repo = SQLMetadatoRepository(db)
     area_repo = SQLMetadatosAreaRepository(db)
-    subdepar_provider = EmpleadoSubDeparProvider(db)
+    subdepar_provider = EmpleadoSubDeparProviderCacheado(db)
     use_case = ObtenerMetadatosVisibles(metadato_repo, area_repo, subdepar_provider)
     return use_case.execute(email)
 
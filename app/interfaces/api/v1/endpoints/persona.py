@@ -3,9 +3,8 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.persona_repository_sql import PersonaRepositorySQL
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, Paginacion
 from app.interfaces.schemas.persona import PersonaResponse
-
-
 from app.infrastructure.db.repositories.api_rol_repository_sql import SqlApiRolRepository
 
 router = APIRouter(prefix="/personas", tags=["Persona"])
@@ -20,20 +19,14 @@ def get_db():
 def get_repo(db: Session = Depends(get_db)):
     return PersonaRepositorySQL(db)
 
-def _enrich_persona_with_admin_status(persona, db: Session):
-    if persona and persona.email:
-        # Populate admin status and id_api_rol from new ApiRol repository
-        repo_rol = SqlApiRolRepository(db)
-        rol = repo_rol.buscar_por_email(persona.email)
-
-        if rol:
-            persona.admin = rol.admin
-            persona.id_api_rol = rol.id
-        else:
-            persona.admin = False
-            persona.id_api_rol = None
-
-    return persona
+def _enriquecer_con_rol(personas, db: Session):
+    """Rellena admin e id_api_rol de las personas con una única consulta a api_roles."""
+    roles = SqlApiRolRepository(db).buscar_por_emails(p.email for p in personas if p.email)
+    for persona in personas:
+        rol = roles.get(persona.email.strip().lower()) if persona.email else None
+        persona.admin = rol.admin if rol else False
+        persona.id_api_rol = rol.id if rol else None
+    return personas
 
 @router.get("", summary="Listar personas",
     description="Devuelve la lista completa de personas desde la tabla externa, con paginación y ordenación.")
@@ -45,41 +38,13 @@ def listar_personas(
     repo: PersonaRepositorySQL = Depends(get_repo),
     db: Session = Depends(get_db)
 ):
-    personas = repo.listar()
-    total = len(personas)
-
-    # Aplicar ordenación si se especifica
-    if sort_field and hasattr(personas[0] if personas else None, sort_field):
-        reverse = sort_direction == "desc"
-
-        def sort_key(persona):
-            value = getattr(persona, sort_field, None)
-            if value is None:
-                return ""
-            return str(value).lower()
-
-        personas.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        personas = personas[start:end]
-
-    # Enrich with admin status only for the returning page
-
-    repo_rol = SqlApiRolRepository(db)
+    try:
+        total, personas = repo.listar_paginado(Paginacion(page, limit, sort_field, sort_direction))
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    for p in personas:
-        if p.email:
-            # Get Admin Status and ID
-            rol = repo_rol.buscar_por_email(p.email)
-            if rol:
-                p.admin = rol.admin
-                p.id_api_rol = rol.id
-            else:
-                p.admin = False
-                p.id_api_rol = None
+    # Roles solo de la página devuelta, en una consulta
+    _enriquecer_con_rol(personas, db)
 
     return {
         "total": total,
@@ -96,7 +61,7 @@ def buscar_por_email(
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
 
-    return _enrich_persona_with_admin_status(persona, db)
+    return _enriquecer_con_rol([persona], db)[0]
 
 @router.get("/nif/{nif}", response_model=PersonaResponse, summary="Buscar persona por NIF")
 def buscar_por_nif(
@@ -108,4 +73,4 @@ def buscar_por_nif(
     if not persona:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
 
-    return _enrich_persona_with_admin_status(persona, db)
+    return _enriquecer_con_rol([persona], db)[0]
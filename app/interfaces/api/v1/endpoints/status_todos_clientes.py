@@ -6,7 +6,14 @@ from sqlalchemy.orm import Session
 
 from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.cliente_proceso_hito_repository_sql import ClienteProcesoHitoRepositorySQL
-from app.application.services.cliente_proceso_hito_status_service import ClienteProcesoHitoStatusService
+from app.application.services.cliente_proceso_hito_status_service import ClienteProcesoHitoStatusService, parsear_campos_reporte
+from app.application.services.exportadores_status.factory import FORMATOS_EXPORTACION
+from app.application.services.reporte_status_streaming import (
+    FORMATOS_STREAMING,
+    generar_reporte_streaming,
+    nombre_fichero_streaming,
+    servicio_status,
+)
 
 router = APIRouter(prefix="/status-todos-clientes", tags=["Status Todos los Clientes"])
 
@@ -35,13 +42,21 @@ def get_status_todos_clientes(
     cliente_id: Optional[str] = Query(None, description="Filtrar por ID de cliente"),
     proceso_id: Optional[int] = Query(None, description="Filtrar por ID de proceso"),
     hito_id: Optional[int] = Query(None, description="Filtrar por ID de hito"),
-    ordenar_por: Optional[str] = Query("fecha_limite", description="Campo para ordenar (fecha_limite, cliente_nombre, proceso_nombre)"),
+    estados: Optional[str] = Query(None, description="Filtrar por estados calculados (separados por coma): cumplido_en_plazo,cumplido_fuera_plazo,vence_hoy,pendiente_fuera_plazo,pendiente_en_plazo"),
+    ordenar_por: Optional[str] = Query("fecha_limite", description="Campo para ordenar (fecha_limite, cliente_nombre, proceso_nombre, estado_calculado)"),
     orden: Optional[str] = Query("asc", description="Orden (asc o desc)"),
     limit: Optional[int] = Query(None, ge=1, le=10000, description="Límite de resultados"),
     offset: Optional[int] = Query(None, ge=0, description="Offset para paginación"),
-    service: ClienteProcesoHitoStatusService = Depends(get_service)
+    formato: str = Query("json", alias="format", pattern="^(json|ndjson|csv)$", description="Formato de salida: json, ndjson o csv (estos dos en streaming)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (p.ej. id,fecha_limite,estado_calculado o ultimo_cumplimiento.fecha). Por defecto, todos"),
 ):
+    # Sin Depends(get_service): la rama en streaming abre su propia sesión dentro del generador
     try:
+        try:
+            campos = parsear_campos_reporte(fields)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         # Validar fechas
         if fecha_limite_desde:
             try:
@@ -61,6 +76,7 @@ def get_status_todos_clientes(
             'cliente_id': cliente_id,
             'proceso_id': proceso_id,
             'hito_id': hito_id,
+            'estados': estados,
             'ordenar_por': ordenar_por,
             'orden': orden
         }
@@ -70,7 +86,18 @@ def get_status_todos_clientes(
             'offset': offset
         }
 
-        return service.obtener_reporte_status(filtros, paginacion)
+        if formato in FORMATOS_STREAMING:
+            return StreamingResponse(
+                generar_reporte_streaming(formato, filtros, paginacion, campos=campos),
+                media_type=FORMATOS_STREAMING[formato][0],
+                headers={
+                    "Content-Disposition": f'attachment; filename={nombre_fichero_streaming("status_todos_clientes", formato)}',
+                    "Access-Control-Expose-Headers": "Content-Disposition"
+                }
+            )
+
+        with servicio_status() as service:
+            return service.obtener_reporte_status(filtros, paginacion, campos)
 
     except HTTPException:
         raise
@@ -78,6 +105,36 @@ def get_status_todos_clientes(
         raise HTTPException(status_code=500, detail=f"Error al obtener hitos: {str(e)}")
 
 
+@router.get("/conteo-estados", summary="Contar hitos por estado calculado",
+            description="Devuelve el número de hitos habilitados por estado calculado (cumplido en plazo, vence hoy, ...) aplicando los mismos filtros que el reporte.")
+def get_conteo_estados(
+    fecha_limite_desde: Optional[date] = Query(None, alias="fecha_desde", description="Filtrar por fecha límite desde (YYYY-MM-DD)"),
+    fecha_limite_hasta: Optional[date] = Query(None, alias="fecha_hasta", description="Filtrar por fecha límite hasta (YYYY-MM-DD)"),
+    cliente_id: Optional[str] = Query(None, description="Filtrar por ID de cliente"),
+    proceso_id: Optional[int] = Query(None, description="Filtrar por ID de proceso"),
+    hito_id: Optional[int] = Query(None, description="Filtrar por ID de hito"),
+    proceso_nombre: Optional[str] = Query(None, description="Filtrar por nombre del proceso"),
+    tipos: Optional[str] = Query(None, description="Filtrar por tipos (separados por coma): Atisa,Cliente,Terceros"),
+    search_term: Optional[str] = Query(None, description="Búsqueda de texto libre en proceso_nombre y hito_nombre"),
+    email: Optional[str] = Query(None, description="Restringir a los clientes asignados a este usuario"),
+    service: ClienteProcesoHitoStatusService = Depends(get_service)
+):
+    try:
+        filtros = {
+            'fecha_limite_desde': fecha_limite_desde,
+            'fecha_limite_hasta': fecha_limite_hasta,
+            'cliente_id': cliente_id,
+            'proceso_id': proceso_id,
+            'hito_id': hito_id,
+            'proceso_nombre': proceso_nombre,
+            'tipos': tipos,
+            'search_term': search_term
+        }
+        return service.obtener_conteo_estados(filtros, email)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error al contar hitos por estado: {str(e)}")
+
+
 @router.get("/exportar-excel", summary="Exportar status de todos los clientes a Excel",
             description="Genera y descarga un archivo Excel con el estado de los hitos filtrados, utilizando colores para indicar el estado de cumplimiento.")
 def exportar_status_todos_excel(
@@ -89,6 +146,7 @@ def exportar_status_todos_excel(
     estados: Optional[str] = Query(None, description="Filtrar por estados (separados por coma): cumplido_en_plazo,cumplido_fuera_plazo,vence_hoy,pendiente_fuera_plazo,pendiente_en_plazo"),
     tipos: Optional[str] = Query(None, description="Filtrar por tipos (separados por coma): Atisa,Cliente,Terceros"),
     search_term: Optional[str] = Query(None, description="Búsqueda de texto libre en proceso_nombre y hito_nombre"),
+    formato: str = Query("xlsx", alias="format", pattern="^(xlsx|csv|json)$", description="Formato del fichero: xlsx, csv o json"),
     service: ClienteProcesoHitoStatusService = Depends(get_service)
 ):
     try:
@@ -116,13 +174,14 @@ def exportar_status_todos_excel(
             'search_term': search_term
         }
 
-        output = service.exportar_reporte_excel(filtros)
+        output = service.exportar_reporte_excel(filtros, formato)
 
         from datetime import datetime
-        filename = f"status_todos_clientes_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.xlsx"
+        exportador = FORMATOS_EXPORTACION[formato]
+        filename = f"status_todos_clientes_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.{exportador.extension}"
         return StreamingResponse(
             output,
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            media_type=exportador.media_type,
             headers={
                 "Content-Disposition": f'attachment; filename={filename}',
                 "Access-Control-Expose-Headers": "Content-Disposition"
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from app.infrastructure.db.database import SessionLocal
 from app.infrastructure.db.repositories.subdepar_repository_sql import SubdeparRepositorySQL
+from app.infrastructure.db.compartido.consulta_paginada import CampoOrdenNoPermitido, Paginacion
 
 router = APIRouter()
 
@@ -25,54 +26,12 @@ def listar(
     sort_direction: Optional[str] = Query("asc", regex="^(asc|desc)$", description="Dirección de ordenación: asc o desc"),
     repo = Depends(get_repo)
 ):
-    subdepartamentos_raw = repo.listar()
-
-    # Agrupar por codSubDepar
-    grouped_data = {}
-    for sub in subdepartamentos_raw:
-        if sub.codSubDepar not in grouped_data:
-            grouped_data[sub.codSubDepar] = {
-                "codSubDepar": sub.codSubDepar,
-                "nombre": sub.nombre, # Asumimos el nombre del primero
-                "cantidad": 0,
-                "items": []
-            }
-        grouped_data[sub.codSubDepar]["items"].append(sub)
-        grouped_data[sub.codSubDepar]["cantidad"] += 1
-
-    # Convertir a lista
-    subdepartamentos_grouped = list(grouped_data.values())
-    total = len(subdepartamentos_grouped)
-
-    # Aplicar ordenación si se especifica (sobre los grupos)
-    if sort_field:
-        reverse = sort_direction == "desc"
-
-        def sort_key(group):
-            # Si el campo existe en el nivel superior del grupo (codSubDepar, nombre, cantidad)
-            if sort_field in group:
-                value = group[sort_field]
-            # Si no, intentamos buscar en el primer item (limitado)
-            elif group["items"] and hasattr(group["items"][0], sort_field):
-                value = getattr(group["items"][0], sort_field, None)
-            else:
-                value = None
-
-            if value is None:
-                return ""
-
-            # Manejo de tipos para ordenación
-            if isinstance(value, (int, float)):
-                return value
-            return str(value).lower()
-
-        subdepartamentos_grouped.sort(key=sort_key, reverse=reverse)
-
-    # Aplicar paginación después de ordenar
-    if page is not None and limit is not None:
-        start = (page - 1) * limit
-        end = start + limit
-        subdepartamentos_grouped = subdepartamentos_grouped[start:end]
+    try:
+        total, subdepartamentos_grouped = repo.listar_agrupado_paginado(
+            Paginacion(page, limit, sort_field, sort_direction)
+        )
+    except CampoOrdenNoPermitido as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not subdepartamentos_grouped and page == 1:
         raise HTTPException(status_code=404, detail="No se encontraron subdepartamentos")
@@ -1,16 +1,30 @@
-from fastapi import WebSocket, WebSocketDisconnect, Depends, status, APIRouter
+from fastapi import WebSocket, WebSocketDisconnect, Depends, Query, status, APIRouter
 from fastapi.exceptions import WebSocketException
 from sqlalchemy.orm import Session
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, Iterable, List, Union
 import json
 import jwt
 from datetime import datetime
 import logging
 import importlib
 import asyncio
+import itertools
+import time
+import uuid
+from collections import deque
 
 from app.config import settings
 from app.infrastructure.db.database import get_db
+from app.interfaces.api.api_key_guard import verificar_admin_key
+from app.infrastructure.services.broker_eventos import crear_broker
+from app.infrastructure.services.tramas_websocket import (
+    FORMATO_JSON,
+    FORMATO_MSGPACK,
+    Trama,
+    TramaAmpliada,
+    TramaLote,
+    formato_disponible,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -53,143 +67,598 @@ DepartamentoModel = _try_import_model(
 # WebSocket router
 router = APIRouter(tags=["WebSockets"])
 
+# Overflow policies for a client whose outbound queue is full
+OVERFLOW_DROP_OLDEST = "descartar_antiguo"   # drop the oldest queued frame
+OVERFLOW_COALESCE = "coalescer"              # replace the backlog with a single resync notice
+OVERFLOW_DISCONNECT = "desconectar"          # close the socket (1013) and let the client reconnect
+
+RESYNC_FRAME = Trama({"tipo": "resync_required", "motivo": "cola_llena"})
+
+# A queued frame: a shared Trama (encoded once per format for every recipient) or a raw text frame
+Frame = Union[Trama, str]
+
+
+class ClientConnection:
+    """
+    A socket with its own bounded outbound queue, drained by a dedicated writer task.
+
+    Producers only append to the queue (O(1)), so a slow or half-dead client never delays
+    delivery to the others: its writer blocks alone and is evicted when a send exceeds
+    `send_timeout` or, with the disconnect policy, when its queue overflows.
+
+    `formato` is the encoding negotiated at connect: JSON text frames or MessagePack binary frames.
+    `channels` are the departments the socket is subscribed to: only `cod_subdepar` for the
+    per-department endpoint, any number for a multiplexed socket (whose frames are tagged with
+    their `canal`).
+    """
+
+    def __init__(self, websocket: WebSocket, client_id: str, cod_subdepar: Optional[str], manager: "ConnectionManager",
+                 formato: str = FORMATO_JSON):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.cod_subdepar = cod_subdepar
+        self.multiplexed = cod_subdepar is None
+        self.channels: set = set()
+        self.manager = manager
+        self.formato = formato
+        self.queue: deque = deque()
+        self.dropped = 0
+        self.last_seen = time.monotonic()
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    def enqueue(self, message: Frame) -> None:
+        if self.closed:
+            return
+        if len(self.queue) >= self.manager.max_queue:
+            policy = self.manager.overflow_policy
+            if policy == OVERFLOW_DISCONNECT:
+                self._drop(len(self.queue) + 1)
+                self.evict(1013, "Client too slow")
+                return
+            if policy == OVERFLOW_COALESCE:
+                self._drop(sum(1 for queued in self.queue if queued is not RESYNC_FRAME))
+                self.queue.clear()
+                self.queue.append(RESYNC_FRAME)
+            else:
+                self.queue.popleft()
+                self._drop(1)
+        self.queue.append(message)
+        self._wakeup.set()
+
+    def _drop(self, count: int) -> None:
+        self.dropped += count
+        self.manager.dropped_frames += count
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self.queue:
+                    message = self.queue.popleft()
+                    await asyncio.wait_for(self._send(message), self.manager.send_timeout)
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"Client {self.client_id} did not accept a frame in {self.manager.send_timeout}s, evicting")
+            self.evict(status.WS_1011_INTERNAL_ERROR, "Send timeout")
+        except Exception as e:
+            logger.error(f"Failed to send message to client {self.client_id}: {e}")
+            self.evict(status.WS_1011_INTERNAL_ERROR, "Send failed")
+
+    def _send(self, message: Frame):
+        if isinstance(message, str):
+            return self.websocket.send_text(message)
+        if self.formato == FORMATO_MSGPACK:
+            return self.websocket.send_bytes(message.binario)
+        return self.websocket.send_text(message.texto)
+
+    def evict(self, code: int, reason: str) -> None:
+        """Stop the writer, unregister the client and close its socket in the background."""
+        if self.closed:
+            return
+        self.closed = True
+        self.manager.evictions += 1
+        self.queue.clear()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self.manager.remove(self)
+        asyncio.get_running_loop().create_task(self._close(code, reason))
+
+    async def _close(self, code: int, reason: str) -> None:
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), self.manager.send_timeout)
+        except Exception:
+            pass
+
+    def stop(self) -> None:
+        """Called on a normal disconnect: the socket is already gone."""
+        self.closed = True
+        self.queue.clear()
+        self._writer.cancel()
+
+
+def _summary(values: Iterable[float]) -> Dict[str, Any]:
+    """p50/p95/max of a sample (gauges of the stats endpoint)."""
+    ordered = sorted(values)
+    if not ordered:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": round(ordered[len(ordered) // 2], 1),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1),
+        "max": round(ordered[-1], 1),
+    }
+
+
+class ChannelLog:
+    """
+    Bounded ring buffer of the events delivered to a channel, numbered with consecutive sequence
+    numbers. `epoch` identifies this log (worker and lifetime): a client's last_seq is only
+    meaningful against the epoch it was received with.
+    """
+
+    def __init__(self, size: int):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.events: deque = deque(maxlen=size)
+
+    def append(self, trama: Trama) -> int:
+        self.seq += 1
+        self.events.append(trama)
+        return self.seq
+
+    def since(self, last_seq: int) -> Optional[List[Trama]]:
+        """Events after last_seq, or None when that gap is no longer (or never was) buffered."""
+        missing = self.seq - last_seq
+        if missing < 0 or missing > len(self.events):
+            return None
+        return list(itertools.islice(self.events, len(self.events) - missing, None))
+
+
 class ConnectionManager:
-    """Manages active WebSocket connections grouped by department code"""
+    """
+    Manages active WebSocket connections grouped by department code.
+
+    `active_connections` indexes sockets by channel, so a broadcast only touches the channel's own
+    subscribers. A socket is either bound to one department (connect) or multiplexed (connect_multiplexed)
+    and subscribed to any number of them with subscribe()/unsubscribe().
+
+    Each channel keeps a ChannelLog so a client that reconnects with its last_seq gets only the
+    events it missed. The channel (broker subscription and log) is kept for `channel_retention`
+    seconds after its last socket leaves, so a short network drop can still be replayed.
+    """
     
-    def __init__(self):
-        # Format: {cod_subdepar: {client_id: WebSocket}}
-        self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
+    def __init__(self, max_queue: int = 256, overflow_policy: str = OVERFLOW_DROP_OLDEST,
+                 send_timeout: float = 10.0, heartbeat_interval: float = 30.0, idle_timeout: float = 0,
+                 log_size: int = 500, channel_retention: float = 0):
+        # Format: {cod_subdepar: {client_id: ClientConnection}}
+        self.active_connections: Dict[str, Dict[str, ClientConnection]] = {}
         self.connection_count = 0
+        self.max_queue = max_queue
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.log_size = log_size
+        self.channel_retention = channel_retention
+        self.logs: Dict[str, ChannelLog] = {}
+        self.replays = 0
+        self.resyncs = 0
+        self.dropped_frames = 0
+        self.evictions = 0
+        self._release_handles: Dict[str, asyncio.TimerHandle] = {}
+        self._by_socket: Dict[int, ClientConnection] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
     
-    async def connect(self, websocket: WebSocket, cod_subdepar: str) -> str:
-        """Connect a client to a specific department channel"""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, cod_subdepar: str, formato: str = FORMATO_JSON) -> str:
+        """Connect a client to a specific department channel, with the frame encoding it negotiated"""
+        connection = await self._accept(websocket, cod_subdepar, formato)
+        self.subscribe(connection, cod_subdepar)
+        
+        logger.info(f"Client {connection.client_id} connected to department {cod_subdepar}")
+        logger.info(f"Active connections: {len(self._by_socket)}")
         
+        return connection.client_id
+
+    async def connect_multiplexed(self, websocket: WebSocket, formato: str = FORMATO_JSON) -> ClientConnection:
+        """Connect a client with no channel yet: it subscribes to departments with control frames"""
+        connection = await self._accept(websocket, None, formato)
+        logger.info(f"Client {connection.client_id} connected (multiplexed)")
+        logger.info(f"Active connections: {len(self._by_socket)}")
+        return connection
+
+    async def _accept(self, websocket: WebSocket, cod_subdepar: Optional[str], formato: str) -> ClientConnection:
+        await websocket.accept()
+
         # Generate unique client ID
         client_id = f"client_{self.connection_count}"
         self.connection_count += 1
-        
-        # Initialize department if not exists
+
+        connection = ClientConnection(websocket, client_id, cod_subdepar, self, formato)
+        self._by_socket[id(websocket)] = connection
+
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        return connection
+
+    def subscribe(self, connection: ClientConnection, cod_subdepar: str) -> None:
+        """Add a socket to a department channel"""
+        if connection.closed:
+            return
+        # Initialize department if not exists (and start receiving its events from other workers,
+        # unless the channel is still retained from its previous sockets)
         if cod_subdepar not in self.active_connections:
             self.active_connections[cod_subdepar] = {}
-        
-        # Add connection to department
-        self.active_connections[cod_subdepar][client_id] = websocket
-        
-        logger.info(f"Client {client_id} connected to department {cod_subdepar}")
-        logger.info(f"Active connections: {sum(len(conns) for conns in self.active_connections.values())}")
-        
-        return client_id
+            handle = self._release_handles.pop(cod_subdepar, None)
+            if handle is not None:
+                handle.cancel()
+            if cod_subdepar not in self.logs:
+                self.logs[cod_subdepar] = ChannelLog(self.log_size)
+                broker.suscribir(cod_subdepar)
+
+        self.active_connections[cod_subdepar][connection.client_id] = connection
+        connection.channels.add(cod_subdepar)
+
+    def unsubscribe(self, connection: ClientConnection, cod_subdepar: str) -> None:
+        """Remove a socket from a department channel"""
+        connection.channels.discard(cod_subdepar)
+        subscribers = self.active_connections.get(cod_subdepar)
+        if subscribers is None or subscribers.pop(connection.client_id, None) is None:
+            return
+
+        # Clean up empty department entries
+        if not subscribers:
+            del self.active_connections[cod_subdepar]
+            self._release_later(cod_subdepar)
     
     def disconnect(self, cod_subdepar: str, client_id: str) -> None:
         """Remove a client connection"""
-        if cod_subdepar in self.active_connections and client_id in self.active_connections[cod_subdepar]:
-            del self.active_connections[cod_subdepar][client_id]
-            
-            # Clean up empty department entries
-            if not self.active_connections[cod_subdepar]:
-                del self.active_connections[cod_subdepar]
-                
-            logger.info(f"Client {client_id} disconnected from department {cod_subdepar}")
-            logger.info(f"Active connections: {sum(len(conns) for conns in self.active_connections.values())}")
+        connection = self.active_connections.get(cod_subdepar, {}).get(client_id)
+        if connection is not None:
+            self.remove(connection)
+
+    def remove(self, connection: ClientConnection) -> None:
+        """Remove a client connection from every channel it is subscribed to"""
+        if self._by_socket.pop(id(connection.websocket), None) is None:
+            return
+        for cod_subdepar in list(connection.channels):
+            self.unsubscribe(connection, cod_subdepar)
+        if not connection.closed:
+            connection.stop()
+
+        logger.info(f"Client {connection.client_id} disconnected from department {connection.cod_subdepar or 'multiplexed'}")
+        logger.info(f"Active connections: {len(self._by_socket)}")
+
+    def _release_later(self, cod_subdepar: str) -> None:
+        if self.channel_retention <= 0:
+            self._release(cod_subdepar)
+            return
+        self._release_handles[cod_subdepar] = asyncio.get_running_loop().call_later(
+            self.channel_retention, self._release, cod_subdepar
+        )
+
+    def _release(self, cod_subdepar: str) -> None:
+        """Drop the log and the broker subscription of a channel nobody rejoined."""
+        self._release_handles.pop(cod_subdepar, None)
+        if cod_subdepar in self.active_connections:
+            return
+        self.logs.pop(cod_subdepar, None)
+        broker.desuscribir(cod_subdepar)
+
+    def position(self, cod_subdepar: str) -> Dict[str, Any]:
+        """Epoch and last sequence number of a channel, to be sent with the welcome message."""
+        log = self.logs.get(cod_subdepar)
+        return {"epoch": log.epoch, "seq": log.seq} if log is not None else {}
+
+    def resume(self, websocket: WebSocket, cod_subdepar: str, last_seq: int, epoch: Optional[str]) -> None:
+        """Queue for a reconnecting client the events after last_seq, or resync_required if not buffered."""
+        connection = self._by_socket.get(id(websocket))
+        if connection is None:
+            return
+        log = self.logs.get(cod_subdepar)
+        missing = log.since(last_seq) if log is not None and epoch == log.epoch else None
+        if missing is None:
+            self.resyncs += 1
+            frame = Trama({
+                "tipo": "resync_required",
+                "motivo": "fuera_de_historial",
+                **self.position(cod_subdepar),
+            })
+        elif missing:
+            self.replays += 1
+            frame = TramaLote(
+                missing, tipo="batch", count=len(missing), replay=True, seq=log.seq,
+                timestamp=datetime.now().isoformat(),
+            )
+        else:
+            return
+        connection.enqueue(TramaAmpliada(frame, canal=cod_subdepar) if connection.multiplexed else frame)
+
+    def mark_alive(self, websocket: WebSocket) -> None:
+        """Record client activity (any received frame) for the idle timeout."""
+        connection = self._by_socket.get(id(websocket))
+        if connection is not None:
+            connection.last_seen = time.monotonic()
     
-    async def send_personal_message(self, message: str, websocket: WebSocket) -> None:
-        """Send a message to a specific client"""
-        await websocket.send_text(message)
+    async def send_personal_message(self, message: Any, websocket: WebSocket) -> None:
+        """Send a message to a specific client (through its queue, never concurrently with broadcasts)"""
+        if not isinstance(message, str):
+            message = Trama.de(message)
+        connection = self._by_socket.get(id(websocket))
+        if connection is not None:
+            connection.enqueue(message)
+        else:
+            await websocket.send_text(message if isinstance(message, str) else message.texto)
     
+    async def broadcast_events(self, cod_subdepar: str, events: List[Trama]) -> None:
+        """
+        Deliver pending events of a channel as one frame: the single event as-is or a batch.
+        The events are appended to the channel log and the frame carries the last `seq`.
+        """
+        log = self.logs.get(cod_subdepar)
+        seq: Dict[str, int] = {}
+        if log is not None:
+            for event in events:
+                seq["seq"] = log.append(event)
+
+        if len(events) == 1:
+            # Send single event as-is to maintain compatibility (plus its seq)
+            frame = TramaAmpliada(events[0], **seq) if seq else events[0]
+        else:
+            # Build batch message from the already-encoded events
+            frame = TramaLote(events, tipo="batch", count=len(events), timestamp=datetime.now().isoformat(), **seq)
+        await self.broadcast(frame, cod_subdepar)
+
     async def broadcast(self, message: Any, cod_subdepar: str) -> None:
-        """Broadcast a message to all clients in a department"""
+        """
+        Broadcast a message to all clients in a department: O(1) enqueue per recipient.
+        Every recipient shares the same Trama, so the payload is encoded at most once per format;
+        multiplexed sockets share a second one tagged with the `canal`.
+        """
         if cod_subdepar not in self.active_connections:
             logger.info(f"No active connections for department {cod_subdepar}")
             return
         
-        # Convert dict to JSON string if needed
-        if isinstance(message, dict):
-            message = json.dumps(message)
+        if not isinstance(message, str):
+            message = Trama.de(message)
         
-        disconnected = []
-        for client_id, connection in self.active_connections[cod_subdepar].items():
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to client {client_id}: {e}")
-                disconnected.append((cod_subdepar, client_id))
-        
-        # Clean up any failed connections
-        for dept, client in disconnected:
-            self.disconnect(dept, client)
+        tagged: Optional[Frame] = None
+        for connection in list(self.active_connections[cod_subdepar].values()):
+            if connection.multiplexed:
+                if tagged is None:
+                    tagged = message if isinstance(message, str) else TramaAmpliada(message, canal=cod_subdepar)
+                connection.enqueue(tagged)
+            else:
+                connection.enqueue(message)
+
+    def queue_gauges(self) -> Dict[str, Any]:
+        """Outbound queue depth over every socket: frames waiting to be written."""
+        depths = [len(connection.queue) for connection in self._by_socket.values()]
+        return {
+            "queued_frames": sum(depths),
+            "depth": _summary(depths),
+            "max_queue": self.max_queue,
+            "dropped_frames": self.dropped_frames,
+            "evictions": self.evictions,
+        }
+
+    def channel_gauges(self) -> Dict[str, Dict[str, Any]]:
+        """Per channel: subscribed sockets, their queued frames and the channel log position."""
+        gauges = {}
+        for cod_subdepar, connections in self.active_connections.items():
+            depths = [len(connection.queue) for connection in connections.values()]
+            log = self.logs.get(cod_subdepar)
+            gauges[cod_subdepar] = {
+                "connections": len(connections),
+                "queued_frames": sum(depths),
+                "max_depth": max(depths, default=0),
+                "seq": log.seq if log is not None else None,
+            }
+        return gauges
+
+    async def _heartbeat(self) -> None:
+        """Periodic heartbeat frame to every client; evicts clients idle for longer than idle_timeout."""
+        while self._by_socket:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = time.monotonic()
+            frame = Trama({"tipo": "heartbeat", "timestamp": datetime.now().isoformat()})
+            for connection in list(self._by_socket.values()):
+                if self.idle_timeout and now - connection.last_seen > self.idle_timeout:
+                    logger.info(f"Client {connection.client_id} idle for {now - connection.last_seen:.0f}s, evicting")
+                    connection.evict(status.WS_1001_GOING_AWAY, "Heartbeat timeout")
+                else:
+                    connection.enqueue(frame)
 
 # Create global connection manager instance
-manager = ConnectionManager()
+manager = ConnectionManager(
+    max_queue=settings.WEBSOCKET_COLA_MAXIMA,
+    overflow_policy=settings.WEBSOCKET_POLITICA_DESBORDE,
+    send_timeout=settings.WEBSOCKET_TIMEOUT_ENVIO_SEGUNDOS,
+    heartbeat_interval=settings.WEBSOCKET_HEARTBEAT_SEGUNDOS,
+    idle_timeout=settings.WEBSOCKET_INACTIVIDAD_SEGUNDOS,
+    log_size=settings.WEBSOCKET_HISTORIAL_EVENTOS,
+    channel_retention=settings.WEBSOCKET_RETENCION_CANAL_SEGUNDOS,
+)
+
+
+# Events of the same kind and entity pending in a channel are coalesced: only the latest one
+# is delivered (latest state), carrying the `cambios` of the ones it replaced
+COALESCE_KEYS = {
+    "hito_actualizado": "cliente_proceso_hito_id",
+    "hito_master_actualizado": "hito_id",
+    "proceso_actualizado": "proceso_id",
+    "cliente_proceso_actualizado": "cliente_proceso_id",
+}
+
+
+class _PendingChannel:
+    __slots__ = ("events", "first", "last")
+
+    def __init__(self, now: float):
+        self.events: Dict[Any, Trama] = {}
+        self.first = now
+        self.last = now
 
 
 class DebounceBroadcaster:
     """
-    Debounces rapid-fire events per subdepartment channel.
+    Debounces and coalesces rapid-fire events per subdepartment channel.
 
-    - If multiple events arrive within `delay_ms`, they are buffered and sent as a single
-      batch message: { tipo: "batch", count, events: [...], timestamp }
-    - If only one event arrives within the window, the original single event is sent as-is
-      to preserve backward compatibility.
+    - A channel is flushed once it has been quiet for `delay_ms`, or at the latest `max_delay_ms`
+      after its first pending event, so a steady stream of events cannot postpone delivery forever.
+    - If several events are pending they are sent as a single batch message:
+      { tipo: "batch", count, events: [...], seq, timestamp }. A single event is sent as-is (plus
+      its `seq`) to preserve backward compatibility. Every flushed event goes to the channel log.
+    - Pending events with the same COALESCE_KEYS key replace each other (latest state wins).
+    - Events are buffered as Tramas: an event published to several channels is encoded once and
+      the batch frames embed the already-encoded events instead of serializing them again.
+    - enqueue() is O(1) and never awaits; a single long-lived task flushes every channel.
     """
 
-    def __init__(self, delay_ms: int = 200):
+    def __init__(self, delay_ms: int = 200, max_delay_ms: int = 1000, coalesce_keys: Optional[Dict[str, str]] = None):
         self.delay = delay_ms / 1000.0
-        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
-        self._tasks: Dict[str, asyncio.Task] = {}
-        self._lock = asyncio.Lock()
+        self.max_delay = max(max_delay_ms, delay_ms) / 1000.0
+        self.coalesce_keys = COALESCE_KEYS if coalesce_keys is None else coalesce_keys
+        self._pending: Dict[str, _PendingChannel] = {}
+        self._uncoalesced = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.events_in = 0
+        self.events_coalesced = 0
+        self.frames_out = 0
+        self.batches_out = 0
+        self.max_latency = 0.0
+        self.recent_batch_sizes: deque = deque(maxlen=1000)
+        self.recent_latencies: deque = deque(maxlen=1000)
 
-    async def enqueue(self, cod_subdepar: str, payload: Dict[str, Any]):
-        async with self._lock:
-            # Initialize buffer list
-            buf = self._buffers.setdefault(cod_subdepar, [])
-            buf.append(payload)
+    def _key(self, trama: Trama) -> Any:
+        message = trama.mensaje
+        if not isinstance(message, dict):
+            return None
+        field = self.coalesce_keys.get(message.get("tipo"))
+        if field is None or message.get(field) is None:
+            return None
+        return message["tipo"], message[field]
 
-            # Cancel previous pending flush for this channel
-            task = self._tasks.get(cod_subdepar)
-            if task and not task.done():
-                task.cancel()
+    @staticmethod
+    def _merge(previous: Trama, latest: Trama) -> Trama:
+        """Latest event, keeping the `cambios` of the replaced one that it does not override."""
+        old, new = previous.mensaje.get("cambios"), latest.mensaje.get("cambios")
+        if isinstance(old, dict) and isinstance(new, dict) and not old.keys() <= new.keys():
+            return Trama({**latest.mensaje, "cambios": {**old, **new}})
+        return latest
 
-            # Schedule a new flush
-            self._tasks[cod_subdepar] = asyncio.create_task(self._flush_after_delay(cod_subdepar))
+    async def enqueue(self, cod_subdepar: str, payload: Union[Trama, Dict[str, Any]]):
+        trama = Trama.de(payload)
+        now = time.monotonic()
+        channel = self._pending.get(cod_subdepar)
+        if channel is None:
+            channel = self._pending[cod_subdepar] = _PendingChannel(now)
+        channel.last = now
+        self.events_in += 1
 
-    async def _flush_after_delay(self, cod_subdepar: str):
+        key = self._key(trama)
+        if key is None:
+            key = next(self._uncoalesced)
+        else:
+            previous = channel.events.pop(key, None)
+            if previous is not None:
+                self.events_coalesced += 1
+                trama = self._merge(previous, trama)
+        channel.events[key] = trama
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            next_due: Optional[float] = None
+            for cod_subdepar, channel in list(self._pending.items()):
+                due = min(channel.last + self.delay, channel.first + self.max_delay)
+                if due <= now:
+                    del self._pending[cod_subdepar]
+                    await self._flush_now(cod_subdepar, channel, now)
+                elif next_due is None or due < next_due:
+                    next_due = due
+            # A channel that starts pending later is never due before the ones already pending
+            if next_due is not None:
+                await asyncio.sleep(next_due - now)
+
+    async def _flush_now(self, cod_subdepar: str, channel: _PendingChannel, now: float):
+        items = list(channel.events.values())
         try:
-            await asyncio.sleep(self.delay)
-            await self._flush_now(cod_subdepar)
-        except asyncio.CancelledError:
-            # Expected when a new event arrives before the debounce window ends
-            return
+            await manager.broadcast_events(cod_subdepar, items)
+            self.frames_out += 1
+            if len(items) > 1:
+                self.batches_out += 1
+            self.max_latency = max(self.max_latency, now - channel.first)
+            self.recent_batch_sizes.append(len(items))
+            self.recent_latencies.append((now - channel.first) * 1000)
         except Exception as e:
             logger.error(f"Debounce flush error for {cod_subdepar}: {e}")
 
-    async def _flush_now(self, cod_subdepar: str):
-        async with self._lock:
-            items = self._buffers.get(cod_subdepar, [])
-            self._buffers[cod_subdepar] = []
-            # Clean task reference if this is the active task
-            self._tasks.pop(cod_subdepar, None)
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events_in": self.events_in,
+            "events_coalesced": self.events_coalesced,
+            "frames_out": self.frames_out,
+            "batches_out": self.batches_out,
+            "pending_channels": len(self._pending),
+            "pending_events": sum(len(channel.events) for channel in self._pending.values()),
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+            # Last 1000 flushes: events per frame and time from the first event to the flush
+            "batch_size": _summary(self.recent_batch_sizes),
+            "flush_latency_ms": _summary(self.recent_latencies),
+            "delay_ms": round(self.delay * 1000),
+            "max_delay_ms": round(self.max_delay * 1000),
+        }
 
-        if not items:
-            return
 
-        # Send single event as-is to maintain compatibility
-        if len(items) == 1:
-            await manager.broadcast(items[0], cod_subdepar)
-            return
+# Global debouncer instance
+debouncer = DebounceBroadcaster(
+    delay_ms=settings.WEBSOCKET_DEBOUNCE_MS,
+    max_delay_ms=settings.WEBSOCKET_DEBOUNCE_MAXIMO_MS,
+)
 
-        # Build batch message
-        batch = {
-            "tipo": "batch",
-            "count": len(items),
-            "events": items,
-            "timestamp": datetime.now().isoformat(),
-        }
-        await manager.broadcast(batch, cod_subdepar)
+# Event broker: every worker receives (through the debouncer) the events of the channels
+# its own sockets have joined, wherever the write was handled
+broker = crear_broker(debouncer.enqueue)
 
 
-# Global debouncer instance
-debouncer = DebounceBroadcaster(delay_ms=200)
+@router.get("/api/admin/hitos-departamento/ws-estadisticas",
+    dependencies=[Depends(verificar_admin_key)],
+    summary="Estado de los WebSockets del worker",
+    description="Conexiones activas, profundidad de las colas de envío y tramas descartadas, cambios pendientes en el outbox, eventos recibidos/coalescidos frente a tramas enviadas por el debouncer (tamaño de lote y latencia de los últimos envíos) y estado del broker. Con por_canal=true, el detalle de cada canal.")
+def websocket_stats(
+    por_canal: bool = Query(False, description="Incluir el detalle por canal (sockets, tramas en cola, seq)"),
+):
+    from app.interfaces.api.websocket_outbox import outbox
+
+    stats = {
+        "connections": len(manager._by_socket),
+        "channels": len(manager.active_connections),
+        "multiplexed_connections": sum(1 for c in manager._by_socket.values() if c.multiplexed),
+        "subscriptions": sum(len(c.channels) for c in manager._by_socket.values()),
+        "retained_channels": len(manager._release_handles),
+        "replays": manager.replays,
+        "resyncs": manager.resyncs,
+        "queues": manager.queue_gauges(),
+        "outbox": outbox.stats(),
+        "debouncer": debouncer.stats(),
+        "broker": broker.estadisticas(),
+    }
+    if por_canal:
+        stats["por_canal"] = manager.channel_gauges()
+    return stats
 
 async def get_current_user_from_token(
     token: Optional[str], db: Session = Depends(get_db)
@@ -232,13 +701,59 @@ async def validate_department_access(
         raise WebSocketException(code=4004, reason=f"Department {cod_subdepar} not found")
     # Optional: user-department permission check can be added here if models are available
 
+def _parse_seq(value: Any) -> int:
+    """Client supplied last_seq; anything unparsable forces a resync."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+async def _relay_hito_update(websocket: WebSocket, cod_subdepar: str, obj: dict, user: Any) -> None:
+    """Relay a client's hito_actualizado to every socket of the department (in any worker)."""
+    cliente_proceso_hito_id = obj.get("cliente_proceso_hito_id")
+    nuevo_estado = obj.get("nuevo_estado")
+    if not cliente_proceso_hito_id or not nuevo_estado:
+        await manager.send_personal_message({
+            "tipo": "error",
+            "message": "Campos requeridos: cliente_proceso_hito_id y nuevo_estado"
+        }, websocket)
+        return
+
+    # Enriquecer con usuario y timestamp
+    if not obj.get("usuario"):
+        obj["usuario"] = user.get("username")
+    if "timestamp" not in obj:
+        obj["timestamp"] = datetime.now().isoformat()
+
+    # Asegurar el tipo correcto (el canal lo añade la difusión a los sockets multiplexados)
+    obj["tipo"] = "hito_actualizado"
+    obj.pop("canal", None)
+
+    # Reenviar a todos los clientes del mismo departamento (en cualquier worker)
+    await broker.publicar(cod_subdepar, Trama(obj))
+    logger.info(
+        f"Broadcast hito_actualizado dept={cod_subdepar} id={cliente_proceso_hito_id} estado={nuevo_estado}"
+    )
+
 @router.websocket("/api/admin/hitos-departamento/ws/{cod_subdepar}")
 async def websocket_hitos_endpoint(
     websocket: WebSocket,
     cod_subdepar: str,
     db: Session = Depends(get_db),
 ):
-    """WebSocket endpoint for real-time hito updates by department"""
+    """
+    WebSocket endpoint for real-time hito updates by department.
+
+    `?formato=msgpack` asks for MessagePack binary frames instead of JSON text frames (falls back to
+    JSON when msgpack is not installed; the welcome message reports the format in use). Client to
+    server messages are always text.
+
+    Every event frame carries the channel `seq`; the welcome message carries the current `epoch`
+    and `seq`. A reconnecting client passes `?last_seq=N&epoch=E` (or sends
+    {"tipo": "resume", "last_seq": N, "epoch": E}) and receives only the events it missed as a
+    batch with `replay: true`, or {"tipo": "resync_required"} when they are no longer buffered
+    (or the epoch changed) and it has to reload its state.
+    """
     client_id: Optional[str] = None
     try:
         # Extract token from query params explicitly for WebSocket endpoints
@@ -248,29 +763,36 @@ async def websocket_hitos_endpoint(
         # Validate department access (best-effort)
         await validate_department_access(cod_subdepar, user, db)
 
-        # Accept connection and register client
-        client_id = await manager.connect(websocket, cod_subdepar)
+        # Accept connection and register client with the negotiated frame encoding
+        formato = formato_disponible(websocket.query_params.get("formato"))
+        client_id = await manager.connect(websocket, cod_subdepar, formato)
 
         # Welcome message
         await manager.send_personal_message(
-            json.dumps(
-                {
-                    "tipo": "connected",
-                    "message": f"Conectado a actualizaciones del departamento {cod_subdepar}",
-                    "username": user.get("username"),
-                    "timestamp": datetime.now().isoformat(),
-                }
-            ),
+            {
+                "tipo": "connected",
+                "message": f"Conectado a actualizaciones del departamento {cod_subdepar}",
+                "username": user.get("username"),
+                "formato": formato,
+                **manager.position(cod_subdepar),
+                "timestamp": datetime.now().isoformat(),
+            },
             websocket,
         )
 
+        # Resume from the client's last seen event (no await since connect: nothing was missed in between)
+        last_seq = websocket.query_params.get("last_seq")
+        if last_seq is not None:
+            manager.resume(websocket, cod_subdepar, _parse_seq(last_seq), websocket.query_params.get("epoch"))
+
         # Message handling loop
         while True:
             data = await websocket.receive_text()
+            manager.mark_alive(websocket)
 
             # Texto plano "ping" (compatibilidad)
             if data == "ping":
-                await websocket.send_text("pong")
+                await manager.send_personal_message("pong", websocket)
                 continue
 
             # Intentar parsear JSON
@@ -279,58 +801,41 @@ async def websocket_hitos_endpoint(
                 obj = json.loads(data)
             except json.JSONDecodeError:
                 # Mantener compatibilidad: eco de mensajes no JSON
-                await websocket.send_text(f"Mensaje recibido: {data}")
+                await manager.send_personal_message(f"Mensaje recibido: {data}", websocket)
                 continue
 
             if not isinstance(obj, dict):
-                await websocket.send_text(json.dumps({
+                await manager.send_personal_message({
                     "tipo": "warning",
                     "message": "Formato de mensaje no soportado"
-                }))
+                }, websocket)
                 continue
 
             msg_type = obj.get("tipo")
 
             # Ping JSON
             if msg_type == "ping":
-                await websocket.send_text(json.dumps({
+                await manager.send_personal_message({
                     "tipo": "pong",
                     "timestamp": datetime.now().isoformat(),
-                }))
+                }, websocket)
+                continue
+
+            # Reanudar desde el último evento recibido
+            if msg_type == "resume":
+                manager.resume(websocket, cod_subdepar, _parse_seq(obj.get("last_seq")), obj.get("epoch"))
                 continue
 
             # Difundir actualización de hito a todo el departamento
             if msg_type == "hito_actualizado":
-                cliente_proceso_hito_id = obj.get("cliente_proceso_hito_id")
-                nuevo_estado = obj.get("nuevo_estado")
-                if not cliente_proceso_hito_id or not nuevo_estado:
-                    await websocket.send_text(json.dumps({
-                        "tipo": "error",
-                        "message": "Campos requeridos: cliente_proceso_hito_id y nuevo_estado"
-                    }))
-                    continue
-
-                # Enriquecer con usuario y timestamp
-                if not obj.get("usuario"):
-                    obj["usuario"] = user.get("username")
-                if "timestamp" not in obj:
-                    obj["timestamp"] = datetime.now().isoformat()
-
-                # Asegurar el tipo correcto
-                obj["tipo"] = "hito_actualizado"
-
-                # Reenviar a todos los clientes del mismo departamento
-                await manager.broadcast(obj, cod_subdepar)
-                logger.info(
-                    f"Broadcast hito_actualizado dept={cod_subdepar} id={cliente_proceso_hito_id} estado={nuevo_estado}"
-                )
+                await _relay_hito_update(websocket, cod_subdepar, obj, user)
                 continue
 
             # Tipo desconocido: advertencia al cliente
-            await websocket.send_text(json.dumps({
+            await manager.send_personal_message({
                 "tipo": "warning",
                 "message": f"Tipo de mensaje no reconocido: {msg_type}",
-            }))
+            }, websocket)
 
     except WebSocketDisconnect:
         if client_id:
@@ -349,6 +854,179 @@ async def websocket_hitos_endpoint(
             if client_id:
                 manager.disconnect(cod_subdepar, client_id)
 
+def _requested_channels(obj: dict) -> List[Any]:
+    """Channels of a subscribe/unsubscribe frame: "canal" or "canales" (codes or {"canal", "last_seq", "epoch"})."""
+    channels = obj.get("canales")
+    if channels is None:
+        channels = [obj] if isinstance(obj.get("canal"), str) else []
+    return channels if isinstance(channels, list) else []
+
+
+@router.websocket("/api/admin/hitos-departamento/ws")
+async def websocket_hitos_multiplexed_endpoint(
+    websocket: WebSocket,
+    db: Session = Depends(get_db),
+):
+    """
+    Multiplexed WebSocket endpoint: one socket (one JWT validation, one heartbeat) for any number
+    of departments.
+
+    Control frames (client to server, text):
+    - {"tipo": "subscribe", "canales": ["221101", {"canal": "221102", "last_seq": 40, "epoch": "..."}]}
+      (or a single "canal"). Every channel is acknowledged with {"tipo": "subscribed", canal, epoch, seq}
+      or rejected with {"tipo": "error", canal, message}; with last_seq the missed events are replayed
+      as in the per-department endpoint. `?canales=A,B` subscribes at connect.
+    - {"tipo": "unsubscribe", "canales": [...]} -> {"tipo": "unsubscribed", canal}
+    - {"tipo": "resume", "canal", "last_seq", "epoch"}, {"tipo": "ping"} and
+      {"tipo": "hito_actualizado", "canal", ...} (only to a subscribed channel).
+
+    Every event frame carries its `canal`; `seq` is per channel. `?formato=msgpack` works as in the
+    per-department endpoint.
+    """
+    connection: Optional[ClientConnection] = None
+    try:
+        token = websocket.query_params.get("token")
+        user = await get_current_user_from_token(token, db)
+
+        formato = formato_disponible(websocket.query_params.get("formato"))
+        connection = await manager.connect_multiplexed(websocket, formato)
+
+        await manager.send_personal_message(
+            {
+                "tipo": "connected",
+                "message": "Conectado a actualizaciones de departamentos",
+                "username": user.get("username"),
+                "formato": formato,
+                "max_canales": settings.WEBSOCKET_CANALES_POR_SOCKET,
+                "timestamp": datetime.now().isoformat(),
+            },
+            websocket,
+        )
+
+        async def subscribe(channels: List[Any]) -> None:
+            for item in channels:
+                request = item if isinstance(item, dict) else {"canal": item}
+                cod_subdepar = request.get("canal")
+                if not isinstance(cod_subdepar, str) or not cod_subdepar:
+                    await manager.send_personal_message({
+                        "tipo": "error",
+                        "message": "Canal no válido",
+                    }, websocket)
+                    continue
+                if cod_subdepar not in connection.channels:
+                    if len(connection.channels) >= settings.WEBSOCKET_CANALES_POR_SOCKET:
+                        await manager.send_personal_message({
+                            "tipo": "error",
+                            "canal": cod_subdepar,
+                            "message": f"Máximo de {settings.WEBSOCKET_CANALES_POR_SOCKET} canales por conexión",
+                        }, websocket)
+                        continue
+                    try:
+                        await validate_department_access(cod_subdepar, user, db)
+                    except WebSocketException as e:
+                        await manager.send_personal_message({
+                            "tipo": "error",
+                            "canal": cod_subdepar,
+                            "message": str(e.reason),
+                        }, websocket)
+                        continue
+                    manager.subscribe(connection, cod_subdepar)
+
+                await manager.send_personal_message({
+                    "tipo": "subscribed",
+                    "canal": cod_subdepar,
+                    **manager.position(cod_subdepar),
+                }, websocket)
+                # No await since subscribe: the replay starts exactly after the acknowledged seq
+                if request.get("last_seq") is not None:
+                    manager.resume(websocket, cod_subdepar, _parse_seq(request.get("last_seq")), request.get("epoch"))
+
+        initial = websocket.query_params.get("canales")
+        if initial:
+            await subscribe([cod.strip() for cod in initial.split(",") if cod.strip()])
+
+        while True:
+            data = await websocket.receive_text()
+            manager.mark_alive(websocket)
+
+            if data == "ping":
+                await manager.send_personal_message("pong", websocket)
+                continue
+
+            try:
+                obj = json.loads(data)
+            except json.JSONDecodeError:
+                obj = None
+            if not isinstance(obj, dict):
+                await manager.send_personal_message({
+                    "tipo": "warning",
+                    "message": "Formato de mensaje no soportado"
+                }, websocket)
+                continue
+
+            msg_type = obj.get("tipo")
+
+            if msg_type == "ping":
+                await manager.send_personal_message({
+                    "tipo": "pong",
+                    "timestamp": datetime.now().isoformat(),
+                }, websocket)
+                continue
+
+            if msg_type == "subscribe":
+                await subscribe(_requested_channels(obj))
+                continue
+
+            if msg_type == "unsubscribe":
+                for item in _requested_channels(obj):
+                    cod_subdepar = item.get("canal") if isinstance(item, dict) else item
+                    if isinstance(cod_subdepar, str):
+                        manager.unsubscribe(connection, cod_subdepar)
+                        await manager.send_personal_message({
+                            "tipo": "unsubscribed",
+                            "canal": cod_subdepar,
+                        }, websocket)
+                continue
+
+            # Resto de mensajes: referidos a un canal al que el socket está suscrito
+            cod_subdepar = obj.get("canal")
+            if msg_type in ("resume", "hito_actualizado") and cod_subdepar not in connection.channels:
+                await manager.send_personal_message({
+                    "tipo": "error",
+                    "canal": cod_subdepar,
+                    "message": "No suscrito al canal",
+                }, websocket)
+                continue
+
+            if msg_type == "resume":
+                manager.resume(websocket, cod_subdepar, _parse_seq(obj.get("last_seq")), obj.get("epoch"))
+                continue
+
+            if msg_type == "hito_actualizado":
+                await _relay_hito_update(websocket, cod_subdepar, obj, user)
+                continue
+
+            await manager.send_personal_message({
+                "tipo": "warning",
+                "message": f"Tipo de mensaje no reconocido: {msg_type}",
+            }, websocket)
+
+    except WebSocketDisconnect:
+        pass
+    except WebSocketException as e:
+        try:
+            await websocket.close(code=e.code, reason=str(e.reason))
+        finally:
+            logger.error(f"WebSocket error: {e.reason} (code: {e.code})")
+    except Exception:
+        try:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason="Internal server error")
+        except Exception:
+            pass
+    finally:
+        if connection is not None:
+            manager.remove(connection)
+
 async def broadcast_hito_update(cod_subdepar: str, hito_data: dict):
     """
     Function to broadcast hito updates to all clients in a department.
@@ -375,8 +1053,8 @@ async def broadcast_hito_update(cod_subdepar: str, hito_data: dict):
     if isinstance(hito_data, dict) and "tipo" not in hito_data:
         hito_data["tipo"] = "hito_actualizado"
     
-    # Route through debouncer to coalesce rapid events
-    await debouncer.enqueue(cod_subdepar, hito_data)
+    # Route through the broker to every worker with sockets in the department
+    await broker.publicar(cod_subdepar, Trama(hito_data))
     logger.info(f"Queued hito update for department {cod_subdepar}")
 
 
@@ -392,13 +1070,23 @@ async def broadcast_departament_event(cod_subdepar: str, tipo: str, data: Option
     - tipo: Event type string (e.g., 'proceso_actualizado', 'hito_actualizado')
     - data: Optional dict payload to include with the event
     """
+    await broadcast_departament_events([cod_subdepar], tipo, data)
+
+
+async def broadcast_departament_events(cod_subdepars: Iterable[str], tipo: str, data: Optional[dict] = None):
+    """
+    Broadcast the same event to several subdepartments: the payload is built and wrapped in a
+    single Trama, so it is encoded once for every channel and recipient.
+    """
     payload: Dict[str, Any] = {}
     if isinstance(data, dict):
         payload.update(data)
     # Ensure standard fields
     payload.setdefault("tipo", tipo)
     payload.setdefault("timestamp", datetime.now().isoformat())
+    trama = Trama(payload)
 
-    # Use debouncer to buffer frequent writes and reduce event spam
-    await debouncer.enqueue(cod_subdepar, payload)
-    logger.info(f"Queued event '{tipo}' to department {cod_subdepar}")
+    # Publish to every worker with sockets in each department; each one debounces locally
+    for cod_subdepar in dict.fromkeys(cod_subdepars):
+        await broker.publicar(cod_subdepar, trama)
+        logger.info(f"Queued event '{tipo}' to department {cod_subdepar}")
@@ -1,14 +1,15 @@
 from fastapi import FastAPI, Request
-from starlette.concurrency import run_in_threadpool
 import logging
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any
 import json as _json
 import re
 
-from sqlalchemy import text, bindparam
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.infrastructure.db.database import SessionLocal
+from app.infrastructure.services.cliente_departamento_index import indice_cliente_departamento
+from app.infrastructure.services.indice_rutas_eventos import indice_rutas_eventos
+from app.infrastructure.services.invalidacion_caches import invalidacion_caches
 
 def configure_websockets(app: FastAPI):
     """Configure WebSocket routes on the main FastAPI application"""
@@ -18,6 +19,17 @@ def configure_websockets(app: FastAPI):
         from app.interfaces.api.websocket_hitos import (
             router as websocket_router,
             broadcast_departament_event,
+            broker,
+        )
+        from app.interfaces.api.websocket_outbox import (
+            outbox,
+            PROCESO,
+            HITO,
+            PROCESO_HITO,
+            CLIENTE_PROCESO_CREADO,
+            CLIENTE_PROCESO,
+            CLIENTE_PROCESO_HITO,
+            CLIENTE_PROCESO_HITO_CREADO,
         )
     except ModuleNotFoundError as e:
         logger.warning(f"WebSocket routes not loaded: {e}")
@@ -28,108 +40,43 @@ def configure_websockets(app: FastAPI):
 
     app.include_router(websocket_router)
 
-    async def _emit_event(cod_subdepar: str, tipo: str, data: Optional[Dict[str, Any]] = None):
-        try:
-            await broadcast_departament_event(cod_subdepar, tipo, data or {})
-        except Exception as e:
-            logger.error(f"Failed to broadcast event '{tipo}' to {cod_subdepar}: {e}")
-
-    def _get_db_session() -> Session:
-        return SessionLocal()
-
-    def _infer_subdepar_for_cph(session: Session, cph_id: int) -> Optional[str]:
-        """Infer codSubDePar from a cliente_proceso_hito id."""
-        sql = text(
-            """
-            SELECT sd.codSubDePar AS cod
-            FROM [ATISA_Input].dbo.cliente_proceso_hito cph
-            JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
-            JOIN [ATISA_Input].dbo.clienteSubDePar csd ON csd.id = cp.cliente_id
-            JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-            WHERE cph.id = :id
-            """
-        )
-        row = session.execute(sql, {"id": cph_id}).mappings().first()
-        return row["cod"] if row else None
+    # Cache invalidations from /admin/cache/* reach the other workers through the event broker
+    # (the in-memory broker means a single worker: nothing to propagate)
+    broker.controlar = invalidacion_caches.recibir
+    if broker.tipo != "memoria":
+        invalidacion_caches.conectar(broker.publicar_control)
 
-    def _infer_subdepar_for_cp(session: Session, cp_id: int) -> Optional[str]:
-        sql = text(
-            """
-            SELECT sd.codSubDePar AS cod
-            FROM [ATISA_Input].dbo.cliente_proceso cp
-            JOIN [ATISA_Input].dbo.clienteSubDePar csd ON csd.id = cp.cliente_id
-            JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-            WHERE cp.id = :id
-            """
-        )
-        row = session.execute(sql, {"id": cp_id}).mappings().first()
-        return row["cod"] if row else None
+    @app.on_event("startup")
+    async def start_event_broker():
+        await broker.iniciar()
 
-    def _infer_subdepar_for_proceso(session: Session, proceso_id: int) -> List[str]:
-        """
-        Get all subdepartments impacted by a proceso via its cliente_proceso relations.
-        """
-        sql = text(
-            """
-            SELECT DISTINCT sd.codSubDePar AS cod
-            FROM [ATISA_Input].dbo.cliente_proceso cp
-            JOIN [ATISA_Input].dbo.clienteSubDePar csd ON csd.id = cp.cliente_id
-            JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-            WHERE cp.proceso_id = :id
-            """
-        )
-        rows = session.execute(sql, {"id": proceso_id}).mappings().all()
-        return [r["cod"] for r in rows]
+    @app.on_event("startup")
+    async def load_routing_index():
+        # Build the routing indexes before the first write event (they load lazily if this fails)
+        try:
+            await run_in_threadpool(_load_routing_index)
+        except Exception as e:
+            logger.warning(f"Routing index not loaded at startup: {e}")
 
-    def _infer_subdepar_for_hito(session: Session, hito_id: int) -> List[str]:
-        sql = text(
-            """
-            SELECT DISTINCT sd.codSubDePar AS cod
-            FROM [ATISA_Input].dbo.cliente_proceso_hito cph
-            JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
-            JOIN [ATISA_Input].dbo.clienteSubDePar csd ON csd.id = cp.cliente_id
-            JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-            WHERE cph.hito_id = :id
-            """
-        )
-        rows = session.execute(sql, {"id": hito_id}).mappings().all()
-        return [r["cod"] for r in rows]
+    def _load_routing_index():
+        session = SessionLocal()
+        try:
+            indice_rutas_eventos.cargar(session)
+            indice_cliente_departamento.cargar(session)
+        finally:
+            session.close()
 
-    def _fetch_cph_updates_for_hito(session: Session, hito_id: int) -> List[Dict[str, Any]]:
-        """Fetch cliente_proceso_hito records impacted by a hito update, with their estado and subdepar."""
-        sql = text(
-            """
-            SELECT
-                cph.id         AS cph_id,
-                cph.estado     AS estado,
-                cph.hito_id    AS hito_id,
-                sd.codSubDePar AS cod
-            FROM [ATISA_Input].dbo.cliente_proceso_hito cph
-            JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
-            JOIN [ATISA_Input].dbo.clienteSubDePar csd ON csd.id = cp.cliente_id
-            JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-            WHERE cph.hito_id = :id
-            """
-        )
-        return [dict(r) for r in session.execute(sql, {"id": hito_id}).mappings().all()]
+    @app.on_event("shutdown")
+    async def stop_event_broker():
+        # Publish the changes still in the outbox before closing the broker
+        await outbox.stop()
+        await broker.cerrar()
 
-    def _fetch_cph_by_id(session: Session, cph_id: int) -> Optional[Dict[str, Any]]:
-        sql = text(
-            """
-            SELECT
-                cph.id         AS cph_id,
-                cph.estado     AS estado,
-                cph.hito_id    AS hito_id,
-                sd.codSubDePar AS cod
-            FROM [ATISA_Input].dbo.cliente_proceso_hito cph
-            JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
-            JOIN [ATISA_Input].dbo.clienteSubDePar csd ON csd.id = cp.cliente_id
-            JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-            WHERE cph.id = :id
-            """
-        )
-        row = session.execute(sql, {"id": cph_id}).mappings().first()
-        return dict(row) if row else None
+    async def _emit_event(cod_subdepar: str, tipo: str, data: Optional[Dict[str, Any]] = None):
+        try:
+            await broadcast_departament_event(cod_subdepar, tipo, data or {})
+        except Exception as e:
+            logger.error(f"Failed to broadcast event '{tipo}' to {cod_subdepar}: {e}")
 
     @app.middleware("http")
     async def websocket_emit_on_write(request: Request, call_next):
@@ -143,6 +90,10 @@ def configure_websockets(app: FastAPI):
         - Proceso-Hitos (POST/DELETE /proceso-hitos[/{id}])
         - Cliente-Proceso (POST /cliente-procesos, PUT-like operations if added)
         - Cliente-Proceso-Hito (POST/PUT /cliente-proceso-hitos)
+
+        The request only records (entity, id, cambios) in the event outbox; the affected
+        subdepartments are resolved and the events published in the background, so the
+        write latency is the handler's own.
         """
 
         method = request.method.upper()
@@ -181,7 +132,8 @@ def configure_websockets(app: FastAPI):
         if response.status_code < 200 or response.status_code >= 300:
             return response
 
-        # Determine entity type and id(s) to compute affected subdepartments
+        # Record the change in the outbox: its subdepartments are resolved and the events
+        # published by the background dispatcher, off the request path
         try:
             # Procesos
             if path.startswith("/procesos"):
@@ -192,47 +144,10 @@ def configure_websockets(app: FastAPI):
                 # PUT /procesos/{id}
                 m = re.match(r"^/procesos/(\d+)$", path)
                 if m:
-                    proceso_id = int(m.group(1))
-                    session = _get_db_session()
-                    try:
-                        subdeps = await run_in_threadpool(_infer_subdepar_for_proceso, session, proceso_id)
-                    finally:
-                        session.close()
-                    # Expandir por CIF (misma lógica del GET): incluir todos los subdeps asignados al CIF
-                    session_cif = _get_db_session()
-                    try:
-                        sql_cifs = text(
-                            """
-                            SELECT DISTINCT c.cif AS cif
-                            FROM [ATISA_Input].dbo.cliente_proceso cp
-                            JOIN [ATISA_Input].dbo.clientes c ON c.idcliente = cp.cliente_id
-                            WHERE cp.proceso_id = :id
-                            """
-                        )
-                        cifs_rows = await run_in_threadpool(lambda: session_cif.execute(sql_cifs, {"id": proceso_id}).mappings().all())
-                        cifs = [str(r["cif"]).strip() for r in cifs_rows if r.get("cif") is not None]
-                        if cifs:
-                            sql_subdeps = text(
-                                """
-                                SELECT DISTINCT sd.codSubDePar AS cod
-                                FROM [ATISA_Input].dbo.clienteSubDePar csd
-                                JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-                                WHERE csd.cif IN :cifs
-                                """
-                            ).bindparams(bindparam("cifs", expanding=True))
-                            extra = await run_in_threadpool(lambda: session_cif.execute(sql_subdeps, {"cifs": cifs}).mappings().all())
-                            extra_codes = [r["cod"] for r in extra]
-                            subdeps = list({*subdeps, *extra_codes})
-                    finally:
-                        session_cif.close()
                     # Build cambios from request body
                     allowed = {"nombre", "descripcion", "frecuencia", "temporalidad", "inicia_dia_1"}
                     cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
-                    for cod in subdeps:
-                        await _emit_event(cod, "proceso_actualizado", {
-                            "proceso_id": proceso_id,
-                            "cambios": cambios,
-                        })
+                    outbox.record(PROCESO, int(m.group(1)), cambios)
                     return response
 
             # Hitos
@@ -240,47 +155,9 @@ def configure_websockets(app: FastAPI):
                 if method == "PUT":
                     m = re.match(r"^/hitos/(\d+)$", path)
                     if m:
-                        hito_id = int(m.group(1))
-                        session = _get_db_session()
-                        try:
-                            subdeps = await run_in_threadpool(_infer_subdepar_for_hito, session, hito_id)
-                        finally:
-                            session.close()
-                        # Expandir por CIF (misma lógica del GET) para hito
-                        session_cif = _get_db_session()
-                        try:
-                            sql_cifs = text(
-                                """
-                                SELECT DISTINCT c.cif AS cif
-                                FROM [ATISA_Input].dbo.cliente_proceso_hito cph
-                                JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
-                                JOIN [ATISA_Input].dbo.clientes c ON c.idcliente = cp.cliente_id
-                                WHERE cph.hito_id = :id
-                                """
-                            )
-                            cifs_rows = await run_in_threadpool(lambda: session_cif.execute(sql_cifs, {"id": hito_id}).mappings().all())
-                            cifs = [str(r["cif"]).strip() for r in cifs_rows if r.get("cif") is not None]
-                            if cifs:
-                                sql_subdeps = text(
-                                    """
-                                    SELECT DISTINCT sd.codSubDePar AS cod
-                                    FROM [ATISA_Input].dbo.clienteSubDePar csd
-                                    JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-                                    WHERE csd.cif IN :cifs
-                                    """
-                                ).bindparams(bindparam("cifs", expanding=True))
-                                extra = await run_in_threadpool(lambda: session_cif.execute(sql_subdeps, {"cifs": cifs}).mappings().all())
-                                extra_codes = [r["cod"] for r in extra]
-                                subdeps = list({*subdeps, *extra_codes})
-                        finally:
-                            session_cif.close()
                         allowed = {"nombre", "descripcion", "fecha_limite", "hora_limite", "obligatorio", "tipo", "habilitado"}
                         cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
-                        for cod in subdeps:
-                            await _emit_event(cod, "hito_master_actualizado", {
-                                "hito_id": hito_id,
-                                "cambios": cambios,
-                            })
+                        outbox.record(HITO, int(m.group(1)), cambios)
                         return response
                 # POST /hitos -> generic, no direct mapping, skip
                 return response
@@ -296,46 +173,10 @@ def configure_websockets(app: FastAPI):
                     except Exception:
                         proceso_id = None
                 if proceso_id:
-                    session = _get_db_session()
-                    try:
-                        subdeps = await run_in_threadpool(_infer_subdepar_for_proceso, session, proceso_id)
-                    finally:
-                        session.close()
-                    # Expandir por CIF
-                    session_cif = _get_db_session()
-                    try:
-                        sql_cifs = text(
-                            """
-                            SELECT DISTINCT c.cif AS cif
-                            FROM [ATISA_Input].dbo.cliente_proceso cp
-                            JOIN [ATISA_Input].dbo.clientes c ON c.idcliente = cp.cliente_id
-                            WHERE cp.proceso_id = :id
-                            """
-                        )
-                        cifs_rows = await run_in_threadpool(lambda: session_cif.execute(sql_cifs, {"id": proceso_id}).mappings().all())
-                        cifs = [str(r["cif"]).strip() for r in cifs_rows if r.get("cif") is not None]
-                        if cifs:
-                            sql_subdeps = text(
-                                """
-                                SELECT DISTINCT sd.codSubDePar AS cod
-                                FROM [ATISA_Input].dbo.clienteSubDePar csd
-                                JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-                                WHERE csd.cif IN :cifs
-                                """
-                            ).bindparams(bindparam("cifs", expanding=True))
-                            extra = await run_in_threadpool(lambda: session_cif.execute(sql_subdeps, {"cifs": cifs}).mappings().all())
-                            extra_codes = [r["cod"] for r in extra]
-                            subdeps = list({*subdeps, *extra_codes})
-                    finally:
-                        session_cif.close()
                     allowed = {"proceso_id", "hito_id"}
                     cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
                     cambios["accion"] = "creado"
-                    for cod in subdeps:
-                        await _emit_event(cod, "proceso_hitos_actualizado", {
-                            "proceso_id": proceso_id,
-                            "cambios": cambios,
-                        })
+                    outbox.record(PROCESO_HITO, proceso_id, cambios)
                 return response
 
             # Cliente-Proceso
@@ -347,155 +188,38 @@ def configure_websockets(app: FastAPI):
                     if cliente_id is None:
                         cliente_id = parsed_body.get("idcliente")
                     if cliente_id is not None:
-                        session = _get_db_session()
-                        try:
-                            # Obtener CIF del cliente
-                            sql_cif = text(
-                                """
-                                SELECT c.cif AS cif
-                                FROM [ATISA_Input].dbo.clientes c
-                                WHERE c.idcliente = :cliente_id
-                                """
-                            )
-                            row_cif = await run_in_threadpool(lambda: session.execute(sql_cif, {"cliente_id": cliente_id}).mappings().first())
-                            cif = row_cif["cif"] if row_cif else None
-                            codes: List[str] = []
-                            if cif:
-                                sql_subdeps = text(
-                                    """
-                                    SELECT sd.codSubDePar AS cod
-                                    FROM [ATISA_Input].dbo.clienteSubDePar csd
-                                    JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-                                    WHERE csd.cif = :cif
-                                    """
-                                )
-                                rows_sub = await run_in_threadpool(lambda: session.execute(sql_subdeps, {"cif": cif}).mappings().all())
-                                codes = [r["cod"] for r in rows_sub]
-                        finally:
-                            session.close()
-                        if codes:
-                            allowed = {"cliente_id", "idcliente", "proceso_id", "id_proceso", "fecha_inicio", "fecha_fin", "mes", "anio", "anterior_id", "id_anterior"}
-                            cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
-                            for cod in sorted(set(codes)):
-                                await _emit_event(cod, "cliente_proceso_creado", {
-                                    "cliente_id": cliente_id,
-                                    # Support both keys: 'proceso_id' and legacy 'id_proceso'
-                                    "proceso_id": parsed_body.get("proceso_id", parsed_body.get("id_proceso")),
-                                    "cambios": cambios,
-                                })
+                        allowed = {"cliente_id", "idcliente", "proceso_id", "id_proceso", "fecha_inicio", "fecha_fin", "mes", "anio", "anterior_id", "id_anterior"}
+                        cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
+                        # Support both keys: 'proceso_id' and legacy 'id_proceso'
+                        outbox.record(CLIENTE_PROCESO_CREADO, cliente_id, cambios,
+                                      proceso_id=parsed_body.get("proceso_id", parsed_body.get("id_proceso")))
                 # PUT updates (if ever added): infer by cp_id path param
                 elif method == "PUT":
                     m = re.match(r"^/cliente-procesos/(\d+)$", path)
                     if m:
-                        cp_id = int(m.group(1))
-                        session = _get_db_session()
-                        try:
-                            # Obtener CIF del cliente del CP
-                            sql_cif = text(
-                                """
-                                SELECT c.cif AS cif
-                                FROM [ATISA_Input].dbo.cliente_proceso cp
-                                JOIN [ATISA_Input].dbo.clientes c ON c.idcliente = cp.cliente_id
-                                WHERE cp.id = :cp_id
-                                """
-                            )
-                            row_cif = await run_in_threadpool(lambda: session.execute(sql_cif, {"cp_id": cp_id}).mappings().first())
-                            cif = row_cif["cif"] if row_cif else None
-                            codes: List[str] = []
-                            if cif:
-                                sql_subdeps = text(
-                                    """
-                                    SELECT sd.codSubDePar AS cod
-                                    FROM [ATISA_Input].dbo.clienteSubDePar csd
-                                    JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-                                    WHERE csd.cif = :cif
-                                    """
-                                )
-                                rows_sub = await run_in_threadpool(lambda: session.execute(sql_subdeps, {"cif": cif}).mappings().all())
-                                codes = [r["cod"] for r in rows_sub]
-                        finally:
-                            session.close()
-                        if codes:
-                            allowed = {"fecha_inicio", "fecha_fin", "mes", "anio", "anterior_id"}
-                            cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
-                            for cod in sorted(set(codes)):
-                                await _emit_event(cod, "cliente_proceso_actualizado", {
-                                    "cliente_proceso_id": cp_id,
-                                    "cambios": cambios,
-                                })
+                        allowed = {"fecha_inicio", "fecha_fin", "mes", "anio", "anterior_id"}
+                        cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
+                        outbox.record(CLIENTE_PROCESO, int(m.group(1)), cambios)
+                return response
+
+            # Cliente-Proceso-Hitos: a new hito instance emits nothing, but routes the master hito's
+            # events to its client from now on
+            if path == "/cliente-proceso-hitos/cliente-proceso-hitos" and method == "POST" and isinstance(parsed_body, dict):
+                try:
+                    outbox.record(CLIENTE_PROCESO_HITO_CREADO, int(parsed_body["cliente_proceso_id"]),
+                                  {"hito_id": int(parsed_body["hito_id"])})
+                except (KeyError, TypeError, ValueError):
+                    pass
                 return response
 
             # Admin Hitos Departamento: actualizar campos por CPH
             if path.startswith("/admin-hitos/departamento-hito/") and method == "POST":
                 m = re.match(r"^/admin-hitos/departamento-hito/(\d+)$", path)
                 if m:
-                    cph_id = int(m.group(1))
-                    session = _get_db_session()
-                    try:
-                        data = await run_in_threadpool(_fetch_cph_by_id, session, cph_id)
-                    finally:
-                        session.close()
-                    if data:
-                        # Cambios aplicados (si vienen en el body)
-                        allowed = {"estado", "fecha_limite", "hora_limite", "tipo"}
-                        cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
-
-                        # 1) Subdepartamentos por hito (relaciones existentes de CPH con mismo hito_id)
-                        session2 = _get_db_session()
-                        try:
-                            related_hito = await run_in_threadpool(_fetch_cph_updates_for_hito, session2, int(data.get("hito_id")))
-                        finally:
-                            session2.close()
-
-                        # 2) Subdepartamentos por CIF (misma lógica del GET): cliente completo asignado a varios subdepartamentos
-                        session3 = _get_db_session()
-                        try:
-                            sql_cif = text(
-                                """
-                                SELECT c.cif AS cif
-                                FROM [ATISA_Input].dbo.cliente_proceso_hito cph
-                                JOIN [ATISA_Input].dbo.cliente_proceso cp ON cp.id = cph.cliente_proceso_id
-                                JOIN [ATISA_Input].dbo.clientes c ON c.idcliente = cp.cliente_id
-                                WHERE cph.id = :id
-                                """
-                            )
-                            row_cif = await run_in_threadpool(lambda: session3.execute(sql_cif, {"id": cph_id}).mappings().first())
-                            cif = row_cif["cif"] if row_cif else None
-
-                            related_cif: List[Dict[str, Any]] = []
-                            if cif:
-                                sql_subdeps = text(
-                                    """
-                                    SELECT sd.codSubDePar AS cod
-                                    FROM [ATISA_Input].dbo.clienteSubDePar csd
-                                    JOIN [ATISA_Input].dbo.SubDePar sd ON sd.codSubDePar = csd.codSubDePar
-                                    WHERE csd.cif = :cif
-                                    """
-                                )
-                                rows_sub = await run_in_threadpool(lambda: session3.execute(sql_subdeps, {"cif": cif}).mappings().all())
-                                related_cif = [dict(r) for r in rows_sub]
-                        finally:
-                            session3.close()
-
-                        # Unificar subdepartamentos (por hito y por CIF), evitando duplicados
-                        cods: Dict[str, Dict[str, Any]] = {}
-                        for r in (related_hito or []):
-                            if r.get("cod"):
-                                cods[r["cod"]] = {"cph_id": r.get("cph_id"), "estado": r.get("estado")}
-                        for r in (related_cif or []):
-                            if r.get("cod") and r["cod"] not in cods:
-                                # Para los que vienen solo por CIF, usamos el CPH original y su estado
-                                cods[r["cod"]] = {"cph_id": data.get("cph_id"), "estado": data.get("estado")}
-
-                        # Emitir a todos los subdepartamentos resultantes
-                        for cod, meta in cods.items():
-                            payload = {
-                                "cliente_proceso_hito_id": meta.get("cph_id", data.get("cph_id")),
-                                "nuevo_estado": cambios.get("estado", meta.get("estado", data.get("estado"))),
-                                "hito_id": data.get("hito_id"),
-                                "cambios": cambios,
-                            }
-                            await _emit_event(cod, "hito_actualizado", payload)
+                    # Cambios aplicados (si vienen en el body)
+                    allowed = {"estado", "fecha_limite", "hora_limite", "tipo"}
+                    cambios = {k: v for k, v in (parsed_body or {}).items() if k in allowed}
+                    outbox.record(CLIENTE_PROCESO_HITO, int(m.group(1)), cambios)
                 return response
 
 
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+from collections import deque, namedtuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.infrastructure.db.compartido.tabla_valores import sql_tabla_valores, valores_json
+from app.infrastructure.db.database import SessionLocal
+from app.infrastructure.services.indice_rutas_eventos import indice_rutas_eventos
+from app.interfaces.api.websocket_hitos import broadcast_departament_events
+
+logger = logging.getLogger(__name__)
+
+# A change recorded by a write request: entity kind and id, changed fields and extra event data
+OutboxEntry = namedtuple("OutboxEntry", ["kind", "entity_id", "cambios", "extra"])
+
+# Entity kinds recorded by the write middleware
+PROCESO = "proceso"                                 # PUT /procesos/{id}
+HITO = "hito"                                       # PUT /hitos/{id}
+PROCESO_HITO = "proceso_hito"                       # POST /proceso-hitos
+CLIENTE_PROCESO_CREADO = "cliente_proceso_creado"   # POST /cliente-procesos
+CLIENTE_PROCESO = "cliente_proceso"                 # PUT /cliente-procesos/{id}
+CLIENTE_PROCESO_HITO = "cliente_proceso_hito"       # POST /admin-hitos/departamento-hito/{id}
+CLIENTE_PROCESO_HITO_CREADO = "cliente_proceso_hito_creado"  # POST /cliente-proceso-hitos (routing only)
+
+# Resolved event: (target subdepartments, tipo, data)
+Event = Tuple[List[str], str, Dict[str, Any]]
+
+# The changed cliente_proceso_hito rows: their hito and client route the event, their estado is the payload
+CPH_SQL = """
+    SELECT cph.id AS cph_id, cph.estado AS estado, cph.hito_id AS hito_id, cph.cliente_proceso_id AS cliente_proceso_id
+    FROM [ATISA_Input].dbo.cliente_proceso_hito cph
+    WHERE cph.id IN ({ids})
+"""
+
+
+def _rows(session: Session, sql: str, ids: Iterable[int]) -> list:
+    dialecto = session.get_bind().dialect.name
+    consulta = text(sql.format(ids=sql_tabla_valores(dialecto, "ids", "id", "INT")))
+    return session.execute(consulta, {"ids": valores_json(ids)}).mappings().all()
+
+
+def _track_writes(entries: List[OutboxEntry]) -> None:
+    """Keep the routing index current with the relations created by these writes."""
+    for entry in entries:
+        try:
+            if entry.kind == CLIENTE_PROCESO_CREADO and entry.extra.get("proceso_id") is not None:
+                indice_rutas_eventos.registrar_cliente_proceso(entry.entity_id, entry.extra["proceso_id"])
+            elif entry.kind == PROCESO_HITO and entry.cambios.get("hito_id") is not None:
+                indice_rutas_eventos.registrar_hito_proceso(entry.cambios["hito_id"], entry.entity_id)
+        except (TypeError, ValueError):
+            # Ids that are not numeric: the periodic reload will pick up whatever was written
+            continue
+
+
+def resolve_events(session: Session, entries: List[OutboxEntry]) -> List[Event]:
+    """
+    Target subdepartments and payload of every recorded change. Routing is resolved on the
+    in-memory routing index; only the changed cliente_proceso_hito rows are read (one query
+    per batch) because their estado is part of the event.
+    """
+    _track_writes(entries)
+    rutas = indice_rutas_eventos
+
+    cph_rows: Dict[int, Dict[str, Any]] = {}
+    cph_ids = {e.entity_id for e in entries if e.kind == CLIENTE_PROCESO_HITO}
+    if cph_ids:
+        cph_rows = {row["cph_id"]: dict(row) for row in _rows(session, CPH_SQL, cph_ids)}
+    created = [e for e in entries if e.kind == CLIENTE_PROCESO_HITO_CREADO]
+    cp_ids = {e.entity_id for e in entries if e.kind == CLIENTE_PROCESO}
+    cp_ids |= {row["cliente_proceso_id"] for row in cph_rows.values()}
+    cp_ids |= {e.entity_id for e in created}
+    if cp_ids:
+        rutas.precargar_cliente_procesos(session, cp_ids)
+
+    # New and changed hito instances route the master hito's events to their client
+    pairs = [(row["hito_id"], row["cliente_proceso_id"]) for row in cph_rows.values()]
+    pairs += [(e.cambios.get("hito_id"), e.entity_id) for e in created]
+    for hito_id, cp_id in pairs:
+        rutas.registrar_hito_cliente(hito_id, rutas.cliente_de_cliente_proceso(session, cp_id))
+
+    events: List[Event] = []
+    for entry in entries:
+        if entry.kind == PROCESO:
+            events.append((sorted(rutas.subdepar_de_proceso(session, entry.entity_id)), "proceso_actualizado", {
+                "proceso_id": entry.entity_id,
+                "cambios": entry.cambios,
+            }))
+        elif entry.kind == PROCESO_HITO:
+            events.append((sorted(rutas.subdepar_de_proceso(session, entry.entity_id)), "proceso_hitos_actualizado", {
+                "proceso_id": entry.entity_id,
+                "cambios": entry.cambios,
+            }))
+        elif entry.kind == HITO:
+            events.append((sorted(rutas.subdepar_de_hito(session, entry.entity_id)), "hito_master_actualizado", {
+                "hito_id": entry.entity_id,
+                "cambios": entry.cambios,
+            }))
+        elif entry.kind == CLIENTE_PROCESO_CREADO:
+            events.append((sorted(rutas.subdepar_por_cif(session, [str(entry.entity_id)])), "cliente_proceso_creado", {
+                "cliente_id": entry.entity_id,
+                "proceso_id": entry.extra.get("proceso_id"),
+                "cambios": entry.cambios,
+            }))
+        elif entry.kind == CLIENTE_PROCESO:
+            cliente = rutas.cliente_de_cliente_proceso(session, entry.entity_id)
+            events.append((sorted(rutas.subdepar_por_cif(session, [cliente] if cliente else [])), "cliente_proceso_actualizado", {
+                "cliente_proceso_id": entry.entity_id,
+                "cambios": entry.cambios,
+            }))
+        elif entry.kind == CLIENTE_PROCESO_HITO:
+            data = cph_rows.get(entry.entity_id)
+            if not data:
+                continue
+            # Every subdepartment using the hito (its tipo lives in the master hito) plus those
+            # assigned to the client or its CIF
+            cliente = rutas.cliente_de_cliente_proceso(session, data["cliente_proceso_id"])
+            codes = rutas.subdepar_de_hito(session, data["hito_id"])
+            if cliente:
+                codes |= rutas.subdepar_de_clientes(session, [cliente])
+            events.append((sorted(codes), "hito_actualizado", {
+                "cliente_proceso_hito_id": data["cph_id"],
+                "nuevo_estado": entry.cambios.get("estado", data["estado"]),
+                "hito_id": data["hito_id"],
+                "cambios": entry.cambios,
+            }))
+    return events
+
+
+class EventOutbox:
+    """
+    Outbox of WebSocket events for the write middleware.
+
+    - record() is called after a successful write and only appends (entity, id, cambios) to an
+      in-memory queue: no DB round-trips on the request path.
+    - A single background dispatcher takes up to `batch_size` pending changes, resolves their
+      target subdepartments on the routing index (in a worker thread, with one session for the
+      few lookups that still need the database) and publishes the events through the broker.
+    - The queue is bounded (`max_pending`): under a sustained backlog the oldest changes are
+      dropped and counted rather than growing without limit.
+    """
+
+    def __init__(self, batch_size: int = 200, max_pending: int = 10000):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._entries: deque = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.dispatched = 0
+        self.events_out = 0
+        self.dropped = 0
+        self.failed_batches = 0
+        self.batches = 0
+        self.last_batch_ms = 0.0
+
+    def record(self, kind: str, entity_id: Any, cambios: Optional[Dict[str, Any]] = None, **extra) -> None:
+        if len(self._entries) >= self.max_pending:
+            self._entries.popleft()
+            self.dropped += 1
+            logger.warning(f"Event outbox full ({self.max_pending}), dropping the oldest change")
+        self._entries.append(OutboxEntry(kind, entity_id, cambios or {}, extra))
+        self.recorded += 1
+
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Stop the dispatcher and publish what is still pending (application shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._dispatch_pending()
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            await self._dispatch_pending()
+
+    async def _dispatch_pending(self) -> None:
+        while self._entries:
+            batch = [self._entries.popleft() for _ in range(min(self.batch_size, len(self._entries)))]
+            started = time.perf_counter()
+            try:
+                events = await run_in_threadpool(self._resolve, batch)
+            except Exception as e:
+                self.failed_batches += 1
+                logger.error(f"Event outbox could not resolve a batch of {len(batch)} changes: {e}")
+                continue
+            for cod_subdepars, tipo, data in events:
+                if not cod_subdepars:
+                    continue
+                try:
+                    await broadcast_departament_events(cod_subdepars, tipo, data)
+                    self.events_out += 1
+                except Exception as e:
+                    logger.error(f"Failed to broadcast event '{tipo}' to {cod_subdepars}: {e}")
+            self.dispatched += len(batch)
+            self.batches += 1
+            self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _resolve(batch: List[OutboxEntry]) -> List[Event]:
+        session = SessionLocal()
+        try:
+            return resolve_events(session, batch)
+        finally:
+            session.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._entries),
+            "recorded": self.recorded,
+            "dispatched": self.dispatched,
+            "events_out": self.events_out,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_batch_ms": round(self.last_batch_ms, 1),
+        }
+
+
+# Global outbox instance
+outbox = EventOutbox(
+    batch_size=settings.WEBSOCKET_OUTBOX_LOTE,
+    max_pending=settings.WEBSOCKET_OUTBOX_MAXIMO,
+)
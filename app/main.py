@@ -1,5 +1,7 @@
 # app/main.py
 
+import threading
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -14,6 +16,13 @@ from app.interfaces.api.security.auth import get_current_user
 # WebSocket integration
 from app.interfaces.api.websocket_integration import configure_websockets
 
+# Cachés en proceso
+from app.infrastructure.services.asignaciones_empleado_cache import precargar_asignaciones
+
+# Migraciones SQL versionadas (app/infrastructure/db/migraciones)
+from app.infrastructure.db.database import engine
+from app.scripts.aplicar_migraciones import migraciones_pendientes
+
 # Importa todos tus routers de la versión 1
 from app.interfaces.api.v1.endpoints import (
     plantilla,
@@ -26,6 +35,7 @@ from app.interfaces.api.v1.endpoints import (
     plantilla_proceso,
     proceso_hito_maestro,
     admin_api_cliente,
+    admin_cache,
     metadato,
     metadatos_area,
     documentos_cumplimiento,
@@ -86,6 +96,7 @@ app.include_router(auth_routes.router)
 
 # --- Routers de administración (sin autenticación JWT/API-Key) ---
 app.include_router(admin_api_cliente.router)
+app.include_router(admin_cache.router)
 
 # --- Routers v1 protegidos por get_current_user ---
 app.include_router(plantilla.router,            dependencies=[Depends(get_current_user)])
@@ -118,6 +129,25 @@ app.include_router(documental_carpeta_documentos.router, dependencies=[Depends(g
 
 configure_websockets(app)
 
+# --- Esquema al día: los modelos mapean columnas y tablas que crean las migraciones (row_version
+# de V0003, tablas de V0004); sin ellas en SQL Server fallan todas las consultas de esas tablas ---
+@app.on_event("startup")
+def comprobar_migraciones():
+    if engine.dialect.name != "mssql":
+        return
+    pendientes = migraciones_pendientes()
+    if pendientes:
+        raise RuntimeError(
+            f"Migraciones pendientes: {', '.join('V' + version for version in pendientes)}. "
+            "Aplícalas con 'python -m app.scripts.aplicar_migraciones' antes de arrancar la API"
+        )
+
+# --- Precarga de cachés en segundo plano (no retrasa el arranque) ---
+@app.on_event("startup")
+def precargar_caches():
+    if settings.ASIGNACIONES_CACHE_PRECARGAR:
+        threading.Thread(target=precargar_asignaciones, daemon=True).start()
+
 # --- Health check opcional ---
 @app.get("/health", tags=["Status"])
 def health_check():
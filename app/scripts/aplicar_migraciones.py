@@ -0,0 +1,77 @@
+# app/scripts/aplicar_migraciones.py
+#
+# Aplica en orden las migraciones SQL versionadas de app/infrastructure/db/migraciones
+# (V<version>__<descripcion>.sql) que aún no figuren en la tabla migraciones_aplicadas.
+# Cada fichero se divide en lotes por las líneas "GO", como en SQL Server Management Studio:
+#
+#   python -m app.scripts.aplicar_migraciones [--listar]
+
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import inspect
+
+from app.infrastructure.db.database import SessionLocal, engine
+from app.infrastructure.db.models.migracion_aplicada_model import MigracionAplicadaModel
+
+DIRECTORIO_MIGRACIONES = Path(__file__).resolve().parents[1] / "infrastructure" / "db" / "migraciones"
+PATRON_FICHERO = re.compile(r"^V(?P<version>\d+)__(?P<descripcion>\w+)\.sql$")
+SEPARADOR_LOTES = re.compile(r"^\s*GO\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+def migraciones_disponibles() -> list:
+    migraciones = []
+    for fichero in DIRECTORIO_MIGRACIONES.glob("V*.sql"):
+        m = PATRON_FICHERO.match(fichero.name)
+        if m:
+            migraciones.append((m.group("version"), m.group("descripcion").replace("_", " "), fichero))
+    return sorted(migraciones, key=lambda migracion: int(migracion[0]))
+
+
+def migraciones_pendientes() -> list:
+    """Versiones sin aplicar, sin crear la tabla migraciones_aplicadas si aún no existe."""
+    if not inspect(engine).has_table(MigracionAplicadaModel.__tablename__):
+        return [migracion[0] for migracion in migraciones_disponibles()]
+    db = SessionLocal()
+    try:
+        aplicadas = {fila.version for fila in db.query(MigracionAplicadaModel.version)}
+    finally:
+        db.close()
+    return [migracion[0] for migracion in migraciones_disponibles() if migracion[0] not in aplicadas]
+
+
+def aplicar_migraciones(solo_listar: bool = False) -> list:
+    MigracionAplicadaModel.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        aplicadas = {fila.version for fila in db.query(MigracionAplicadaModel.version)}
+        pendientes = [m for m in migraciones_disponibles() if m[0] not in aplicadas]
+        if solo_listar:
+            return pendientes
+
+        for version, descripcion, fichero in pendientes:
+            lotes = [lote.strip() for lote in SEPARADOR_LOTES.split(fichero.read_text(encoding="utf-8"))]
+            # Cada migración se aplica en su propia transacción y se registra al terminar
+            with engine.begin() as conexion:
+                for lote in lotes:
+                    if lote:
+                        conexion.exec_driver_sql(lote)
+            db.add(MigracionAplicadaModel(version=version, descripcion=descripcion, fecha_aplicacion=datetime.now()))
+            db.commit()
+            print(f"Migración V{version} aplicada: {descripcion}")
+        return pendientes
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    listar = "--listar" in sys.argv
+    pendientes = aplicar_migraciones(solo_listar=listar)
+    if not pendientes:
+        print("No hay migraciones pendientes")
+    elif listar:
+        for version, descripcion, _ in pendientes:
+            print(f"V{version} pendiente: {descripcion}")
@@ -0,0 +1,149 @@
+# app/scripts/benchmark_broadcast_tramas.py
+#
+# Benchmark del broadcast de WebSocket: CPU por cada 1.000 destinatarios serializando cada
+# mensaje en cada canal (antes) frente a tramas codificadas una sola vez y compartidas (después).
+#
+# Escenarios:
+# - evento: un mismo evento emitido a varios subdepartamentos (como hace el middleware).
+# - lote: un lote del debouncer con muchos eventos, también en varios canales.
+#
+# Uso (desde la raíz del repositorio, con el entorno de la aplicación configurado):
+#
+#   python -m app.scripts.benchmark_broadcast_tramas [--canales 100] [--clientes 10] [--eventos 200] [--repeticiones 5]
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from app.infrastructure.services import tramas_websocket
+from app.infrastructure.services.tramas_websocket import FORMATO_JSON, FORMATO_MSGPACK, Trama, TramaLote
+from app.interfaces.api.websocket_hitos import ConnectionManager
+
+
+class Contador:
+    tramas = 0
+    bytes = 0
+
+
+class SocketSimulado:
+    """WebSocket que acepta cualquier trama al instante; solo cuenta lo enviado."""
+
+    def __init__(self, contador: Contador):
+        self.contador = contador
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, texto: str):
+        self.contador.tramas += 1
+        self.contador.bytes += len(texto)
+
+    async def send_bytes(self, datos: bytes):
+        self.contador.tramas += 1
+        self.contador.bytes += len(datos)
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+def _evento(i: int) -> dict:
+    return {
+        "tipo": "hito_actualizado",
+        "cliente_proceso_hito_id": 100000 + i,
+        "nuevo_estado": "Finalizado",
+        "hito_id": 500 + i % 40,
+        "cambios": {"estado": "Finalizado", "fecha_limite": "2024-06-30", "hora_limite": "14:00:00"},
+        "usuario": "usuario.prueba",
+        "timestamp": datetime.now().isoformat(),
+    }
+
+
+async def _conectar(manager: ConnectionManager, canales: list, clientes: int, formato: str, contador: Contador):
+    for canal in canales:
+        for _ in range(clientes):
+            await manager.connect(SocketSimulado(contador), canal, formato)
+
+
+async def _medir(difundir, contador: Contador, destinatarios: int, repeticiones: int) -> float:
+    """Segundos de CPU por repetición (mediana) de difundir() hasta que todos reciben la trama."""
+    tiempos = []
+    for _ in range(repeticiones):
+        esperadas = contador.tramas + destinatarios
+        inicio = time.process_time()
+        await difundir()
+        while contador.tramas < esperadas:
+            await asyncio.sleep(0)
+        tiempos.append(time.process_time() - inicio)
+    return sorted(tiempos)[len(tiempos) // 2]
+
+
+async def ejecutar(canales: int, clientes: int, eventos: int, repeticiones: int, formato: str) -> dict:
+    manager = ConnectionManager(max_queue=eventos + 10, heartbeat_interval=3600)
+    codigos = [f"BENCH{n:03d}" for n in range(canales)]
+    contador = Contador()
+    await _conectar(manager, codigos, clientes, formato, contador)
+    destinatarios = canales * clientes
+    evento = _evento(0)
+    lote = [_evento(i) for i in range(eventos)]
+
+    async def evento_antes():
+        for cod in codigos:
+            await manager.broadcast(json.dumps(dict(evento)), cod)
+
+    async def evento_despues():
+        trama = Trama(dict(evento))
+        for cod in codigos:
+            await manager.broadcast(trama, cod)
+
+    async def lote_antes():
+        for cod in codigos:
+            batch = {"tipo": "batch", "count": len(lote), "events": lote, "timestamp": datetime.now().isoformat()}
+            await manager.broadcast(json.dumps(batch), cod)
+
+    async def lote_despues():
+        tramas = [Trama(e) for e in lote]
+        for cod in codigos:
+            batch = TramaLote(tramas, tipo="batch", count=len(tramas), timestamp=datetime.now().isoformat())
+            await manager.broadcast(batch, cod)
+
+    resultados = {}
+    por_mil = 1000 / destinatarios
+    for nombre, antes, despues in (("evento", evento_antes, evento_despues), ("lote", lote_antes, lote_despues)):
+        cpu_antes = await _medir(antes, contador, destinatarios, repeticiones) * por_mil
+        cpu_despues = await _medir(despues, contador, destinatarios, repeticiones) * por_mil
+        resultados[nombre] = {
+            "antes_ms_por_1000": round(cpu_antes * 1000, 3),
+            "despues_ms_por_1000": round(cpu_despues * 1000, 3),
+        }
+
+    for conexiones in list(manager.active_connections.values()):
+        for conexion in list(conexiones.values()):
+            manager.disconnect(conexion.cod_subdepar, conexion.client_id)
+    if manager._heartbeat_task:
+        manager._heartbeat_task.cancel()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CPU del broadcast de WebSocket por cada 1.000 destinatarios: serializar por canal frente a tramas compartidas")
+    parser.add_argument("--canales", type=int, default=100)
+    parser.add_argument("--clientes", type=int, default=10, help="Clientes por canal")
+    parser.add_argument("--eventos", type=int, default=200, help="Eventos por lote")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    formatos = [FORMATO_JSON] + ([FORMATO_MSGPACK] if tramas_websocket.msgpack is not None else [])
+    print(f"orjson: {'sí' if tramas_websocket.orjson is not None else 'no'} | "
+          f"msgpack: {'sí' if tramas_websocket.msgpack is not None else 'no'} | "
+          f"{args.canales} canales x {args.clientes} clientes, lotes de {args.eventos} eventos")
+    for formato in formatos:
+        resultados = asyncio.run(ejecutar(args.canales, args.clientes, args.eventos, args.repeticiones, formato))
+        for escenario, cpu in resultados.items():
+            print(f"[{formato}] {escenario}: antes {cpu['antes_ms_por_1000']} ms CPU / 1.000 destinatarios, "
+                  f"después {cpu['despues_ms_por_1000']} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# app/scripts/benchmark_carga_websocket.py
+#
+# Prueba de carga del fan-out de WebSocket (ConnectionManager + DebounceBroadcaster) de extremo a extremo.
+#
+# Arranca la aplicación en este mismo proceso (uvicorn en un hilo propio), abre N clientes WebSocket
+# repartidos entre M departamentos, genera escrituras por HTTP con POST /admin-hitos/departamento-hito/{id}
+# (el mismo camino que el frontend: middleware -> outbox -> broker -> debouncer -> sockets) y mide:
+#
+# - latencia de entrega: desde la última escritura de un hito hasta que cada cliente recibe su evento;
+# - tramas perdidas: huecos en el `seq` de cada canal y avisos resync_required;
+# - CPU del servidor: CPU del proceso menos la de los hilos de la propia carga (clientes y escrituras).
+#
+# Al terminar muestra los medidores del servidor (ws-estadisticas?por_canal=true): colas de envío,
+# tamaño de los lotes del debouncer y latencia de los envíos.
+#
+# Necesita la base de datos de la aplicación (DATABASE_URL) con hitos en los departamentos elegidos. Cada
+# escritura vuelve a guardar el estado que ya tiene el hito, así que no cambia los datos.
+#
+# Uso (desde la raíz del repositorio, con el entorno de la aplicación configurado):
+#
+#   python -m app.scripts.benchmark_carga_websocket [--clientes 500] [--departamentos 10 | --codigos A,B]
+#       [--escrituras 50] [--duracion 30] [--formato json|msgpack] [--multiplexado --canales-por-cliente 3]
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+import websockets
+
+from app.config import settings
+from app.infrastructure.services import tramas_websocket
+from app.infrastructure.services.tramas_websocket import FORMATO_MSGPACK
+from app.interfaces.api.security.auth import create_access_token
+from app.main import app
+
+
+def _percentiles(valores: list) -> dict:
+    ordenados = sorted(valores)
+    if not ordenados:
+        return {"n": 0}
+
+    def p(q: float) -> float:
+        return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))], 1)
+
+    return {"n": len(ordenados), "p50": p(0.50), "p95": p(0.95), "p99": p(0.99), "max": round(ordenados[-1], 1)}
+
+
+class ServidorEnProceso:
+    """La aplicación servida por uvicorn en un hilo con su propio bucle de eventos."""
+
+    def __init__(self):
+        self.servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", ws_max_size=2 ** 24))
+        self._hilo = threading.Thread(target=self.servidor.run, daemon=True)
+
+    def iniciar(self) -> str:
+        self._hilo.start()
+        while not self.servidor.started:
+            time.sleep(0.05)
+        puerto = self.servidor.servers[0].sockets[0].getsockname()[1]
+        return f"127.0.0.1:{puerto}"
+
+    def parar(self):
+        self.servidor.should_exit = True
+        self._hilo.join(timeout=10)
+
+
+class Medidas:
+    def __init__(self):
+        self.enviados: dict = {}            # cliente_proceso_hito_id -> instante de la última escritura
+        self.latencias_ms: list = []
+        self.http_ms: list = []
+        self.escrituras_ok = 0
+        self.escrituras_error = 0
+        self.eventos = 0
+        self.tramas = 0
+        self.perdidas = 0
+        self.resyncs = 0
+        self.conectados = 0
+        self.errores_conexion = 0
+        self.cpu_carga = 0.0                # CPU de los hilos de escritura
+        self._lock = threading.Lock()
+
+    def sumar_cpu(self, segundos: float):
+        with self._lock:
+            self.cpu_carga += segundos
+
+
+class Cliente:
+    """Un socket simulado: decodifica cada trama, comprueba el seq de cada canal y anota latencias."""
+
+    def __init__(self, url: str, formato: str, medidas: Medidas, canales: list):
+        self.url = url
+        self.formato = formato
+        self.medidas = medidas
+        self.canales = canales
+        self.ultimo_seq: dict = {}
+
+    def _decodificar(self, trama):
+        if isinstance(trama, bytes):
+            return tramas_websocket.msgpack.unpackb(trama, raw=False)
+        return json.loads(trama)
+
+    def _procesar(self, mensaje: dict, ahora: float):
+        tipo = mensaje.get("tipo")
+        if tipo == "resync_required":
+            self.medidas.resyncs += 1
+            return
+        if tipo in ("connected", "subscribed", "heartbeat", "pong"):
+            return
+        eventos = mensaje.get("events", []) if tipo == "batch" else [mensaje]
+
+        # seq es el del último evento de la trama: el anterior debe ser seq - len(eventos)
+        seq = mensaje.get("seq")
+        canal = mensaje.get("canal", self.canales[0])
+        if seq is not None and not mensaje.get("replay"):
+            anterior = self.ultimo_seq.get(canal)
+            if anterior is not None and seq - len(eventos) > anterior:
+                self.medidas.perdidas += seq - len(eventos) - anterior
+            self.ultimo_seq[canal] = seq
+
+        for evento in eventos:
+            self.medidas.eventos += 1
+            if evento.get("tipo") == "hito_actualizado":
+                enviado = self.medidas.enviados.get(evento.get("cliente_proceso_hito_id"))
+                if enviado is not None:
+                    self.medidas.latencias_ms.append((ahora - enviado) * 1000)
+
+    async def ejecutar(self, conectado: asyncio.Event, parar: asyncio.Event):
+        try:
+            async with websockets.connect(self.url, max_size=None, ping_interval=None) as ws:
+                self.medidas.conectados += 1
+                conectado.set()
+                while not parar.is_set():
+                    try:
+                        trama = await asyncio.wait_for(ws.recv(), 0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    self.medidas.tramas += 1
+                    self._procesar(self._decodificar(trama), time.perf_counter())
+        except (OSError, websockets.WebSocketException):
+            self.medidas.errores_conexion += 1
+            conectado.set()
+
+
+class Carga:
+    def __init__(self, args):
+        self.args = args
+        self.medidas = Medidas()
+        self.token = create_access_token({"sub": "carga.websocket"})
+        self._local = threading.local()
+
+    def _sesion(self) -> requests.Session:
+        if not hasattr(self._local, "sesion"):
+            self._local.sesion = requests.Session()
+            self._local.sesion.headers["Authorization"] = f"Bearer {self.token}"
+        return self._local.sesion
+
+    def hitos_por_departamento(self) -> dict:
+        """{codSubDePar: [(cliente_proceso_hito_id, estado)]} leídos del propio listado de la API."""
+        departamentos: dict = {}
+        codigos = self.args.codigos.split(",") if self.args.codigos else [None]
+        for codigo in codigos:
+            params = {"flat": 1, "limit": 5000}
+            if codigo:
+                params["cod_subdepar"] = codigo
+            respuesta = self._sesion().get(f"{self.base_http}/admin-hitos/departamentos-hitos", params=params, timeout=120)
+            respuesta.raise_for_status()
+            for fila in respuesta.json()["items"]:
+                departamentos.setdefault(fila["codigo_subdepar"], {})[fila["cliente_proceso_hito_id"]] = fila["estado"]
+        elegidos = sorted(departamentos, key=lambda cod: -len(departamentos[cod]))[: self.args.departamentos]
+        return {cod: list(departamentos[cod].items()) for cod in elegidos}
+
+    def _escribir(self, cph_id: int, estado: str):
+        inicio_cpu = time.thread_time()
+        inicio = time.perf_counter()
+        self.medidas.enviados[cph_id] = inicio
+        try:
+            respuesta = self._sesion().post(
+                f"{self.base_http}/admin-hitos/departamento-hito/{cph_id}", json={"estado": estado}, timeout=30
+            )
+            if respuesta.ok:
+                self.medidas.escrituras_ok += 1
+            else:
+                self.medidas.escrituras_error += 1
+        except requests.RequestException:
+            self.medidas.escrituras_error += 1
+        self.medidas.http_ms.append((time.perf_counter() - inicio) * 1000)
+        self.medidas.sumar_cpu(time.thread_time() - inicio_cpu)
+
+    def _url_cliente(self, canales: list) -> str:
+        ruta = f"{self.base_ws}/api/admin/hitos-departamento/ws"
+        consulta = f"token={self.token}&formato={self.args.formato}"
+        if self.args.multiplexado:
+            return f"{ruta}?{consulta}&canales={','.join(canales)}"
+        return f"{ruta}/{canales[0]}?{consulta}"
+
+    async def _generar_escrituras(self, hitos: list, parar: asyncio.Event):
+        bucle = asyncio.get_running_loop()
+        intervalo = 1.0 / self.args.escrituras
+        siguiente = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.hilos_http) as hilos:
+            while not parar.is_set():
+                cph_id, estado = random.choice(hitos)
+                bucle.run_in_executor(hilos, self._escribir, cph_id, estado)
+                siguiente += intervalo
+                await asyncio.sleep(max(0.0, siguiente - time.perf_counter()))
+
+    def _estadisticas_servidor(self) -> dict:
+        respuesta = requests.get(
+            f"{self.base_api}/api/admin/hitos-departamento/ws-estadisticas",
+            params={"por_canal": "true"},
+            headers={"x-admin-api-key": settings.ADMIN_API_KEY},
+            timeout=30,
+        )
+        return respuesta.json() if respuesta.ok else {"error": respuesta.status_code}
+
+    async def ejecutar(self, direccion: str) -> dict:
+        # Las rutas HTTP se piden como llegan detrás del proxy (sin root_path), que es como las
+        # reconoce el middleware de eventos; las declaradas con /api/... necesitan el root_path delante
+        raiz = app.root_path or ""
+        self.base_http = f"http://{direccion}"
+        self.base_api = f"http://{direccion}{raiz}"
+        self.base_ws = f"ws://{direccion}{raiz}"
+
+        departamentos = await asyncio.to_thread(self.hitos_por_departamento)
+        if not departamentos:
+            raise SystemExit("No hay hitos en los departamentos indicados")
+        codigos = list(departamentos)
+        hitos = [hito for lista in departamentos.values() for hito in lista]
+
+        # Clientes repartidos por turnos entre los departamentos
+        parar = asyncio.Event()
+        tareas = []
+        inicio_conexion = time.perf_counter()
+        for n in range(self.args.clientes):
+            if self.args.multiplexado:
+                canales = [codigos[(n + k) % len(codigos)] for k in range(min(self.args.canales_por_cliente, len(codigos)))]
+            else:
+                canales = [codigos[n % len(codigos)]]
+            conectado = asyncio.Event()
+            cliente = Cliente(self._url_cliente(canales), self.args.formato, self.medidas, canales)
+            tareas.append(asyncio.create_task(cliente.ejecutar(conectado, parar)))
+            await conectado.wait()
+        segundos_conexion = time.perf_counter() - inicio_conexion
+
+        cpu_proceso = time.process_time()
+        cpu_clientes = time.thread_time()
+        reloj = time.perf_counter()
+
+        escrituras = asyncio.create_task(self._generar_escrituras(hitos, parar))
+        await asyncio.sleep(self.args.duracion)
+        escrituras.cancel()
+        # Margen para que lleguen los eventos de las últimas escrituras
+        await asyncio.sleep(self.args.espera)
+
+        duracion = time.perf_counter() - reloj
+        cpu_clientes = time.thread_time() - cpu_clientes
+        cpu_servidor = time.process_time() - cpu_proceso - cpu_clientes - self.medidas.cpu_carga
+        servidor = await asyncio.to_thread(self._estadisticas_servidor)
+
+        parar.set()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+        m = self.medidas
+        return {
+            "departamentos": len(codigos),
+            "clientes": {"pedidos": self.args.clientes, "conectados": m.conectados, "errores": m.errores_conexion,
+                         "segundos_conexion": round(segundos_conexion, 2)},
+            "escrituras": {"ok": m.escrituras_ok, "error": m.escrituras_error, "por_segundo": round(m.escrituras_ok / duracion, 1),
+                           "http_ms": _percentiles(m.http_ms)},
+            "entrega": {"tramas": m.tramas, "eventos": m.eventos, "perdidas": m.perdidas, "resync_required": m.resyncs,
+                        "latencia_ms": _percentiles(m.latencias_ms)},
+            "cpu_servidor": {"segundos": round(cpu_servidor, 2), "porcentaje_nucleo": round(100 * cpu_servidor / duracion, 1)},
+            "servidor": servidor,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del fan-out de WebSocket de extremo a extremo")
+    parser.add_argument("--clientes", type=int, default=500)
+    parser.add_argument("--departamentos", type=int, default=10, help="Departamentos con más hitos a usar")
+    parser.add_argument("--codigos", help="codSubDePar concretos separados por coma (en lugar de elegirlos)")
+    parser.add_argument("--escrituras", type=float, default=50, help="Escrituras HTTP por segundo")
+    parser.add_argument("--hilos-http", type=int, default=16, help="Escrituras HTTP concurrentes")
+    parser.add_argument("--duracion", type=float, default=30, help="Segundos de escrituras")
+    parser.add_argument("--espera", type=float, default=3, help="Segundos de margen tras la última escritura")
+    parser.add_argument("--formato", choices=["json", FORMATO_MSGPACK], default="json")
+    parser.add_argument("--multiplexado", action="store_true", help="Un socket multiplexado por cliente")
+    parser.add_argument("--canales-por-cliente", type=int, default=3, help="Departamentos por socket multiplexado")
+    parser.add_argument("--json", action="store_true", help="Resultado completo en JSON")
+    args = parser.parse_args()
+    if args.formato == FORMATO_MSGPACK and tramas_websocket.msgpack is None:
+        raise SystemExit("msgpack no está instalado")
+
+    servidor = ServidorEnProceso()
+    direccion = servidor.iniciar()
+    try:
+        resultado = asyncio.run(Carga(args).ejecutar(direccion))
+    finally:
+        servidor.parar()
+
+    if args.json:
+        print(json.dumps(resultado, indent=2, default=str))
+        return
+    clientes, escrituras, entrega = resultado["clientes"], resultado["escrituras"], resultado["entrega"]
+    servidor_stats = resultado["servidor"]
+    print(f"{clientes['conectados']}/{clientes['pedidos']} clientes en {resultado['departamentos']} departamentos "
+          f"({clientes['segundos_conexion']} s en conectar, {clientes['errores']} errores)")
+    print(f"Escrituras: {escrituras['ok']} ok, {escrituras['error']} con error, {escrituras['por_segundo']}/s, "
+          f"HTTP ms {escrituras['http_ms']}")
+    print(f"Entrega: {entrega['eventos']} eventos en {entrega['tramas']} tramas, {entrega['perdidas']} perdidos, "
+          f"{entrega['resync_required']} resync_required")
+    print(f"Latencia de entrega ms: {entrega['latencia_ms']}")
+    print(f"CPU del servidor: {resultado['cpu_servidor']['segundos']} s ({resultado['cpu_servidor']['porcentaje_nucleo']} % de un núcleo)")
+    if "queues" in servidor_stats:
+        print(f"Colas de envío: {servidor_stats['queues']}")
+        debouncer = servidor_stats["debouncer"]
+        print(f"Debouncer: lotes {debouncer['batch_size']}, latencia ms {debouncer['flush_latency_ms']}")
+        print(f"Outbox: {servidor_stats['outbox']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# app/scripts/benchmark_pipeline_status.py
+#
+# Microbenchmark (solo CPU, sin BD ni openpyxl) de la transformación de filas del reporte de status:
+# implementación anterior de _generar_excel (tres pasadas, strftime/monthrange por fila)
+# frente a PipelineFilasStatus (una pasada con memorización).
+#
+#   python -m app.scripts.benchmark_pipeline_status [num_filas]
+
+import random
+import sys
+import time as timer
+from calendar import monthrange
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+
+from app.application.services.exportadores_status.pipeline_filas import PipelineFilasStatus
+
+
+def calcular_estado(estado_base, fecha_limite, hora_limite, fecha_cumplimiento):
+    # Copia de ClienteProcesoHitoStatusService._calculate_excel_status (evita cargar la configuración)
+    if estado_base == 'Finalizado':
+        if not fecha_cumplimiento or not fecha_limite:
+            return "Finalizado"
+        deadline = datetime.combine(fecha_limite, hora_limite) if hora_limite else datetime.combine(fecha_limite, time(23, 59, 59))
+        fulfillment_dt = datetime.combine(fecha_cumplimiento, time(0, 0, 0))
+        return "Cumplido fuera de plazo" if fulfillment_dt > deadline else "Cumplido en plazo"
+    if not fecha_limite:
+        return estado_base
+    today = date.today()
+    if fecha_limite == today:
+        return "Vence hoy"
+    elif fecha_limite < today:
+        return "Pendiente fuera de plazo"
+    return "Pendiente en plazo"
+
+
+Fila = namedtuple("Fila", [
+    "id", "cliente_proceso_id", "estado", "fecha_estado", "fecha_limite", "hora_limite", "tipo",
+    "cliente_nombre", "proceso_fecha_inicio", "proceso_fecha_fin", "proceso_mes", "proceso_anio",
+    "proceso_nombre", "proceso_estado", "hito_nombre", "hito_critico",
+    "cumplimiento_id", "cumplimiento_fecha", "cumplimiento_hora", "cumplimiento_observacion",
+    "cumplimiento_usuario", "cumplimiento_codSubDepar", "cumplimiento_departamento",
+    "cumplimiento_fecha_creacion", "cliente_departamento_codigo", "cliente_departamento_nombre",
+])
+
+
+def generar_filas(num_filas: int, semilla: int = 42) -> list:
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    filas = []
+    for i in range(num_filas):
+        cp_id = i // 8
+        mes = cp_id % 12 + 1
+        anio = 2024 + cp_id % 3
+        fecha_limite = hoy + timedelta(days=rnd.randint(-60, 60))
+        finalizado = rnd.random() < 0.5
+        filas.append(Fila(
+            i, cp_id, "Finalizado" if finalizado else "Pendiente", datetime(2025, 1, 1, 10, 0), fecha_limite,
+            rnd.choice([None, time(12, 0)]), rnd.choice(["Atisa", "Cliente", "Terceros"]),
+            f"Cliente {cp_id % 3000}", date(anio, mes, 1), None, mes, anio,
+            f"Proceso {cp_id % 40}", "En proceso", f"Hito {i % 25}", i % 7 == 0,
+            i if finalizado else None, fecha_limite + timedelta(days=rnd.randint(-3, 3)) if finalizado else None,
+            time(9, 30) if finalizado else None, "ok" if finalizado else None,
+            "Nombre Apellido" if finalizado else None, "000123" if finalizado else None,
+            "Laboral" if finalizado else None, datetime(2025, 1, 2, 9, 30) if finalizado else None,
+            f"0001{cp_id % 50:02d}", f"Departamento {cp_id % 50}",
+        ))
+    return filas
+
+
+def transformar_anterior(resultados, estados):
+    """Lógica de filas del _generar_excel anterior (filtro + procesos_estado + escritura)."""
+    estados_list = [e.strip() for e in estados.split(",")]
+    resultados = [
+        r for r in resultados
+        if calcular_estado(r.estado, r.fecha_limite, r.hora_limite, r.cumplimiento_fecha).lower().replace(" ", "_") in estados_list
+    ]
+
+    procesos_estado = {}
+    for r in resultados:
+        info = procesos_estado.setdefault(r.cliente_proceso_id, {'total_hitos': 0, 'hitos_finalizados': 0})
+        info['total_hitos'] += 1
+        if r.estado == 'Finalizado':
+            info['hitos_finalizados'] += 1
+    for info in procesos_estado.values():
+        info['estado'] = 'Finalizado' if info['hitos_finalizados'] == info['total_hitos'] else 'En proceso'
+
+    salida = []
+    for r in resultados:
+        estado_calculado = calcular_estado(r.estado, r.fecha_limite, r.hora_limite, r.cumplimiento_fecha)
+        periodo = ""
+        if r.proceso_mes and r.proceso_anio:
+            _, last_day = monthrange(r.proceso_anio, r.proceso_mes)
+            inicio = date(r.proceso_anio, r.proceso_mes, 1)
+            fin = date(r.proceso_anio, r.proceso_mes, last_day)
+            periodo = f"{inicio.strftime('%d/%m/%Y')} - {fin.strftime('%d/%m/%Y')}"
+        gestor = observaciones = fecha_creacion = fecha_cumplimiento = hora_cumplimiento = dept_cumplimiento = ""
+        if r.cumplimiento_id:
+            gestor = str(r.cumplimiento_usuario or "").strip()
+            observaciones = str(r.cumplimiento_observacion or "").strip()
+            fecha_creacion = r.cumplimiento_fecha_creacion.strftime("%d/%m/%Y %H:%M") if r.cumplimiento_fecha_creacion else ""
+            fecha_cumplimiento = r.cumplimiento_fecha.strftime("%d/%m/%Y") if r.cumplimiento_fecha else ""
+            hora_cumplimiento = r.cumplimiento_hora.strftime("%H:%M") if r.cumplimiento_hora else ""
+            code = str(r.cumplimiento_codSubDepar or "").strip()
+            name = str(r.cumplimiento_departamento or "").strip()
+            dept_cumplimiento = f"{code[-2:]} - {name}" if code else name
+        dept_codigo = str(r.cliente_departamento_codigo or "").strip()
+        dept_nombre = str(r.cliente_departamento_nombre or "").strip()
+        dept_combined = f"{dept_codigo[-2:]} - {dept_nombre}" if dept_codigo else dept_nombre
+        salida.append([
+            str(r.cliente_nombre or "").strip(), dept_combined, str(r.proceso_nombre or "").strip(), periodo,
+            procesos_estado[r.cliente_proceso_id]['estado'], str(r.hito_nombre or "").strip(), str(r.tipo or ""),
+            "Clave" if r.hito_critico else "No Clave", estado_calculado,
+            r.fecha_limite.strftime("%d/%m/%Y") if r.fecha_limite else "",
+            r.hora_limite.strftime("%H:%M") if r.hora_limite else "",
+            r.fecha_estado.strftime("%d/%m/%Y") if r.fecha_estado else "",
+            gestor, observaciones, fecha_cumplimiento, hora_cumplimiento, fecha_creacion, dept_cumplimiento,
+        ])
+    return salida
+
+
+def transformar_pipeline(resultados, estados):
+    # Con el filtro ya aplicado en SQL, el pipeline recibe solo las filas que coinciden
+    pipeline = PipelineFilasStatus(calcular_estado=calcular_estado)
+    return list(pipeline.transformar(resultados))
+
+
+def medir(funcion, *args, repeticiones: int = 3) -> float:
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = timer.perf_counter()
+        funcion(*args)
+        mejor = min(mejor, timer.perf_counter() - inicio)
+    return mejor
+
+
+if __name__ == "__main__":
+    num_filas = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    estados = "cumplido_en_plazo,cumplido_fuera_de_plazo,vence_hoy,pendiente_fuera_de_plazo,pendiente_en_plazo"
+    filas = generar_filas(num_filas)
+
+    t_anterior = medir(transformar_anterior, filas, estados)
+    t_pipeline = medir(transformar_pipeline, filas, estados)
+
+    print(f"Filas: {num_filas:,}")
+    print(f"Anterior (3 pasadas): {t_anterior * 1000:8.1f} ms")
+    print(f"Pipeline (1 pasada):  {t_pipeline * 1000:8.1f} ms")
+    print(f"Ahorro de CPU:        {(1 - t_pipeline / t_anterior) * 100:8.1f} %")
@@ -0,0 +1,72 @@
+# app/scripts/benchmark_planes_periodo.py
+#
+# Compara en SQL Server (DATABASE_URL) el filtro de calendario por año/mes escrito con
+# YEAR()/MONTH() frente al rango semiabierto [inicio, fin) de rango_fechas. Para cada variante
+# muestra los operadores de acceso del plan estimado (SHOWPLAN_TEXT: Index Seek frente a Scan)
+# y el tiempo medio de ejecución. Conviene lanzarlo antes y después de aplicar la migración
+# V0001__indices_calendario.sql:
+#
+#   python -m app.scripts.benchmark_planes_periodo [anio] [mes] [repeticiones]
+
+import re
+import statistics
+import sys
+import time as timer
+from datetime import date
+
+from app.infrastructure.db.compartido.rango_fechas import rango_periodo
+from app.infrastructure.db.database import engine
+
+CONSULTAS = {
+    "calendario (cph.fecha_limite)": (
+        "SELECT COUNT(*) FROM dbo.cliente_proceso_hito cph "
+        "WHERE cph.habilitado = 1 AND YEAR(cph.fecha_limite) = ? AND MONTH(cph.fecha_limite) = ?",
+        "SELECT COUNT(*) FROM dbo.cliente_proceso_hito cph "
+        "WHERE cph.habilitado = 1 AND cph.fecha_limite >= ? AND cph.fecha_limite < ?",
+    ),
+    "procesos (cp.fecha_inicio)": (
+        "SELECT COUNT(*) FROM dbo.cliente_proceso cp "
+        "WHERE YEAR(cp.fecha_inicio) = ? AND MONTH(cp.fecha_inicio) = ?",
+        "SELECT COUNT(*) FROM dbo.cliente_proceso cp "
+        "WHERE cp.fecha_inicio >= ? AND cp.fecha_inicio < ?",
+    ),
+}
+
+OPERADORES_ACCESO = re.compile(r"(Index Seek|Index Scan|Clustered Index Seek|Clustered Index Scan|Table Scan)\(OBJECT:\(([^)]*)\)")
+
+
+def operadores_plan(conexion, sql: str, params: tuple) -> list:
+    conexion.exec_driver_sql("SET SHOWPLAN_TEXT ON")
+    try:
+        # Con SHOWPLAN_TEXT la sentencia no se ejecuta: se obtiene el plan estimado
+        resultado = conexion.exec_driver_sql(sql, params)
+        lineas = [fila[0] for fila in resultado.fetchall()]
+        while resultado.cursor is not None and resultado.cursor.nextset():
+            lineas.extend(fila[0] for fila in resultado.cursor.fetchall())
+    finally:
+        conexion.exec_driver_sql("SET SHOWPLAN_TEXT OFF")
+    return sorted({f"{op} {objeto.split('.')[-1]}" for linea in lineas for op, objeto in OPERADORES_ACCESO.findall(linea)})
+
+
+def medir(conexion, sql: str, params: tuple, repeticiones: int) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = timer.perf_counter()
+        conexion.exec_driver_sql(sql, params).scalar()
+        tiempos.append((timer.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+if __name__ == "__main__":
+    hoy = date.today()
+    anio = int(sys.argv[1]) if len(sys.argv) > 1 else hoy.year
+    mes = int(sys.argv[2]) if len(sys.argv) > 2 else hoy.month
+    repeticiones = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+    inicio, fin = rango_periodo(anio, mes)
+
+    with engine.connect() as conexion:
+        for nombre, (sql_funcion, sql_rango) in CONSULTAS.items():
+            print(nombre)
+            for etiqueta, sql, params in (("YEAR()/MONTH()", sql_funcion, (anio, mes)), ("rango [inicio, fin)", sql_rango, (inicio, fin))):
+                plan = operadores_plan(conexion, sql, params)
+                print(f"  {etiqueta:<20} {medir(conexion, sql, params, repeticiones):8.2f} ms  plan: {', '.join(plan) or '-'}")
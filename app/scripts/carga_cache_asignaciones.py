@@ -0,0 +1,69 @@
+# app/scripts/carga_cache_asignaciones.py
+#
+# Prueba de carga de los endpoints por usuario contra un servidor en marcha, con la caché de
+# asignaciones fría (invalidada antes de cada petición) y caliente. Mide la latencia de cliente
+# y muestra media, p50, p95 y máximo por endpoint:
+#
+#   python -m app.scripts.carga_cache_asignaciones --url http://localhost:8000 \
+#       --token <JWT> --admin-key <ADMIN_API_KEY> --email a@atisa.es --email b@atisa.es [--repeticiones 20]
+
+import argparse
+import statistics
+import time as timer
+
+import requests
+
+ENDPOINTS = {
+    "hitos-cliente-por-empleado": "/hitos/hitos-cliente-por-empleado",
+    "status-usuario": "/cliente-proceso-hitos/status-todos-clientes/hitos",
+    "metadatos-visibles": "/metadatos/visibles",
+}
+
+
+def medir(sesion: requests.Session, url: str, email: str) -> float:
+    inicio = timer.perf_counter()
+    r = sesion.get(url, params={"email": email})
+    r.raise_for_status()
+    return (timer.perf_counter() - inicio) * 1000
+
+
+def resumen(tiempos: list) -> str:
+    ordenados = sorted(tiempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+    return (
+        f"media {statistics.mean(ordenados):8.1f} ms  p50 {statistics.median(ordenados):8.1f} ms  "
+        f"p95 {p95:8.1f} ms  max {ordenados[-1]:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia por usuario con la caché de asignaciones fría y caliente")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--token", required=True, help="JWT de un usuario válido")
+    parser.add_argument("--admin-key", required=True, help="ADMIN_API_KEY para invalidar la caché")
+    parser.add_argument("--email", action="append", required=True, help="Email a consultar (repetible)")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    base = args.url.rstrip("/")
+    sesion = requests.Session()
+    sesion.headers["Authorization"] = f"Bearer {args.token}"
+    admin = {"x-admin-api-key": args.admin_key}
+
+    for nombre, ruta in ENDPOINTS.items():
+        frio, caliente = [], []
+        for _ in range(args.repeticiones):
+            for email in args.email:
+                requests.delete(f"{base}/admin/cache/asignaciones", params={"email": email}, headers=admin).raise_for_status()
+                frio.append(medir(sesion, base + ruta, email))
+                caliente.append(medir(sesion, base + ruta, email))
+
+        print(nombre)
+        print(f"  caché fría     {resumen(frio)}")
+        print(f"  caché caliente {resumen(caliente)}")
+
+    print(requests.get(f"{base}/admin/cache/asignaciones", headers=admin).json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+# app/scripts/refrescar_ceco_subdepar.py
+#
+# Job de refresco de la tabla ceco_subdepar (CODIDEPAR de HDW_Cecos <-> subdepartamento).
+# Evalúa una sola vez las reglas que troceaban CODIDEPAR y aplica solo las altas y bajas
+# respecto al contenido anterior. Pensado para ejecutarse de forma programada (cron / tarea),
+# antes del refresco de empleado_cliente, que se apoya en esta tabla:
+#
+#   python -m app.scripts.refrescar_ceco_subdepar
+
+import time as timer
+
+from app.infrastructure.db.database import SessionLocal, engine
+from app.infrastructure.db.models.ceco_subdepar_model import CecoSubdeparModel
+from app.infrastructure.db.repositories.ceco_subdepar_repository_sql import CecoSubdeparRepositorySQL
+
+
+def refrescar_ceco_subdepar() -> dict:
+    # La crea la migración V0004; aquí solo por si se ejecuta sobre una base sin migrar (desarrollo)
+    CecoSubdeparModel.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        return CecoSubdeparRepositorySQL(db).refrescar()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    inicio = timer.perf_counter()
+    resultado = refrescar_ceco_subdepar()
+    print(
+        f"ceco_subdepar: {resultado['altas']} altas, {resultado['bajas']} bajas, "
+        f"{resultado['total']} correspondencias ({timer.perf_counter() - inicio:.1f} s)"
+    )
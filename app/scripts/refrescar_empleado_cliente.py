@@ -0,0 +1,37 @@
+# app/scripts/refrescar_empleado_cliente.py
+#
+# Job de refresco de la tabla empleado_cliente (clientes asignados a cada empleado).
+# Recalcula las asignaciones sobre las tablas de RRHH/contratos y aplica solo las altas y bajas
+# respecto al snapshot anterior. Refresca antes la tabla ceco_subdepar, de la que depende.
+# Pensado para ejecutarse de forma programada (cron / tarea):
+#
+#   python -m app.scripts.refrescar_empleado_cliente
+
+import time as timer
+
+from app.infrastructure.db.database import SessionLocal, engine
+from app.infrastructure.db.models.empleado_cliente_model import EmpleadoClienteModel
+from app.infrastructure.db.repositories.empleado_cliente_repository_sql import EmpleadoClienteRepositorySQL
+from app.scripts.refrescar_ceco_subdepar import refrescar_ceco_subdepar
+
+
+def refrescar_empleado_cliente() -> dict:
+    refrescar_ceco_subdepar()
+
+    # La crea la migración V0004; aquí solo por si se ejecuta sobre una base sin migrar (desarrollo)
+    EmpleadoClienteModel.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        return EmpleadoClienteRepositorySQL(db).refrescar()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    inicio = timer.perf_counter()
+    resultado = refrescar_empleado_cliente()
+    print(
+        f"empleado_cliente: {resultado['altas']} altas, {resultado['bajas']} bajas, "
+        f"{resultado['total']} asignaciones ({timer.perf_counter() - inicio:.1f} s)"
+    )
@@ -0,0 +1,7 @@
+import os
+
+# Settings obligatorios para importar la app sin .env; los tests no usan la base de datos configurada
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("ADMIN_API_KEY", "test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("FILE_STORAGE_ROOT", "/tmp")
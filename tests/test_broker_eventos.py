@@ -0,0 +1,281 @@
+"""
+Brokers de eventos entre workers: el local con dos instancias sobre sockets Unix en un directorio
+temporal y el de Redis contra un servidor RESP mínimo en memoria (PUBLISH/SUBSCRIBE).
+"""
+import asyncio
+import os
+
+import pytest
+
+from app.infrastructure.services.broker_eventos import BrokerLocal, BrokerRedis, _comando_resp, _leer_resp
+from app.infrastructure.services.tramas_websocket import Trama
+
+ESPERA = 0.1
+
+
+class ServidorResp:
+    """Lo justo de Redis para los brokers: PUBLISH, SUBSCRIBE, UNSUBSCRIBE y +OK para el resto."""
+
+    def __init__(self):
+        self.suscripciones: dict[bytes, set] = {}
+        self.clientes: dict = {}
+
+    async def _atender(self, reader, writer):
+        self.clientes[writer] = asyncio.current_task()
+        propias = set()
+        try:
+            while True:
+                comando = await _leer_resp(reader)
+                operacion = comando[0].upper()
+                if operacion == b"PUBLISH":
+                    destinos = list(self.suscripciones.get(comando[1], ()))
+                    for destino in destinos:
+                        destino.write(_comando_resp(b"message", comando[1], comando[2]))
+                    writer.write(b":%d\r\n" % len(destinos))
+                elif operacion == b"SUBSCRIBE":
+                    for canal in comando[1:]:
+                        self.suscripciones.setdefault(canal, set()).add(writer)
+                        propias.add(canal)
+                        writer.write(b"*3\r\n" + _comando_resp(b"subscribe", canal)[4:] + b":1\r\n")
+                elif operacion == b"UNSUBSCRIBE":
+                    for canal in comando[1:]:
+                        self.suscripciones.get(canal, set()).discard(writer)
+                        propias.discard(canal)
+                else:
+                    writer.write(b"+OK\r\n")
+        except Exception:
+            pass
+        finally:
+            for canal in propias:
+                self.suscripciones.get(canal, set()).discard(writer)
+            self.clientes.pop(writer, None)
+            writer.close()
+
+    async def iniciar(self) -> int:
+        self.servidor = await asyncio.start_server(self._atender, "127.0.0.1", 0)
+        return self.servidor.sockets[0].getsockname()[1]
+
+    async def cerrar(self):
+        self.servidor.close()
+        for writer in list(self.clientes):
+            writer.close()
+        await asyncio.gather(*self.clientes.values(), return_exceptions=True)
+
+
+def _receptor(recibidos: list):
+    async def entregar(canal, trama):
+        recibidos.append((canal, trama.texto))
+    return entregar
+
+
+def _broker_local(directorio, nombre, recibidos) -> BrokerLocal:
+    broker = BrokerLocal(_receptor(recibidos), str(directorio))
+    broker.ruta = os.path.join(str(directorio), f"{nombre}.sock")
+    return broker
+
+
+def test_local_entrega_solo_a_los_workers_suscritos(tmp_path):
+    async def escenario():
+        recibidos_a, recibidos_b = [], []
+        a = _broker_local(tmp_path, "a", recibidos_a)
+        b = _broker_local(tmp_path, "b", recibidos_b)
+        await a.iniciar()
+        await b.iniciar()
+        a.suscribir("100")
+        b.suscribir("100")
+        b.suscribir("200")
+        await asyncio.sleep(ESPERA)
+
+        await a.publicar("100", Trama({"n": 1}))
+        await a.publicar("200", Trama({"n": 2}))
+        await a.publicar("300", Trama({"n": 3}))
+        await asyncio.sleep(ESPERA)
+        b.desuscribir("100")
+        await asyncio.sleep(ESPERA)
+        await a.publicar("100", Trama({"n": 4}))
+        await asyncio.sleep(ESPERA)
+        await a.cerrar()
+        await b.cerrar()
+        return recibidos_a, recibidos_b
+
+    recibidos_a, recibidos_b = asyncio.run(escenario())
+    assert [canal for canal, _ in recibidos_a] == ["100", "100"]
+    assert recibidos_b == [("100", '{"n":1}'), ("200", '{"n":2}')]
+
+
+def test_local_envia_eventos_mayores_que_un_datagrama(tmp_path):
+    # Con SOCK_DGRAM los mensajes de más de ~208 KB fallaban (EMSGSIZE) y solo se registraban
+    grande = Trama({"datos": "x" * (2 * 1024 * 1024)})
+
+    async def escenario():
+        recibidos = []
+        a = _broker_local(tmp_path, "a", [])
+        b = _broker_local(tmp_path, "b", recibidos)
+        await a.iniciar()
+        await b.iniciar()
+        b.suscribir("100")
+        await asyncio.sleep(ESPERA)
+        await a.publicar("100", grande)
+        await a.publicar("100", Trama({"n": 2}))
+        for _ in range(50):
+            if len(recibidos) == 2:
+                break
+            await asyncio.sleep(ESPERA)
+        await a.cerrar()
+        await b.cerrar()
+        return recibidos
+
+    recibidos = asyncio.run(escenario())
+    assert [texto for _, texto in recibidos] == [grande.texto, '{"n":2}']
+
+
+def test_local_mensajes_de_control_a_los_demas_workers(tmp_path):
+    async def escenario():
+        controles_a, controles_b = [], []
+        a = _broker_local(tmp_path, "a", [])
+        b = _broker_local(tmp_path, "b", [])
+        a.controlar = _anotar(controles_a)
+        b.controlar = _anotar(controles_b)
+        await a.iniciar()
+        await b.iniciar()
+        await asyncio.sleep(ESPERA)
+        await a.publicar_control({"operacion": "personas.refrescar", "datos": {}})
+        await asyncio.sleep(ESPERA)
+        await a.cerrar()
+        await b.cerrar()
+        return controles_a, controles_b
+
+    controles_a, controles_b = asyncio.run(escenario())
+    assert controles_a == []
+    assert controles_b == [{"operacion": "personas.refrescar", "datos": {}}]
+
+
+def test_local_olvida_los_sockets_de_workers_caidos(tmp_path):
+    # Socket de un worker que terminó sin cerrar el broker: nadie escucha en él
+    import socket
+    caido = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    caido.bind(str(tmp_path / "caido.sock"))
+    caido.close()
+
+    async def escenario():
+        a = _broker_local(tmp_path, "a", [])
+        await a.iniciar()
+        await asyncio.sleep(ESPERA)
+        estadisticas = a.estadisticas()
+        await a.cerrar()
+        return estadisticas
+
+    estadisticas = asyncio.run(escenario())
+    assert estadisticas["workers_vecinos"] == 0
+    assert not (tmp_path / "caido.sock").exists()
+
+
+def _anotar(lista: list):
+    async def controlar(mensaje):
+        lista.append(mensaje)
+    return controlar
+
+
+def test_redis_publica_y_filtra_por_canal():
+    async def escenario():
+        servidor = ServidorResp()
+        puerto = await servidor.iniciar()
+        url = f"redis://127.0.0.1:{puerto}/0"
+        recibidos_a, recibidos_b = [], []
+        a = BrokerRedis(_receptor(recibidos_a), url, "test:")
+        b = BrokerRedis(_receptor(recibidos_b), url, "test:")
+        a.suscribir("100")
+        await a.iniciar()
+        await b.iniciar()
+        await asyncio.sleep(ESPERA)
+        b.suscribir("100")
+        b.suscribir("200")
+        await asyncio.sleep(ESPERA)
+
+        await a.publicar("100", Trama({"n": 1}))
+        await b.publicar("200", Trama({"n": 2}))
+        await a.publicar("300", Trama({"n": 3}))
+        await asyncio.sleep(ESPERA)
+        b.desuscribir("100")
+        await asyncio.sleep(ESPERA)
+        await a.publicar("100", Trama({"n": 4}))
+        await asyncio.sleep(ESPERA)
+        await a.cerrar()
+        await b.cerrar()
+        await servidor.cerrar()
+        return recibidos_a, recibidos_b
+
+    recibidos_a, recibidos_b = asyncio.run(escenario())
+    assert recibidos_a == [("100", '{"n":1}'), ("100", '{"n":4}')]
+    assert recibidos_b == [("100", '{"n":1}'), ("200", '{"n":2}')]
+
+
+def test_redis_control_no_vuelve_al_origen():
+    async def escenario():
+        servidor = ServidorResp()
+        puerto = await servidor.iniciar()
+        url = f"redis://127.0.0.1:{puerto}/0"
+        controles_a, controles_b = [], []
+        a = BrokerRedis(_receptor([]), url, "test:")
+        b = BrokerRedis(_receptor([]), url, "test:")
+        # Dos workers del mismo proceso: se distinguen por el origen
+        b.origen = f"{b.origen}-b"
+        a.controlar = _anotar(controles_a)
+        b.controlar = _anotar(controles_b)
+        await a.iniciar()
+        await b.iniciar()
+        await asyncio.sleep(ESPERA)
+        await a.publicar_control({"operacion": "asignaciones.invalidar", "datos": {}})
+        await asyncio.sleep(ESPERA)
+        await a.cerrar()
+        await b.cerrar()
+        await servidor.cerrar()
+        return controles_a, controles_b
+
+    controles_a, controles_b = asyncio.run(escenario())
+    assert controles_a == []
+    assert controles_b == [{"operacion": "asignaciones.invalidar", "datos": {}}]
+
+
+def test_redis_sin_respuesta_no_bloquea_la_publicacion():
+    async def escenario():
+        cerradas = []
+
+        # Acepta la conexión pero nunca responde; anota cuándo la cierra el broker
+        async def mudo(reader, writer):
+            while await reader.read(1024):
+                pass
+            cerradas.append(writer)
+            writer.close()
+
+        servidor = await asyncio.start_server(mudo, "127.0.0.1", 0)
+        puerto = servidor.sockets[0].getsockname()[1]
+        broker = BrokerRedis(_receptor([]), f"redis://127.0.0.1:{puerto}/0", "test:", timeout=ESPERA)
+        inicio = asyncio.get_running_loop().time()
+        await broker.publicar("100", Trama({"n": 1}))
+        duracion = asyncio.get_running_loop().time() - inicio
+        await asyncio.sleep(ESPERA)
+        servidor.close()
+        await servidor.wait_closed()
+        return duracion, len(cerradas), broker._publicador
+
+    duracion, cerradas, publicador = asyncio.run(escenario())
+    # Dos intentos de como mucho ESPERA cada uno, y las dos conexiones descartadas se cierran
+    assert duracion < 4 * ESPERA
+    assert cerradas == 2
+    assert publicador is None
+
+
+@pytest.mark.parametrize("respuesta, esperado", [
+    (b"+OK\r\n", b"OK"),
+    (b":3\r\n", 3),
+    (b"$-1\r\n", None),
+    (b"*2\r\n$1\r\na\r\n:1\r\n", [b"a", 1]),
+])
+def test_leer_resp(respuesta, esperado):
+    async def leer():
+        reader = asyncio.StreamReader()
+        reader.feed_data(respuesta)
+        return await _leer_resp(reader)
+
+    assert asyncio.run(leer()) == esperado
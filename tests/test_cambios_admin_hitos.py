@@ -0,0 +1,116 @@
+"""
+Sincronización incremental de /admin-hitos/cambios en SQLite (contador emulado): las páginas no
+parten una versión, una versión compartida por actualizaciones y lápidas llega completa en la
+misma página y un cambio en el hito maestro devuelve de nuevo sus cliente_proceso_hito.
+"""
+from datetime import date, time
+
+import pytest
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.infrastructure.db.database import Base
+from app.infrastructure.db.models.cliente_model import ClienteModel
+from app.infrastructure.db.models.cliente_proceso_hito_cumplimiento_model import ClienteProcesoHitoCumplimientoModel
+from app.infrastructure.db.models.cliente_proceso_hito_model import ClienteProcesoHitoModel
+from app.infrastructure.db.models.cliente_proceso_model import ClienteProcesoModel
+from app.infrastructure.db.models.fila_eliminada_model import FilaEliminadaModel
+from app.infrastructure.db.models.hito_model import HitoModel
+from app.infrastructure.db.models.proceso_hito_maestro_model import ProcesoHitoMaestroModel
+from app.infrastructure.db.models.proceso_model import ProcesoModel
+from app.infrastructure.db.repositories.admin_hitos_departamento_repository_sql import AdminHitosDepartamentoRepositorySQL
+
+MODELOS = [
+    ProcesoModel, HitoModel, ProcesoHitoMaestroModel, ClienteModel, ClienteProcesoModel,
+    ClienteProcesoHitoModel, ClienteProcesoHitoCumplimientoModel, FilaEliminadaModel,
+]
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+
+    # SQLite no admite nombres de tres partes: las tablas de [ATISA_Input].dbo están en la principal
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _sin_base_de_datos(conn, cursor, statement, parameters, context, executemany):
+        return statement.replace("[ATISA_Input].dbo.", ""), parameters
+
+    Base.metadata.create_all(engine, tables=[modelo.__table__ for modelo in MODELOS])
+    hoy = date.today()
+    with engine.begin() as conexion:
+        conexion.execute(ProcesoModel.__table__.insert(), [
+            {"id": 1, "nombre": "IVA", "frecuencia": 1, "temporalidad": "mes"},
+        ])
+        conexion.execute(HitoModel.__table__.insert(), [
+            {"id": 1, "nombre": "Presentación", "fecha_limite": hoy, "tipo": "Atisa", "row_version": 1},
+            {"id": 2, "nombre": "Pago", "fecha_limite": hoy, "tipo": "Atisa", "row_version": 1},
+        ])
+        conexion.execute(ProcesoHitoMaestroModel.__table__.insert(), [
+            {"id": 1, "proceso_id": 1, "hito_id": 1},
+            {"id": 2, "proceso_id": 1, "hito_id": 2},
+        ])
+        conexion.execute(ClienteModel.__table__.insert(), [{"idcliente": "1", "cif": "CIF1", "razsoc": "Cliente 1"}])
+        conexion.execute(ClienteProcesoModel.__table__.insert(), [
+            {"id": 100, "cliente_id": "1", "proceso_id": 1, "fecha_inicio": hoy},
+        ])
+        # La versión 10 la comparten una actualización, un hito deshabilitado, un cumplimiento y
+        # la lápida de un borrado
+        conexion.execute(ClienteProcesoHitoModel.__table__.insert(), [
+            {"id": 1, "cliente_proceso_id": 100, "hito_id": 1, "estado": "Nuevo", "tipo": "Atisa", "habilitado": True, "row_version": 5},
+            {"id": 2, "cliente_proceso_id": 100, "hito_id": 1, "estado": "Pendiente", "tipo": "Atisa", "habilitado": True, "row_version": 10},
+            {"id": 3, "cliente_proceso_id": 100, "hito_id": 2, "estado": "Nuevo", "tipo": "Atisa", "habilitado": False, "row_version": 10},
+            {"id": 4, "cliente_proceso_id": 100, "hito_id": 2, "estado": "Nuevo", "tipo": "Atisa", "habilitado": True, "row_version": 20},
+        ])
+        conexion.execute(ClienteProcesoHitoCumplimientoModel.__table__.insert(), [
+            {"id": 1, "cliente_proceso_hito_id": 1, "fecha": hoy, "hora": time(9, 0), "usuario": "111", "row_version": 10},
+        ])
+        conexion.execute(FilaEliminadaModel.__table__.insert(), [
+            {"tabla": "cliente_proceso_hito", "fila_id": 9, "cliente_id": "1", "row_version": 10},
+        ])
+
+    with Session(engine) as sesion:
+        yield sesion
+    engine.dispose()
+
+
+def _ids(filas, clave="cliente_proceso_hito_id"):
+    return sorted(fila[clave] for fila in filas)
+
+
+def test_la_pagina_no_parte_una_version(session):
+    repo = AdminHitosDepartamentoRepositorySQL(session)
+
+    # La página de 3 acabaría dentro de la versión 10: se corta antes
+    primera = repo.listar_cambios(0, limit=3)
+    assert primera["hay_mas"] and primera["version"] == 5
+    assert _ids(primera["hitos"]) == [1]
+    assert primera["cumplimientos"] == [] and primera["eliminados"] == []
+
+    # La versión 10 ocupa más que la página: se devuelve entera, actualizaciones y lápidas juntas
+    segunda = repo.listar_cambios(primera["version"], limit=3)
+    assert segunda["hay_mas"] and segunda["version"] == 10
+    assert _ids(segunda["hitos"]) == [2]
+    assert _ids(segunda["cumplimientos"], "id") == [1]
+    assert sorted((fila["id"], fila["motivo"]) for fila in segunda["eliminados"]) == [(3, "deshabilitado"), (9, "eliminado")]
+
+    tercera = repo.listar_cambios(segunda["version"], limit=3)
+    assert not tercera["hay_mas"] and tercera["version"] == 20
+    assert _ids(tercera["hitos"]) == [4]
+    assert tercera["cumplimientos"] == [] and tercera["eliminados"] == []
+
+    assert repo.listar_cambios(tercera["version"])["hitos"] == []
+
+
+def test_cambio_en_el_hito_maestro(session):
+    repo = AdminHitosDepartamentoRepositorySQL(session)
+    version = repo.listar_cambios(0)["version"]
+
+    # La fecha límite del hito maestro llega a los cliente_proceso_hito sin fecha propia
+    session.execute(update(HitoModel).where(HitoModel.id == 2).values(fecha_limite=date(2030, 1, 31), row_version=30))
+    session.commit()
+
+    cambios = repo.listar_cambios(version)
+    assert cambios["version"] == 30
+    assert [(fila["cliente_proceso_hito_id"], fila["fecha_limite"]) for fila in cambios["hitos"]] == [(4, "2030-01-31")]
+    assert [(fila["id"], fila["motivo"], fila["row_version"]) for fila in cambios["eliminados"]] == [(3, "deshabilitado", 30)]
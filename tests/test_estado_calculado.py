@@ -0,0 +1,149 @@
+"""
+Equivalencia entre estado_calculado_expr (CASE en SQL) y la implementación de referencia
+ClienteProcesoHitoStatusService._calculate_excel_status, evaluando la expresión en SQLite sobre
+todas las combinaciones de estado, fecha/hora límite y fecha/hora de cumplimiento alrededor de hoy.
+"""
+import itertools
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import Column, Date, Integer, MetaData, String, Table, Time, create_engine, select
+
+from app.application.services.cliente_proceso_hito_status_service import ClienteProcesoHitoStatusService
+from app.infrastructure.db.compartido.estado_calculado import (
+    ESTADOS_CALCULADOS,
+    estado_calculado_expr,
+    filtro_estados_calculados,
+)
+
+HOY = date.today()
+
+ESTADOS = ["Finalizado", "Pendiente", "Nuevo"]
+FECHAS_LIMITE = [None, HOY - timedelta(days=1), HOY, HOY + timedelta(days=1)]
+HORAS_LIMITE = [None, time(0, 0), time(13, 30), time(23, 59, 59)]
+# Sin cumplimiento, antes, el mismo día y después del plazo
+DESFASES_CUMPLIMIENTO = [None, -1, 0, 1]
+HORAS_CUMPLIMIENTO = [None, time(0, 0), time(13, 30), time(13, 30, 1), time(23, 59, 59)]
+
+metadata = MetaData()
+filas = Table(
+    "filas", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("estado", String(50)),
+    Column("fecha_limite", Date),
+    Column("hora_limite", Time),
+    Column("fecha_cumplimiento", Date),
+    Column("hora_cumplimiento", Time),
+)
+
+
+def _casos():
+    casos = []
+    for estado, fecha_limite, hora_limite, desfase, hora_cumplimiento in itertools.product(
+        ESTADOS, FECHAS_LIMITE, HORAS_LIMITE, DESFASES_CUMPLIMIENTO, HORAS_CUMPLIMIENTO
+    ):
+        if desfase is None:
+            fecha_cumplimiento = None
+        else:
+            fecha_cumplimiento = (fecha_limite or HOY) + timedelta(days=desfase)
+        casos.append((estado, fecha_limite, hora_limite, fecha_cumplimiento, hora_cumplimiento))
+    return casos
+
+
+def _oraculo(estado, fecha_limite, hora_limite, fecha_cumplimiento, hora_cumplimiento):
+    if fecha_cumplimiento is not None and hora_cumplimiento is not None:
+        fecha_cumplimiento = datetime.combine(fecha_cumplimiento, hora_cumplimiento)
+    return ClienteProcesoHitoStatusService(None)._calculate_excel_status(
+        estado, fecha_limite, hora_limite, fecha_cumplimiento
+    )
+
+
+@pytest.fixture(scope="module")
+def conexion():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.execute(filas.insert(), [
+            dict(zip(("estado", "fecha_limite", "hora_limite", "fecha_cumplimiento", "hora_cumplimiento"), caso))
+            for caso in _casos()
+        ])
+        yield conn
+
+
+def _evaluar(conn, con_hora_cumplimiento: bool):
+    expr = estado_calculado_expr(
+        filas.c.estado,
+        filas.c.fecha_limite,
+        filas.c.fecha_cumplimiento,
+        hoy=HOY,
+        hora_limite=filas.c.hora_limite,
+        hora_cumplimiento=filas.c.hora_cumplimiento if con_hora_cumplimiento else None,
+    )
+    return conn.execute(select(filas, expr.label("estado_calculado")).order_by(filas.c.id)).mappings().all()
+
+
+def test_sin_hora_de_cumplimiento_equivale_al_oraculo(conexion):
+    # Reporte general: el cumplimiento es solo fecha (medianoche)
+    for fila in _evaluar(conexion, con_hora_cumplimiento=False):
+        esperado = _oraculo(fila["estado"], fila["fecha_limite"], fila["hora_limite"], fila["fecha_cumplimiento"], None)
+        assert fila["estado_calculado"] == esperado, dict(fila)
+
+
+def test_con_hora_de_cumplimiento_equivale_al_oraculo(conexion):
+    # Export por cliente: el mismo día del plazo decide la hora del cumplimiento
+    for fila in _evaluar(conexion, con_hora_cumplimiento=True):
+        esperado = _oraculo(fila["estado"], fila["fecha_limite"], fila["hora_limite"],
+                            fila["fecha_cumplimiento"], fila["hora_cumplimiento"])
+        assert fila["estado_calculado"] == esperado, dict(fila)
+
+
+@pytest.mark.parametrize("caso, esperado", [
+    # Vence el mismo día
+    (("Pendiente", HOY, time(13, 30), None, None), "Vence hoy"),
+    # Sin hora límite el plazo acaba a las 23:59:59
+    (("Finalizado", HOY, None, HOY, time(23, 59, 59)), "Cumplido en plazo"),
+    (("Finalizado", HOY, None, HOY + timedelta(days=1), time(0, 0)), "Cumplido fuera de plazo"),
+    # Sin cumplimiento
+    (("Finalizado", HOY, time(13, 30), None, None), "Finalizado"),
+    (("Pendiente", HOY - timedelta(days=1), None, None, None), "Pendiente fuera de plazo"),
+    # Cumplimiento tardío el mismo día y días después
+    (("Finalizado", HOY, time(13, 30), HOY, time(13, 30, 1)), "Cumplido fuera de plazo"),
+    (("Finalizado", HOY - timedelta(days=1), time(13, 30), HOY, None), "Cumplido fuera de plazo"),
+    (("Finalizado", HOY, time(13, 30), HOY, time(13, 30)), "Cumplido en plazo"),
+])
+def test_casos_limite(conexion, caso, esperado):
+    assert _oraculo(*caso) == esperado
+    estado, fecha_limite, hora_limite, fecha_cumplimiento, hora_cumplimiento = caso
+    fila = conexion.execute(select(estado_calculado_expr(
+        filas.c.estado, filas.c.fecha_limite, filas.c.fecha_cumplimiento, hoy=HOY,
+        hora_limite=filas.c.hora_limite, hora_cumplimiento=filas.c.hora_cumplimiento,
+    )).where(
+        filas.c.estado == estado,
+        filas.c.fecha_limite.is_(None) if fecha_limite is None else filas.c.fecha_limite == fecha_limite,
+        filas.c.hora_limite.is_(None) if hora_limite is None else filas.c.hora_limite == hora_limite,
+        filas.c.fecha_cumplimiento.is_(None) if fecha_cumplimiento is None else filas.c.fecha_cumplimiento == fecha_cumplimiento,
+        filas.c.hora_cumplimiento.is_(None) if hora_cumplimiento is None else filas.c.hora_cumplimiento == hora_cumplimiento,
+    )).scalar_one()
+    assert fila == esperado
+
+
+def test_filtro_por_estado_coincide_con_el_oraculo(conexion):
+    # Muestra aleatoria (reproducible) de combinaciones de claves del filtro "estados"
+    claves = ["cumplido_en_plazo", "cumplido_fuera_plazo", "vence_hoy", "pendiente_fuera_de_plazo",
+              "pendiente_en_plazo", "finalizado", "pendiente"]
+    aleatorio = random.Random(27)
+    expr = estado_calculado_expr(filas.c.estado, filas.c.fecha_limite, filas.c.fecha_cumplimiento, hoy=HOY,
+                                 hora_limite=filas.c.hora_limite)
+    todas = {fila["id"]: fila for fila in _evaluar(conexion, con_hora_cumplimiento=False)}
+    for _ in range(20):
+        elegidas = aleatorio.sample(claves, aleatorio.randint(1, 3))
+        ids = set(conexion.execute(
+            select(filas.c.id).where(filtro_estados_calculados(expr, ",".join(elegidas)))
+        ).scalars())
+        etiquetas = {ESTADOS_CALCULADOS.get(clave, clave.replace("_", " ")).lower() for clave in elegidas}
+        esperados = {
+            id_fila for id_fila, fila in todas.items()
+            if (_oraculo(fila["estado"], fila["fecha_limite"], fila["hora_limite"], fila["fecha_cumplimiento"], None) or "").lower() in etiquetas
+        }
+        assert ids == esperados, elegidas
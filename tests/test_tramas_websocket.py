@@ -0,0 +1,32 @@
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+import pytest
+
+from app.infrastructure.services import tramas_websocket
+
+MENSAJE = {
+    "fecha": date(2024, 5, 1),
+    "momento": datetime(2024, 5, 1, 10, 30),
+    "con_microsegundos": datetime(2024, 5, 1, 10, 30, 0, 1500),
+    "con_zona": datetime(2024, 5, 1, tzinfo=timezone.utc),
+    "hora": time(9, 5),
+    "importe": Decimal("1.50"),
+    "texto": "Año ñ",
+    "lista": [1, None, True],
+}
+
+
+def test_sin_orjson_se_codifica_igual(monkeypatch):
+    pytest.importorskip("orjson")
+    con_orjson = tramas_websocket.dumps_json(MENSAJE)
+    monkeypatch.setattr(tramas_websocket, "orjson", None)
+    assert tramas_websocket.dumps_json(MENSAJE) == con_orjson
+
+
+def test_fechas_en_iso_8601(monkeypatch):
+    monkeypatch.setattr(tramas_websocket, "orjson", None)
+    decodificado = tramas_websocket.loads_json(tramas_websocket.dumps_json(MENSAJE))
+    assert decodificado["momento"] == "2024-05-01T10:30:00"
+    assert decodificado["hora"] == "09:05:00"
+    assert decodificado["importe"] == "1.50"